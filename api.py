@@ -3,9 +3,12 @@ FastAPI server for SD1 Film Production AI System
 """
 from fastapi import FastAPI, HTTPException, File, UploadFile
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import FileResponse, StreamingResponse
 from pydantic import BaseModel
 from typing import Dict, Any, List, Optional
 import asyncio
+import io
+import json
 import logging
 import os
 from datetime import datetime
@@ -51,6 +54,11 @@ except Exception as e:
     logger.error(f"Error initializing coordinators: {e}")
     raise
 
+@app.on_event("shutdown")
+def close_coordinators():
+    """Stop the scheduling worker processes with the server."""
+    scheduling_coordinator.close()
+
 # Pydantic models for API requests
 class ScriptRequest(BaseModel):
     script_text: str
@@ -61,9 +69,15 @@ class StoryboardRequest(BaseModel):
     scene_data: Dict[str, Any]
     shot_settings: Optional[Dict[str, Any]] = None
 
+class StoryboardExportRequest(BaseModel):
+    storyboard: Dict[str, Any]
+    panels_per_page: int = 6
+
 class BudgetRequest(BaseModel):
     production_data: Dict[str, Any]
     budget_constraints: Optional[Dict[str, Any]] = None
+    scene_data: Optional[Dict[str, Any]] = None
+    project_id: Optional[str] = "default"
 
 class ScheduleRequest(BaseModel):
     script_data: Dict[str, Any]
@@ -302,6 +316,25 @@ async def generate_schedule_frontend(request: dict):
         logger.error(f"Error in schedule generation: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.post("/api/schedule/what-if")
+async def evaluate_schedule_orders(request: dict):
+    """Rank candidate shooting orders without generating full schedules."""
+    try:
+        result = await scheduling_coordinator.evaluate_shooting_orders(
+            scene_data=request.get("script_results", {}),
+            candidates=request.get("candidates", []),
+            generate=int(request.get("generate", 0)),
+            start_date=request.get("start_date", ""),
+            location_constraints=request.get("location_constraints", {}),
+            schedule_constraints=request.get("schedule_constraints", {}),
+            weights=request.get("weights"),
+            seed=request.get("seed")
+        )
+        return {"success": True, "data": result}
+    except Exception as e:
+        logger.error(f"Error in schedule what-if evaluation: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
 # Budgeting endpoints
 @app.post("/api/budget/estimate")
 async def estimate_budget(request: BudgetRequest):
@@ -309,7 +342,9 @@ async def estimate_budget(request: BudgetRequest):
     try:
         result = await budgeting_coordinator.process_budget_estimation({
             "production_data": request.production_data,
-            "budget_constraints": request.budget_constraints
+            "budget_constraints": request.budget_constraints,
+            "scene_data": request.scene_data,
+            "project_id": request.project_id
         })
         return {"success": True, "data": result}
     except Exception as e:
@@ -340,13 +375,230 @@ async def estimate_budget_frontend(request: dict):
         
         result = await budgeting_coordinator.process_budget_estimation({
             "production_data": production_data,
-            "budget_constraints": budget_constraints
+            "budget_constraints": budget_constraints,
+            "scene_data": request.get("scene_data"),
+            "project_id": request.get("project_id", "default")
         })
         return {"success": True, "data": result}
     except Exception as e:
         logger.error(f"Error in budget estimation: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.post("/api/budget/risk")
+async def simulate_budget_risk(request: dict):
+    """Monte Carlo percentile budgets (P50/P80/P95) with tornado sensitivity."""
+    try:
+        script_results = request.get("script_results", {})
+        scenes = (script_results.get("parsed_data") or {}).get("scenes", [])
+        result = await budgeting_coordinator.simulate_budget_risk(
+            budget=request.get("budget"),
+            scenes=scenes,
+            trials=int(request.get("trials", 100000)),
+            parameters=request.get("risk_parameters"),
+            seed=request.get("seed"),
+            project_id=request.get("project_id", "default")
+        )
+        return {"success": True, "data": result}
+    except Exception as e:
+        logger.error(f"Error in budget risk simulation: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.get("/api/budget/projects/{project_id}")
+async def get_budget_project(project_id: str, version: Optional[int] = None):
+    """Budget summary for a project, at its latest or a given snapshot version."""
+    try:
+        result = await asyncio.to_thread(budgeting_coordinator.get_budget_summary, project_id, version)
+        return {"success": True, "data": result}
+    except Exception as e:
+        logger.error(f"Error in budget project summary: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.get("/api/budget/projects/{project_id}/history")
+async def get_budget_project_history(project_id: str):
+    """Snapshot history for a project's budget session."""
+    try:
+        result = await asyncio.to_thread(budgeting_coordinator.get_budget_history, project_id)
+        return {"success": True, "data": result}
+    except Exception as e:
+        logger.error(f"Error in budget project history: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.post("/api/budget/projects/{project_id}/restore")
+async def restore_budget_project(project_id: str, request: dict):
+    """Make an earlier snapshot the project's current budget session."""
+    try:
+        result = await asyncio.to_thread(budgeting_coordinator.restore_budget_version, project_id, int(request["version"]))
+        return {"success": True, "data": result}
+    except Exception as e:
+        logger.error(f"Error in budget project restore: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.post("/api/budget/projects/{project_id}/lines")
+async def edit_budget_line(project_id: str, request: dict):
+    """Edit one budget line; the change is journaled and can be undone."""
+    try:
+        result = await asyncio.to_thread(
+            budgeting_coordinator.edit_budget_line,
+            request["category"],
+            request["item"],
+            request["total_cost"],
+            reason=request.get("reason", "edit"),
+            project_id=project_id
+        )
+        return {"success": True, "data": result}
+    except Exception as e:
+        logger.error(f"Error in budget line edit: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.post("/api/budget/projects/{project_id}/undo")
+async def undo_budget_change(project_id: str):
+    """Revert the latest budget edit or optimization."""
+    try:
+        result = await asyncio.to_thread(budgeting_coordinator.undo_budget_change, project_id)
+        return {"success": True, "data": result}
+    except Exception as e:
+        logger.error(f"Error in budget undo: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.post("/api/budget/projects/{project_id}/what-if")
+async def preview_budget_variants(project_id: str, request: dict):
+    """Totals for what-if budget variants without saving them."""
+    try:
+        result = await asyncio.to_thread(budgeting_coordinator.preview_budget_variants, request.get("variants", []), project_id)
+        return {"success": True, "data": result}
+    except Exception as e:
+        logger.error(f"Error in budget what-if preview: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.get("/api/budget/projects/{project_id}/scenes")
+async def get_scene_costs(project_id: str):
+    """Per-scene cost table rolled up to the project's category budget."""
+    try:
+        result = await asyncio.to_thread(budgeting_coordinator.get_scene_costs, project_id)
+        return {"success": True, "data": result}
+    except Exception as e:
+        logger.error(f"Error in scene costs: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.post("/api/budget/projects/{project_id}/scene-cuts")
+async def preview_scene_cuts(project_id: str, request: dict):
+    """Savings from cutting the given scenes, without saving anything."""
+    try:
+        result = await asyncio.to_thread(budgeting_coordinator.preview_scene_cuts, request.get("scene_ids", []), project_id)
+        return {"success": True, "data": result}
+    except Exception as e:
+        logger.error(f"Error in scene cut preview: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.post("/api/budget/projects/{project_id}/optimize")
+async def optimize_project_budget(project_id: str, request: dict):
+    """Fit a project's budget to target_budget with the local optimizer."""
+    try:
+        result = await budgeting_coordinator.optimize_current_budget(
+            request.get("constraints", {}),
+            request.get("target_budget"),
+            vendor_data=request.get("vendor_data"),
+            project_id=project_id
+        )
+        return {"success": True, "data": result}
+    except Exception as e:
+        logger.error(f"Error in budget optimization: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.post("/api/budget/projects/{project_id}/expenses")
+async def ingest_expenses(project_id: str, request: dict):
+    """Append a batch of actual expenses given as CSV or JSONL text."""
+    try:
+        result = await asyncio.to_thread(
+            budgeting_coordinator.ingest_expenses,
+            request.get("data", "").splitlines(),
+            fmt=request.get("format", "csv"),
+            tracking_period=request.get("tracking_period"),
+            project_id=project_id
+        )
+        return {"success": True, "data": result}
+    except Exception as e:
+        logger.error(f"Error in expense ingestion: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.post("/api/budget/projects/{project_id}/expenses/upload")
+async def upload_expenses(project_id: str, file: UploadFile = File(...), tracking_period: Optional[str] = None):
+    """Append a CSV or JSONL cost report file, read line by line."""
+    try:
+        fmt = "jsonl" if file.filename and file.filename.lower().endswith((".jsonl", ".ndjson")) else "csv"
+        lines = io.TextIOWrapper(file.file, encoding="utf-8-sig")
+        result = await asyncio.to_thread(budgeting_coordinator.ingest_expenses, lines, fmt=fmt, tracking_period=tracking_period, project_id=project_id)
+        return {"success": True, "data": result}
+    except Exception as e:
+        logger.error(f"Error in expense upload: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.get("/api/budget/projects/{project_id}/tracking/narrative")
+async def get_tracking_narrative(project_id: str):
+    """LLM narrative for the project's current tracking report."""
+    try:
+        result = await budgeting_coordinator.get_tracking_narrative(project_id)
+        return {"success": True, "data": result}
+    except Exception as e:
+        logger.error(f"Error in tracking narrative: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.post("/api/budget/projects/{project_id}/cash-flow")
+async def project_cash_flow(project_id: str, request: dict):
+    """Weekly or monthly cash-flow projection with running balance and shortfalls."""
+    try:
+        result = await asyncio.to_thread(
+            budgeting_coordinator.project_cash_flow,
+            start_date=request.get("start_date"),
+            shoot_days=request.get("shoot_days"),
+            freq=request.get("frequency", "W"),
+            financing_shares=request.get("financing_shares"),
+            cash_flows=request.get("cash_flows"),
+            opening_balance=float(request.get("opening_balance", 0)),
+            minimum_balance=float(request.get("minimum_balance", 0)),
+            project_id=project_id
+        )
+        return {"success": True, "data": result}
+    except Exception as e:
+        logger.error(f"Error in cash flow projection: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.get("/api/budget/projects/{project_id}/export")
+async def export_budget(project_id: str, format: str = "csv", sections: Optional[str] = None, version: Optional[int] = None):
+    """Top sheet, detail, fringes and cash-flow schedule as a CSV, XLSX or PDF download."""
+    try:
+        result = await asyncio.to_thread(
+            budgeting_coordinator.export_budget,
+            format,
+            sections.split(",") if sections else None,
+            version,
+            project_id
+        )
+        return FileResponse(result["path"], media_type=result["media_type"], filename=result["filename"])
+    except Exception as e:
+        logger.error(f"Error in budget export: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.get("/api/budget/projects/{project_id}/vendors")
+async def get_vendor_rankings(project_id: str, metric: str = "total_spend", descending: bool = True, limit: Optional[int] = None):
+    """Vendors ranked by spend, on-time ratio, delay, rating, rate variance or outstanding balance."""
+    try:
+        result = await asyncio.to_thread(budgeting_coordinator.get_vendor_rankings, metric, descending, limit, project_id)
+        return {"success": True, "data": result}
+    except Exception as e:
+        logger.error(f"Error in vendor rankings: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.get("/api/budget/projects/{project_id}/vendors/{vendor_id}")
+async def get_vendor_report(project_id: str, vendor_id: str):
+    """One vendor's spend, payment status and performance metrics."""
+    try:
+        result = await asyncio.to_thread(budgeting_coordinator.get_vendor_report, vendor_id, project_id)
+        return {"success": True, "data": result}
+    except Exception as e:
+        logger.error(f"Error in vendor report: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
 @app.get("/api/budget/verify-agents")
 async def verify_budget_agents():
     """Verify all budget sub-agents are properly connected."""
@@ -371,6 +623,32 @@ async def generate_storyboard(request: StoryboardRequest):
         logger.error(f"Error in storyboard generation: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.post("/api/storyboard/stream")
+async def stream_storyboard(request: StoryboardRequest):
+    """Generate a storyboard, streaming each panel as NDJSON as soon as it is saved."""
+    async def events():
+        try:
+            async for event in storyboard_coordinator.stream_storyboard(
+                request.scene_data,
+                request.shot_settings
+            ):
+                yield json.dumps(event, default=str) + "\n"
+        except Exception as e:
+            logger.error(f"Error in storyboard streaming: {e}")
+            yield json.dumps({"type": "error", "error": str(e)}) + "\n"
+    
+    return StreamingResponse(events(), media_type="application/x-ndjson")
+
+@app.post("/api/storyboard/export")
+async def export_storyboard_pdf(request: StoryboardExportRequest):
+    """Storyboard as a grid-layout PDF download, several panels to a page."""
+    try:
+        result = await storyboard_coordinator.export_pdf(request.storyboard, request.panels_per_page)
+        return FileResponse(result["path"], media_type=result["media_type"], filename=result["filename"])
+    except Exception as e:
+        logger.error(f"Error in storyboard export: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
 # One-liner endpoints
 @app.post("/api/oneliners/generate")
 async def generate_oneliners(request: OneLinerRequest):
@@ -12,6 +12,7 @@ from character_breakdown.coordinator import CharacterBreakdownCoordinator
 from scheduling.coordinator import SchedulingCoordinator
 from budgeting.coordinator import BudgetingCoordinator
 from storyboard.coordinator import StoryboardCoordinator
+from storyboard.image_derivatives import derivative_for
 from one_liner.agents.one_linear_agent import OneLinerAgent
 import logging
 import plotly.express as px
@@ -950,6 +951,7 @@ def show_character_breakdown():
 
 async def run_scheduling_pipeline(script_results, character_results, start_date, location_constraints, schedule_constraints):
     """Run the complete scheduling pipeline asynchronously."""
+    coordinator = None
     try:
         coordinator = SchedulingCoordinator()
         
@@ -1014,6 +1016,9 @@ async def run_scheduling_pipeline(script_results, character_results, start_date,
         status.error(f"Error generating schedule: {str(e)}")
         progress.empty()
         raise
+    finally:
+        if coordinator is not None:
+            coordinator.close()
 
 def show_schedule():
     st.title("Schedule View")
@@ -1681,7 +1686,15 @@ def show_storyboard():
     logger.info("Starting storyboard view")
     
     # Define the absolute path for storyboards
-    STORYBOARD_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "static", "storage", "storyboards")
+    # Images are named by content hash, so scenes are found through their stored image_path
+    STATIC_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "static")
+    STORYBOARD_DIR = os.path.join(STATIC_DIR, "storage", "storyboards")
+    
+    def scene_image(scene, size):
+        """Absolute path of one size of a scene's image, or None for panels that failed to generate."""
+        if not scene.get("image_path"):
+            return None
+        return derivative_for(os.path.join(STATIC_DIR, scene["image_path"]), size)
     os.makedirs(STORYBOARD_DIR, exist_ok=True)
     logger.info(f"Using storyboard directory: {STORYBOARD_DIR}")
     
@@ -1724,8 +1737,8 @@ def show_storyboard():
                         # Update image paths to absolute paths
                         if "scenes" in storyboard_results:
                             for scene in storyboard_results["scenes"]:
-                                if "image_path" in scene:
-                                    scene["image_path"] = os.path.join(STORYBOARD_DIR, f"scene_{scene.get('scene_id', '')}.webp")
+                                if scene.get("image_path"):
+                                    scene["image_path"] = os.path.join(STATIC_DIR, scene["image_path"])
                                     logger.info(f"Updated image path for scene {scene.get('scene_id', '')}: {scene['image_path']}")
                         
                         save_to_storage(storyboard_results, 'storyboard_results.json')
@@ -1761,18 +1774,14 @@ def show_storyboard():
                         for j, scene in enumerate(row_scenes):
                             with cols[j]:
                                 # Get the absolute path for the image
-                                image_path = os.path.join(STORYBOARD_DIR, f"scene_{scene.get('scene_id', '')}.webp")
+                                image_path = scene_image(scene, "thumbnail")
                                 logger.info(f"Checking image path for scene {scene.get('scene_id', '')}: {image_path}")
                                 
-                                if os.path.exists(image_path):
+                                if image_path and os.path.exists(image_path):
                                     logger.info(f"Image found at path: {image_path}")
                                     st.image(image_path, 
                                            caption=f"Scene {scene.get('scene_id', '?')} - {scene.get('technical_params', {}).get('shot_type', 'MS')}")
                                     
-                                    # Update the path in the scene data
-                                    scene["image_path"] = image_path
-                                    logger.info(f"Updated image path in scene data to: {image_path}")
-                                    
                                     # Display prompt
                                     with st.expander("View Prompt"):
                                         st.write("**Original Prompt:**")
@@ -1808,9 +1817,9 @@ def show_storyboard():
                         st.write(f"### Scene {scene.get('scene_id', '?')}")
                         
                         # Get the absolute path for the image
-                        image_path = os.path.join(STORYBOARD_DIR, f"scene_{scene.get('scene_id', '')}.webp")
+                        image_path = scene_image(scene, "preview")
                         
-                        if os.path.exists(image_path):
+                        if image_path and os.path.exists(image_path):
                             st.image(image_path, use_column_width=True)
                             
                             # Display scene details
@@ -2,11 +2,12 @@ from typing import Dict, Any, List
 import json
 import logging
 import re
-from datetime import datetime
 import os
+import asyncio
 from google import genai
 from google.genai import types
 from base_config import AGENT_INSTRUCTIONS, get_model_config
+from ..optimization_engine import OptimizationEngine
 
 logger = logging.getLogger(__name__)
 
@@ -15,6 +16,7 @@ class BudgetOptimizerAgent:
         self.client = genai.Client(api_key=os.environ.get("GOOGLE_API_KEY"))
         self.model_config = get_model_config()
         self.instructions = AGENT_INSTRUCTIONS["budget_optimizer"]
+        self.engine = OptimizationEngine()
         # Initialize optimization templates for Indian market
         self.optimization_templates = {
             "cost_reduction": {
@@ -46,90 +48,34 @@ class BudgetOptimizerAgent:
         cost_estimates: Dict[str, Any],
         production_constraints: Dict[str, Any],
         target_budget: float = None,
-        scenario: str = "base"
+        scenario: str = "base",
+        include_llm_commentary: bool = False
     ) -> Dict[str, Any]:
-        """Optimize budget allocation with scenario analysis."""
-        # Apply scenario adjustments
-        adjusted_estimates = self._apply_scenario_adjustments(
-            cost_estimates,
-            scenario,
-            production_constraints
-        )
-        
-        prompt = self._generate_optimization_prompt(
-            adjusted_estimates,
-            production_constraints,
-            target_budget,
-            scenario
-        )
+        """Optimize budget allocation with scenario analysis.
         
+        The plan comes from the local OptimizationEngine, the lowest-impact
+        set of category cuts, equipment tier swaps and shoot-day cuts that
+        meets target_budget; the LLM only explains it when asked to.
+        """
         try:
-            # Combine instructions with prompt
-            full_prompt = f"{self.instructions}\n\n{prompt}"
-
-            response = self.client.models.generate_content(
-                model=self.model_config["model"],
-                contents=full_prompt,
-                config=types.GenerateContentConfig(
-                    temperature=self.model_config["temperature"],
-                    max_output_tokens=self.model_config["max_output_tokens"],
-                    top_p=self.model_config["top_p"],
-                    top_k=self.model_config["top_k"],
-                    response_mime_type="application/json"
-                )
-            )
-
-            # Safe content extraction
-            def extract_content_safely(response):
-                if not hasattr(response, 'candidates') or not response.candidates:
-                    raise ValueError("No candidates in Gemini response")
-                
-                candidate = response.candidates[0]
-                if not hasattr(candidate, 'content') or not candidate.content:
-                    raise ValueError("Empty content in Gemini response")
-                
-                if not hasattr(candidate.content, 'parts') or not candidate.content.parts:
-                    raise ValueError("No content parts in Gemini response")
-                
-                text_content = candidate.content.parts[0].text
-                if not text_content:
-                    raise ValueError("Empty text content in Gemini response")
-                
-                return text_content
-
-            try:
-                response_text = extract_content_safely(response)
-                logger.info(f"Received budget optimization response for scenario: {scenario}")
-                
-                optimization = self._extract_json(response_text)
-                if not optimization:
-                    logger.error("Failed to extract valid JSON from response")
-                    return self._create_fallback_optimization(
-                        adjusted_estimates,
-                        target_budget,
-                        scenario
-                    )
-            except ValueError as e:
-                logger.error(f"Validation error: {e}")
-                return self._create_fallback_optimization(
-                    adjusted_estimates,
-                    target_budget,
-                    scenario
-                )
-            
-            processed = self._process_optimization(
-                optimization,
-                adjusted_estimates,
+            optimization = await asyncio.to_thread(
+                self.engine.optimize,
+                cost_estimates,
                 target_budget,
+                production_constraints,
                 scenario
             )
+            optimization["recommendations"] = self._recommendations(optimization)
+            
+            if include_llm_commentary:
+                optimization["commentary"] = await self._generate_commentary(optimization, target_budget)
             logger.info(f"Successfully processed budget optimization for scenario: {scenario}")
-            return processed
+            return optimization
             
         except Exception as e:
             logger.error(f"Error in budget optimization: {str(e)}", exc_info=True)
             return self._create_fallback_optimization(
-                adjusted_estimates,
+                cost_estimates,
                 target_budget,
                 scenario
             )
@@ -166,123 +112,65 @@ class BudgetOptimizerAgent:
             "comparison": comparison
         }
     
-    def _apply_scenario_adjustments(
-        self,
-        estimates: Dict[str, Any],
-        scenario: str,
-        constraints: Dict[str, Any]
-    ) -> Dict[str, Any]:
-        """Apply scenario-specific adjustments to cost estimates."""
-        adjusted = json.loads(json.dumps(estimates))  # Deep copy
-        
-        # Get regional factors
-        region = constraints.get("region", "mumbai").lower()
-        factors = self.optimization_templates["regional_factors"].get(
-            region,
-            self.optimization_templates["regional_factors"]["mumbai"]
-        )
-        
-        # Apply scenario multipliers
-        multipliers = {
-            "base": 1.0,
-            "optimistic": 0.9,
-            "conservative": 1.2
-        }
-        
-        scenario_multiplier = multipliers.get(scenario, 1.0)
-        regional_multiplier = factors["cost_multiplier"]
-        risk_multiplier = factors["risk_factor"]
-        
-        # Apply multipliers to all cost categories
-        for category in ["location_costs", "equipment_costs", "personnel_costs"]:
-            if category in adjusted:
-                for item in adjusted[category].values():
-                    if isinstance(item, dict) and "total_cost" in item:
-                        item["total_cost"] *= (
-                            scenario_multiplier *
-                            regional_multiplier *
-                            risk_multiplier
-                        )
-        
-        return adjusted
+    def _recommendations(self, optimization: Dict[str, Any]) -> List[Dict[str, Any]]:
+        """Actions for each lever in the plan, largest saving first, with methods from the templates."""
+        methods = self.optimization_templates["cost_reduction"]
+        template_keys = {"location_costs": "location", "equipment_costs": "equipment", "personnel_costs": "crew"}
+        recommendations = [
+            {
+                "action": lever,
+                "priority": "high",
+                "timeline": "pre-production",
+                "expected_outcome": "Discrete lever chosen by the optimizer",
+                "dependencies": []
+            }
+            for lever in optimization["plan"]["levers"]
+        ]
+        cuts = sorted(optimization["plan"]["category_cuts"].items(), key=lambda item: item[1], reverse=True)
+        for category, savings in cuts:
+            options = methods.get(template_keys.get(category), {})
+            recommendations.append({
+                "action": f"Reduce {category.replace('_', ' ')} by {savings:,.2f}",
+                "priority": "high" if savings == cuts[0][1] else "medium",
+                "timeline": "pre-production",
+                "expected_outcome": f"Saves {savings:,.2f} before contingency",
+                "methods": [name.replace("_", " ") for name, option in options.items() if option["impact"] != "high"],
+                "dependencies": []
+            })
+        return recommendations
     
-    def _generate_optimization_prompt(
-        self,
-        estimates: Dict[str, Any],
-        constraints: Dict[str, Any],
-        target_budget: float,
-        scenario: str
-    ) -> str:
-        """Generate optimization prompt with scenario context."""
-        return f"""You are a professional Indian film production budget optimizer. Analyze the estimates and suggest optimizations for the {scenario} scenario in valid JSON format.
-
-        Required JSON structure:
-        {{
-            "scenario_info": {{
-                "name": string,
-                "description": string,
-                "risk_level": string
-            }},
-            "reductions": {{
-                "category": {{
-                    "current_cost": float,
-                    "proposed_cost": float,
-                    "savings": float,
-                    "methods": [string],
-                    "impact": string
-                }}
-            }},
-            "reallocations": [
-                {{
-                    "from_category": string,
-                    "to_category": string,
-                    "amount": float,
-                    "justification": string,
-                    "risk": string
-                }}
-            ],
-            "alternatives": {{
-                "category": {{
-                    "options": [string],
-                    "savings": float,
-                    "implementation_cost": float,
-                    "net_benefit": float,
-                    "timeline": string
-                }}
-            }},
-            "regional_strategies": {{
-                "local_resources": [string],
-                "cost_advantages": [string],
-                "risk_mitigations": [string]
-            }},
-            "impact": {{
-                "quality": {{}},
-                "timeline": {{}},
-                "resources": {{}},
-                "risks": [string]
-            }},
-            "recommendations": [
-                {{
-                    "action": string,
-                    "priority": string,
-                    "timeline": string,
-                    "outcome": string,
-                    "dependencies": [string]
-                }}
-            ]
-        }}
-        
-        {f'Target budget: ₹{target_budget:,.2f}' if target_budget else 'Optimize for efficiency'}
-        
-        Cost Estimates:
-        {json.dumps(estimates, indent=2)}
+    async def _generate_commentary(self, optimization: Dict[str, Any], target_budget: float = None) -> Dict[str, Any]:
+        """LLM explanation of a computed optimization plan; {} if unavailable."""
+        payload = {
+            "target_budget": target_budget,
+            "plan": optimization["plan"],
+            "line_changes": optimization["line_changes"],
+            "savings_summary": optimization["savings_summary"],
+            "risks": optimization["impact_analysis"]["risk_assessment"]
+        }
+        prompt = f"""{self.instructions}
         
-        Production Constraints:
-        {json.dumps(constraints, indent=2)}
+        Explain this budget optimization plan to a producer. Do not change any numbers.
+        Respond with JSON: {{"summary": string, "tradeoffs": [string], "recommendations": [string]}}
         
-        Scenario: {scenario}
-
-        IMPORTANT: Respond ONLY with valid JSON matching the structure above. Do not include any other text or explanations."""
+        {json.dumps(payload, indent=2, default=str)}"""
+        try:
+            response = await asyncio.to_thread(
+                self.client.models.generate_content,
+                model=self.model_config["model"],
+                contents=prompt,
+                config=types.GenerateContentConfig(
+                    temperature=self.model_config["temperature"],
+                    max_output_tokens=self.model_config["max_output_tokens"],
+                    top_p=self.model_config["top_p"],
+                    top_k=self.model_config["top_k"],
+                    response_mime_type="application/json"
+                )
+            )
+            return self._extract_json(response.candidates[0].content.parts[0].text)
+        except Exception as e:
+            logger.error(f"Error generating optimization commentary: {str(e)}")
+            return {}
     
     def _compare_scenarios(self, scenarios: Dict[str, Any]) -> Dict[str, Any]:
         """Generate comparison metrics between different scenarios."""
@@ -465,100 +353,3 @@ class BudgetOptimizerAgent:
         }
         
         return optimization
-    
-    def _process_optimization(
-        self,
-        optimization: Dict[str, Any],
-        original_estimates: Dict[str, Any],
-        target_budget: float = None,
-        scenario: str = "base"
-    ) -> Dict[str, Any]:
-        """Process and validate budget optimization suggestions."""
-        processed = {
-            "cost_reductions": {},
-            "reallocations": {},
-            "alternatives": {},
-            "impact_analysis": {},
-            "savings_summary": {},
-            "recommendations": [],
-            "scenario_info": optimization["scenario_info"]
-        }
-        
-        # Process cost reduction suggestions
-        if "reductions" in optimization:
-            for category, reductions in optimization["reductions"].items():
-                processed["cost_reductions"][category] = {
-                    "current_cost": reductions.get("current_cost", 0),
-                    "proposed_cost": reductions.get("proposed_cost", 0),
-                    "savings": reductions.get("savings", 0),
-                    "methods": reductions.get("methods", []),
-                    "impact_level": reductions.get("impact", "low")
-                }
-        
-        # Process budget reallocation suggestions
-        if "reallocations" in optimization:
-            for item in optimization["reallocations"]:
-                processed["reallocations"][item["from_category"]] = {
-                    "to_category": item.get("to_category"),
-                    "amount": item.get("amount", 0),
-                    "justification": item.get("justification", ""),
-                    "risk_level": item.get("risk", "low")
-                }
-        
-        # Process alternative solutions
-        if "alternatives" in optimization:
-            for category, options in optimization["alternatives"].items():
-                processed["alternatives"][category] = {
-                    "options": options.get("options", []),
-                    "potential_savings": options.get("savings", 0),
-                    "implementation_cost": options.get("implementation_cost", 0),
-                    "net_benefit": options.get("net_benefit", 0),
-                    "timeline": options.get("timeline", "immediate")
-                }
-        
-        # Process impact analysis
-        if "impact" in optimization:
-            processed["impact_analysis"] = {
-                "quality_impact": optimization["impact"].get("quality", {}),
-                "timeline_impact": optimization["impact"].get("timeline", {}),
-                "resource_impact": optimization["impact"].get("resources", {}),
-                "risk_assessment": optimization["impact"].get("risks", [])
-            }
-        
-        # Calculate savings summary
-        total_current = original_estimates["total_estimates"]["grand_total"]
-        total_savings = sum(
-            reduction["savings"]
-            for reduction in processed["cost_reductions"].values()
-        )
-        total_reallocation = sum(
-            realloc["amount"]
-            for realloc in processed["reallocations"].values()
-        )
-        
-        processed["savings_summary"] = {
-            "original_total": total_current,
-            "total_savings": total_savings,
-            "total_reallocation": total_reallocation,
-            "optimized_total": total_current - total_savings,
-            "percentage_saved": (total_savings / total_current * 100) if total_current > 0 else 0,
-            "target_met": (
-                target_budget is None or
-                (total_current - total_savings) <= target_budget
-            )
-        }
-        
-        # Process recommendations
-        if "recommendations" in optimization:
-            processed["recommendations"] = [
-                {
-                    "action": rec.get("action", ""),
-                    "priority": rec.get("priority", "medium"),
-                    "timeline": rec.get("timeline", "immediate"),
-                    "expected_outcome": rec.get("outcome", ""),
-                    "dependencies": rec.get("dependencies", [])
-                }
-                for rec in optimization["recommendations"]
-            ]
-        
-        return processed 
\ No newline at end of file
@@ -1,12 +1,17 @@
 from typing import Dict, Any, List
+import asyncio
 import json
 import logging
 import re
-from datetime import datetime, timedelta
+from datetime import datetime
 import os
+import numpy as np
 from google import genai
 from google.genai import types
 from base_config import AGENT_INSTRUCTIONS, get_model_config
+from ..expense_stream import RunningActuals
+from ..cash_flow_engine import CashFlowEngine, period_start
+from ..vendor_index import VendorIndex
 
 logger = logging.getLogger(__name__)
 
@@ -15,6 +20,7 @@ class BudgetTrackerAgent:
         self.client = genai.Client(api_key=os.environ.get("GOOGLE_API_KEY"))
         self.model_config = get_model_config()
         self.instructions = AGENT_INSTRUCTIONS["budget_tracker"]
+        self.cash_flow_engine = CashFlowEngine()
         # Initialize health monitoring thresholds
         self.health_thresholds = {
             "critical": {
@@ -131,6 +137,180 @@ class BudgetTrackerAgent:
                 health_metrics
             )
     
+    def track_expense_stream(
+        self,
+        budget_data: Dict[str, Any],
+        running: RunningActuals,
+        tracking_period: str = None
+    ) -> Dict[str, Any]:
+        """Tracking report from running actuals, computed locally without an LLM call.
+        
+        Reads only the budget's category totals and the running totals, so its
+        cost depends on the number of categories, not the number of expenses.
+        """
+        totals = budget_data.get("total_estimates", {})
+        total_budget = totals.get("grand_total", 0)
+        total_spent = running.total_spent
+        
+        start_date, end_date = None, None
+        if tracking_period and " to " in tracking_period:
+            start_date, end_date = tracking_period.split(" to ")[:2]
+        start_date = start_date or running.first_date
+        end_date = end_date or running.last_date
+        start = datetime.strptime(start_date, "%Y-%m-%d") if start_date else None
+        end = datetime.strptime(end_date, "%Y-%m-%d") if end_date else None
+        last = datetime.strptime(running.last_date, "%Y-%m-%d") if running.last_date else None
+        days_elapsed = (last - start).days + 1 if start and last else 0
+        total_days = (end - start).days + 1 if start and end else 0
+        # Share of the period already behind us; budgets are phased evenly across it
+        elapsed_share = min(days_elapsed / total_days, 1.0) if total_days > 0 else 1.0
+        
+        burn_rate = total_spent / days_elapsed if days_elapsed > 0 else 0
+        projected_total = burn_rate * total_days if total_days > 0 else total_spent
+        spend_rate = projected_total / total_budget if total_budget > 0 else 0
+        remaining_percent = (total_budget - total_spent) / total_budget if total_budget > 0 else 0
+        
+        category_tracking, variances, category_variances = {}, {}, {}
+        categories = {
+            key[len("total_"):] for key in totals
+            if key.startswith("total_") and key.endswith("_costs")
+        } | set(running.categories)
+        for category in sorted(categories):
+            budgeted = totals.get(f"total_{category}", 0)
+            actual = running.categories.get(category, {}).get("actual", 0.0)
+            phased = budgeted * elapsed_share
+            category_tracking[category] = {
+                "budgeted": budgeted,
+                "actual": round(actual, 2),
+                "remaining": round(budgeted - actual, 2),
+                "percent_spent": (actual / budgeted * 100) if budgeted > 0 else 0,
+                "status": "on_track" if actual <= phased or not budgeted else "over_budget",
+                "health_indicators": {"phased_budget": round(phased, 2)}
+            }
+            if phased > 0:
+                category_variances[category] = (actual - phased) / phased
+                if abs(actual - phased) > phased * 0.1:
+                    variances[category] = {
+                        "amount": round(actual - phased, 2),
+                        "percentage": category_variances[category] * 100,
+                        "reason": "Actuals differ from the phased budget",
+                        "impact": "high" if abs(category_variances[category]) > self.health_thresholds["critical"]["variance"] else "medium",
+                        "corrective_action": "Review recent cost reports for this category",
+                        "trend": "over" if actual > phased else "under"
+                    }
+        
+        # Only overspending counts against health; underspend early in the period is expected
+        health_status = "healthy"
+        for threshold_name, thresholds in self.health_thresholds.items():
+            if (
+                spend_rate > thresholds["spend_rate"] or
+                remaining_percent < thresholds["remaining"] or
+                any(var > thresholds["variance"] for var in category_variances.values())
+            ):
+                health_status = threshold_name
+                break
+        
+        alerts = []
+        now = datetime.now().isoformat()
+        if total_budget > 0 and total_spent > total_budget * 0.9:
+            alerts.append({
+                "type": "warning",
+                "category": "overall",
+                "message": "Budget usage above 90%",
+                "threshold": total_budget * 0.9,
+                "current_value": total_spent,
+                "timestamp": now,
+                "priority": "high"
+            })
+        for category, variance in variances.items():
+            if variance["trend"] == "over":
+                alerts.append({
+                    "type": "variance",
+                    "category": category,
+                    "message": f"{category} is {variance['percentage']:.1f}% over its phased budget",
+                    "threshold": category_tracking[category]["health_indicators"]["phased_budget"],
+                    "current_value": category_tracking[category]["actual"],
+                    "timestamp": now,
+                    "priority": "high" if variance["impact"] == "high" else "medium"
+                })
+        
+        daily = running.daily
+        return {
+            "period_summary": {
+                "period_start": start_date,
+                "period_end": end_date,
+                "total_budget": total_budget,
+                "total_spent": round(total_spent, 2),
+                "remaining_budget": round(total_budget - total_spent, 2),
+                "percent_spent": (total_spent / total_budget * 100) if total_budget > 0 else 0,
+                "expense_count": running.count
+            },
+            "category_tracking": category_tracking,
+            "variances": variances,
+            "trends": {
+                "daily_averages": {"overall": round(burn_rate, 2)},
+                "latest_day": {running.last_date: round(daily.get(running.last_date, 0.0), 2)} if running.last_date else {},
+                "burn_rate": round(burn_rate, 2)
+            },
+            "alerts": alerts,
+            "projections": {
+                "estimated_total": round(projected_total, 2),
+                "estimated_variance": round(projected_total - total_budget, 2),
+                "completion_date": end_date,
+                "confidence_level": "high" if elapsed_share >= 0.5 else "medium" if elapsed_share >= 0.2 else "low"
+            },
+            "vendor_spend": running.vendors,
+            "health_status": health_status,
+            "health_metrics": {
+                "spend_rate": spend_rate,
+                "burn_rate": burn_rate,
+                "remaining_percent": remaining_percent,
+                "days_elapsed": days_elapsed,
+                "days_remaining": max(total_days - days_elapsed, 0),
+                "category_variances": category_variances
+            },
+            "health_indicators": {
+                "on_track": spend_rate <= 1.0,
+                "within_budget": total_spent <= total_budget,
+                "healthy_burn": burn_rate <= (total_budget / total_days) if total_days > 0 else True
+            },
+            "stream": running.to_dict(),
+            "engine": "stream",
+            "updated_at": now
+        }
+    
+    async def narrate_tracking(self, tracking: Dict[str, Any]) -> Dict[str, Any]:
+        """LLM narrative for a tracking report, generated only when asked for."""
+        summary = {key: tracking.get(key) for key in (
+            "period_summary", "category_tracking", "variances", "alerts", "projections", "health_status", "health_metrics"
+        )}
+        prompt = f"""{self.instructions}
+
+        Write a short status narrative for the producer from this budget tracking report.
+        Respond with JSON: {{"summary": string, "concerns": [string], "recommendations": [string]}}
+
+        {json.dumps(summary, indent=2, default=str)}"""
+        try:
+            response = await asyncio.to_thread(
+                self.client.models.generate_content,
+                model=self.model_config["model"],
+                contents=prompt,
+                config=types.GenerateContentConfig(
+                    temperature=self.model_config["temperature"],
+                    max_output_tokens=self.model_config["max_output_tokens"],
+                    top_p=self.model_config["top_p"],
+                    top_k=self.model_config["top_k"],
+                    response_mime_type="application/json"
+                )
+            )
+            narrative = self._extract_json(response.text or "")
+            if not narrative:
+                raise ValueError("Empty narrative")
+            return narrative
+        except Exception as e:
+            logger.error(f"Error generating tracking narrative: {str(e)}")
+            return {}
+    
     def _calculate_health_metrics(
         self,
         budget: Dict[str, Any],
@@ -566,63 +746,27 @@ class BudgetTrackerAgent:
     def _analyze_vendor_performance(
         self,
         vendor_data: Dict[str, Any],
-        actuals: Dict[str, Any]
+        actuals: Dict[str, Any],
+        index: VendorIndex = None
     ) -> Dict[str, Any]:
-        """Analyze vendor performance and payment status."""
+        """Analyze vendor performance and payment status.
+        
+        Reads per-vendor aggregates from a VendorIndex; without one, builds it
+        in a single pass over vendor_data and actuals.
+        """
         try:
+            if index is None:
+                index = VendorIndex().register_vendors(vendor_data).post_actuals(actuals)
+            
             vendor_analysis = {
                 "spend_by_vendor": {},
                 "payment_status": {},
                 "performance_metrics": {}
             }
-            
-            for vendor_id, vendor in vendor_data.items():
-                # Calculate total spend for vendor
-                total_spend = sum(
-                    expense["amount"]
-                    for category in actuals.values()
-                    for expense in category.values()
-                    if isinstance(expense, dict) and expense.get("vendor_id") == vendor_id
-                )
-                
-                # Calculate payment metrics
-                payments = vendor.get("payments", [])
-                total_paid = sum(payment["amount"] for payment in payments)
-                outstanding = total_spend - total_paid
-                
-                # Calculate performance metrics
-                delivery_delays = vendor.get("delivery_delays", [])
-                avg_delay = sum(delay["days"] for delay in delivery_delays) / len(delivery_delays) if delivery_delays else 0
-                quality_ratings = vendor.get("quality_ratings", [])
-                avg_rating = sum(rating["score"] for rating in quality_ratings) / len(quality_ratings) if quality_ratings else 0
-                
-                vendor_analysis["spend_by_vendor"][vendor_id] = {
-                    "name": vendor.get("name", "Unknown"),
-                    "total_spend": total_spend,
-                    "categories": self._get_vendor_categories(vendor_id, actuals)
-                }
-                
-                vendor_analysis["payment_status"][vendor_id] = {
-                    "total_spend": total_spend,
-                    "total_paid": total_paid,
-                    "outstanding": outstanding,
-                    "payment_history": payments,
-                    "upcoming_payments": self._get_upcoming_payments(vendor)
-                }
-                
-                vendor_analysis["performance_metrics"][vendor_id] = {
-                    "avg_delivery_delay": avg_delay,
-                    "quality_rating": avg_rating,
-                    "reliability_score": self._calculate_reliability_score(avg_delay, avg_rating),
-                    "cost_efficiency": self._calculate_cost_efficiency(vendor, total_spend),
-                    "issues": vendor.get("issues", []),
-                    "recommendations": self._generate_vendor_recommendations(
-                        avg_delay,
-                        avg_rating,
-                        outstanding,
-                        vendor.get("issues", [])
-                    )
-                }
+            for vendor_id in index.vendors:
+                report = self.vendor_report(index, vendor_id)
+                for section in vendor_analysis:
+                    vendor_analysis[section][vendor_id] = report[section]
             
             return vendor_analysis
             
@@ -634,32 +778,48 @@ class BudgetTrackerAgent:
                 "performance_metrics": {}
             }
     
-    def _get_vendor_categories(
-        self,
-        vendor_id: str,
-        actuals: Dict[str, Any]
-    ) -> Dict[str, float]:
-        """Get spending breakdown by category for a vendor."""
-        categories = {}
-        for category, expenses in actuals.items():
-            category_total = sum(
-                expense["amount"]
-                for expense in expenses.values()
-                if isinstance(expense, dict) and expense.get("vendor_id") == vendor_id
-            )
-            if category_total > 0:
-                categories[category] = category_total
-        return categories
+    def vendor_report(self, index: VendorIndex, vendor_id: str) -> Dict[str, Any]:
+        """One vendor's spend, payment status and performance, from its index aggregates."""
+        entry = index.vendors[vendor_id]
+        metrics = index.metrics(vendor_id)
+        return {
+            "spend_by_vendor": {
+                "name": entry["name"],
+                "total_spend": metrics["total_spend"],
+                "categories": {category: spend for category, spend in entry["categories"].items() if spend > 0}
+            },
+            "payment_status": {
+                "total_spend": metrics["total_spend"],
+                "total_paid": metrics["total_paid"],
+                "outstanding": metrics["outstanding"],
+                "payment_history": entry["payment_history"],
+                "upcoming_payments": self._get_upcoming_payments(entry)
+            },
+            "performance_metrics": {
+                "avg_delivery_delay": metrics["mean_delay"],
+                "on_time_ratio": metrics["on_time_ratio"],
+                "quality_rating": metrics["mean_rating"],
+                "reliability_score": self._calculate_reliability_score(metrics["mean_delay"], metrics["mean_rating"]),
+                "cost_efficiency": self._calculate_cost_efficiency(entry["rate_comparison"], metrics["total_spend"]),
+                "issues": entry["issues"],
+                "recommendations": self._generate_vendor_recommendations(
+                    metrics["mean_delay"],
+                    metrics["mean_rating"],
+                    metrics["outstanding"],
+                    entry["issues"]
+                )
+            }
+        }
     
     def _get_upcoming_payments(
         self,
         vendor: Dict[str, Any]
     ) -> List[Dict[str, Any]]:
         """Get list of upcoming payments for a vendor."""
-        now = datetime.now()
+        today = datetime.now().strftime("%Y-%m-%d")
         return [
             payment for payment in vendor.get("scheduled_payments", [])
-            if datetime.strptime(payment["due_date"], "%Y-%m-%d") > now
+            if str(payment["due_date"])[:10] > today
         ]
     
     def _calculate_reliability_score(
@@ -677,31 +837,21 @@ class BudgetTrackerAgent:
     
     def _calculate_cost_efficiency(
         self,
-        vendor: Dict[str, Any],
+        rate_comparison: Dict[str, Dict[str, float]],
         total_spend: float
     ) -> Dict[str, Any]:
-        """Calculate vendor cost efficiency metrics."""
-        market_rates = vendor.get("market_rates", {})
+        """Calculate vendor cost efficiency metrics from rates compared to their benchmarks."""
         efficiency_metrics = {
             "overall_rating": "competitive",
             "savings_potential": 0.0,
-            "rate_comparison": {}
+            "rate_comparison": rate_comparison
         }
         
-        for service, rate in vendor.get("rates", {}).items():
-            market_rate = market_rates.get(service, rate)
-            variance = (rate - market_rate) / market_rate if market_rate > 0 else 0
-            efficiency_metrics["rate_comparison"][service] = {
-                "vendor_rate": rate,
-                "market_rate": market_rate,
-                "variance_percent": variance * 100
-            }
-            
         # Calculate potential savings
         total_variance = sum(
-            comp["variance_percent"] for comp in efficiency_metrics["rate_comparison"].values()
+            comp["variance_percent"] for comp in rate_comparison.values()
         )
-        avg_variance = total_variance / len(efficiency_metrics["rate_comparison"]) if efficiency_metrics["rate_comparison"] else 0
+        avg_variance = total_variance / len(rate_comparison) if rate_comparison else 0
         
         if avg_variance > 10:
             efficiency_metrics["overall_rating"] = "expensive"
@@ -748,48 +898,45 @@ class BudgetTrackerAgent:
     ) -> Dict[str, Any]:
         """Analyze cash flow and generate projections."""
         try:
-            now = datetime.now()
-            upcoming_payments = []
+            today = np.datetime64(datetime.now().strftime("%Y-%m-%d"), "D")
             
-            # Collect all upcoming payments
-            for vendor_id, vendor in vendor_data.items():
-                upcoming_payments.extend([
-                    {
-                        "vendor_id": vendor_id,
-                        "vendor_name": vendor.get("name", "Unknown"),
-                        "amount": payment["amount"],
-                        "due_date": payment["due_date"],
-                        "category": payment.get("category", "Unknown")
-                    }
-                    for payment in vendor.get("scheduled_payments", [])
-                    if datetime.strptime(payment["due_date"], "%Y-%m-%d") > now
-                ])
-            
-            # Sort payments by due date
-            upcoming_payments.sort(key=lambda x: x["due_date"])
+            # Upcoming payments as a columnar table, due dates parsed once
+            table = self.cash_flow_engine.vendor_table(vendor_data).sorted()
+            upcoming = table.select(table.day > today)
+            weeks = period_start(upcoming.day, "W").astype(str)
+            dates = upcoming.day.astype(str)
+            amounts = (-upcoming.amount).tolist()
+            upcoming_payments = [
+                {
+                    "vendor_id": vendor_id,
+                    "vendor_name": vendor_data[vendor_id].get("name", "Unknown"),
+                    "amount": amount,
+                    "due_date": due_date,
+                    "category": category
+                }
+                for vendor_id, amount, due_date, category in zip(
+                    upcoming.reference.tolist(), amounts, dates.tolist(), upcoming.label.tolist()
+                )
+            ]
             
             # Calculate current balance
             total_budget = budget["total_estimates"]["grand_total"]
-            total_spent = sum(
-                sum(expense.values())
-                for category in actuals.values()
-                for expense in category.values()
-                if isinstance(expense, dict)
-            )
-            current_balance = total_budget - total_spent
+            current_balance = total_budget - self._total_spent(actuals)
             
-            # Group upcoming payments by week
-            weekly_requirements = {}
-            for payment in upcoming_payments:
-                due_date = datetime.strptime(payment["due_date"], "%Y-%m-%d")
-                week_start = (due_date - timedelta(days=due_date.weekday())).strftime("%Y-%m-%d")
-                if week_start not in weekly_requirements:
-                    weekly_requirements[week_start] = {
-                        "total": 0,
-                        "payments": []
-                    }
-                weekly_requirements[week_start]["total"] += payment["amount"]
-                weekly_requirements[week_start]["payments"].append(payment)
+            # Group upcoming payments by week (rows are already in date order)
+            week_starts, first_rows, inverse, counts = np.unique(
+                weeks, return_index=True, return_inverse=True, return_counts=True
+            )
+            week_totals = np.bincount(inverse, weights=-upcoming.amount, minlength=len(week_starts))
+            weekly_requirements = {
+                week: {
+                    "total": total,
+                    "payments": upcoming_payments[first:first + count]
+                }
+                for week, first, count, total in zip(
+                    week_starts.tolist(), first_rows.tolist(), counts.tolist(), week_totals.tolist()
+                )
+            }
             
             return {
                 "current_balance": current_balance,
@@ -815,6 +962,14 @@ class BudgetTrackerAgent:
                 "recommendations": []
             }
     
+    def _total_spent(self, actuals: Dict[str, Any]) -> float:
+        """Total of an actual_expenses dict ({category: {expense_id: expense}})."""
+        return sum(
+            float(expense.get("amount", expense.get("total_cost", 0)))
+            for category in actuals.values() if isinstance(category, dict)
+            for expense in category.values() if isinstance(expense, dict)
+        )
+    
     def _assess_cash_flow_health(
         self,
         current_balance: float,
@@ -1,4 +1,5 @@
 from typing import Dict, Any, List
+import asyncio
 import json
 import logging
 import os
@@ -6,9 +7,19 @@ from datetime import datetime, timedelta
 from google import genai
 from google.genai import types
 from base_config import AGENT_INSTRUCTIONS, get_model_config
+from ..cash_flow_engine import CashFlowEngine
 
 logger = logging.getLogger(__name__)
 
+# Typical providers for each financing source
+FINANCING_SOURCE_NAMES = {
+    "equity_investment": ["Private investors", "Production company", "Executive producers"],
+    "tax_incentives": ["State tax credits", "Local incentives", "Federal programs"],
+    "pre_sales": ["Distribution agreements", "International pre-sales"],
+    "grants": ["Arts councils", "Foundation grants", "Cultural programs"],
+    "gap_financing": ["Bridge loans", "Completion bonds", "Contingency funding"]
+}
+
 class CashFlowManagerAgent:
     """Agent for financing structure analysis and cash flow management."""
     
@@ -16,6 +27,7 @@ class CashFlowManagerAgent:
         self.client = genai.Client(api_key=os.environ.get("GOOGLE_API_KEY"))
         self.model_config = get_model_config()
         self.instructions = AGENT_INSTRUCTIONS.get("cashflow_manager", "")
+        self.engine = CashFlowEngine()
         
         # Financing and payment templates
         self.financing_templates = {
@@ -80,38 +92,38 @@ class CashFlowManagerAgent:
         total_budget: float,
         production_data: Dict[str, Any],
         investor_data: Dict[str, Any] = None,
-        timeline_data: Dict[str, Any] = None
+        timeline_data: Dict[str, Any] = None,
+        vendor_data: Dict[str, Any] = None,
+        include_llm_commentary: bool = False
     ) -> Dict[str, Any]:
-        """Analyze financing structure and create payment schedule."""
+        """Analyze financing structure and create payment schedule.
+        
+        The structure, payment schedule and cash-flow projection come from the
+        local CashFlowEngine; the LLM only adds commentary when asked to.
+        """
         try:
-            prompt = self._generate_financing_analysis_prompt(
-                total_budget, production_data, investor_data, timeline_data
-            )
+            investor_data = investor_data or {}
+            timeline_data = timeline_data or {}
+            start_date = timeline_data.get("start_date") or production_data.get("start_date")
+            shoot_days = int(timeline_data.get("schedule_days") or production_data.get("schedule_days") or 18)
             
-            full_prompt = f"{self.instructions}\n\n{prompt}"
-            
-            response = self.client.models.generate_content(
-                model=self.model_config["model"],
-                contents=full_prompt,
-                config=types.GenerateContentConfig(
-                    temperature=self.model_config["temperature"],
-                    max_output_tokens=self.model_config["max_output_tokens"],
-                    top_p=self.model_config["top_p"],
-                    top_k=self.model_config["top_k"],
-                    response_mime_type="application/json"
-                )
+            projection = await asyncio.to_thread(
+                self.engine.project,
+                total_budget,
+                start_date=start_date,
+                shoot_days=shoot_days,
+                vendor_data=vendor_data,
+                financing_shares=investor_data.get("financing_shares"),
+                extra_flows=investor_data.get("cash_flows"),
+                opening_balance=float(investor_data.get("opening_balance", 0)),
+                minimum_balance=float(investor_data.get("minimum_balance", 0)),
+                freq=investor_data.get("cash_flow_frequency", "W")
             )
+            analysis = self._build_financing_analysis(total_budget, projection, shoot_days, start_date)
             
-            response_text = self._extract_content_safely(response)
-            analysis = self._extract_json(response_text)
-            
-            if not analysis:
-                logger.warning("Failed to parse AI response, using fallback")
-                return self._create_fallback_financing_analysis(
-                    total_budget, production_data, investor_data, timeline_data
-                )
-            
-            return self._process_financing_analysis(analysis)
+            if include_llm_commentary:
+                analysis["commentary"] = await self._generate_commentary(analysis)
+            return analysis
             
         except Exception as e:
             logger.error(f"Error in financing analysis: {str(e)}")
@@ -119,143 +131,123 @@ class CashFlowManagerAgent:
                 total_budget, production_data, investor_data, timeline_data
             )
     
-    def _generate_financing_analysis_prompt(
+    def _build_financing_analysis(
         self,
         total_budget: float,
-        production_data: Dict[str, Any],
-        investor_data: Dict[str, Any],
-        timeline_data: Dict[str, Any]
-    ) -> str:
-        """Generate prompt for financing analysis."""
-        return f"""You are a professional film financing and cash flow specialist.
-        
-        Analyze the production data and create a comprehensive financing structure and payment schedule.
-        
-        Required JSON structure:
-        {{
-            "financing_structure": {{
-                "equity_investment": {{
-                    "amount": float,
-                    "percentage": float,
-                    "sources": ["source1", "source2"]
-                }},
-                "tax_incentives": {{
-                    "amount": float,
-                    "percentage": float,
-                    "sources": ["source1", "source2"]
-                }},
-                "pre_sales": {{
-                    "amount": float,
-                    "percentage": float,
-                    "sources": ["source1", "source2"]
-                }},
-                "grants": {{
-                    "amount": float,
-                    "percentage": float,
-                    "sources": ["source1", "source2"]
-                }},
-                "gap_financing": {{
-                    "amount": float,
-                    "percentage": float,
-                    "sources": ["source1", "source2"]
-                }}
-            }},
-            "payment_schedule": {{
-                "pre_production": {{
-                    "week_minus_8": {{
-                        "amount": float,
-                        "items": ["item1", "item2"],
-                        "cash_flow_impact": float
-                    }},
-                    "week_minus_4": {{
-                        "amount": float,
-                        "items": ["item1", "item2"],
-                        "cash_flow_impact": float
-                    }},
-                    "week_minus_2": {{
-                        "amount": float,
-                        "items": ["item1", "item2"],
-                        "cash_flow_impact": float
-                    }}
-                }},
-                "production": {{
-                    "weekly_payroll": {{
-                        "amount": float,
-                        "frequency": "weekly",
-                        "items": ["item1", "item2"],
-                        "total_weeks": int
-                    }},
-                    "equipment_weekly": {{
-                        "amount": float,
-                        "frequency": "weekly",
-                        "items": ["item1", "item2"],
-                        "total_weeks": int
-                    }},
-                    "daily_expenses": {{
-                        "amount": float,
-                        "frequency": "daily",
-                        "items": ["item1", "item2"],
-                        "total_days": int
-                    }}
-                }},
-                "post_production": {{
-                    "final_payments": {{
-                        "amount": float,
-                        "items": ["item1", "item2"],
-                        "payment_terms": "string"
-                    }}
-                }}
-            }},
-            "cash_flow_analysis": {{
-                "peak_funding_requirement": float,
-                "minimum_cash_balance": float,
-                "funding_milestones": [
-                    {{
-                        "milestone": "string",
-                        "amount_required": float,
-                        "deadline": "string"
-                    }}
-                ],
-                "risk_factors": [
-                    {{
-                        "risk": "string",
-                        "probability": "low|medium|high",
-                        "impact": float,
-                        "mitigation": "string"
-                    }}
-                ]
-            }},
-            "financing_terms": {{
-                "equity_terms": {{
-                    "investor_percentage": float,
-                    "profit_sharing": "string",
-                    "recoupment_order": ["first", "second"]
-                }},
-                "debt_terms": {{
-                    "interest_rate": float,
-                    "repayment_schedule": "string",
-                    "collateral": "string"
-                }}
-            }},
-            "total_budget": float,
-            "recommendations": [
-                "recommendation1",
-                "recommendation2"
-            ]
-        }}
-        
-        Total Budget: ${total_budget}
-        
-        Production Data:
-        {json.dumps(production_data, indent=2)}
+        projection: Dict[str, Any],
+        shoot_days: int,
+        start_date: str = None
+    ) -> Dict[str, Any]:
+        """Financing analysis in the agent's report shape from an engine projection."""
+        financing_structure = {
+            source: {
+                "amount": amount,
+                "percentage": round(amount / total_budget * 100, 2) if total_budget else 0.0,
+                "sources": FINANCING_SOURCE_NAMES.get(source, [])
+            }
+            for source, amount in projection["financing_structure"].items()
+        }
         
-        Investor Data:
-        {json.dumps(investor_data or {}, indent=2)}
+        timeline = self.engine.timeline(start_date, shoot_days)
+        payment_schedule = {}
+        for entry in self.engine.spend_schedule(total_budget - projection["summary"]["committed_vendor_payments"], timeline):
+            line = {
+                "amount": round(entry["amount"], 2),
+                "items": [entry["item"]],
+                "due_date": str(entry["dates"][0])
+            }
+            if entry["cadence"] == "weekly":
+                line.update({"frequency": "weekly", "total_weeks": entry["occurrences"]})
+            else:
+                line["cash_flow_impact"] = -line["amount"]
+            payment_schedule.setdefault(entry["phase"], {})[entry["key"]] = line
         
-        Timeline Data:
-        {json.dumps(timeline_data or {}, indent=2)}
+        summary = projection["summary"]
+        tax_incentives = projection["financing_structure"].get("tax_incentives", 0)
+        risk_factors = [
+            {
+                "risk": "Tax credit delays",
+                "probability": "high",
+                "impact": tax_incentives,
+                "mitigation": "Secure tax credit bridge financing or factoring"
+            },
+            {
+                "risk": "Cost overruns",
+                "probability": "medium",
+                "impact": total_budget * 0.10,
+                "mitigation": "Maintain 10% contingency and strict budget monitoring"
+            }
+        ]
+        recommendations = []
+        if summary["first_shortfall"]:
+            risk_factors.insert(0, {
+                "risk": f"Cash shortfall from {summary['first_shortfall']}",
+                "probability": "high",
+                "impact": summary["max_shortfall"],
+                "mitigation": "Bring forward equity draws or arrange bridge financing"
+            })
+            recommendations.append(
+                f"Arrange {summary['max_shortfall']:,.2f} of bridge financing before {summary['first_shortfall']}"
+            )
+        recommendations.extend([
+            "Secure equity funding before pre-production begins",
+            "Establish relationships with tax credit lenders early",
+            "Implement weekly cash flow monitoring during production"
+        ])
         
-        IMPORTANT: Respond ONLY with valid JSON matching the structure above."""
+        return {
+            "financing_structure": financing_structure,
+            "payment_schedule": payment_schedule,
+            "cash_flow_analysis": {
+                "peak_funding_requirement": summary["peak_funding_requirement"],
+                "minimum_cash_balance": summary["minimum_balance"],
+                "funding_milestones": projection["funding_milestones"],
+                "risk_factors": risk_factors
+            },
+            "cash_flow_projection": projection,
+            "financing_terms": {
+                "equity_terms": {
+                    "investor_percentage": 60.0,
+                    "profit_sharing": "50/50 after investor recoupment",
+                    "recoupment_order": ["First position", "Pari passu with production company"]
+                },
+                "debt_terms": {
+                    "interest_rate": 8.5,
+                    "repayment_schedule": "Interest only during production, principal at distribution",
+                    "collateral": "Film negative and distribution rights"
+                }
+            },
+            "total_budget": total_budget,
+            "recommendations": recommendations,
+            "engine": "cash_flow"
+        }
+    
+    async def _generate_commentary(self, analysis: Dict[str, Any]) -> Dict[str, Any]:
+        """LLM commentary on a computed financing analysis; {} if unavailable."""
+        payload = {key: analysis[key] for key in ("financing_structure", "cash_flow_analysis", "total_budget")}
+        prompt = f"""{self.instructions}
+
+        Review this film financing plan and cash-flow projection. Do not change any numbers.
+        Respond with JSON: {{"summary": string, "risks": [string], "recommendations": [string]}}
+
+        {json.dumps(payload, indent=2, default=str)}"""
+        try:
+            response = await asyncio.to_thread(
+                self.client.models.generate_content,
+                model=self.model_config["model"],
+                contents=prompt,
+                config=types.GenerateContentConfig(
+                    temperature=self.model_config["temperature"],
+                    max_output_tokens=self.model_config["max_output_tokens"],
+                    top_p=self.model_config["top_p"],
+                    top_k=self.model_config["top_k"],
+                    response_mime_type="application/json"
+                )
+            )
+            return self._extract_json(self._extract_content_safely(response))
+        except Exception as e:
+            logger.error(f"Error generating financing commentary: {str(e)}")
+            return {}
     
     def _create_fallback_financing_analysis(
         self,
@@ -425,22 +417,6 @@ class CashFlowManagerAgent:
             ]
         }
     
-    def _process_financing_analysis(self, analysis: Dict[str, Any]) -> Dict[str, Any]:
-        """Process and validate financing analysis."""
-        # Ensure all required fields are present
-        if "financing_structure" not in analysis:
-            analysis["financing_structure"] = {}
-        if "payment_schedule" not in analysis:
-            analysis["payment_schedule"] = {}
-        if "cash_flow_analysis" not in analysis:
-            analysis["cash_flow_analysis"] = {}
-        if "financing_terms" not in analysis:
-            analysis["financing_terms"] = {}
-        if "total_budget" not in analysis:
-            analysis["total_budget"] = 0
-            
-        return analysis
-    
     def _extract_content_safely(self, response):
         """Safely extract content from Gemini response."""
         if not hasattr(response, 'candidates') or not response.candidates:
@@ -4,9 +4,15 @@ import logging
 import re
 from datetime import datetime
 import os
+import copy
+import asyncio
 from google import genai
 from google.genai import types
 from base_config import AGENT_INSTRUCTIONS, get_model_config
+from ..budget_engine import BudgetEngine
+from ..scene_costing import SceneCostModel
+from ..budget_ledger import BudgetLedger
+from ..rate_cards import COST_TEMPLATES, EXCHANGE_RATES, DEFAULT_DAY_HOURS
 
 logger = logging.getLogger(__name__)
 
@@ -16,254 +22,97 @@ class CostEstimatorAgent:
         self.model_config = get_model_config()
         self.instructions = AGENT_INSTRUCTIONS["cost_estimator"]
         # Initialize Indian cost templates
-        self.cost_templates = {
-            "mumbai": {
-                "studio_rates": {"small": 25000, "medium": 50000, "large": 100000},
-                "location_rates": {"basic": 15000, "premium": 35000},
-                "equipment_rates": {
-                    "camera": {"basic": 20000, "premium": 45000},
-                    "lighting": {"basic": 15000, "premium": 35000},
-                    "sound": {"basic": 10000, "premium": 25000}
-                },
-                "crew_rates": {
-                    "director": {"daily": 15000, "weekly": 90000},
-                    "dop": {"daily": 12000, "weekly": 70000},
-                    "sound": {"daily": 8000, "weekly": 45000}
-                }
-            },
-            "delhi": {
-                "studio_rates": {"small": 20000, "medium": 40000, "large": 80000},
-                "location_rates": {"basic": 12000, "premium": 30000},
-                "equipment_rates": {
-                    "camera": {"basic": 18000, "premium": 40000},
-                    "lighting": {"basic": 12000, "premium": 30000},
-                    "sound": {"basic": 8000, "premium": 20000}
-                },
-                "crew_rates": {
-                    "director": {"daily": 12000, "weekly": 75000},
-                    "dop": {"daily": 10000, "weekly": 60000},
-                    "sound": {"daily": 7000, "weekly": 40000}
-                }
-            }
-        }
+        self.cost_templates = copy.deepcopy(COST_TEMPLATES)
+        self.engine = BudgetEngine(self.cost_templates)
+        self.scene_costing = SceneCostModel(self.cost_templates)
     
     async def estimate_costs(
         self,
         production_data: Dict[str, Any],
         location_data: Dict[str, Any],
         crew_data: Dict[str, Any],
-        scene_data: Dict[str, Any] = None
+        scene_data: Dict[str, Any] = None,
+        cast_data: Dict[str, Any] = None,
+        schedule_data: Dict[str, Any] = None,
+        constraints: Dict[str, Any] = None,
+        include_llm_commentary: bool = False
     ) -> Dict[str, Any]:
-        """Generate detailed cost estimates with scene-level breakdown."""
-        # Prepare scene-level cost structure if scene data is provided
-        scene_costs = {}
-        if scene_data:
-            for scene_id, scene in scene_data.items():
-                scene_costs[scene_id] = await self._estimate_scene_costs(
-                    scene,
-                    production_data,
-                    location_data
-                )
-        
-        # Generate overall cost estimates
-        prompt = self._generate_cost_estimation_prompt(
-            production_data,
-            location_data,
-            crew_data,
-            scene_costs
-        )
+        """Price the budget from the rate cards, with optional LLM commentary.
         
+        With scene_data (script results with breakdown cards, a scene list or
+        {scene_id: scene}), the budget also carries a per-scene cost table
+        attributed to its category totals.
+        """
         try:
-            # Combine instructions with prompt
-            full_prompt = f"{self.instructions}\n\n{prompt}"
-
-            response = self.client.models.generate_content(
-                model=self.model_config["model"],
-                contents=full_prompt,
-                config=types.GenerateContentConfig(
-                    temperature=self.model_config["temperature"],
-                    max_output_tokens=self.model_config["max_output_tokens"],
-                    top_p=self.model_config["top_p"],
-                    top_k=self.model_config["top_k"],
-                    response_mime_type="application/json"
-                )
+            estimates = self.engine.build_budget(
+                production_data,
+                location_data,
+                crew_data,
+                cast_data=cast_data,
+                schedule_data=schedule_data,
+                constraints=constraints
             )
-
-            # Safe content extraction
-            def extract_content_safely(response):
-                if not hasattr(response, 'candidates') or not response.candidates:
-                    raise ValueError("No candidates in Gemini response")
-                
-                candidate = response.candidates[0]
-                if not hasattr(candidate, 'content') or not candidate.content:
-                    raise ValueError("Empty content in Gemini response")
-                
-                if not hasattr(candidate.content, 'parts') or not candidate.content.parts:
-                    raise ValueError("No content parts in Gemini response")
-                
-                text_content = candidate.content.parts[0].text
-                if not text_content:
-                    raise ValueError("Empty text content in Gemini response")
-                
-                return text_content
-
-            try:
-                response_text = extract_content_safely(response)
-                logger.info("Received cost estimation response")
-                
-                estimates = self._extract_json(response_text)
-                if not estimates:
-                    logger.error("Failed to extract valid JSON from response")
-                    return self._create_fallback_estimates(
-                        production_data,
-                        location_data,
-                        crew_data,
-                        scene_costs
-                    )
-            except ValueError as e:
-                logger.error(f"Validation error: {e}")
-                return self._create_fallback_estimates(
-                    production_data,
-                    location_data,
-                    crew_data,
-                    scene_costs
-                )
-            
-            processed = self._process_estimates(estimates, scene_costs)
-            logger.info("Successfully processed cost estimates")
-            return processed
-            
         except Exception as e:
-            logger.error(f"Error in cost estimation: {str(e)}", exc_info=True)
+            logger.error(f"Error in rate-card cost estimation: {str(e)}", exc_info=True)
             return self._create_fallback_estimates(
                 production_data,
                 location_data,
                 crew_data,
-                scene_costs
+                {}
             )
-    
-    async def _estimate_scene_costs(
-        self,
-        scene: Dict[str, Any],
-        production_data: Dict[str, Any],
-        location_data: Dict[str, Any]
-    ) -> Dict[str, Any]:
-        """Generate cost estimates for a single scene."""
-        # Get appropriate regional rates
-        region = location_data.get("region", "mumbai").lower()
-        rates = self.cost_templates.get(region, self.cost_templates["mumbai"])
-        
-        # Calculate basic scene costs
-        location_type = scene.get("location_type", "basic")
-        studio_size = scene.get("studio_size", "small")
-        equipment_level = scene.get("equipment_level", "basic")
-        
-        scene_costs = {
-            "location": rates["location_rates"].get(location_type, rates["location_rates"]["basic"]),
-            "studio": rates["studio_rates"].get(studio_size, rates["studio_rates"]["small"]),
-            "equipment": {
-                "camera": rates["equipment_rates"]["camera"].get(equipment_level, rates["equipment_rates"]["camera"]["basic"]),
-                "lighting": rates["equipment_rates"]["lighting"].get(equipment_level, rates["equipment_rates"]["lighting"]["basic"]),
-                "sound": rates["equipment_rates"]["sound"].get(equipment_level, rates["equipment_rates"]["sound"]["basic"])
-            },
-            "crew": {}
-        }
         
-        # Calculate crew costs
-        for role, rate_info in rates["crew_rates"].items():
-            scene_costs["crew"][role] = rate_info["daily"]
+        if scene_data:
+            try:
+                estimates["scene_costs"] = self.scene_costing.price(
+                    scene_data,
+                    production_data,
+                    location_data,
+                    budget=estimates
+                )
+            except Exception as e:
+                logger.warning(f"Skipping scene cost attribution: {str(e)}")
         
-        # Add scene-specific metadata
-        scene_costs["metadata"] = {
-            "scene_id": scene.get("scene_id"),
-            "duration": scene.get("duration_hours", 1),
-            "complexity": scene.get("complexity", "medium"),
-            "special_requirements": scene.get("special_requirements", [])
-        }
+        # Commentary is the only optional LLM step
+        if include_llm_commentary:
+            estimates["commentary"] = await self._generate_commentary(estimates, production_data)
         
-        return scene_costs
+        return estimates
     
-    def _generate_cost_estimation_prompt(
-        self,
-        production_data: Dict[str, Any],
-        location_data: Dict[str, Any],
-        crew_data: Dict[str, Any],
-        scene_costs: Dict[str, Any]
-    ) -> str:
-        """Generate detailed prompt for cost estimation."""
-        return f"""You are a professional Indian film production cost estimator. Analyze the provided data and generate a detailed cost estimate in valid JSON format.
-
-        Required JSON structure:
-        {{
-            "scenes": {{
-                "scene_id": {{
-                    "costs": {{
-                        "location": float,
-                        "studio": float,
-                        "equipment": {{}},
-                        "crew": {{}},
-                        "other": float
-                    }},
-                    "total": float,
-                    "cost_drivers": [string]
-                }}
-            }},
-            "locations": {{
-                "location_name": {{
-                    "daily_rate": float,
-                    "permits": float,
-                    "additional_fees": [string],
-                    "total_days": int,
-                    "total_cost": float
-                }}
-            }},
-            "equipment": {{
-                "category": {{
-                    "items": [string],
-                    "rental_rates": {{"item": float}},
-                    "purchase_costs": {{"item": float}},
-                    "insurance": float,
-                    "total_cost": float
-                }}
-            }},
-            "personnel": {{
-                "role": {{
-                    "daily_rate": float,
-                    "overtime_rate": float,
-                    "total_days": int,
-                    "benefits": float,
-                    "total_cost": float
-                }}
-            }},
-            "logistics": {{
-                "transportation": {{"item": float}},
-                "accommodation": {{"item": float}},
-                "catering": {{"item": float}},
-                "misc": [string]
-            }},
-            "insurance": {{"type": float}},
-            "contingency": {{
-                "percentage": float,
-                "amount": float
-            }},
-            "cost_drivers": {{
-                "category": [string]
-            }}
-        }}
-
-        Production Data:
-        {json.dumps(production_data, indent=2)}
+    async def _generate_commentary(self, estimates: Dict[str, Any], production_data: Dict[str, Any]) -> Dict[str, Any]:
+        """Ask Gemini to explain an already-priced budget; numbers are never taken from the reply."""
+        largest_lines = sorted(estimates["line_items"], key=lambda row: -row["total_cost"])[:10]
+        prompt = f"""Review this film production budget, priced from rate cards, and return ONLY a JSON object of the form
+{{"summary": "string", "cost_drivers": ["string"], "savings_opportunities": ["string"]}}
+with at most 5 short, practical entries per list. Do not change or restate any figures.
 
-        Location Data:
-        {json.dumps(location_data, indent=2)}
+Production Data:
+{json.dumps(production_data, indent=2, default=str)}
 
-        Crew Data:
-        {json.dumps(crew_data, indent=2)}
+Totals ({estimates["rate_card"]["currency"]}):
+{json.dumps(estimates["total_estimates"], indent=2)}
 
-        Scene-Level Costs:
-        {json.dumps(scene_costs, indent=2)}
+Largest line items:
+{json.dumps(largest_lines, indent=2)}
 
-        IMPORTANT: Respond ONLY with valid JSON matching the structure above. Do not include any other text or explanations."""
+Assumptions:
+{json.dumps(estimates["assumptions"], indent=2)}"""
+        try:
+            response = await asyncio.to_thread(
+                self.client.models.generate_content,
+                model=self.model_config["model"],
+                contents=f"{self.instructions}\n\n{prompt}",
+                config=types.GenerateContentConfig(
+                    temperature=self.model_config["temperature"],
+                    max_output_tokens=self.model_config["max_output_tokens"],
+                    top_p=self.model_config["top_p"],
+                    top_k=self.model_config["top_k"],
+                    response_mime_type="application/json"
+                )
+            )
+            return self._extract_json(response.text or "")
+        except Exception as e:
+            logger.warning(f"Skipping LLM budget commentary: {str(e)}")
+            return {}
     
     def _extract_json(self, text: str) -> Dict[str, Any]:
         """Extract JSON from text response, handling various formats."""
@@ -424,141 +273,29 @@ class CostEstimatorAgent:
                 "total_cost": base_crew_cost * num_days
             }
         
-        # Calculate totals
-        total_location = sum(loc["total_cost"] for loc in estimates["location_costs"].values())
-        total_equipment = sum(eq["total_cost"] for eq in estimates["equipment_costs"].values())
-        total_personnel = sum(p["total_cost"] for p in estimates["personnel_costs"].values())
-        total_insurance = sum(estimates["insurance_costs"].values())
-        
-        subtotal = total_location + total_equipment + total_personnel + total_insurance
-        contingency_amount = subtotal * 0.1
-        
-        estimates["contingency"]["amount"] = contingency_amount
-        estimates["total_estimates"] = {
-            "total_location_costs": total_location,
-            "total_equipment_costs": total_equipment,
-            "total_personnel_costs": total_personnel,
-            "total_insurance_costs": total_insurance,
-            "contingency_amount": contingency_amount,
-            "grand_total": subtotal + contingency_amount
+        # Same keys as a rate-card budget, so the ledger, risk simulation and exports can read it
+        ledger = BudgetLedger.from_budget(estimates)
+        estimates["contingency"]["amount"] = ledger.contingency_amount
+        estimates["total_estimates"] = ledger.totals()
+        estimates["rate_card"] = {
+            "version": None,
+            "region": str(location_data.get("region") or production_data.get("region") or "mumbai").lower(),
+            "tier": "premium" if production_data.get("quality_level") == "High" else "basic",
+            "union": bool(production_data.get("union", True)),
+            "currency": "USD",
+            "exchange_rates": dict(EXCHANGE_RATES)
         }
-        
-        return estimates
-    
-    def _process_estimates(self, estimates: Dict[str, Any], scene_costs: Dict[str, Any]) -> Dict[str, Any]:
-        """Process and validate cost estimates."""
-        processed = {
-            "location_costs": {},
-            "equipment_costs": {},
-            "personnel_costs": {},
-            "logistics_costs": {},
-            "insurance_costs": {},
-            "contingency": {},
-            "total_estimates": {}
-        }
-        
-        # Process location costs
-        if "locations" in estimates:
-            for location, data in estimates["locations"].items():
-                processed["location_costs"][location] = {
-                    "daily_rate": data.get("daily_rate", 0),
-                    "permit_costs": data.get("permits", 0),
-                    "additional_fees": data.get("additional_fees", []),
-                    "total_days": data.get("total_days", 0),
-                    "total_cost": data.get("total_cost", 0)
-                }
-        
-        # Process equipment costs
-        if "equipment" in estimates:
-            for category, items in estimates["equipment"].items():
-                # Handle cases where items might be a float or other non-dict type
-                if isinstance(items, dict):
-                    processed["equipment_costs"][category] = {
-                        "items": items.get("items", []),
-                        "rental_rates": items.get("rental_rates", {}),
-                        "purchase_costs": items.get("purchase_costs", {}),
-                        "insurance_costs": items.get("insurance", 0),
-                        "total_cost": items.get("total_cost", 0)
-                    }
-                else:
-                    # If items is not a dict (e.g., it's a float), create a basic structure
-                    cost_value = float(items) if isinstance(items, (int, float)) else 0
-                    processed["equipment_costs"][category] = {
-                        "items": [f"{category} Package"],
-                        "rental_rates": {f"{category} Package": cost_value},
-                        "purchase_costs": {},
-                        "insurance_costs": 0,
-                        "total_cost": cost_value
-                    }
-        
-        # Process personnel costs
-        if "personnel" in estimates:
-            for role, costs in estimates["personnel"].items():
-                # Handle cases where costs might be a float or other non-dict type
-                if isinstance(costs, dict):
-                    processed["personnel_costs"][role] = {
-                        "daily_rate": costs.get("daily_rate", 0),
-                        "overtime_rate": costs.get("overtime_rate", 0),
-                        "total_days": costs.get("total_days", 0),
-                        "benefits": costs.get("benefits", 0),
-                        "total_cost": costs.get("total_cost", 0)
-                    }
-                else:
-                    # If costs is not a dict (e.g., it's a float), create a basic structure
-                    cost_value = float(costs) if isinstance(costs, (int, float)) else 0
-                    processed["personnel_costs"][role] = {
-                        "daily_rate": cost_value,
-                        "overtime_rate": 0,
-                        "total_days": 1,
-                        "benefits": 0,
-                        "total_cost": cost_value
-                    }
-        
-        # Process logistics costs
-        if "logistics" in estimates:
-            processed["logistics_costs"] = {
-                "transportation": estimates["logistics"].get("transportation", {}),
-                "accommodation": estimates["logistics"].get("accommodation", {}),
-                "catering": estimates["logistics"].get("catering", {}),
-                "misc_expenses": estimates["logistics"].get("misc", [])
-            }
-        
-        # Process insurance costs
-        if "insurance" in estimates:
-            processed["insurance_costs"] = estimates["insurance"]
-        
-        # Process contingency
-        if "contingency" in estimates:
-            processed["contingency"] = {
-                "percentage": estimates["contingency"].get("percentage", 10),
-                "amount": estimates["contingency"].get("amount", 0)
-            }
-        
-        # Calculate totals
-        total_location = sum(loc["total_cost"] for loc in processed["location_costs"].values())
-        total_equipment = sum(eq["total_cost"] for eq in processed["equipment_costs"].values())
-        total_personnel = sum(p["total_cost"] for p in processed["personnel_costs"].values())
-        total_logistics = sum(
-            sum(category.values()) if isinstance(category, dict) else 0
-            for category in processed["logistics_costs"].values()
-        )
-        total_insurance = sum(processed["insurance_costs"].values())
-        
-        processed["total_estimates"] = {
-            "total_location_costs": total_location,
-            "total_equipment_costs": total_equipment,
-            "total_personnel_costs": total_personnel,
-            "total_logistics_costs": total_logistics,
-            "total_insurance_costs": total_insurance,
-            "contingency_amount": processed["contingency"]["amount"],
-            "grand_total": sum([
-                total_location,
-                total_equipment,
-                total_personnel,
-                total_logistics,
-                total_insurance,
-                processed["contingency"]["amount"]
-            ])
+        estimates["line_items"] = ledger.line_items(estimates)
+        estimates["assumptions"] = {
+            "shoot_days": num_days,
+            "start_date": production_data.get("start_date"),
+            "shoot_weeks": -(-num_days // 5),
+            "days_source": "fallback",
+            "day_hours": DEFAULT_DAY_HOURS,
+            "cast_source": "none",
+            "cast_work_days": {},
+            "crew_headcount": len(estimates["personnel_costs"])
         }
+        estimates["engine"] = "fallback"
         
-        return processed 
\ No newline at end of file
+        return estimates
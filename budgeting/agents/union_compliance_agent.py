@@ -2,9 +2,13 @@ from typing import Dict, Any, List
 import json
 import logging
 import os
+import copy
+import asyncio
 from google import genai
 from google.genai import types
 from base_config import AGENT_INSTRUCTIONS, get_model_config
+from ..rate_cards import UNION_RATES
+from ..union_compliance_engine import UnionComplianceEngine
 
 logger = logging.getLogger(__name__)
 
@@ -17,103 +21,61 @@ class UnionComplianceAgent:
         self.instructions = AGENT_INSTRUCTIONS.get("union_compliance", "")
         
         # Union rate templates (2024 rates)
-        self.union_rates = {
-            "sag_aftra": {
-                "scale_rates": {
-                    "lead_actor": {
-                        "daily_rate": 1030,
-                        "weekly_rate": 3575,
-                        "overtime_rate": 1545  # 1.5x daily rate
-                    },
-                    "supporting_actor": {
-                        "daily_rate": 630,
-                        "weekly_rate": 2190,
-                        "overtime_rate": 945
-                    },
-                    "background": {
-                        "daily_rate": 150,
-                        "weekly_rate": 525,
-                        "overtime_rate": 225
-                    },
-                    "stunt_performer": {
-                        "daily_rate": 1030,
-                        "weekly_rate": 3575,
-                        "hazard_pay": 500  # Additional per hazard
-                    }
-                },
-                "benefits": {
-                    "health_pension": {
-                        "percentage": 18.5,
-                        "minimum_contribution": 500
-                    },
-                    "vacation_holiday": {
-                        "percentage": 8.0
-                    }
-                },
-                "meal_penalties": {
-                    "first_violation": 25,
-                    "second_violation": 50,
-                    "subsequent_violations": 100
-                },
-                "turnaround_violations": {
-                    "less_than_12_hours": 100,
-                    "less_than_10_hours": 200
-                }
-            },
-            "iatse": {
-                "department_minimums": {
-                    "dp_rate": 550,  # per day
-                    "gaffer_rate": 450,
-                    "key_grip_rate": 400,
-                    "sound_mixer_rate": 500,
-                    "script_supervisor_rate": 450,
-                    "first_ad_rate": 500,
-                    "second_ad_rate": 350
-                },
-                "benefits": {
-                    "health_welfare": {
-                        "percentage": 25,
-                        "minimum_hours": 300
-                    },
-                    "pension": {
-                        "percentage": 15
-                    },
-                    "training": {
-                        "percentage": 2
-                    }
-                },
-                "overtime_rules": {
-                    "daily_overtime": 12,  # hours before overtime
-                    "weekly_overtime": 40,  # hours before weekly overtime
-                    "overtime_multiplier": 1.5,
-                    "double_time_hours": 16
-                },
-                "meal_requirements": {
-                    "first_meal": 6,  # hours before first meal
-                    "subsequent_meals": 6,  # hours between meals
-                    "meal_penalty": 25
-                }
-            }
-        }
+        self.union_rates = copy.deepcopy(UNION_RATES)
+        self.engine = UnionComplianceEngine(self.union_rates)
     
     async def calculate_union_costs(
         self,
         cast_data: Dict[str, Any],
         crew_data: Dict[str, Any],
         schedule_data: Dict[str, Any],
-        production_type: str = "independent"
+        production_type: str = "independent",
+        production_data: Dict[str, Any] = None,
+        include_llm_commentary: bool = False
     ) -> Dict[str, Any]:
-        """Calculate union costs and compliance requirements."""
+        """Calculate union costs and compliance requirements.
+        
+        Wages, fringes and meal/turnaround penalties come from the local
+        UnionComplianceEngine, memoized per rate card and schedule; the LLM
+        only adds commentary when asked to.
+        """
         try:
-            prompt = self._generate_union_compliance_prompt(
-                cast_data, crew_data, schedule_data, production_type
+            analysis = await asyncio.to_thread(
+                self.engine.evaluate,
+                cast_data,
+                crew_data,
+                schedule_data,
+                production_type,
+                production_data
             )
             
-            full_prompt = f"{self.instructions}\n\n{prompt}"
+            if include_llm_commentary:
+                analysis["commentary"] = await self._generate_commentary(analysis)
+            return analysis
             
-            response = self.client.models.generate_content(
+        except Exception as e:
+            logger.error(f"Error in union compliance analysis: {str(e)}", exc_info=True)
+            return self._create_fallback_union_analysis(cast_data, crew_data, schedule_data)
+    
+    async def _generate_commentary(self, analysis: Dict[str, Any]) -> Dict[str, Any]:
+        """LLM commentary on a computed union analysis; {} if unavailable."""
+        payload = {
+            "sag_aftra": {key: analysis["sag_aftra"][key] for key in ("scale_rates", "benefits", "penalties", "estimated_total")},
+            "iatse": {key: analysis["iatse"][key] for key in ("crew_costs", "benefits", "penalties", "estimated_total")},
+            "penalty_days": [row for row in analysis["daily"] if row["penalties"]],
+            "total_union_costs": analysis["total_union_costs"]
+        }
+        prompt = f"""{self.instructions}
+        
+        Review this SAG-AFTRA / IATSE cost and compliance analysis. Do not change any numbers.
+        Respond with JSON: {{"summary": string, "risks": [string], "recommendations": [string]}}
+        
+        {json.dumps(payload, indent=2, default=str)}"""
+        try:
+            response = await asyncio.to_thread(
+                self.client.models.generate_content,
                 model=self.model_config["model"],
-                contents=full_prompt,
+                contents=prompt,
                 config=types.GenerateContentConfig(
                     temperature=self.model_config["temperature"],
                     max_output_tokens=self.model_config["max_output_tokens"],
@@ -122,142 +84,10 @@ class UnionComplianceAgent:
                     response_mime_type="application/json"
                 )
             )
-            
-            response_text = self._extract_content_safely(response)
-            analysis = self._extract_json(response_text)
-            
-            if not analysis:
-                logger.warning("Failed to parse AI response, using fallback")
-                return self._create_fallback_union_analysis(cast_data, crew_data, schedule_data)
-            
-            return self._process_union_analysis(analysis)
-            
+            return self._extract_json(self._extract_content_safely(response))
         except Exception as e:
-            logger.error(f"Error in union compliance analysis: {str(e)}")
-            return self._create_fallback_union_analysis(cast_data, crew_data, schedule_data)
-    
-    def _generate_union_compliance_prompt(
-        self,
-        cast_data: Dict[str, Any],
-        crew_data: Dict[str, Any],
-        schedule_data: Dict[str, Any],
-        production_type: str
-    ) -> str:
-        """Generate prompt for union compliance analysis."""
-        return f"""You are a professional union compliance specialist for film production.
-        
-        Analyze the production data and calculate SAG-AFTRA and IATSE union costs and compliance requirements.
-        
-        Required JSON structure:
-        {{
-            "sag_aftra": {{
-                "scale_rates": {{
-                    "lead_actor": {{
-                        "daily_rate": float,
-                        "weekly_rate": float,
-                        "total_days": int,
-                        "total_cost": float
-                    }},
-                    "supporting_actor": {{
-                        "daily_rate": float,
-                        "count": int,
-                        "total_days": int,
-                        "total_cost": float
-                    }},
-                    "background": {{
-                        "daily_rate": float,
-                        "person_days": int,
-                        "total_cost": float
-                    }},
-                    "stunt_performer": {{
-                        "daily_rate": float,
-                        "hazard_pay": float,
-                        "total_days": int,
-                        "total_cost": float
-                    }}
-                }},
-                "benefits": {{
-                    "health_pension": {{
-                        "percentage": float,
-                        "calculated_amount": float
-                    }},
-                    "vacation_holiday": {{
-                        "percentage": float,
-                        "calculated_amount": float
-                    }}
-                }},
-                "penalties": {{
-                    "meal_penalties": {{
-                        "estimated_violations": int,
-                        "total_cost": float
-                    }},
-                    "turnaround_violations": {{
-                        "estimated_violations": int,
-                        "total_cost": float
-                    }}
-                }},
-                "estimated_total": float
-            }},
-            "iatse": {{
-                "department_minimums": {{
-                    "dp_rate": float,
-                    "gaffer_rate": float,
-                    "key_grip_rate": float,
-                    "sound_mixer_rate": float,
-                    "script_supervisor_rate": float,
-                    "first_ad_rate": float,
-                    "second_ad_rate": float
-                }},
-                "crew_costs": {{
-                    "department": {{
-                        "base_cost": float,
-                        "overtime_cost": float,
-                        "total_cost": float
-                    }}
-                }},
-                "benefits": {{
-                    "health_welfare": {{
-                        "percentage": float,
-                        "calculated_amount": float
-                    }},
-                    "pension": {{
-                        "percentage": float,
-                        "calculated_amount": float
-                    }},
-                    "training": {{
-                        "percentage": float,
-                        "calculated_amount": float
-                    }}
-                }},
-                "estimated_total": float
-            }},
-            "compliance_requirements": {{
-                "sag_aftra": [
-                    "requirement_description"
-                ],
-                "iatse": [
-                    "requirement_description"
-                ]
-            }},
-            "total_union_costs": float,
-            "production_type": "{production_type}",
-            "recommendations": [
-                "recommendation"
-            ]
-        }}
-        
-        Cast Data:
-        {json.dumps(cast_data, indent=2)}
-        
-        Crew Data:
-        {json.dumps(crew_data, indent=2)}
-        
-        Schedule Data:
-        {json.dumps(schedule_data, indent=2)}
-        
-        Production Type: {production_type}
-        
-        IMPORTANT: Respond ONLY with valid JSON matching the structure above."""
+            logger.error(f"Error generating union commentary: {str(e)}")
+            return {}
     
     def _create_fallback_union_analysis(
         self,
@@ -431,20 +261,6 @@ class UnionComplianceAgent:
             ]
         }
     
-    def _process_union_analysis(self, analysis: Dict[str, Any]) -> Dict[str, Any]:
-        """Process and validate union analysis."""
-        # Ensure all required fields are present
-        if "sag_aftra" not in analysis:
-            analysis["sag_aftra"] = {}
-        if "iatse" not in analysis:
-            analysis["iatse"] = {}
-        if "compliance_requirements" not in analysis:
-            analysis["compliance_requirements"] = {"sag_aftra": [], "iatse": []}
-        if "total_union_costs" not in analysis:
-            analysis["total_union_costs"] = 0
-            
-        return analysis
-    
     def _extract_content_safely(self, response):
         """Safely extract content from Gemini response."""
         if not hasattr(response, 'candidates') or not response.candidates:
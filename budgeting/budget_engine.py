@@ -0,0 +1,580 @@
+"""
+Deterministic rate-card budget engine.
+
+Prices every budget line locally from the rate cards in rate_cards.py:
+cast from SAG-AFTRA scale over their Day Out of Days, crew from regional and
+IATSE rates per department headcount, locations, equipment, logistics,
+insurance and contingency. Shoot days, cast work days and crew counts are
+NumPy arrays, so weekly rate caps, overtime and fringes come out of a few
+array operations and a full budget takes milliseconds. The output keeps the
+shape CostEstimatorAgent used to request from the LLM (location_costs,
+equipment_costs, personnel_costs, logistics_costs, insurance_costs,
+contingency, total_estimates) and adds a flat line-item table and version
+stamps so any budget can be reproduced from its inputs.
+"""
+
+from typing import Dict, Any, List, Optional
+from datetime import datetime
+import hashlib
+import json
+import logging
+import math
+import re
+import time
+
+import numpy as np
+
+from .rate_cards import (
+    COST_TEMPLATES, UNION_RATES, TEMPLATE_CURRENCY, UNION_CURRENCY,
+    DEPARTMENT_ROLES, DEPARTMENT_ALIASES, CREW_SIZE_LABELS, DEFAULT_CAST,
+    LOGISTICS_RATES, PERMIT_RATE, EQUIPMENT_INSURANCE_RATE, INSURANCE_RATES,
+    EXCHANGE_RATES, DEFAULT_DAY_HOURS, rate_card_version
+)
+
+logger = logging.getLogger(__name__)
+
+ENGINE_VERSION = "1.0"
+
+BUDGET_CATEGORIES = ["location_costs", "equipment_costs", "personnel_costs", "logistics_costs"]
+
+# Role descriptions that map a character to a SAG-AFTRA scale category, checked in order
+CAST_CATEGORY_KEYWORDS = [
+    ("stunt", "stunt_performer"),
+    ("background", "background"),
+    ("extra", "background"),
+    ("lead", "lead_actor"),
+    ("protagonist", "lead_actor"),
+    ("antagonist", "lead_actor"),
+    ("main", "lead_actor"),
+    ("supporting", "supporting_actor"),
+    ("minor", "supporting_actor")
+]
+
+# Characters without a role description: the most-booked ones are priced as leads
+LEAD_ROLES = 2
+
+STUDIO_SIZE_BY_QUALITY = {"Low": "small", "Medium": "medium", "High": "large"}
+
+LOCATION_SUFFIX = re.compile(r"_(INT|EXT|INT/EXT|EXT/INT|I/E)$", re.IGNORECASE)
+
+
+def cast_category(role: Any) -> Optional[str]:
+    """SAG-AFTRA scale category for a free-text role description, if one matches."""
+    text = str(role or "").lower()
+    if text in UNION_RATES["sag_aftra"]["scale_rates"]:
+        return text
+    for keyword, category in CAST_CATEGORY_KEYWORDS:
+        if keyword in text:
+            return category
+    return None
+
+
+def week_index(dates: List[Any]) -> np.ndarray:
+    """Consecutive Monday-based week numbers (0, 1, ...) for each date."""
+    days = np.asarray(dates, dtype='datetime64[D]').astype(np.int64)
+    # 1970-01-05 was the first Monday after the epoch
+    return np.unique((days - 4) // 7, return_inverse=True)[1].reshape(-1)
+
+
+def overtime_hours(hours: np.ndarray, threshold: float, double_after: float, multiplier: float) -> np.ndarray:
+    """Premium-weighted overtime hours per day: time-and-a-half past threshold, double time past double_after."""
+    time_and_half = np.clip(hours - threshold, 0, max(double_after - threshold, 0))
+    double_time = np.maximum(hours - max(double_after, threshold), 0)
+    return time_and_half * multiplier + double_time * 2.0
+
+
+def weekly_capped_cost(worked: np.ndarray, week: np.ndarray, daily: np.ndarray, weekly: np.ndarray) -> np.ndarray:
+    """Wages per row of a (people x days) work matrix, billing each week at the lower of daily x days or the weekly rate."""
+    weeks = np.zeros((len(week), int(week.max()) + 1 if len(week) else 0))
+    weeks[np.arange(len(week)), week] = 1.0
+    days_per_week = worked.astype(float) @ weeks
+    capped = np.minimum(days_per_week * daily[:, None], np.where(days_per_week > 0, weekly[:, None], 0.0))
+    return capped.sum(axis=1)
+
+
+def _money(amount: Any) -> float:
+    return round(float(amount), 2)
+
+
+class BudgetEngine:
+    """Computes a complete production budget from rate cards, schedule days, cast DOOP and crew counts."""
+
+    def __init__(self, cost_templates: Optional[Dict[str, Any]] = None, union_rates: Optional[Dict[str, Any]] = None):
+        self.cost_templates = cost_templates or COST_TEMPLATES
+        self.union_rates = union_rates or UNION_RATES
+
+    def build_budget(
+        self,
+        production_data: Dict[str, Any],
+        location_data: Dict[str, Any],
+        crew_data: Dict[str, Any],
+        cast_data: Optional[Dict[str, Any]] = None,
+        schedule_data: Optional[Dict[str, Any]] = None,
+        constraints: Optional[Dict[str, Any]] = None
+    ) -> Dict[str, Any]:
+        """Price every line item and roll them up into the estimator's budget shape.
+
+        schedule_data["days"] (or ["schedule"]) is a list of shoot days with date,
+        work_hours, locations and optionally the cast and scenes of that day;
+        cast_data["cast"] lists performers with category and work_days (1-based
+        shoot days), or cast_data["doop_reports"] is AssistantDirectorAgent's DOOP,
+        whose scenes are placed on shoot days through the schedule.
+        """
+        started = time.perf_counter()
+        constraints = constraints or {}
+        region = str(location_data.get("region") or production_data.get("region") or "mumbai").lower()
+        if region not in self.cost_templates:
+            logger.warning(f"No rate card for region {region}; using mumbai")
+            region = "mumbai"
+        templates = self.cost_templates[region]
+        quality = production_data.get("quality_level", "Medium")
+        tier = "premium" if quality == "High" else "basic"
+        union = bool(production_data.get("union", True))
+
+        currency = constraints.get("currency", "USD")
+        exchange_rates = {**EXCHANGE_RATES, **(constraints.get("exchange_rates") or {})}
+        if currency not in exchange_rates:
+            raise ValueError(f"No exchange rate for currency {currency}")
+        conversion = {code: rate / exchange_rates[currency] for code, rate in exchange_rates.items()}
+
+        days = self._shoot_days(production_data, schedule_data, constraints)
+        cast = self._cast_matrix(cast_data, days)
+        crew = self._crew_roster(crew_data, templates)
+
+        personnel = self._price_cast(cast, days, union, conversion)
+        crew_lines = self._price_crew(crew, days, union, conversion)
+        personnel.update(crew_lines)
+        locations = self._price_locations(location_data, days, templates, tier, quality, conversion[TEMPLATE_CURRENCY])
+        equipment = self._price_equipment(templates, tier, len(days["hours"]), conversion[TEMPLATE_CURRENCY])
+        logistics = self._price_logistics(cast, crew, days, conversion[LOGISTICS_RATES["currency"]])
+
+        payroll = sum(line["base_cost"] + line["overtime_cost"] for line in personnel.values())
+        non_payroll = sum(
+            line["total_cost"]
+            for category in (locations, equipment, logistics)
+            for line in category.values()
+        )
+        insurance = {
+            "workers_compensation": _money(payroll * INSURANCE_RATES["workers_compensation"]),
+            "general_liability": _money(non_payroll * INSURANCE_RATES["general_liability"])
+        }
+
+        budget = {
+            "location_costs": locations,
+            "equipment_costs": equipment,
+            "personnel_costs": personnel,
+            "logistics_costs": logistics,
+            "insurance_costs": insurance
+        }
+        totals = {
+            f"total_{category}": _money(sum(line["total_cost"] for line in budget[category].values()))
+            for category in BUDGET_CATEGORIES
+        }
+        totals["total_insurance_costs"] = _money(sum(insurance.values()))
+        subtotal = sum(totals.values())
+        percentage = float(constraints.get("contingency_percentage", production_data.get("contingency_percentage", 10)))
+        budget["contingency"] = {"percentage": percentage, "amount": _money(subtotal * percentage / 100)}
+        totals["contingency_amount"] = budget["contingency"]["amount"]
+        totals["grand_total"] = _money(subtotal + budget["contingency"]["amount"])
+        budget["total_estimates"] = totals
+
+        budget["line_items"] = self._line_items(budget, currency)
+        version = rate_card_version(self.cost_templates, self.union_rates)
+        budget["rate_card"] = {
+            "version": version,
+            "region": region,
+            "tier": tier,
+            "union": union,
+            "currency": currency,
+            "exchange_rates": exchange_rates
+        }
+        budget["version"] = {
+            "engine": ENGINE_VERSION,
+            "rate_card": version,
+            "inputs": self._inputs_hash(production_data, location_data, crew_data, cast_data, schedule_data, constraints)
+        }
+        budget["assumptions"] = {
+            "shoot_days": len(days["hours"]),
+            "start_date": days["start"],
+            "shoot_weeks": int(days["week"].max()) + 1 if len(days["week"]) else 0,
+            "days_source": days["source"],
+            "day_hours": round(float(days["hours"].mean()), 2) if len(days["hours"]) else 0.0,
+            "cast_source": cast["source"],
+            "cast_work_days": {name: int(n) for name, n in zip(cast["names"], cast["worked"].sum(axis=1))},
+            "crew_headcount": int(crew["count"].sum())
+        }
+        budget["engine"] = "rate_card"
+        budget["computation_ms"] = round((time.perf_counter() - started) * 1000, 3)
+        budget["generated_at"] = datetime.now().isoformat()
+        logger.info(f"Rate-card budget {totals['grand_total']:,.2f} {currency} in {budget['computation_ms']} ms")
+        return budget
+
+    def _shoot_days(
+        self,
+        production_data: Dict[str, Any],
+        schedule_data: Optional[Dict[str, Any]],
+        constraints: Dict[str, Any]
+    ) -> Dict[str, Any]:
+        """Hours, week numbers, places and cast per shoot day, and the first day's date."""
+        schedule_data = schedule_data or {}
+        day_list = schedule_data.get("days") or schedule_data.get("schedule") or []
+        default_hours = float(constraints.get("day_hours", DEFAULT_DAY_HOURS))
+
+        if day_list:
+            dates = [day.get("date") for day in day_list]
+            week = week_index(dates) if all(dates) else np.arange(len(day_list)) // 5
+            return {
+                "source": "schedule",
+                "start": dates[0] or production_data.get("start_date"),
+                "hours": np.array([float(day.get("work_hours") or default_hours) for day in day_list]),
+                "week": week,
+                "places": [{LOCATION_SUFFIX.sub("", str(loc)) for loc in day.get("locations", [])} for day in day_list],
+                "cast": [set(day["cast"]) for day in day_list] if any("cast" in day for day in day_list) else None,
+                "scenes": [
+                    {str(scene.get("scene_id") if isinstance(scene, dict) else scene) for scene in day.get("scenes", [])}
+                    for day in day_list
+                ] if any("scenes" in day for day in day_list) else None
+            }
+
+        count = max(int(production_data.get("schedule_days") or 1), 1)
+        return {
+            "source": "schedule_days",
+            "start": production_data.get("start_date"),
+            "hours": np.full(count, default_hours),
+            "week": np.arange(count) // 5,
+            "places": None,
+            "cast": None,
+            "scenes": None
+        }
+
+    def _cast_matrix(self, cast_data: Optional[Dict[str, Any]], days: Dict[str, Any]) -> Dict[str, Any]:
+        """Performers with category, headcount and a (cast x days) work matrix."""
+        cast_data = cast_data or {}
+        n_days = len(days["hours"])
+        entries = list(cast_data.get("cast") or [])
+        if not entries and cast_data.get("doop_reports"):
+            # DOOP work_days count scene positions, not shoot days; a performer's days come from
+            # the schedule days holding their scenes, or its per-day cast lists, instead
+            entries = [
+                {"name": name, **{key: value for key, value in report.items() if key != "work_days"}, "doop_scenes": report.get("scenes", [])}
+                for name, report in cast_data["doop_reports"].items()
+            ]
+        source = "cast_data"
+        if days["cast"]:
+            # Performers the schedule books but the cast data does not describe
+            listed = {str(entry.get("name")) for entry in entries}
+            scheduled = sorted(set().union(*days["cast"]) - listed)
+            if scheduled and not entries:
+                source = "schedule"
+            entries.extend({"name": name} for name in scheduled)
+        if not entries:
+            entries = DEFAULT_CAST
+            source = "default"
+
+        names = [str(entry.get("name", f"Cast {i + 1}")) for i, entry in enumerate(entries)]
+        row_by_name = {name: i for i, name in enumerate(names)}
+        worked = np.zeros((len(entries), n_days), dtype=bool)
+
+        # Work days from the schedule's per-day cast lists
+        if days["cast"]:
+            for d, cast in enumerate(days["cast"]):
+                rows = [row_by_name[name] for name in cast if name in row_by_name]
+                worked[rows, d] = True
+
+        for i, entry in enumerate(entries):
+            if entry.get("doop_scenes") and days["scenes"]:
+                scenes = {str(scene) for scene in entry["doop_scenes"]}
+                worked[i] = [bool(scenes & day) for day in days["scenes"]]
+            elif entry.get("work_days"):
+                index = np.asarray(entry["work_days"], dtype=int) - 1
+                worked[i] = False
+                worked[i, index[(index >= 0) & (index < n_days)]] = True
+            elif not worked[i].any():
+                booked = entry.get("days", entry.get("total_work_days"))
+                if booked is None:
+                    booked = math.ceil(float(entry.get("day_share", 1.0)) * n_days)
+                worked[i, :min(int(booked), n_days)] = True
+
+        categories = [
+            cast_category(entry.get("category") or entry.get("role_type") or entry.get("role"))
+            for entry in entries
+        ]
+        unresolved = [i for i, category in enumerate(categories) if category is None]
+        by_days = sorted(unresolved, key=lambda i: -worked[i].sum())
+        for rank, i in enumerate(by_days):
+            categories[i] = "lead_actor" if rank < LEAD_ROLES else "supporting_actor"
+
+        return {
+            "source": source,
+            "names": names,
+            "categories": categories,
+            "count": np.array([float(entry.get("count", 1)) for entry in entries]),
+            "worked": worked
+        }
+
+    def _crew_roster(self, crew_data: Dict[str, Any], templates: Dict[str, Any]) -> Dict[str, Any]:
+        """Roles per department with headcount, rates and rate currency."""
+        minimums = self.union_rates["iatse"]["department_minimums"]
+        cheapest = min(minimums, key=minimums.get)
+        departments = crew_data.get("departments") or list(DEPARTMENT_ROLES)
+        size = crew_data.get("size", "Medium")
+        size = CREW_SIZE_LABELS.get(size, 15) if isinstance(size, str) and not size.isdigit() else int(size)
+        department_counts = crew_data.get("department_counts") or {}
+
+        roles = []
+        for department in departments:
+            canonical = DEPARTMENT_ALIASES.get(str(department).lower(), str(department).lower())
+            named = DEPARTMENT_ROLES.get(canonical) or [(f"{canonical}_lead", "iatse", cheapest)]
+            roles.extend((department, role, source, key, 1.0) for role, source, key in named)
+
+        # Remaining headcount is priced at the lowest IATSE minimum, spread over departments
+        if department_counts:
+            extra = {
+                department: max(int(department_counts.get(department, 0)) - sum(1 for r in roles if r[0] == department), 0)
+                for department in departments
+            }
+        else:
+            spare = max(size - len(roles), 0)
+            share, remainder = divmod(spare, max(len(departments), 1))
+            extra = {department: share + (1 if i < remainder else 0) for i, department in enumerate(departments)}
+        roles.extend(
+            (department, "crew", "iatse", cheapest, float(count))
+            for department, count in extra.items() if count
+        )
+
+        daily, weekly, currency, union_scale = [], [], [], []
+        for _, _, source, key, _ in roles:
+            if source == "template":
+                rate = templates["crew_rates"][key]
+                daily.append(rate["daily"])
+                weekly.append(rate.get("weekly", np.inf))
+                currency.append(TEMPLATE_CURRENCY)
+                union_scale.append(False)
+            else:
+                daily.append(minimums[key])
+                weekly.append(np.inf)
+                currency.append(UNION_CURRENCY)
+                union_scale.append(True)
+
+        return {
+            "department": [r[0] for r in roles],
+            "role": [r[1] for r in roles],
+            "count": np.array([r[4] for r in roles]),
+            "daily": np.array(daily, dtype=float),
+            "weekly": np.array(weekly, dtype=float),
+            "currency": currency,
+            "union_scale": np.array(union_scale, dtype=bool)
+        }
+
+    def _price_cast(self, cast: Dict[str, Any], days: Dict[str, Any], union: bool, conversion: Dict[str, float]) -> Dict[str, Dict[str, Any]]:
+        sag = self.union_rates["sag_aftra"]
+        rules = self.union_rates["iatse"]["overtime_rules"]
+        scale = [sag["scale_rates"][category] for category in cast["categories"]]
+        daily = np.array([rate["daily_rate"] for rate in scale], dtype=float)
+        weekly = np.array([rate.get("weekly_rate", np.inf) for rate in scale], dtype=float)
+        hazard = np.array([rate.get("hazard_pay", 0) for rate in scale], dtype=float)
+        count = cast["count"]
+        worked = cast["worked"]
+        work_days = worked.sum(axis=1)
+
+        day_hours = sag.get("work_day_hours", 8)
+        premium_hours = worked.astype(float) @ overtime_hours(
+            days["hours"], day_hours, rules["double_time_hours"], rules["overtime_multiplier"]
+        )
+        base = (weekly_capped_cost(worked, days["week"], daily, weekly) + hazard * work_days) * count
+        overtime = premium_hours * daily / day_hours * count
+        gross = base + overtime
+
+        fringes = np.zeros_like(gross)
+        if union:
+            benefits = sag["benefits"]
+            health = gross * benefits["health_pension"]["percentage"] / 100
+            principal = np.array([category != "background" for category in cast["categories"]]) & (gross > 0)
+            health = np.where(principal, np.maximum(health, benefits["health_pension"].get("minimum_contribution", 0) * count), health)
+            fringes = health + gross * benefits["vacation_holiday"]["percentage"] / 100
+
+        rate = conversion[UNION_CURRENCY]
+        return {
+            f"Cast - {name}": {
+                "department": "cast",
+                "category": cast["categories"][i],
+                "currency": UNION_CURRENCY,
+                "headcount": int(count[i]),
+                "daily_rate": _money(daily[i] * rate),
+                "weekly_rate": _money(weekly[i] * rate) if np.isfinite(weekly[i]) else None,
+                "overtime_rate": _money(daily[i] / day_hours * rules["overtime_multiplier"] * rate),
+                "total_days": int(work_days[i]),
+                "base_cost": _money(base[i] * rate),
+                "overtime_cost": _money(overtime[i] * rate),
+                "benefits": _money(fringes[i] * rate),
+                "total_cost": _money((gross[i] + fringes[i]) * rate)
+            }
+            for i, name in enumerate(cast["names"])
+        }
+
+    def _price_crew(self, crew: Dict[str, Any], days: Dict[str, Any], union: bool, conversion: Dict[str, float]) -> Dict[str, Dict[str, Any]]:
+        iatse = self.union_rates["iatse"]
+        rules = iatse["overtime_rules"]
+        n_days = len(days["hours"])
+        threshold = rules["daily_overtime"]
+        premium_hours = overtime_hours(days["hours"], threshold, rules["double_time_hours"], rules["overtime_multiplier"]).sum()
+
+        worked = np.ones((len(crew["role"]), n_days), dtype=bool)
+        base = weekly_capped_cost(worked, days["week"], crew["daily"], crew["weekly"]) * crew["count"]
+        overtime = premium_hours * crew["daily"] / threshold * crew["count"]
+        gross = base + overtime
+        fringe_rate = sum(benefit["percentage"] for benefit in iatse["benefits"].values()) / 100 if union else 0.0
+        fringes = gross * fringe_rate * crew["union_scale"]
+        rate = np.array([conversion[code] for code in crew["currency"]])
+
+        lines = {}
+        for i, role in enumerate(crew["role"]):
+            department = crew["department"][i]
+            key = f"{department} - {role}" if role == "crew" or role in lines else role
+            lines[key] = {
+                "department": department,
+                "currency": crew["currency"][i],
+                "headcount": int(crew["count"][i]),
+                "daily_rate": _money(crew["daily"][i] * rate[i]),
+                "weekly_rate": _money(crew["weekly"][i] * rate[i]) if np.isfinite(crew["weekly"][i]) else None,
+                "overtime_rate": _money(crew["daily"][i] / threshold * rules["overtime_multiplier"] * rate[i]),
+                "total_days": n_days,
+                "base_cost": _money(base[i] * rate[i]),
+                "overtime_cost": _money(overtime[i] * rate[i]),
+                "benefits": _money(fringes[i] * rate[i]),
+                "total_cost": _money((gross[i] + fringes[i]) * rate[i])
+            }
+        return lines
+
+    def _price_locations(
+        self,
+        location_data: Dict[str, Any],
+        days: Dict[str, Any],
+        templates: Dict[str, Any],
+        tier: str,
+        quality: str,
+        rate: float
+    ) -> Dict[str, Dict[str, Any]]:
+        locations = location_data.get("locations") or ["Unknown Location"]
+        names, studio, premium = [], [], []
+        for loc in locations:
+            entry = loc if isinstance(loc, dict) else {"name": str(loc)}
+            name = str(entry.get("name", "Unknown Location"))
+            kind = f"{entry.get('type', '')} {name}".lower()
+            names.append(name)
+            studio.append("studio" in kind or "stage" in kind)
+            premium.append(str(entry.get("cost_category", "")).lower() == "premium" or tier == "premium")
+        studio = np.array(studio)
+        studio_rate = templates["studio_rates"][STUDIO_SIZE_BY_QUALITY.get(quality, "medium")]
+        location_rates = templates["location_rates"]
+        daily = np.where(
+            studio,
+            studio_rate,
+            np.where(premium, location_rates["premium"], location_rates["basic"])
+        ).astype(float)
+        permits = np.where(studio, 0.0, daily * PERMIT_RATE)
+
+        # Days per location from the schedule, or the shoot days split evenly
+        n_days = len(days["hours"])
+        booked = None
+        if days["places"]:
+            booked = np.array([sum(name in places for places in days["places"]) for name in names])
+            if not booked.any():
+                booked = None
+        if booked is None:
+            share, remainder = divmod(n_days, len(names))
+            booked = np.maximum(share + (np.arange(len(names)) < remainder), 1)
+
+        total = booked * (daily + permits) * rate
+        return {
+            name: {
+                "currency": TEMPLATE_CURRENCY,
+                "daily_rate": _money(daily[i] * rate),
+                "permit_costs": _money(permits[i] * rate),
+                "additional_fees": [],
+                "total_days": int(booked[i]),
+                "total_cost": _money(total[i])
+            }
+            for i, name in enumerate(names)
+        }
+
+    def _price_equipment(self, templates: Dict[str, Any], tier: str, n_days: int, rate: float) -> Dict[str, Dict[str, Any]]:
+        categories = list(templates["equipment_rates"])
+        daily = np.array([templates["equipment_rates"][c].get(tier, templates["equipment_rates"][c]["basic"]) for c in categories], dtype=float)
+        rental = daily * n_days * rate
+        insurance = rental * EQUIPMENT_INSURANCE_RATE
+        return {
+            category.title(): {
+                "currency": TEMPLATE_CURRENCY,
+                "items": [f"{category.title()} Package"],
+                "rental_rates": {f"{category.title()} Package": _money(daily[i] * rate)},
+                "purchase_costs": {},
+                "insurance_costs": _money(insurance[i]),
+                "total_days": n_days,
+                "total_cost": _money(rental[i] + insurance[i])
+            }
+            for i, category in enumerate(categories)
+        }
+
+    def _price_logistics(self, cast: Dict[str, Any], crew: Dict[str, Any], days: Dict[str, Any], rate: float) -> Dict[str, Dict[str, Any]]:
+        n_days = len(days["hours"])
+        cast_per_day = cast["count"] @ cast["worked"].astype(float) if len(cast["count"]) else np.zeros(n_days)
+        heads = cast_per_day + crew["count"].sum()
+        cast_days = int((cast_per_day > 0).sum())
+        catering = heads.sum() * LOGISTICS_RATES["catering_per_head_day"] * rate
+        crew_transport = n_days * LOGISTICS_RATES["crew_transport_per_day"] * rate
+        cast_transport = cast_days * LOGISTICS_RATES["cast_transport_per_day"] * rate
+        return {
+            "catering": {
+                "currency": LOGISTICS_RATES["currency"],
+                "person_days": int(heads.sum()),
+                "rate_per_head_day": _money(LOGISTICS_RATES["catering_per_head_day"] * rate),
+                "total_cost": _money(catering)
+            },
+            "crew_transportation": {
+                "currency": LOGISTICS_RATES["currency"],
+                "total_days": n_days,
+                "daily_rate": _money(LOGISTICS_RATES["crew_transport_per_day"] * rate),
+                "total_cost": _money(crew_transport)
+            },
+            "cast_transportation": {
+                "currency": LOGISTICS_RATES["currency"],
+                "total_days": cast_days,
+                "daily_rate": _money(LOGISTICS_RATES["cast_transport_per_day"] * rate),
+                "total_cost": _money(cast_transport)
+            }
+        }
+
+    def _line_items(self, budget: Dict[str, Any], currency: str) -> List[Dict[str, Any]]:
+        """Flat table of every priced line, one row per item; currency is the rate card each line was priced from."""
+        rows = []
+        for category in BUDGET_CATEGORIES:
+            for item, line in budget[category].items():
+                rows.append({
+                    "category": category,
+                    "item": item,
+                    "department": line.get("department", category.replace("_costs", "")),
+                    "currency": line["currency"],
+                    "quantity": line.get("total_days", line.get("person_days", 0)),
+                    "base_cost": line.get("base_cost", line["total_cost"]),
+                    "overtime_cost": line.get("overtime_cost", 0.0),
+                    "fringe_cost": line.get("benefits", 0.0),
+                    "total_cost": line["total_cost"]
+                })
+        for item, amount in budget["insurance_costs"].items():
+            rows.append({
+                "category": "insurance_costs",
+                "item": item,
+                "department": "insurance",
+                "currency": currency,
+                "quantity": 1,
+                "base_cost": amount,
+                "overtime_cost": 0.0,
+                "fringe_cost": 0.0,
+                "total_cost": amount
+            })
+        return rows
+
+    def _inputs_hash(self, *inputs: Any) -> str:
+        payload = json.dumps(inputs, sort_keys=True, default=str)
+        return hashlib.sha1(payload.encode()).hexdigest()[:12]
@@ -0,0 +1,322 @@
+"""
+Budget exports for accounting: top sheet, account detail, fringe breakdown
+and cash-flow schedule as CSV, XLSX or PDF.
+
+Each section is a generator of rows over a stored budget snapshot, and the
+writers consume those rows one at a time: CSV rows go straight to the file,
+XLSX worksheets are streamed into their zip members (SpreadsheetML is
+written directly, so no spreadsheet library is needed) and PDF tables are
+laid out row by row. Snapshots are immutable, so an export is cached on
+disk under the project, snapshot version, format and sections and served
+from there until the budget changes.
+"""
+
+from typing import Dict, Any, List, Optional, Iterator, Callable, Tuple
+from xml.sax.saxutils import escape
+import csv
+import hashlib
+import logging
+import os
+import re
+import time
+import uuid
+import zipfile
+
+from fpdf import FPDF
+
+from .budget_engine import BUDGET_CATEGORIES
+from .budget_ledger import BudgetLedger
+
+logger = logging.getLogger(__name__)
+
+EXPORT_FORMATS = ["csv", "xlsx", "pdf"]
+EXPORT_SECTIONS = ["top_sheet", "detail", "fringes", "cash_flow"]
+
+# Bumped when the layout or contents of an export change, so cached files are rebuilt
+EXPORT_VERSION = "2"
+
+MEDIA_TYPES = {
+    "csv": "text/csv",
+    "xlsx": "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+    "pdf": "application/pdf"
+}
+
+SECTION_TITLES = {
+    "top_sheet": "Top Sheet",
+    "detail": "Detail",
+    "fringes": "Fringes",
+    "cash_flow": "Cash Flow"
+}
+
+SECTION_COLUMNS = {
+    "top_sheet": ["account", "description", "amount", "share_pct"],
+    "detail": ["category", "item", "department", "currency", "quantity", "base_cost", "overtime_cost", "fringe_cost", "total_cost"],
+    "fringes": ["item", "department", "headcount", "gross_wages", "fringe_cost", "fringe_pct", "total_cost"],
+    "cash_flow": ["period_start", "inflow", "outflow", "net", "balance", "shortfall"]
+}
+
+# XML 1.0 forbids most control characters, even escaped
+INVALID_XML = re.compile("[\x00-\x08\x0b\x0c\x0e-\x1f]")
+
+Row = List[Any]
+
+
+def top_sheet_rows(budget: Dict[str, Any]) -> Iterator[Row]:
+    """One row per category total, then subtotal, contingency and grand total."""
+    totals = budget.get("total_estimates") or {}
+    grand_total = float(totals.get("grand_total") or 0.0)
+    subtotal = 0.0
+    for number, category in enumerate(BUDGET_CATEGORIES + ["insurance_costs"], start=1):
+        amount = float(totals.get(f"total_{category}") or 0.0)
+        subtotal += amount
+        yield [f"{number}000", category.replace("_", " ").title(), round(amount, 2), _share(amount, grand_total)]
+    contingency = float(totals.get("contingency_amount") or 0.0)
+    yield ["", "Subtotal", round(subtotal, 2), _share(subtotal, grand_total)]
+    yield ["", "Contingency", round(contingency, 2), _share(contingency, grand_total)]
+    yield ["", "Grand Total", round(grand_total, 2), 100.0 if grand_total else 0.0]
+
+
+def detail_rows(budget: Dict[str, Any]) -> Iterator[Row]:
+    """Every priced line, as the ledger prices it, so the detail adds up to the top sheet."""
+    columns = SECTION_COLUMNS["detail"]
+    ledger = BudgetLedger.from_budget(budget)
+    if budget.get("line_items"):
+        # Reconciled rows: superseded insurance lines are swapped for total_insurance_legal
+        for line in ledger.line_items(budget):
+            yield [line.get(column, "") for column in columns]
+        return
+    currency = (budget.get("rate_card") or {}).get("currency", "")
+    for category, column in ledger.categories.items():
+        for item, total in zip(column.names, column.amounts.tolist()):
+            line = (budget.get(category) or {}).get(item)
+            line = line if isinstance(line, dict) else {}
+            yield [category, item, line.get("department", category.replace("_costs", "")), line.get("currency", currency),
+                   line.get("total_days", 0), line.get("base_cost", total), line.get("overtime_cost", 0.0),
+                   line.get("benefits", 0.0), round(total, 2)]
+
+
+def fringe_rows(budget: Dict[str, Any]) -> Iterator[Row]:
+    """Personnel lines carrying fringes (union benefits) with their rate on gross wages."""
+    for item, line in (budget.get("personnel_costs") or {}).items():
+        if not isinstance(line, dict) or not line.get("benefits"):
+            continue
+        gross = float(line.get("base_cost", 0.0)) + float(line.get("overtime_cost", 0.0))
+        fringe = float(line["benefits"])
+        yield [item, line.get("department", ""), line.get("headcount", 1), round(gross, 2), round(fringe, 2),
+               _share(fringe, gross), line.get("total_cost", round(gross + fringe, 2))]
+
+
+def cash_flow_rows(projection: Dict[str, Any]) -> Iterator[Row]:
+    """Periods of a CashFlowEngine projection."""
+    columns = SECTION_COLUMNS["cash_flow"]
+    for period in (projection or {}).get("periods", []):
+        yield [period.get(column, "") for column in columns]
+
+
+def _share(amount: float, total: float) -> float:
+    return round(amount / total * 100, 2) if total else 0.0
+
+
+class BudgetExporter:
+    """Writes and caches budget exports for stored snapshots."""
+
+    def __init__(self, export_dir: str):
+        self.export_dir = export_dir
+
+    def path(self, project_id: str, version: int, fmt: str, sections: List[str]) -> str:
+        key = hashlib.sha1(f"{EXPORT_VERSION}|{','.join(sections)}".encode()).hexdigest()[:10]
+        # Sanitizing can map distinct ids to one name, so the raw id's hash keeps them apart
+        safe_project = re.sub(r"[^A-Za-z0-9_.-]", "_", project_id)
+        if safe_project != project_id or safe_project in ("", ".", ".."):
+            safe_project = f"{safe_project}-{hashlib.sha1(project_id.encode()).hexdigest()[:8]}"
+        return os.path.join(self.export_dir, safe_project, f"budget-v{version}-{key}.{fmt}")
+
+    def export(
+        self,
+        session: Dict[str, Any],
+        fmt: str = "csv",
+        sections: Optional[List[str]] = None,
+        cash_flow: Optional[Callable[[], Dict[str, Any]]] = None
+    ) -> Dict[str, Any]:
+        """Export a loaded snapshot; cash_flow is called for the projection only when the file is not cached."""
+        started = time.perf_counter()
+        if fmt not in EXPORT_FORMATS:
+            raise ValueError(f"Unsupported export format: {fmt}")
+        requested = sections or EXPORT_SECTIONS
+        unknown = set(requested) - set(EXPORT_SECTIONS)
+        if unknown:
+            raise ValueError(f"Unknown export sections: {sorted(unknown)}")
+        sections = [section for section in EXPORT_SECTIONS if section in requested]
+        budget = session.get("current_budget")
+        if not budget:
+            raise ValueError("Budget must be initialized before export")
+
+        path = self.path(session["project_id"], session["version"], fmt, sections)
+        cached = os.path.exists(path)
+        if not cached:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            rows = {
+                "top_sheet": lambda: top_sheet_rows(budget),
+                "detail": lambda: detail_rows(budget),
+                "fringes": lambda: fringe_rows(budget),
+                "cash_flow": lambda: cash_flow_rows(cash_flow() if cash_flow else session.get("cash_flow_data"))
+            }
+            tables = [(section, SECTION_COLUMNS[section], rows[section]()) for section in sections]
+            # Write beside the target and rename, so concurrent requests never serve a partial file
+            partial = f"{path}.{uuid.uuid4().hex}.partial"
+            try:
+                getattr(self, f"_write_{fmt}")(partial, tables, session)
+                os.replace(partial, path)
+            finally:
+                if os.path.exists(partial):
+                    os.remove(partial)
+
+        result = {
+            "path": path,
+            "filename": f"{session['project_id']}-budget-v{session['version']}.{fmt}",
+            "media_type": MEDIA_TYPES[fmt],
+            "format": fmt,
+            "sections": sections,
+            "version": session["version"],
+            "cached": cached,
+            "size_bytes": os.path.getsize(path),
+            "computation_ms": round((time.perf_counter() - started) * 1000, 3)
+        }
+        logger.info(f"Budget export {path} ({'cached' if cached else 'written'}) in {result['computation_ms']} ms")
+        return result
+
+    def _write_csv(self, path: str, tables: List[Tuple[str, List[str], Iterator[Row]]], session: Dict[str, Any]) -> None:
+        with open(path, "w", newline="", encoding="utf-8") as handle:
+            writer = csv.writer(handle)
+            for index, (section, columns, rows) in enumerate(tables):
+                if index:
+                    writer.writerow([])
+                writer.writerow([SECTION_TITLES[section]])
+                writer.writerow(columns)
+                for row in rows:
+                    writer.writerow(row)
+
+    def _write_xlsx(self, path: str, tables: List[Tuple[str, List[str], Iterator[Row]]], session: Dict[str, Any]) -> None:
+        with zipfile.ZipFile(path, "w", zipfile.ZIP_DEFLATED) as archive:
+            archive.writestr("[Content_Types].xml", _content_types(len(tables)))
+            archive.writestr("_rels/.rels", ROOT_RELS)
+            archive.writestr("xl/workbook.xml", _workbook([SECTION_TITLES[section] for section, _, _ in tables]))
+            archive.writestr("xl/_rels/workbook.xml.rels", _workbook_rels(len(tables)))
+            for number, (section, columns, rows) in enumerate(tables, start=1):
+                with archive.open(f"xl/worksheets/sheet{number}.xml", "w") as sheet:
+                    sheet.write(SHEET_HEADER.encode())
+                    sheet.write(_xlsx_row(1, columns))
+                    for index, row in enumerate(rows, start=2):
+                        sheet.write(_xlsx_row(index, row))
+                    sheet.write(SHEET_FOOTER.encode())
+
+    def _write_pdf(self, path: str, tables: List[Tuple[str, List[str], Iterator[Row]]], session: Dict[str, Any]) -> None:
+        budget = session["current_budget"]
+        currency = (budget.get("rate_card") or {}).get("currency", "")
+        pdf = FPDF(orientation="L")
+        pdf.set_auto_page_break(auto=False)
+        bottom = pdf.h - 15
+        for section, columns, rows in tables:
+            pdf.add_page()
+            pdf.set_font("Arial", "B", 14)
+            pdf.cell(0, 10, _latin1(f"{session['project_id']} - {SECTION_TITLES[section]} (v{session['version']}, {currency})"), ln=True)
+            width = (pdf.w - pdf.l_margin - pdf.r_margin) / len(columns)
+            _pdf_row(pdf, columns, width, bold=True)
+            for row in rows:
+                if pdf.get_y() + 6 > bottom:
+                    pdf.add_page()
+                    _pdf_row(pdf, columns, width, bold=True)
+                _pdf_row(pdf, row, width)
+        pdf.output(path, "F")
+
+
+def _latin1(text: Any) -> str:
+    # fpdf's core fonts are Latin-1 only
+    return str(text).encode("latin-1", "replace").decode("latin-1")
+
+
+def _pdf_row(pdf: FPDF, row: Row, width: float, bold: bool = False) -> None:
+    pdf.set_font("Arial", "B" if bold else "", 8)
+    for value in row:
+        text = f"{value:,.2f}" if isinstance(value, float) else _latin1(value)
+        while text and pdf.get_string_width(text) > width - 2:
+            text = text[:-1]
+        pdf.cell(width, 6, text, border=1, align="R" if isinstance(value, (int, float)) and not bold else "L")
+    pdf.ln()
+
+
+def _column_name(index: int) -> str:
+    name = ""
+    while index:
+        index, remainder = divmod(index - 1, 26)
+        name = chr(65 + remainder) + name
+    return name
+
+
+def _xlsx_row(number: int, row: Row) -> bytes:
+    cells = []
+    for column, value in enumerate(row, start=1):
+        ref = f"{_column_name(column)}{number}"
+        if isinstance(value, bool) or not isinstance(value, (int, float)):
+            text = escape(INVALID_XML.sub("", "" if value is None else str(value)))
+            cells.append(f'<c r="{ref}" t="inlineStr"><is><t xml:space="preserve">{text}</t></is></c>')
+        else:
+            cells.append(f'<c r="{ref}"><v>{value}</v></c>')
+    return f'<row r="{number}">{"".join(cells)}</row>'.encode()
+
+
+ROOT_RELS = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+    '<Relationship Id="rId1" Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument" Target="xl/workbook.xml"/>'
+    '</Relationships>'
+)
+
+SHEET_HEADER = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<worksheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main"><sheetData>'
+)
+
+SHEET_FOOTER = '</sheetData></worksheet>'
+
+
+def _content_types(sheets: int) -> str:
+    overrides = "".join(
+        f'<Override PartName="/xl/worksheets/sheet{n}.xml" '
+        'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"/>'
+        for n in range(1, sheets + 1)
+    )
+    return (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+        '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+        '<Default Extension="xml" ContentType="application/xml"/>'
+        '<Override PartName="/xl/workbook.xml" ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>'
+        f'{overrides}</Types>'
+    )
+
+
+def _workbook(names: List[str]) -> str:
+    sheets = "".join(
+        f'<sheet name="{escape(name)}" sheetId="{n}" r:id="rId{n}"/>'
+        for n, name in enumerate(names, start=1)
+    )
+    return (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<workbook xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main" '
+        'xmlns:r="http://schemas.openxmlformats.org/officeDocument/2006/relationships">'
+        f'<sheets>{sheets}</sheets></workbook>'
+    )
+
+
+def _workbook_rels(sheets: int) -> str:
+    relationships = "".join(
+        f'<Relationship Id="rId{n}" Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/worksheet" '
+        f'Target="worksheets/sheet{n}.xml"/>'
+        for n in range(1, sheets + 1)
+    )
+    return (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+        f'{relationships}</Relationships>'
+    )
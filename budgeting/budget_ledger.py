@@ -0,0 +1,408 @@
+"""
+Incremental budget ledger.
+
+Holds a budget's line amounts as one NumPy array per category and keeps the
+category rollups, subtotal and contingency current by applying the delta of
+every edit, so a line edit costs O(1) and an optimization O(1) per touched
+line instead of re-summing the whole budget. Every edit is journaled (old and
+new amount, reason, batch) for audit and undo; the journal saved with a
+budget keeps the most recent JOURNAL_LIMIT entries, in whole batches, so
+budget blobs and undo stay bounded. Forks share category arrays with their
+parent and copy one only when they first write to it, and to_budget()
+rebuilds only the categories and lines that changed, reusing every other
+dict of the source budget by reference.
+"""
+
+from typing import Dict, Any, List, Optional, Tuple
+from datetime import datetime
+import logging
+
+import numpy as np
+
+from .budget_engine import BUDGET_CATEGORIES
+
+logger = logging.getLogger(__name__)
+
+LEDGER_CATEGORIES = BUDGET_CATEGORIES + ["insurance_costs"]
+
+# Contingency share of the subtotal when a budget does not state one
+DEFAULT_CONTINGENCY_PERCENTAGE = 10.0
+
+# Journal entries kept with a saved budget; older batches are dropped whole
+JOURNAL_LIMIT = 500
+
+
+def _money(amount: Any) -> float:
+    return round(float(amount), 2)
+
+
+def _category_lines(category: str, data: Dict[str, Any]) -> Tuple[List[str], List[float]]:
+    """Names and amounts of the priced lines in a budget category."""
+    if not isinstance(data, dict):
+        return [], []
+    if category == "insurance_costs" and isinstance(data.get("total_insurance_legal"), (int, float)):
+        # The insurance specialist's total supersedes the estimator's insurance lines
+        return ["total_insurance_legal"], [float(data["total_insurance_legal"])]
+    names, amounts = [], []
+    for item, line in data.items():
+        if isinstance(line, dict) and isinstance(line.get("total_cost"), (int, float)):
+            names.append(item)
+            amounts.append(float(line["total_cost"]))
+        elif category == "insurance_costs" and isinstance(line, (int, float)) and not isinstance(line, bool):
+            names.append(item)
+            amounts.append(float(line))
+    return names, amounts
+
+
+class LedgerCategory:
+    """Line names, their row index and amounts for one category."""
+
+    __slots__ = ("names", "index", "amounts")
+
+    def __init__(self, names: List[str], amounts: np.ndarray):
+        self.names = names
+        self.index = {name: i for i, name in enumerate(names)}
+        self.amounts = amounts
+
+    def copy(self) -> "LedgerCategory":
+        category = LedgerCategory.__new__(LedgerCategory)
+        category.names = list(self.names)
+        category.index = dict(self.index)
+        category.amounts = self.amounts.copy()
+        return category
+
+
+class BudgetLedger:
+    """Line amounts with delta-maintained rollups and an edit journal."""
+
+    def __init__(
+        self,
+        categories: Dict[str, LedgerCategory],
+        contingency_percentage: Optional[float],
+        contingency_amount: float,
+        journal: Optional[List[Dict[str, Any]]] = None
+    ):
+        self.categories = categories
+        self.rollups = {name: float(category.amounts.sum()) for name, category in categories.items()}
+        self.subtotal = sum(self.rollups.values())
+        self.contingency_percentage = contingency_percentage
+        self._contingency_amount = contingency_amount
+        self.journal = journal if journal is not None else []
+        self.revision = self.journal[-1]["revision"] if self.journal else 0
+        self._batch = max((entry["batch"] for entry in self.journal), default=0)
+        # Categories this ledger may write in place; the rest are shared with a fork
+        self._owned = set(categories)
+        # Lines edited since the ledger was built, for to_budget()
+        self._dirty: Dict[str, set] = {}
+        # Day counts changed by shoot-day cuts (or their undo) since then
+        self._days: Dict[Tuple[str, str], Any] = {}
+        self._shoot_days: Optional[int] = None
+
+    @classmethod
+    def from_budget(cls, budget: Dict[str, Any]) -> "BudgetLedger":
+        """Ledger over a budget dict; the budget itself is never modified."""
+        categories = {}
+        for name in LEDGER_CATEGORIES:
+            if name in budget:
+                names, amounts = _category_lines(name, budget[name])
+                categories[name] = LedgerCategory(names, np.array(amounts, dtype=float))
+
+        contingency = budget.get("contingency") or {}
+        percentage = contingency.get("percentage") if isinstance(contingency, dict) else None
+        amount = contingency.get("amount") if isinstance(contingency, dict) else None
+        if percentage is None and amount is None:
+            percentage = DEFAULT_CONTINGENCY_PERCENTAGE
+
+        journal = list((budget.get("ledger") or {}).get("journal", []))
+        return cls(
+            categories,
+            float(percentage) if percentage is not None else None,
+            float(amount or 0.0),
+            journal
+        )
+
+    def fork(self) -> "BudgetLedger":
+        """What-if variant sharing every category array until one side writes to it."""
+        variant = BudgetLedger.__new__(BudgetLedger)
+        variant.categories = dict(self.categories)
+        variant.rollups = dict(self.rollups)
+        variant.subtotal = self.subtotal
+        variant.contingency_percentage = self.contingency_percentage
+        variant._contingency_amount = self._contingency_amount
+        variant.journal = list(self.journal)
+        variant.revision = self.revision
+        variant._batch = self._batch
+        variant._owned = set()
+        variant._dirty = {name: set(items) for name, items in self._dirty.items()}
+        variant._days = dict(self._days)
+        variant._shoot_days = self._shoot_days
+        self._owned = set()
+        return variant
+
+    @property
+    def contingency_amount(self) -> float:
+        if self.contingency_percentage is not None:
+            return self.subtotal * self.contingency_percentage / 100
+        return self._contingency_amount
+
+    @property
+    def grand_total(self) -> float:
+        return self.subtotal + self.contingency_amount
+
+    def value(self, category: str, item: str) -> float:
+        column = self.categories[category]
+        return float(column.amounts[column.index[item]])
+
+    def totals(self) -> Dict[str, float]:
+        """Budget total_estimates from the maintained rollups."""
+        totals = {f"total_{name}": _money(amount) for name, amount in self.rollups.items()}
+        personnel = self.categories.get("personnel_costs")
+        if personnel is not None and "union_costs" in personnel.index:
+            # Already part of personnel costs; reported on its own, not added again
+            totals["total_union_costs"] = _money(self.value("personnel_costs", "union_costs"))
+        insurance = self.categories.get("insurance_costs")
+        if insurance is not None and "total_insurance_legal" in insurance.index:
+            totals["total_insurance_legal"] = _money(self.value("insurance_costs", "total_insurance_legal"))
+        totals["subtotal"] = _money(self.subtotal)
+        totals["contingency_amount"] = _money(self.contingency_amount)
+        totals["grand_total"] = _money(self.grand_total)
+        return totals
+
+    def _writable(self, category: str) -> LedgerCategory:
+        if category not in self.categories:
+            self.categories[category] = LedgerCategory([], np.zeros(0))
+            self.rollups[category] = 0.0
+            self._owned.add(category)
+        elif category not in self._owned:
+            self.categories[category] = self.categories[category].copy()
+            self._owned.add(category)
+        return self.categories[category]
+
+    def _write(self, category: str, item: str, amount: float, reason: str, batch: int, **extra: Any) -> Dict[str, Any]:
+        amount = _money(amount)
+        column = self._writable(category)
+        row = column.index.get(item)
+        if row is None:
+            row = len(column.names)
+            column.names.append(item)
+            column.index[item] = row
+            column.amounts = np.append(column.amounts, 0.0)
+        old = float(column.amounts[row])
+        delta = float(amount) - old
+        column.amounts[row] = amount
+        self.rollups[category] += delta
+        self.subtotal += delta
+        self._dirty.setdefault(category, set()).add(item)
+
+        self.revision += 1
+        entry = {
+            "revision": self.revision,
+            "batch": batch,
+            "category": category,
+            "item": item,
+            "old": _money(old),
+            "new": amount,
+            "delta": _money(delta),
+            "reason": reason,
+            "at": datetime.now().isoformat(),
+            **extra
+        }
+        # Day changes are journaled as [old, new] so undo can swap them back
+        if "days" in extra:
+            self._days[(category, item)] = extra["days"][1]
+        if "shoot_days" in extra:
+            self._shoot_days = extra["shoot_days"][1]
+        self.journal.append(entry)
+        return entry
+
+    def _next_batch(self) -> int:
+        self._batch += 1
+        return self._batch
+
+    def set_line(self, category: str, item: str, amount: float, reason: str = "edit") -> Dict[str, Any]:
+        """Set one line's total cost; adds the line if the category has no such item."""
+        if category not in LEDGER_CATEGORIES:
+            raise ValueError(f"Unknown budget category: {category}")
+        if amount < 0:
+            raise ValueError("Line amounts cannot be negative")
+        insurance = self.categories.get("insurance_costs")
+        if category == "insurance_costs" and item != "total_insurance_legal" and insurance is not None and "total_insurance_legal" in insurance.index:
+            raise ValueError(f"{item} is priced inside total_insurance_legal; edit total_insurance_legal instead")
+        return self._write(category, item, amount, reason, self._next_batch())
+
+    def scale_category(self, category: str, ratio: float, reason: str = "scale", batch: Optional[int] = None) -> List[Dict[str, Any]]:
+        """Multiply every line in a category by ratio."""
+        if category not in self.categories:
+            return []
+        batch = batch or self._next_batch()
+        column = self.categories[category]
+        return [
+            self._write(category, item, float(amount) * ratio, reason, batch)
+            for item, amount in zip(list(column.names), column.amounts.tolist())
+        ]
+
+    def shift(self, category: str, amount: float, reason: str = "shift", batch: Optional[int] = None) -> List[Dict[str, Any]]:
+        """Add amount to a category, spread over its lines in proportion to their size."""
+        if category not in self.categories or not self.categories[category].names:
+            return []
+        batch = batch or self._next_batch()
+        column = self.categories[category]
+        current = column.amounts
+        total = float(current.sum())
+        shares = current / total if total > 0 else np.full(len(current), 1 / len(current))
+        new_amounts = np.maximum(current + shares * amount, 0.0)
+        return [
+            self._write(category, item, new, reason, batch)
+            for item, new in zip(list(column.names), new_amounts.tolist())
+        ]
+
+    def apply_optimization(self, optimization: Dict[str, Any], reason: str = "optimization") -> List[Dict[str, Any]]:
+        """Apply BudgetOptimizerAgent cost reductions and reallocations as one undoable batch.
+
+        Exact line_changes from the optimizer are written as given, with the
+        day counts of a shoot-day cut; category scaling only covers categories
+        they do not touch.
+        """
+        batch = self._next_batch()
+        entries = []
+        exact = set()
+        shoot_days = (optimization.get("plan") or {}).get("shoot_days")
+        for change in optimization.get("line_changes") or []:
+            category = change["category"]
+            if category in LEDGER_CATEGORIES:
+                exact.add(category)
+                extra = {}
+                if "proposed_days" in change:
+                    extra["days"] = [change["current_days"], change["proposed_days"]]
+                    if shoot_days:
+                        extra["shoot_days"] = [shoot_days["current"], shoot_days["proposed"]]
+                entries.append(self._write(category, change["item"], max(float(change["proposed_cost"]), 0.0), f"{reason}: {category}", batch, **extra))
+        for category, reduction in (optimization.get("cost_reductions") or {}).items():
+            current = reduction.get("current_cost") or self.rollups.get(category, 0.0)
+            if category in self.categories and current and category not in exact:
+                ratio = max(reduction.get("proposed_cost", current) / current, 0.0)
+                entries.extend(self.scale_category(category, ratio, f"{reason}: reduce {category}", batch))
+        for from_category, realloc in (optimization.get("reallocations") or {}).items():
+            to_category = realloc.get("to_category")
+            amount = float(realloc.get("amount") or 0)
+            if from_category in self.categories and to_category in self.categories and amount:
+                entries.extend(self.shift(from_category, -amount, f"{reason}: move to {to_category}", batch))
+                entries.extend(self.shift(to_category, amount, f"{reason}: move from {from_category}", batch))
+        return entries
+
+    def undo(self) -> List[Dict[str, Any]]:
+        """Revert the most recent batch that has not been undone; the reversal is journaled too."""
+        # Walk back from the end: a reversal is always journaled after the batch it undoes,
+        # so it is seen first, and the walk stops at the first batch still in effect
+        undone = set()
+        target_entries = []
+        for entry in reversed(self.journal):
+            if "undoes" in entry:
+                undone.add(entry["undoes"])
+            elif target_entries and entry["batch"] != target_entries[0]["batch"]:
+                break
+            elif entry["batch"] not in undone:
+                target_entries.append(entry)
+        if not target_entries:
+            return []
+        target = target_entries[0]["batch"]
+        batch = self._next_batch()
+        return [
+            self._write(
+                entry["category"], entry["item"], entry["old"], f"undo: {entry['reason']}", batch, undoes=target,
+                **{key: entry[key][::-1] for key in ("days", "shoot_days") if key in entry}
+            )
+            for entry in target_entries
+        ]
+
+    def _compact_journal(self) -> None:
+        """Drop the oldest batches once the journal outgrows JOURNAL_LIMIT entries."""
+        cut = len(self.journal) - JOURNAL_LIMIT
+        if cut <= 0:
+            return
+        # Never split a batch, or undoing what is left of it would revert only part of it
+        while cut > 0 and self.journal[cut]["batch"] == self.journal[cut - 1]["batch"]:
+            cut -= 1
+        self.journal = self.journal[cut:]
+
+    def line_items(self, budget: Dict[str, Any]) -> List[Dict[str, Any]]:
+        """budget["line_items"] reconciled with the ledger, so the rows add up to its rollups.
+
+        Rows take the ledger's amounts and day counts, rows of lines the ledger
+        does not price (insurance lines superseded by total_insurance_legal)
+        are dropped, and priced lines without a row get one.
+        """
+        rows, present = [], set()
+        for row in budget.get("line_items") or []:
+            key = (row.get("category"), row.get("item"))
+            if key[0] in LEDGER_CATEGORIES:
+                column = self.categories.get(key[0])
+                if column is None or key[1] not in column.index:
+                    continue
+                present.add(key)
+                amount = _money(column.amounts[column.index[key[1]]])
+                if row.get("total_cost") != amount or key in self._days:
+                    row = {**row, "total_cost": amount}
+                    if key in self._days:
+                        row["quantity"] = self._days[key]
+            rows.append(row)
+
+        currency = (budget.get("rate_card") or {}).get("currency", "USD")
+        for category in LEDGER_CATEGORIES:
+            column = self.categories.get(category)
+            if column is None:
+                continue
+            for item, amount in zip(column.names, column.amounts.tolist()):
+                if (category, item) in present:
+                    continue
+                line = (budget.get(category) or {}).get(item)
+                line = line if isinstance(line, dict) else {}
+                amount = _money(amount)
+                rows.append({
+                    "category": category,
+                    "item": item,
+                    "department": line.get("department", "insurance" if category == "insurance_costs" else category.replace("_costs", "")),
+                    "currency": line.get("currency", currency),
+                    "quantity": line.get("total_days", line.get("person_days", 1 if category == "insurance_costs" else 0)),
+                    "base_cost": amount,
+                    "overtime_cost": 0.0,
+                    "fringe_cost": 0.0,
+                    "total_cost": amount
+                })
+        return rows
+
+    def to_budget(self, budget: Dict[str, Any]) -> Dict[str, Any]:
+        """New budget dict with the ledger's amounts; unchanged parts of budget are shared, not copied."""
+        updated = dict(budget)
+        for category, items in self._dirty.items():
+            data = dict(budget.get(category) or {})
+            column = self.categories[category]
+            for item in items:
+                amount = _money(column.amounts[column.index[item]])
+                line = data.get(item)
+                if isinstance(line, dict):
+                    data[item] = {**line, "total_cost": amount}
+                    if (category, item) in self._days:
+                        data[item]["total_days"] = self._days[(category, item)]
+                elif category == "insurance_costs":
+                    data[item] = amount
+                else:
+                    data[item] = {"total_cost": amount}
+            updated[category] = data
+
+        if self._dirty and isinstance(budget.get("line_items"), list):
+            updated["line_items"] = self.line_items(updated)
+
+        contingency = budget.get("contingency")
+        updated["contingency"] = {
+            **(contingency if isinstance(contingency, dict) else {}),
+            "amount": _money(self.contingency_amount)
+        }
+        if self.contingency_percentage is not None:
+            updated["contingency"]["percentage"] = self.contingency_percentage
+        if self._shoot_days is not None:
+            updated["assumptions"] = {**(budget.get("assumptions") or {}), "shoot_days": self._shoot_days}
+        updated["total_estimates"] = self.totals()
+        self._compact_journal()
+        updated["ledger"] = {"revision": self.revision, "journal": self.journal}
+        return updated
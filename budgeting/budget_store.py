@@ -0,0 +1,267 @@
+"""
+Per-project budget sessions backed by SQLite.
+
+Each project keeps a chain of immutable snapshots. A snapshot stores one
+content hash per state component (budget, tracking, cash flow, vendors,
+sub-agent results); the JSON itself lives once in a blob table keyed by that
+hash, so a new snapshot copies only the components that changed and shares
+the rest with its parent (copy-on-write). Lookups are primary-key reads,
+writes run in an IMMEDIATE transaction and the database uses WAL, so several
+uvicorn workers can serve the same store safely. Actual expenses are kept in
+an append-only table, deduplicated by expense id, next to the snapshots.
+"""
+
+from typing import Dict, Any, List, Optional, Iterable, Callable
+from contextlib import contextmanager
+from datetime import datetime
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_STORE_PATH = os.environ.get("BUDGET_STORE_PATH", "data/budgets/budget_store.db")
+
+DEFAULT_PROJECT = "default"
+
+# Session state components, in snapshot column order
+SESSION_FIELDS = ["current_budget", "current_tracking", "cash_flow_data", "vendor_data", "sub_agent_results", "vendor_index"]
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS blobs (
+    hash TEXT PRIMARY KEY,
+    data TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS snapshots (
+    project_id TEXT NOT NULL,
+    version INTEGER NOT NULL,
+    parent INTEGER,
+    label TEXT,
+    created_at TEXT NOT NULL,
+    current_budget TEXT,
+    current_tracking TEXT,
+    cash_flow_data TEXT,
+    vendor_data TEXT,
+    sub_agent_results TEXT,
+    vendor_index TEXT,
+    PRIMARY KEY (project_id, version)
+);
+CREATE TABLE IF NOT EXISTS projects (
+    project_id TEXT PRIMARY KEY,
+    head INTEGER NOT NULL,
+    updated_at TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS expenses (
+    project_id TEXT NOT NULL,
+    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+    expense_id TEXT NOT NULL,
+    version INTEGER NOT NULL,
+    data TEXT NOT NULL,
+    UNIQUE (project_id, expense_id)
+);
+"""
+
+
+class BudgetVersionConflict(RuntimeError):
+    """A write expected a different head snapshot than the one stored."""
+
+
+class BudgetStore:
+    """Project-scoped, versioned budget session state."""
+
+    def __init__(self, path: str = DEFAULT_STORE_PATH):
+        self.path = path
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        with self._connect() as connection:
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.executescript(SCHEMA)
+            # Stores created before a session field existed get its column added
+            columns = {row[1] for row in connection.execute("PRAGMA table_info(snapshots)")}
+            for field in SESSION_FIELDS:
+                if field not in columns:
+                    connection.execute(f"ALTER TABLE snapshots ADD COLUMN {field} TEXT")
+
+    @contextmanager
+    def _connect(self):
+        # A connection per call keeps the store safe across threads and processes
+        connection = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+        try:
+            connection.execute("PRAGMA busy_timeout=30000")
+            yield connection
+        finally:
+            connection.close()
+
+    def _put_blob(self, connection: sqlite3.Connection, value: Any) -> Optional[str]:
+        if value is None:
+            return None
+        data = json.dumps(value, sort_keys=True, default=str)
+        digest = hashlib.sha256(data.encode()).hexdigest()
+        connection.execute("INSERT OR IGNORE INTO blobs (hash, data) VALUES (?, ?)", (digest, data))
+        return digest
+
+    def _get_blob(self, connection: sqlite3.Connection, digest: Optional[str]) -> Any:
+        if digest is None:
+            return None
+        row = connection.execute("SELECT data FROM blobs WHERE hash = ?", (digest,)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def _snapshot_row(self, connection: sqlite3.Connection, project_id: str, version: Optional[int]) -> Optional[tuple]:
+        if version is None:
+            head = connection.execute("SELECT head FROM projects WHERE project_id = ?", (project_id,)).fetchone()
+            if not head:
+                return None
+            version = head[0]
+        return connection.execute(
+            f"SELECT version, parent, label, created_at, {', '.join(SESSION_FIELDS)} FROM snapshots "
+            "WHERE project_id = ? AND version = ?",
+            (project_id, version)
+        ).fetchone()
+
+    def _load(self, connection: sqlite3.Connection, project_id: str, version: Optional[int]) -> Dict[str, Any]:
+        row = self._snapshot_row(connection, project_id, version)
+        if row is None:
+            if version is not None:
+                raise ValueError(f"Project {project_id} has no snapshot {version}")
+            session = {field: None for field in SESSION_FIELDS}
+            session.update({"project_id": project_id, "version": 0, "label": None, "created_at": None})
+            return session
+        session = {
+            field: self._get_blob(connection, digest)
+            for field, digest in zip(SESSION_FIELDS, row[4:])
+        }
+        session.update({"project_id": project_id, "version": row[0], "label": row[2], "created_at": row[3]})
+        return session
+
+    def load(self, project_id: str, version: Optional[int] = None) -> Dict[str, Any]:
+        """Session state at a snapshot (the head by default); empty state for unknown projects."""
+        with self._connect() as connection:
+            return self._load(connection, project_id, version)
+
+    def _commit(
+        self,
+        connection: sqlite3.Connection,
+        project_id: str,
+        changes: Dict[str, Any],
+        label: str,
+        expected_version: Optional[int]
+    ) -> int:
+        unknown = set(changes) - set(SESSION_FIELDS)
+        if unknown:
+            raise ValueError(f"Unknown session fields: {sorted(unknown)}")
+
+        row = self._snapshot_row(connection, project_id, None)
+        head = row[0] if row else 0
+        if expected_version is not None and expected_version != head:
+            raise BudgetVersionConflict(
+                f"Project {project_id} is at version {head}, expected {expected_version}"
+            )
+        digests = dict(zip(SESSION_FIELDS, row[4:])) if row else {field: None for field in SESSION_FIELDS}
+        for field, value in changes.items():
+            digests[field] = self._put_blob(connection, value)
+
+        version = head + 1
+        now = datetime.now().isoformat()
+        connection.execute(
+            f"INSERT INTO snapshots (project_id, version, parent, label, created_at, {', '.join(SESSION_FIELDS)}) "
+            f"VALUES (?, ?, ?, ?, ?, {', '.join('?' for _ in SESSION_FIELDS)})",
+            (project_id, version, head or None, label, now, *(digests[field] for field in SESSION_FIELDS))
+        )
+        connection.execute(
+            "INSERT INTO projects (project_id, head, updated_at) VALUES (?, ?, ?) "
+            "ON CONFLICT(project_id) DO UPDATE SET head = excluded.head, updated_at = excluded.updated_at",
+            (project_id, version, now)
+        )
+        return version
+
+    def commit(
+        self,
+        project_id: str,
+        changes: Dict[str, Any],
+        label: str = "",
+        expected_version: Optional[int] = None
+    ) -> int:
+        """Write a new head snapshot that replaces only the changed components; returns its version."""
+        with self._connect() as connection:
+            connection.execute("BEGIN IMMEDIATE")
+            try:
+                version = self._commit(connection, project_id, changes, label, expected_version)
+                connection.execute("COMMIT")
+            except Exception:
+                connection.execute("ROLLBACK")
+                raise
+        logger.info(f"Budget project {project_id} -> version {version} ({label or 'update'})")
+        return version
+
+    def append_expenses(
+        self,
+        project_id: str,
+        expenses: Iterable[Dict[str, Any]],
+        update: Callable[[Dict[str, Any], List[Dict[str, Any]]], Dict[str, Any]],
+        label: str = ""
+    ) -> Dict[str, Any]:
+        """Append expenses and commit the session changes update() derives from them, atomically.
+
+        Expenses whose expense_id the project already has are skipped; update
+        receives the head session and only the newly accepted expenses.
+        Returns the new version with accepted and duplicate counts.
+        """
+        with self._connect() as connection:
+            connection.execute("BEGIN IMMEDIATE")
+            try:
+                session = self._load(connection, project_id, None)
+                version = session["version"] + 1
+                accepted, duplicates = [], 0
+                for expense in expenses:
+                    cursor = connection.execute(
+                        "INSERT OR IGNORE INTO expenses (project_id, expense_id, version, data) VALUES (?, ?, ?, ?)",
+                        (project_id, expense["expense_id"], version, json.dumps(expense, default=str))
+                    )
+                    if cursor.rowcount:
+                        accepted.append(expense)
+                    else:
+                        duplicates += 1
+                if accepted:
+                    version = self._commit(connection, project_id, update(session, accepted), label, session["version"])
+                else:
+                    version = session["version"]
+                connection.execute("COMMIT")
+            except Exception:
+                connection.execute("ROLLBACK")
+                raise
+        logger.info(f"Budget project {project_id}: {len(accepted)} expenses appended, {duplicates} duplicates")
+        return {"version": version, "accepted": len(accepted), "duplicates": duplicates}
+
+    def expenses(self, project_id: str, since_version: int = 0) -> Iterable[Dict[str, Any]]:
+        """Stored expenses in arrival order, optionally only those appended after a version."""
+        with self._connect() as connection:
+            cursor = connection.execute(
+                "SELECT data FROM expenses WHERE project_id = ? AND version > ? ORDER BY seq",
+                (project_id, since_version)
+            )
+            for (data,) in cursor:
+                yield json.loads(data)
+
+    def restore(self, project_id: str, version: int) -> int:
+        """Make an earlier snapshot the head again by committing a copy that shares all its blobs."""
+        session = self.load(project_id, version)
+        return self.commit(
+            project_id,
+            {field: session[field] for field in SESSION_FIELDS},
+            label=f"restore v{version}"
+        )
+
+    def history(self, project_id: str) -> List[Dict[str, Any]]:
+        """Snapshot metadata for a project, newest first."""
+        with self._connect() as connection:
+            rows = connection.execute(
+                "SELECT version, parent, label, created_at FROM snapshots WHERE project_id = ? ORDER BY version DESC",
+                (project_id,)
+            ).fetchall()
+        return [{"version": v, "parent": p, "label": label, "created_at": created} for v, p, label, created in rows]
+
+    def projects(self) -> List[Dict[str, Any]]:
+        with self._connect() as connection:
+            rows = connection.execute("SELECT project_id, head, updated_at FROM projects ORDER BY updated_at DESC").fetchall()
+        return [{"project_id": p, "version": head, "updated_at": updated} for p, head, updated in rows]
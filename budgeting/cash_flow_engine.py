@@ -0,0 +1,348 @@
+"""
+Columnar cash-flow projection engine.
+
+Every dated money movement of a production (vendor payments, phased
+production spend, equity draws, tax-incentive receipts, pre-sale tranches,
+grants and gap financing) is a row of a CashFlowTable: parallel NumPy
+columns for the date, signed amount (inflows positive) and kind. Dates are
+parsed once, in bulk, into datetime64[D]; weekly and monthly resampling is a
+bincount over period codes, and running balances and shortfalls are
+cumulative sums over the resampled periods, so tens of thousands of
+scheduled payments project in milliseconds.
+"""
+
+from typing import Dict, Any, List, Optional, Sequence
+from datetime import datetime, timedelta
+import logging
+import math
+import time
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+FLOW_KINDS = ["payment", "spend", "equity_investment", "tax_incentives", "pre_sales", "grants", "gap_financing"]
+INFLOW_KINDS = FLOW_KINDS[2:]
+RESAMPLE_FREQUENCIES = ["D", "W", "M"]
+
+# Share of the budget raised from each source; equity covers the remainder
+FINANCING_SHARES = {
+    "tax_incentives": 0.20,
+    "pre_sales": 0.10,
+    "grants": 0.05,
+    "gap_financing": 0.044
+}
+
+# When each source pays in, as (anchor, offset in days, share of the source).
+# Anchors: "start" of principal photography, "wrap" and "delivery" of the film.
+FINANCING_RECEIPTS = {
+    "equity_investment": [("start", -56, 0.5), ("start", -14, 0.5)],
+    "grants": [("start", -56, 1.0)],
+    "gap_financing": [("start", -14, 1.0)],
+    "pre_sales": [("start", -56, 0.2), ("delivery", 0, 0.8)],
+    "tax_incentives": [("delivery", 180, 1.0)]
+}
+
+# Production spend phasing, from CashFlowManagerAgent's payment schedule
+# template (percentages are normalized to the budget when applied):
+# (phase, key, item, anchor, offset in days, percentage, cadence)
+SPEND_PHASING = [
+    ("pre_production", "week_minus_8", "Development and pre-production salaries", "start", -56, 15, "once"),
+    ("pre_production", "week_minus_4", "Location and equipment deposits", "start", -28, 20, "once"),
+    ("pre_production", "week_minus_2", "Insurance and final pre-production costs", "start", -14, 25, "once"),
+    ("production", "weekly_payroll", "Cast and crew payroll", "start", 0, 30, "weekly"),
+    ("production", "equipment_weekly", "Equipment, catering and transportation", "start", 0, 15, "weekly"),
+    ("post_production", "final_payments", "Post-production and final payments", "wrap", 30, 10, "once")
+]
+
+# Funding needed by each anchor date, reported as milestones
+FUNDING_MILESTONES = [
+    ("Pre-production funding", "start", -56),
+    ("Production funding", "start", 0),
+    ("Post-production funding", "wrap", 0),
+    ("Delivery", "delivery", 0)
+]
+
+# Six-day shooting weeks, then this many weeks of post before delivery
+SHOOT_DAYS_PER_WEEK = 6
+POST_PRODUCTION_WEEKS = 12
+
+# Monday of the week for a datetime64[D] day number (1970-01-01 was a Thursday)
+_MONDAY_OFFSET = 3
+
+
+def to_days(dates: Sequence[Any]) -> np.ndarray:
+    """Parse dates (ISO strings, date/datetime objects or datetime64) into datetime64[D] in one pass."""
+    if isinstance(dates, np.ndarray) and np.issubdtype(dates.dtype, np.datetime64):
+        return dates.astype("datetime64[D]")
+    return np.array([str(d)[:10] for d in dates], dtype="datetime64[D]")
+
+
+def period_start(days: np.ndarray, freq: str) -> np.ndarray:
+    """First day of the day's resampling period (D, W starting Monday, or M)."""
+    if freq == "D":
+        return days
+    if freq == "W":
+        numbers = days.astype("int64")
+        return (numbers - (numbers + _MONDAY_OFFSET) % 7).astype("datetime64[D]")
+    if freq == "M":
+        return days.astype("datetime64[M]").astype("datetime64[D]")
+    raise ValueError(f"Unsupported resampling frequency: {freq}")
+
+
+class CashFlowTable:
+    """Dated, signed money movements as parallel columns; inflows are positive."""
+
+    __slots__ = ("day", "amount", "kind", "label", "reference")
+
+    def __init__(self, day: np.ndarray, amount: np.ndarray, kind: np.ndarray, label: np.ndarray, reference: np.ndarray):
+        self.day = day
+        self.amount = amount
+        self.kind = kind
+        self.label = label
+        self.reference = reference
+
+    @classmethod
+    def from_columns(
+        cls,
+        dates: Sequence[Any],
+        amounts: Sequence[float],
+        kind: str,
+        labels: Optional[Sequence[str]] = None,
+        references: Optional[Sequence[str]] = None
+    ) -> "CashFlowTable":
+        """Rows of one kind; outflow amounts are given positive and stored negative."""
+        if kind not in FLOW_KINDS:
+            raise ValueError(f"Unknown cash flow kind: {kind}")
+        amount = np.asarray(amounts, dtype=float)
+        n = len(amount)
+        return cls(
+            to_days(dates),
+            amount if kind in INFLOW_KINDS else -amount,
+            np.full(n, FLOW_KINDS.index(kind), dtype=np.int8),
+            np.asarray(labels if labels is not None else [kind] * n, dtype=object),
+            np.asarray(references if references is not None else [""] * n, dtype=object)
+        )
+
+    @classmethod
+    def empty(cls) -> "CashFlowTable":
+        return cls(
+            np.array([], dtype="datetime64[D]"), np.array([], dtype=float),
+            np.array([], dtype=np.int8), np.array([], dtype=object), np.array([], dtype=object)
+        )
+
+    @classmethod
+    def concat(cls, tables: List["CashFlowTable"]) -> "CashFlowTable":
+        tables = [table for table in tables if len(table)] or [cls.empty()]
+        return cls(*(np.concatenate([getattr(table, column) for table in tables]) for column in cls.__slots__))
+
+    def __len__(self) -> int:
+        return len(self.amount)
+
+    def select(self, mask: np.ndarray) -> "CashFlowTable":
+        return CashFlowTable(*(getattr(self, column)[mask] for column in self.__slots__))
+
+    def sorted(self) -> "CashFlowTable":
+        return self.select(np.argsort(self.day, kind="stable"))
+
+    def resample(self, freq: str = "W", opening_balance: float = 0.0, minimum_balance: float = 0.0) -> Dict[str, np.ndarray]:
+        """Per-period inflow, outflow, net, running balance and shortfall, with every period in range present."""
+        if not len(self):
+            return {key: np.array([]) for key in ("period", "inflow", "outflow", "net", "balance", "shortfall")}
+        starts = period_start(self.day, freq)
+        if freq == "M":
+            months = starts.astype("datetime64[M]")
+            first = months.min()
+            codes = (months - first).astype("int64")
+            periods = (first + np.arange(codes.max() + 1)).astype("datetime64[D]")
+        else:
+            step = 7 if freq == "W" else 1
+            first = starts.min()
+            codes = (starts - first).astype("int64") // step
+            periods = first + np.arange(codes.max() + 1) * step
+        size = len(periods)
+        inflow = np.bincount(codes, weights=np.where(self.amount > 0, self.amount, 0.0), minlength=size)
+        outflow = np.bincount(codes, weights=np.where(self.amount < 0, -self.amount, 0.0), minlength=size)
+        net = inflow - outflow
+        balance = opening_balance + np.cumsum(net)
+        return {
+            "period": periods,
+            "inflow": inflow,
+            "outflow": outflow,
+            "net": net,
+            "balance": balance,
+            "shortfall": np.maximum(minimum_balance - balance, 0.0)
+        }
+
+
+def _round(values: np.ndarray) -> List[float]:
+    return np.round(values, 2).tolist()
+
+
+class CashFlowEngine:
+    """Builds a production's cash-flow table and projects balances and shortfalls."""
+
+    def timeline(self, start_date: Optional[str], shoot_days: int, post_weeks: int = POST_PRODUCTION_WEEKS) -> Dict[str, np.datetime64]:
+        """Anchor dates; without a start date, prep (eight weeks before the shoot) starts today."""
+        start = np.datetime64(str(start_date)[:10], "D") if start_date else np.datetime64(
+            (datetime.now() + timedelta(weeks=8)).strftime("%Y-%m-%d"), "D"
+        )
+        shoot_weeks = max(1, math.ceil(shoot_days / SHOOT_DAYS_PER_WEEK))
+        wrap = start + np.timedelta64(shoot_weeks * 7, "D")
+        return {
+            "start": start,
+            "wrap": wrap,
+            "delivery": wrap + np.timedelta64(post_weeks * 7, "D"),
+            "shoot_weeks": shoot_weeks
+        }
+
+    def financing_structure(self, total_budget: float, shares: Optional[Dict[str, float]] = None) -> Dict[str, float]:
+        """Amount raised per source; equity is whatever the other sources leave."""
+        shares = {**FINANCING_SHARES, **(shares or {})}
+        shares.pop("equity_investment", None)
+        other = sum(shares.values())
+        if other > 1:
+            raise ValueError("Financing shares other than equity exceed 100% of the budget")
+        structure = {source: total_budget * share for source, share in shares.items()}
+        structure["equity_investment"] = total_budget * (1 - other)
+        return structure
+
+    def financing_table(self, structure: Dict[str, float], timeline: Dict[str, Any]) -> CashFlowTable:
+        tables = []
+        for source, amount in structure.items():
+            receipts = FINANCING_RECEIPTS.get(source, [("start", -56, 1.0)])
+            tables.append(CashFlowTable.from_columns(
+                np.array([timeline[anchor] + np.timedelta64(offset, "D") for anchor, offset, _ in receipts]),
+                [amount * share for _, _, share in receipts],
+                source,
+                [f"{source} tranche {i + 1}" for i in range(len(receipts))]
+            ))
+        return CashFlowTable.concat(tables)
+
+    def spend_schedule(self, amount: float, timeline: Dict[str, Any]) -> List[Dict[str, Any]]:
+        """Phased production spend: one entry per SPEND_PHASING item with its dates and amounts."""
+        total_percentage = sum(phase[5] for phase in SPEND_PHASING)
+        schedule = []
+        for phase, key, item, anchor, offset, percentage, cadence in SPEND_PHASING:
+            share = amount * percentage / total_percentage
+            first = timeline[anchor] + np.timedelta64(offset, "D")
+            occurrences = timeline["shoot_weeks"] if cadence == "weekly" else 1
+            schedule.append({
+                "phase": phase,
+                "key": key,
+                "item": item,
+                "cadence": cadence,
+                "dates": first + np.arange(occurrences) * np.timedelta64(7, "D"),
+                "amount": share / occurrences,
+                "occurrences": occurrences
+            })
+        return schedule
+
+    def spend_table(self, amount: float, timeline: Dict[str, Any]) -> CashFlowTable:
+        """Phase production spend over prep, shoot weeks and post."""
+        schedule = self.spend_schedule(amount, timeline)
+        return CashFlowTable.from_columns(
+            np.concatenate([entry["dates"] for entry in schedule]),
+            np.concatenate([np.full(entry["occurrences"], entry["amount"]) for entry in schedule]),
+            "spend",
+            [entry["item"] for entry in schedule for _ in range(entry["occurrences"])]
+        )
+
+    def vendor_table(self, vendor_data: Dict[str, Any]) -> CashFlowTable:
+        """Scheduled vendor payments, with every due date parsed in one pass."""
+        dates, amounts, labels, references = [], [], [], []
+        for vendor_id, vendor in (vendor_data or {}).items():
+            for payment in vendor.get("scheduled_payments", []):
+                dates.append(payment["due_date"])
+                amounts.append(payment["amount"])
+                labels.append(payment.get("category", "Unknown"))
+                references.append(vendor_id)
+        return CashFlowTable.from_columns(dates, amounts, "payment", labels, references)
+
+    def project(
+        self,
+        total_budget: float,
+        start_date: Optional[str] = None,
+        shoot_days: int = 18,
+        vendor_data: Optional[Dict[str, Any]] = None,
+        financing_shares: Optional[Dict[str, float]] = None,
+        extra_flows: Optional[List[Dict[str, Any]]] = None,
+        spent_to_date: float = 0.0,
+        opening_balance: float = 0.0,
+        minimum_balance: float = 0.0,
+        freq: str = "W",
+        post_weeks: int = POST_PRODUCTION_WEEKS
+    ) -> Dict[str, Any]:
+        """Project balances per period for the whole production.
+
+        Scheduled vendor payments are commitments within the budget, so the
+        generic phased spend covers only what they and spent_to_date leave.
+        extra_flows are additional rows {date, amount, kind, label}.
+        """
+        started = time.perf_counter()
+        timeline = self.timeline(start_date, shoot_days, post_weeks)
+        structure = self.financing_structure(total_budget, financing_shares)
+        vendors = self.vendor_table(vendor_data)
+        committed = float(-vendors.amount.sum()) if len(vendors) else 0.0
+        tables = [
+            self.financing_table(structure, timeline),
+            vendors,
+            self.spend_table(max(total_budget - committed - spent_to_date, 0.0), timeline)
+        ]
+        for kind in FLOW_KINDS:
+            rows = [flow for flow in extra_flows or [] if flow.get("kind", "payment") == kind]
+            if rows:
+                tables.append(CashFlowTable.from_columns(
+                    [flow["date"] for flow in rows],
+                    [abs(float(flow["amount"])) for flow in rows],
+                    kind,
+                    [flow.get("label", kind) for flow in rows]
+                ))
+        table = CashFlowTable.concat(tables).sorted()
+        series = table.resample(freq, opening_balance, minimum_balance)
+
+        # Cumulative outflow up to each milestone date
+        cumulative_spend = np.cumsum(np.where(table.amount < 0, -table.amount, 0.0))
+        milestone_dates = np.array(
+            [timeline[anchor] + np.timedelta64(offset, "D") for _, anchor, offset in FUNDING_MILESTONES]
+        )
+        reached = np.searchsorted(table.day, milestone_dates, side="right")
+        required = np.concatenate([[0.0], cumulative_spend])[reached]
+
+        balance = series["balance"]
+        low = int(np.argmin(balance)) if len(balance) else 0
+        short = np.flatnonzero(series["shortfall"] > 0)
+        periods = series["period"].astype(str).tolist()
+        # Funding needed at the worst point: cumulative spend not yet covered by cumulative receipts
+        cumulative_gap = np.cumsum(series["outflow"]) - np.cumsum(series["inflow"])
+        result = {
+            "frequency": freq,
+            "timeline": {key: str(value) for key, value in timeline.items()},
+            "financing_structure": {source: round(amount, 2) for source, amount in structure.items()},
+            "periods": [
+                {"period_start": p, "inflow": i, "outflow": o, "net": n, "balance": b, "shortfall": s}
+                for p, i, o, n, b, s in zip(
+                    periods, _round(series["inflow"]), _round(series["outflow"]),
+                    _round(series["net"]), _round(balance), _round(series["shortfall"])
+                )
+            ],
+            "funding_milestones": [
+                {"milestone": name, "amount_required": amount, "deadline": str(date)}
+                for (name, _, _), amount, date in zip(FUNDING_MILESTONES, _round(required), milestone_dates)
+            ],
+            "summary": {
+                "total_inflows": round(float(series["inflow"].sum()), 2),
+                "total_outflows": round(float(series["outflow"].sum()), 2),
+                "committed_vendor_payments": round(committed, 2),
+                "peak_funding_requirement": round(max(float(cumulative_gap.max()), 0.0), 2) if len(cumulative_gap) else 0.0,
+                "minimum_balance": round(float(balance[low]), 2) if len(balance) else opening_balance,
+                "minimum_balance_date": periods[low] if periods else None,
+                "first_shortfall": periods[short[0]] if len(short) else None,
+                "max_shortfall": round(float(series["shortfall"].max()), 2) if len(short) else 0.0,
+                "shortfall_periods": len(short)
+            },
+            "rows": len(table),
+            "computation_ms": 0.0
+        }
+        result["computation_ms"] = round((time.perf_counter() - started) * 1000, 3)
+        return result
@@ -1,6 +1,8 @@
-from typing import Dict, Any, List
+from typing import Dict, Any, List, Iterable
+import asyncio
 import json
 import logging
+import os
 from datetime import datetime
 from .agents.cost_estimator_agent import CostEstimatorAgent
 from .agents.budget_optimizer_agent import BudgetOptimizerAgent
@@ -9,11 +11,18 @@ from .agents.line_producer_agent import LineProducerAgent
 from .agents.union_compliance_agent import UnionComplianceAgent
 from .agents.insurance_specialist_agent import InsuranceSpecialistAgent
 from .agents.cashflow_manager_agent import CashFlowManagerAgent
+from .risk_simulation import BudgetRiskSimulator, DEFAULT_TRIALS
+from .budget_store import BudgetStore, DEFAULT_STORE_PATH, DEFAULT_PROJECT
+from .budget_ledger import BudgetLedger
+from .expense_stream import RunningActuals, parse_expense_lines
+from .vendor_index import VendorIndex
+from .scene_costing import reattribute, scene_cut_savings
+from .budget_export import BudgetExporter
 
 logger = logging.getLogger(__name__)
 
 class BudgetingCoordinator:
-    def __init__(self):
+    def __init__(self, store_path: str = DEFAULT_STORE_PATH):
         logger.info("Initializing BudgetingCoordinator with 5 sub-agents")
         # Original agents
         self.cost_estimator = CostEstimatorAgent()
@@ -24,12 +33,10 @@ class BudgetingCoordinator:
         self.union_compliance = UnionComplianceAgent()
         self.insurance_specialist = InsuranceSpecialistAgent()
         self.cashflow_manager = CashFlowManagerAgent()
-        # State management
-        self.current_budget = None
-        self.current_tracking = None
-        self.vendor_data = {}
-        self.cash_flow_data = None
-        self.sub_agent_results = {}
+        # Per-project session state (budget, tracking, vendors, cash flow)
+        self.store = BudgetStore(store_path)
+        # Cached exports live next to the store, one directory per project
+        self.exporter = BudgetExporter(os.path.join(os.path.dirname(os.path.abspath(store_path)), "exports"))
     
     async def process_budget_estimation(self, request_data: Dict[str, Any]) -> Dict[str, Any]:
         """Process budget estimation request - convenience method for API."""
@@ -52,7 +59,11 @@ class BudgetingCoordinator:
                 location_data=location_data,
                 crew_data=crew_data,
                 target_budget=target_budget,
-                constraints=constraints
+                constraints=constraints,
+                cast_data=request_data.get("cast_data"),
+                schedule_data=request_data.get("schedule_data"),
+                scene_data=request_data.get("scene_data"),
+                project_id=request_data.get("project_id", DEFAULT_PROJECT)
             )
             
             return result
@@ -83,6 +94,9 @@ class BudgetingCoordinator:
             # Extract location and crew data from the results
             location_data = self._extract_location_data(script_results, schedule_results)
             crew_data = self._extract_crew_data(character_results, schedule_results)
+            schedule_data = self._extract_schedule_data(script_results, schedule_results)
+            cast_data = self._extract_cast_data(character_results, schedule_results)
+            scene_data = self._extract_scene_data(script_results)
             
             # Extract constraints
             constraints = request_data.get("budget_constraints", {})
@@ -94,7 +108,11 @@ class BudgetingCoordinator:
                 location_data=location_data,
                 crew_data=crew_data,
                 target_budget=target_budget,
-                constraints=constraints
+                constraints=constraints,
+                cast_data=cast_data,
+                schedule_data=schedule_data,
+                scene_data=scene_data,
+                project_id=request_data.get("project_id", DEFAULT_PROJECT)
             )
             
             return result
@@ -214,6 +232,60 @@ class BudgetingCoordinator:
                 "departments": ["Direction", "Cinematography", "Sound", "Lighting", "Production"]
             }
 
+    def _extract_schedule_data(self, script_results: Dict[str, Any], schedule_results: Dict[str, Any]) -> Dict[str, Any]:
+        """Shoot days with hours, locations and working cast from a generated schedule."""
+        days = (schedule_results or {}).get("schedule")
+        if not isinstance(days, list) or not days:
+            return None
+        
+        scenes = ((script_results or {}).get("parsed_data") or {}).get("scenes", []) or []
+        cast_by_scene = {
+            str(scene.get("scene_number", i + 1)): scene.get("main_characters", []) or []
+            for i, scene in enumerate(scenes)
+        }
+        return {
+            "days": [
+                {
+                    "date": day.get("date"),
+                    "work_hours": day.get("work_hours"),
+                    "locations": day.get("locations", []),
+                    "cast": sorted({
+                        character
+                        for slot in day.get("scenes", [])
+                        for character in cast_by_scene.get(str(slot.get("scene_id")), [])
+                    }),
+                    "scenes": [str(slot.get("scene_id")) for slot in day.get("scenes", [])]
+                }
+                for day in days
+            ]
+        }
+
+    def _extract_scene_data(self, script_results: Dict[str, Any]) -> Dict[str, Any]:
+        """Parsed scenes and their breakdown cards, for scene-level costing."""
+        scenes = ((script_results or {}).get("parsed_data") or {}).get("scenes")
+        if not scenes:
+            return None
+        cards = ((script_results or {}).get("metadata") or {}).get("breakdown_cards")
+        return {"scenes": scenes, "metadata": {"breakdown_cards": cards or []}}
+    
+    def _extract_cast_data(self, character_results: Dict[str, Any], schedule_results: Dict[str, Any]) -> Dict[str, Any]:
+        """Cast list with role descriptions, plus the DOOP when the schedule has one."""
+        cast = []
+        characters = (character_results or {}).get("characters", {})
+        if isinstance(characters, dict):
+            for name, profile in characters.items():
+                profile = profile if isinstance(profile, dict) else {}
+                basic_info = profile.get("basic_info", {}) if isinstance(profile.get("basic_info"), dict) else {}
+                cast.append({
+                    "name": name,
+                    "role_type": profile.get("role_type") or basic_info.get("role_type")
+                })
+        
+        doop_reports = ((schedule_results or {}).get("stripboard_doop") or {}).get("doop_reports")
+        if not cast and not doop_reports:
+            return None
+        return {"cast": cast, "doop_reports": doop_reports or {}}
+
     def _create_fallback_budget(self) -> Dict[str, Any]:
         """Create a fallback budget when estimation fails."""
         logger.info("Creating fallback budget estimation")
@@ -264,14 +336,14 @@ class BudgetingCoordinator:
         crew_data: Dict[str, Any],
         target_budget: float = None,
         constraints: Dict[str, Any] = None,
-        vendor_data: Dict[str, Any] = None
+        vendor_data: Dict[str, Any] = None,
+        cast_data: Dict[str, Any] = None,
+        schedule_data: Dict[str, Any] = None,
+        scene_data: Dict[str, Any] = None,
+        project_id: str = DEFAULT_PROJECT
     ) -> Dict[str, Any]:
         """Initialize production budget with estimates and optimization."""
         try:
-            # Store vendor data if provided
-            if vendor_data:
-                self.vendor_data = vendor_data
-            
             # Validate input data
             self._validate_input_data(production_data, location_data, crew_data)
             logger.info("Input data validated successfully")
@@ -281,7 +353,12 @@ class BudgetingCoordinator:
             estimates = await self.cost_estimator.estimate_costs(
                 production_data,
                 location_data,
-                crew_data
+                crew_data,
+                scene_data=scene_data,
+                cast_data=cast_data,
+                schedule_data=schedule_data,
+                constraints=constraints,
+                include_llm_commentary=bool((constraints or {}).get("include_llm_commentary"))
             )
             
             if not estimates:
@@ -296,7 +373,8 @@ class BudgetingCoordinator:
                 optimization = await self.budget_optimizer.optimize_budget(
                     estimates,
                     constraints or {},
-                    target_budget
+                    target_budget,
+                    include_llm_commentary=bool((constraints or {}).get("include_llm_commentary"))
                 )
                 
                 if not optimization:
@@ -309,17 +387,20 @@ class BudgetingCoordinator:
             else:
                 final_budget = estimates
             
-            # Store current budget
-            self.current_budget = final_budget
+            # Store current budget; a new budget starts with no tracking
+            changes = {"current_budget": final_budget, "current_tracking": None, "cash_flow_data": None, "vendor_index": None}
             
             # Initialize cash flow tracking if vendor data is available
             if vendor_data:
-                self.cash_flow_data = await self.budget_tracker._analyze_cash_flow(
+                changes["vendor_data"] = vendor_data
+                changes["vendor_index"] = VendorIndex().register_vendors(vendor_data).to_dict()
+                changes["cash_flow_data"] = self.budget_tracker._analyze_cash_flow(
                     final_budget,
                     {},  # No actuals yet
                     vendor_data
                 )
             
+            await asyncio.to_thread(self.store.commit, project_id, changes, label="initialize")
             return final_budget
             
         except Exception as e:
@@ -333,16 +414,16 @@ class BudgetingCoordinator:
         crew_data: Dict[str, Any],
         target_budget: float = None,
         constraints: Dict[str, Any] = None,
-        vendor_data: Dict[str, Any] = None
+        vendor_data: Dict[str, Any] = None,
+        cast_data: Dict[str, Any] = None,
+        schedule_data: Dict[str, Any] = None,
+        scene_data: Dict[str, Any] = None,
+        project_id: str = DEFAULT_PROJECT
     ) -> Dict[str, Any]:
         """Initialize production budget with all 5 sub-agents."""
         try:
             logger.info("Starting comprehensive budget analysis with all 5 sub-agents")
             
-            # Store vendor data if provided
-            if vendor_data:
-                self.vendor_data = vendor_data
-            
             # Validate input data
             self._validate_input_data(production_data, location_data, crew_data)
             logger.info("Input data validated successfully")
@@ -354,7 +435,12 @@ class BudgetingCoordinator:
             logger.info("Running CostCalculatorAgent...")
             try:
                 cost_estimates = await self.cost_estimator.estimate_costs(
-                    production_data, location_data, crew_data
+                    production_data, location_data, crew_data,
+                    scene_data=scene_data,
+                    cast_data=cast_data,
+                    schedule_data=schedule_data,
+                    constraints=constraints,
+                    include_llm_commentary=bool((constraints or {}).get("include_llm_commentary"))
                 )
                 logger.info("CostCalculatorAgent completed successfully")
             except Exception as e:
@@ -383,10 +469,12 @@ class BudgetingCoordinator:
             logger.info("Running UnionComplianceAgent...")
             try:
                 union_analysis = await self.union_compliance.calculate_union_costs(
-                    cast_data=crew_data,  # Use crew_data as cast_data fallback
+                    cast_data=cast_data,
                     crew_data=crew_data,
-                    schedule_data=production_data,
-                    production_type="independent"
+                    schedule_data=schedule_data,
+                    production_type="independent",
+                    production_data=production_data,
+                    include_llm_commentary=bool((constraints or {}).get("include_llm_commentary"))
                 )
                 logger.info("UnionComplianceAgent completed successfully")
             except Exception as e:
@@ -419,7 +507,9 @@ class BudgetingCoordinator:
                     total_budget=total_budget_estimate,
                     production_data=production_data,
                     investor_data=constraints,
-                    timeline_data=production_data
+                    timeline_data=production_data,
+                    vendor_data=vendor_data,
+                    include_llm_commentary=bool((constraints or {}).get("include_llm_commentary"))
                 )
                 logger.info("CashFlowManagerAgent completed successfully")
             except Exception as e:
@@ -429,7 +519,7 @@ class BudgetingCoordinator:
                 )
             
             # Store sub-agent results
-            self.sub_agent_results = {
+            sub_agent_results = {
                 "cost_calculator": {
                     "status": "operational",
                     "data": cost_estimates
@@ -464,24 +554,35 @@ class BudgetingCoordinator:
                 optimization = await self.budget_optimizer.optimize_budget(
                     comprehensive_budget,
                     constraints or {},
-                    target_budget
+                    target_budget,
+                    include_llm_commentary=bool((constraints or {}).get("include_llm_commentary"))
                 )
                 
                 if optimization:
                     comprehensive_budget = self._apply_optimization(comprehensive_budget, optimization)
                     logger.info("Budget optimization applied successfully")
             
-            # Store current budget
-            self.current_budget = comprehensive_budget
+            # Store current budget; a new budget starts with no tracking
+            changes = {
+                "current_budget": comprehensive_budget,
+                "sub_agent_results": sub_agent_results,
+                "current_tracking": None,
+                "cash_flow_data": None,
+                "vendor_index": None
+            }
             
             # Initialize cash flow tracking if vendor data is available
             if vendor_data:
-                self.cash_flow_data = await self.budget_tracker._analyze_cash_flow(
+                changes["vendor_data"] = vendor_data
+                changes["vendor_index"] = VendorIndex().register_vendors(vendor_data).to_dict()
+                changes["cash_flow_data"] = self.budget_tracker._analyze_cash_flow(
                     comprehensive_budget,
                     {},  # No actuals yet
                     vendor_data
                 )
             
+            await asyncio.to_thread(self.store.commit, project_id, changes, label="initialize comprehensive")
+            
             logger.info("Comprehensive budget analysis completed successfully")
             return comprehensive_budget
             
@@ -539,10 +640,12 @@ class BudgetingCoordinator:
             }
         }
         
-        # Add union costs to personnel costs
-        if union_analysis and "total_union_costs" in union_analysis:
+        # Add union costs to personnel costs; rate-card budgets already price
+        # cast and crew at union scale with fringes
+        if cost_estimates.get("engine") != "rate_card" and union_analysis and "total_union_costs" in union_analysis:
             union_total = union_analysis.get("total_union_costs", 0)
             if "personnel_costs" in comprehensive_budget:
+                comprehensive_budget["personnel_costs"] = dict(comprehensive_budget["personnel_costs"])
                 comprehensive_budget["personnel_costs"]["union_costs"] = {
                     "sag_aftra_total": union_analysis.get("sag_aftra", {}).get("estimated_total", 0),
                     "iatse_total": union_analysis.get("iatse", {}).get("estimated_total", 0),
@@ -553,63 +656,26 @@ class BudgetingCoordinator:
         if insurance_analysis and "total_insurance_legal" in insurance_analysis:
             insurance_total = insurance_analysis.get("total_insurance_legal", 0)
             if "insurance_costs" in comprehensive_budget:
-                comprehensive_budget["insurance_costs"].update({
+                comprehensive_budget["insurance_costs"] = {
+                    **comprehensive_budget["insurance_costs"],
                     "comprehensive_insurance": insurance_analysis.get("required_insurance", {}),
                     "legal_costs": insurance_analysis.get("legal_costs", {}),
                     "total_insurance_legal": insurance_total
-                })
+                }
         
         # Update financing structure
         if financing_analysis and "financing_structure" in financing_analysis:
             comprehensive_budget["financing"] = financing_analysis
         
-        # Recalculate totals with all sub-agent data
-        self._recalculate_comprehensive_totals(comprehensive_budget)
+        # Recalculate totals with all sub-agent data; union costs count once, inside personnel,
+        # and the line table follows the lines the totals now price
+        ledger = BudgetLedger.from_budget(comprehensive_budget)
+        comprehensive_budget["total_estimates"] = ledger.totals()
+        if isinstance(comprehensive_budget.get("line_items"), list):
+            comprehensive_budget["line_items"] = ledger.line_items(comprehensive_budget)
         
         return comprehensive_budget
     
-    def _recalculate_comprehensive_totals(self, budget: Dict[str, Any]) -> None:
-        """Recalculate totals including all sub-agent costs."""
-        try:
-            if "total_estimates" not in budget:
-                budget["total_estimates"] = {}
-            
-            totals = budget["total_estimates"]
-            
-            # Base costs
-            base_total = 0
-            for category in ["location_costs", "equipment_costs", "personnel_costs", "logistics_costs"]:
-                if category in budget:
-                    category_total = 0
-                    for item in budget[category].values():
-                        if isinstance(item, dict) and "total_cost" in item:
-                            category_total += item["total_cost"]
-                    totals[f"total_{category}"] = category_total
-                    base_total += category_total
-            
-            # Add union costs
-            union_total = 0
-            if "personnel_costs" in budget and "union_costs" in budget["personnel_costs"]:
-                union_total = budget["personnel_costs"]["union_costs"].get("total_cost", 0)
-            
-            # Add insurance and legal costs
-            insurance_total = 0
-            if "insurance_costs" in budget:
-                insurance_total = budget["insurance_costs"].get("total_insurance_legal", 0)
-            
-            # Update totals
-            totals["total_union_costs"] = union_total
-            totals["total_insurance_legal"] = insurance_total
-            totals["subtotal"] = base_total + union_total + insurance_total
-            
-            # Add contingency
-            contingency_amount = budget.get("contingency", {}).get("amount", totals["subtotal"] * 0.1)
-            totals["contingency_amount"] = contingency_amount
-            totals["grand_total"] = totals["subtotal"] + contingency_amount
-            
-        except Exception as e:
-            logger.error(f"Failed to recalculate comprehensive totals: {str(e)}")
-    
     def _create_comprehensive_fallback_budget(
         self,
         production_data: Dict[str, Any],
@@ -808,17 +874,18 @@ class BudgetingCoordinator:
         self,
         actual_expenses: Dict[str, Any],
         tracking_period: str,
-        vendor_data: Dict[str, Any] = None
+        vendor_data: Dict[str, Any] = None,
+        project_id: str = DEFAULT_PROJECT
     ) -> Dict[str, Any]:
-        """Track actual expenses against current budget with vendor analysis."""
+        """Track actual expenses against a project's budget with vendor analysis."""
         try:
-            if not self.current_budget:
-                logger.error("Budget not initialized before tracking")
+            session = await asyncio.to_thread(self.store.load, project_id)
+            if not session["current_budget"]:
+                logger.error(f"Budget not initialized before tracking for project {project_id}")
                 raise ValueError("Budget must be initialized before tracking")
             
             # Update vendor data if provided
-            if vendor_data:
-                self.vendor_data = vendor_data
+            vendor_data = vendor_data or session["vendor_data"] or {}
             
             # Validate actual expenses data
             self._validate_expenses_data(actual_expenses)
@@ -826,26 +893,36 @@ class BudgetingCoordinator:
             
             # Track expenses with vendor analysis
             tracking_data = await self.budget_tracker.track_expenses(
-                self.current_budget,
+                session["current_budget"],
                 actual_expenses,
                 tracking_period,
-                self.vendor_data
+                vendor_data
             )
             
             if not tracking_data:
                 logger.error("Budget tracker returned empty tracking data")
                 raise ValueError("Failed to generate tracking data")
             
+            # A tracking report replaces the posted history, so the vendor index is rebuilt from it
+            index = VendorIndex().register_vendors(vendor_data).post_actuals(actual_expenses)
+            tracking_data["vendor_analysis"] = self.budget_tracker._analyze_vendor_performance(
+                vendor_data,
+                actual_expenses,
+                index
+            )
+            
+            changes = {"current_tracking": tracking_data, "vendor_data": vendor_data, "vendor_index": index.to_dict()}
+            
             # Update cash flow analysis
-            if self.vendor_data:
-                self.cash_flow_data = await self.budget_tracker._analyze_cash_flow(
-                    self.current_budget,
+            if vendor_data:
+                changes["cash_flow_data"] = self.budget_tracker._analyze_cash_flow(
+                    session["current_budget"],
                     actual_expenses,
-                    self.vendor_data
+                    vendor_data
                 )
             
             # Store current tracking
-            self.current_tracking = tracking_data
+            await asyncio.to_thread(self.store.commit, project_id, changes, label=f"track {tracking_period}", expected_version=session["version"])
             logger.info("Budget tracking completed successfully")
             
             return tracking_data
@@ -854,25 +931,97 @@ class BudgetingCoordinator:
             logger.error(f"Failed to track budget: {str(e)}", exc_info=True)
             raise RuntimeError(f"Failed to track budget: {str(e)}")
     
+    def ingest_expenses(
+        self,
+        lines: Iterable[str],
+        fmt: str = "csv",
+        tracking_period: str = None,
+        project_id: str = DEFAULT_PROJECT
+    ) -> Dict[str, Any]:
+        """Append a CSV/JSONL batch of actual expenses and update running tracking.
+        
+        Expenses already posted (same expense_id) are skipped. Tracking is
+        updated from running totals, so each expense costs the same to add no
+        matter how many came before; no LLM call is made.
+        """
+        try:
+            def update(session: Dict[str, Any], accepted: List[Dict[str, Any]]) -> Dict[str, Any]:
+                if not session["current_budget"]:
+                    raise ValueError("Budget must be initialized before tracking")
+                previous = session["current_tracking"] or {}
+                running = RunningActuals(previous.get("stream")).extend(accepted)
+                # Vendor aggregates accumulate alongside the running totals and restart with them
+                if previous.get("stream"):
+                    index = VendorIndex(session["vendor_index"])
+                else:
+                    index = VendorIndex().register_vendors(session["vendor_data"])
+                for expense in accepted:
+                    index.post_expense(expense)
+                period = tracking_period or previous.get("tracking_period")
+                tracking = self.budget_tracker.track_expense_stream(session["current_budget"], running, period)
+                tracking["tracking_period"] = period
+                return {"current_tracking": tracking, "vendor_index": index.to_dict()}
+            
+            result = self.store.append_expenses(
+                project_id,
+                parse_expense_lines(lines, fmt),
+                update,
+                label="ingest expenses"
+            )
+            tracking = self.store.load(project_id)["current_tracking"] or {}
+            result.update({
+                "project_id": project_id,
+                "health_status": tracking.get("health_status"),
+                "period_summary": tracking.get("period_summary"),
+                "alerts": tracking.get("alerts", [])
+            })
+            return result
+            
+        except Exception as e:
+            logger.error(f"Failed to ingest expenses: {str(e)}", exc_info=True)
+            raise RuntimeError(f"Failed to ingest expenses: {str(e)}")
+    
+    async def get_tracking_narrative(self, project_id: str = DEFAULT_PROJECT) -> Dict[str, Any]:
+        """LLM narrative for a project's current tracking report."""
+        try:
+            tracking = (await asyncio.to_thread(self.store.load, project_id))["current_tracking"]
+            if not tracking:
+                raise ValueError("No tracking data available")
+            return {
+                "health_status": tracking.get("health_status"),
+                "narrative": await self.budget_tracker.narrate_tracking(tracking)
+            }
+            
+        except Exception as e:
+            logger.error(f"Failed to generate tracking narrative: {str(e)}", exc_info=True)
+            raise RuntimeError(f"Failed to generate tracking narrative: {str(e)}")
+    
     async def analyze_vendor_performance(
         self,
-        vendor_data: Dict[str, Any] = None
+        vendor_data: Dict[str, Any] = None,
+        project_id: str = DEFAULT_PROJECT
     ) -> Dict[str, Any]:
         """Analyze vendor performance and payment status."""
         try:
-            if not self.current_tracking:
+            session = await asyncio.to_thread(self.store.load, project_id)
+            if not session["current_tracking"]:
                 logger.error("No tracking data available for vendor analysis")
                 raise ValueError("Budget tracking must be performed before vendor analysis")
             
             # Use provided vendor data or stored data
-            vendor_data_to_analyze = vendor_data or self.vendor_data
+            vendor_data_to_analyze = vendor_data or session["vendor_data"]
             if not vendor_data_to_analyze:
                 logger.error("No vendor data available for analysis")
                 raise ValueError("Vendor data must be provided")
             
-            analysis = await self.budget_tracker._analyze_vendor_performance(
+            index = self._vendor_index(session)
+            if vendor_data:
+                index.register_vendors(vendor_data)
+            
+            analysis = self.budget_tracker._analyze_vendor_performance(
                 vendor_data_to_analyze,
-                self.current_tracking.get("actuals", {})
+                session["current_tracking"].get("actuals", {}),
+                index
             )
             
             logger.info("Vendor analysis completed successfully")
@@ -882,46 +1031,185 @@ class BudgetingCoordinator:
             logger.error(f"Failed to analyze vendor performance: {str(e)}", exc_info=True)
             raise RuntimeError(f"Failed to analyze vendor performance: {str(e)}")
     
-    async def get_cash_flow_analysis(self) -> Dict[str, Any]:
-        """Get current cash flow analysis and projections."""
+    def _vendor_index(self, session: Dict[str, Any]) -> VendorIndex:
+        """A session's vendor index; sessions stored before the index existed get one built."""
+        if session["vendor_index"]:
+            return VendorIndex(session["vendor_index"])
+        return VendorIndex().register_vendors(session["vendor_data"]).post_actuals(
+            (session["current_tracking"] or {}).get("actuals", {})
+        )
+    
+    def get_vendor_report(self, vendor_id: str, project_id: str = DEFAULT_PROJECT) -> Dict[str, Any]:
+        """One vendor's spend, payments and performance metrics."""
+        try:
+            index = self._vendor_index(self.store.load(project_id))
+            if vendor_id not in index.vendors:
+                raise ValueError(f"Unknown vendor: {vendor_id}")
+            return {
+                "vendor_id": vendor_id,
+                "metrics": index.metrics(vendor_id),
+                **self.budget_tracker.vendor_report(index, vendor_id)
+            }
+            
+        except Exception as e:
+            logger.error(f"Failed to get vendor report: {str(e)}", exc_info=True)
+            raise RuntimeError(f"Failed to get vendor report: {str(e)}")
+    
+    def get_vendor_rankings(
+        self,
+        metric: str = "total_spend",
+        descending: bool = True,
+        limit: int = None,
+        project_id: str = DEFAULT_PROJECT
+    ) -> Dict[str, Any]:
+        """A project's vendors ordered by one indexed metric."""
+        try:
+            index = self._vendor_index(self.store.load(project_id))
+            return {
+                "metric": metric,
+                "descending": descending,
+                "vendors": index.rank(metric, descending, limit)
+            }
+            
+        except Exception as e:
+            logger.error(f"Failed to rank vendors: {str(e)}", exc_info=True)
+            raise RuntimeError(f"Failed to rank vendors: {str(e)}")
+    
+    async def get_cash_flow_analysis(self, project_id: str = DEFAULT_PROJECT) -> Dict[str, Any]:
+        """Get a project's cash flow analysis and projections."""
         try:
-            if not self.cash_flow_data:
+            session = await asyncio.to_thread(self.store.load, project_id)
+            if not session["cash_flow_data"]:
                 logger.error("No cash flow data available")
                 raise ValueError("Cash flow analysis has not been performed")
             
             return {
-                "cash_flow_status": self.cash_flow_data,
-                "last_updated": datetime.now().isoformat()
+                "cash_flow_status": session["cash_flow_data"],
+                "last_updated": session["created_at"],
+                "version": session["version"]
             }
             
         except Exception as e:
             logger.error(f"Failed to get cash flow analysis: {str(e)}", exc_info=True)
             raise RuntimeError(f"Failed to get cash flow analysis: {str(e)}")
     
+    def project_cash_flow(
+        self,
+        start_date: str = None,
+        shoot_days: int = None,
+        freq: str = "W",
+        financing_shares: Dict[str, float] = None,
+        cash_flows: List[Dict[str, Any]] = None,
+        opening_balance: float = 0.0,
+        minimum_balance: float = 0.0,
+        project_id: str = DEFAULT_PROJECT
+    ) -> Dict[str, Any]:
+        """Dated cash-flow projection for a project's budget, vendor payments and financing."""
+        try:
+            session = self.store.load(project_id)
+            budget = session["current_budget"]
+            if not budget:
+                raise ValueError("Budget must be initialized before cash flow projection")
+            
+            tracking = session["current_tracking"] or {}
+            return self.cashflow_manager.engine.project(
+                budget["total_estimates"]["grand_total"],
+                start_date=start_date or budget.get("assumptions", {}).get("start_date"),
+                shoot_days=shoot_days or budget.get("assumptions", {}).get("shoot_days", 18),
+                vendor_data=session["vendor_data"],
+                financing_shares=financing_shares,
+                extra_flows=cash_flows,
+                spent_to_date=tracking.get("period_summary", {}).get("total_spent", 0.0),
+                opening_balance=opening_balance,
+                minimum_balance=minimum_balance,
+                freq=freq
+            )
+            
+        except Exception as e:
+            logger.error(f"Failed to project cash flow: {str(e)}", exc_info=True)
+            raise RuntimeError(f"Failed to project cash flow: {str(e)}")
+    
+    def export_budget(
+        self,
+        fmt: str = "csv",
+        sections: List[str] = None,
+        version: int = None,
+        project_id: str = DEFAULT_PROJECT
+    ) -> Dict[str, Any]:
+        """Export a budget snapshot (the head by default) as CSV, XLSX or PDF, cached per version."""
+        try:
+            session = self.store.load(project_id, version)
+            budget = session["current_budget"]
+            if not budget:
+                raise ValueError("Budget must be initialized before export")
+            
+            tracking = session["current_tracking"] or {}
+            return self.exporter.export(
+                session,
+                fmt,
+                sections,
+                cash_flow=lambda: self.cashflow_manager.engine.project(
+                    budget["total_estimates"]["grand_total"],
+                    start_date=budget.get("assumptions", {}).get("start_date"),
+                    shoot_days=budget.get("assumptions", {}).get("shoot_days", 18),
+                    vendor_data=session["vendor_data"],
+                    spent_to_date=tracking.get("period_summary", {}).get("total_spent", 0.0)
+                )
+            )
+            
+        except Exception as e:
+            logger.error(f"Failed to export budget: {str(e)}", exc_info=True)
+            raise RuntimeError(f"Failed to export budget: {str(e)}")
+    
+    async def simulate_budget_risk(
+        self,
+        budget: Dict[str, Any] = None,
+        scenes: List[Dict[str, Any]] = None,
+        trials: int = DEFAULT_TRIALS,
+        parameters: Dict[str, Any] = None,
+        seed: int = None,
+        project_id: str = DEFAULT_PROJECT
+    ) -> Dict[str, Any]:
+        """P50/P80/P95 budgets and driver sensitivity for a rate-card budget."""
+        try:
+            budget = budget or (await asyncio.to_thread(self.store.load, project_id))["current_budget"]
+            if not budget:
+                logger.error("Budget not initialized before risk simulation")
+                raise ValueError("Budget must be initialized before risk simulation")
+            
+            simulator = BudgetRiskSimulator(budget, scenes, parameters)
+            return await asyncio.to_thread(simulator.run, trials, seed)
+            
+        except Exception as e:
+            logger.error(f"Failed to simulate budget risk: {str(e)}", exc_info=True)
+            raise RuntimeError(f"Failed to simulate budget risk: {str(e)}")
+    
     async def optimize_current_budget(
         self,
         new_constraints: Dict[str, Any],
         new_target: float = None,
-        vendor_data: Dict[str, Any] = None
+        vendor_data: Dict[str, Any] = None,
+        project_id: str = DEFAULT_PROJECT
     ) -> Dict[str, Any]:
-        """Re-optimize current budget based on new constraints or targets."""
+        """Re-optimize a project's budget based on new constraints or targets."""
         try:
-            if not self.current_budget:
+            session = await asyncio.to_thread(self.store.load, project_id)
+            if not session["current_budget"]:
                 logger.error("Budget not initialized before optimization")
                 raise ValueError("Budget must be initialized before optimization")
             
             # Update vendor data if provided
-            if vendor_data:
-                self.vendor_data = vendor_data
+            vendor_data = vendor_data or session["vendor_data"] or {}
             
             # Validate constraints
             self._validate_constraints(new_constraints)
             logger.info("New constraints validated")
             
             optimization = await self.budget_optimizer.optimize_budget(
-                self.current_budget,
+                session["current_budget"],
                 new_constraints,
-                new_target
+                new_target,
+                include_llm_commentary=bool(new_constraints.get("include_llm_commentary"))
             )
             
             if not optimization:
@@ -930,47 +1218,54 @@ class BudgetingCoordinator:
             
             # Apply optimization to current budget
             optimized_budget = self._apply_optimization(
-                self.current_budget,
+                session["current_budget"],
                 optimization
             )
             
-            # Update current budget
-            self.current_budget = optimized_budget
+            changes = {"current_budget": optimized_budget, "vendor_data": vendor_data}
             
             # Update cash flow analysis if vendor data is available
-            if self.vendor_data:
-                self.cash_flow_data = await self.budget_tracker._analyze_cash_flow(
+            if vendor_data:
+                changes["cash_flow_data"] = self.budget_tracker._analyze_cash_flow(
                     optimized_budget,
-                    self.current_tracking.get("actuals", {}) if self.current_tracking else {},
-                    self.vendor_data
+                    session["current_tracking"].get("actuals", {}) if session["current_tracking"] else {},
+                    vendor_data
                 )
             
+            await asyncio.to_thread(self.store.commit, project_id, changes, label="optimize", expected_version=session["version"])
             logger.info("Budget optimization completed successfully")
             
+            cash_flow_data = changes.get("cash_flow_data", session["cash_flow_data"])
             return {
                 "optimized_budget": optimized_budget,
                 "optimization_details": optimization,
-                "cash_flow_impact": self.cash_flow_data if self.cash_flow_data else None
+                "cash_flow_impact": cash_flow_data if cash_flow_data else None
             }
             
         except Exception as e:
             logger.error(f"Failed to optimize budget: {str(e)}", exc_info=True)
             raise RuntimeError(f"Failed to optimize budget: {str(e)}")
     
-    def get_budget_summary(self) -> Dict[str, Any]:
-        """Get current budget and tracking summary with vendor and cash flow analysis."""
+    def get_budget_summary(self, project_id: str = DEFAULT_PROJECT, version: int = None) -> Dict[str, Any]:
+        """Get a project's budget and tracking summary with vendor and cash flow analysis."""
         try:
-            if not self.current_budget:
+            session = self.store.load(project_id, version)
+            current_budget = session["current_budget"]
+            current_tracking = session["current_tracking"]
+            cash_flow_data = session["cash_flow_data"]
+            if not current_budget:
                 logger.error("Budget not initialized")
                 raise ValueError("Budget not initialized")
             
             summary = {
+                "project_id": project_id,
+                "version": session["version"],
                 "budget_status": {
-                    "total_budget": self.current_budget["total_estimates"]["grand_total"],
-                    "last_updated": datetime.now().isoformat(),
+                    "total_budget": current_budget["total_estimates"]["grand_total"],
+                    "last_updated": session["created_at"],
                     "categories": {
                         category: total
-                        for category, total in self.current_budget["total_estimates"].items()
+                        for category, total in current_budget["total_estimates"].items()
                         if category != "grand_total"
                     }
                 },
@@ -979,39 +1274,39 @@ class BudgetingCoordinator:
                 "cash_flow_status": None
             }
             
-            if self.current_tracking:
+            if current_tracking:
                 summary["tracking_status"] = {
-                    "period_summary": self.current_tracking["period_summary"],
-                    "alerts": self.current_tracking["alerts"],
-                    "projections": self.current_tracking["projections"]
+                    "period_summary": current_tracking["period_summary"],
+                    "alerts": current_tracking["alerts"],
+                    "projections": current_tracking["projections"]
                 }
                 
-                if "vendor_analysis" in self.current_tracking:
+                if "vendor_analysis" in current_tracking:
                     summary["vendor_status"] = {
-                        "total_vendors": len(self.current_tracking["vendor_analysis"]["spend_by_vendor"]),
+                        "total_vendors": len(current_tracking["vendor_analysis"]["spend_by_vendor"]),
                         "total_spend": sum(
                             vendor["total_spend"]
-                            for vendor in self.current_tracking["vendor_analysis"]["spend_by_vendor"].values()
+                            for vendor in current_tracking["vendor_analysis"]["spend_by_vendor"].values()
                         ),
                         "outstanding_payments": sum(
                             status["outstanding"]
-                            for status in self.current_tracking["vendor_analysis"]["payment_status"].values()
+                            for status in current_tracking["vendor_analysis"]["payment_status"].values()
                         ),
                         "performance_summary": {
                             vendor_id: metrics["reliability_score"]
-                            for vendor_id, metrics in self.current_tracking["vendor_analysis"]["performance_metrics"].items()
+                            for vendor_id, metrics in current_tracking["vendor_analysis"]["performance_metrics"].items()
                         }
                     }
             
-            if self.cash_flow_data:
+            if cash_flow_data:
                 summary["cash_flow_status"] = {
-                    "current_balance": self.cash_flow_data["current_balance"],
+                    "current_balance": cash_flow_data["current_balance"],
                     "upcoming_total": sum(
                         payment["amount"]
-                        for payment in self.cash_flow_data["upcoming_payments"]
+                        for payment in cash_flow_data["upcoming_payments"]
                     ),
-                    "health_status": self.cash_flow_data["cash_flow_health"],
-                    "recommendations": self.cash_flow_data["recommendations"]
+                    "health_status": cash_flow_data["cash_flow_health"],
+                    "recommendations": cash_flow_data["recommendations"]
                 }
             
             logger.info("Budget summary generated successfully")
@@ -1021,6 +1316,125 @@ class BudgetingCoordinator:
             logger.error(f"Failed to get budget summary: {str(e)}", exc_info=True)
             raise RuntimeError(f"Failed to get budget summary: {str(e)}")
     
+    def get_budget_history(self, project_id: str = DEFAULT_PROJECT) -> List[Dict[str, Any]]:
+        """Snapshot history for a project, newest first."""
+        return self.store.history(project_id)
+    
+    def restore_budget_version(self, project_id: str, version: int) -> Dict[str, Any]:
+        """Make an earlier snapshot the project's current state again."""
+        try:
+            new_version = self.store.restore(project_id, version)
+            return {"project_id": project_id, "restored_from": version, "version": new_version}
+        except Exception as e:
+            logger.error(f"Failed to restore budget version: {str(e)}", exc_info=True)
+            raise RuntimeError(f"Failed to restore budget version: {str(e)}")
+    
+    def edit_budget_line(
+        self,
+        category: str,
+        item: str,
+        total_cost: float,
+        reason: str = "edit",
+        project_id: str = DEFAULT_PROJECT
+    ) -> Dict[str, Any]:
+        """Change one line of a project's budget; totals update by the line's delta."""
+        try:
+            session = self.store.load(project_id)
+            if not session["current_budget"]:
+                raise ValueError("Budget must be initialized before editing")
+            
+            ledger = BudgetLedger.from_budget(session["current_budget"])
+            entry = ledger.set_line(category, item, float(total_cost), reason)
+            budget = ledger.to_budget(session["current_budget"])
+            version = self.store.commit(
+                project_id, {"current_budget": budget},
+                label=f"edit {category}/{item}", expected_version=session["version"]
+            )
+            return {"entry": entry, "total_estimates": budget["total_estimates"], "version": version}
+            
+        except Exception as e:
+            logger.error(f"Failed to edit budget line: {str(e)}", exc_info=True)
+            raise RuntimeError(f"Failed to edit budget line: {str(e)}")
+    
+    def undo_budget_change(self, project_id: str = DEFAULT_PROJECT) -> Dict[str, Any]:
+        """Revert the latest journaled edit or optimization of a project's budget."""
+        try:
+            session = self.store.load(project_id)
+            if not session["current_budget"]:
+                raise ValueError("Budget not initialized")
+            
+            ledger = BudgetLedger.from_budget(session["current_budget"])
+            entries = ledger.undo()
+            if not entries:
+                raise ValueError("No budget changes to undo")
+            budget = ledger.to_budget(session["current_budget"])
+            version = self.store.commit(
+                project_id, {"current_budget": budget},
+                label="undo", expected_version=session["version"]
+            )
+            return {"entries": entries, "total_estimates": budget["total_estimates"], "version": version}
+            
+        except Exception as e:
+            logger.error(f"Failed to undo budget change: {str(e)}", exc_info=True)
+            raise RuntimeError(f"Failed to undo budget change: {str(e)}")
+    
+    def get_scene_costs(self, project_id: str = DEFAULT_PROJECT) -> Dict[str, Any]:
+        """A project's per-scene cost table, rolled up to its current category totals."""
+        try:
+            budget = self.store.load(project_id)["current_budget"]
+            if not budget or not budget.get("scene_costs"):
+                raise ValueError("Budget has no scene cost table; estimate it with scene data")
+            return reattribute(budget["scene_costs"], budget)
+            
+        except Exception as e:
+            logger.error(f"Failed to get scene costs: {str(e)}", exc_info=True)
+            raise RuntimeError(f"Failed to get scene costs: {str(e)}")
+    
+    def preview_scene_cuts(self, scene_ids: List[Any], project_id: str = DEFAULT_PROJECT) -> Dict[str, Any]:
+        """Savings from cutting scenes, without changing the budget."""
+        try:
+            budget = self.store.load(project_id)["current_budget"]
+            return scene_cut_savings(self.get_scene_costs(project_id), scene_ids, budget)
+            
+        except Exception as e:
+            logger.error(f"Failed to preview scene cuts: {str(e)}", exc_info=True)
+            raise RuntimeError(f"Failed to preview scene cuts: {str(e)}")
+    
+    def preview_budget_variants(
+        self,
+        variants: List[Dict[str, Any]],
+        project_id: str = DEFAULT_PROJECT
+    ) -> List[Dict[str, Any]]:
+        """Totals for what-if variants of a project's budget without saving them.
+        
+        Each variant is {"name", "edits": [{"category", "item", "total_cost"}]}
+        and/or {"optimization": BudgetOptimizerAgent output}; variants fork one
+        ledger and copy only the categories they change.
+        """
+        try:
+            session = self.store.load(project_id)
+            if not session["current_budget"]:
+                raise ValueError("Budget not initialized")
+            
+            base = BudgetLedger.from_budget(session["current_budget"])
+            results = []
+            for i, variant in enumerate(variants):
+                ledger = base.fork()
+                for edit in variant.get("edits", []):
+                    ledger.set_line(edit["category"], edit["item"], float(edit["total_cost"]), edit.get("reason", "what-if"))
+                if variant.get("optimization"):
+                    ledger.apply_optimization(variant["optimization"])
+                results.append({
+                    "name": variant.get("name", f"variant_{i + 1}"),
+                    "total_estimates": ledger.totals(),
+                    "difference": round(ledger.grand_total - base.grand_total, 2)
+                })
+            return results
+            
+        except Exception as e:
+            logger.error(f"Failed to preview budget variants: {str(e)}", exc_info=True)
+            raise RuntimeError(f"Failed to preview budget variants: {str(e)}")
+    
     def _validate_input_data(
         self,
         production_data: Dict[str, Any],
@@ -1079,65 +1493,12 @@ class BudgetingCoordinator:
         current_budget: Dict[str, Any],
         optimization: Dict[str, Any]
     ) -> Dict[str, Any]:
-        """Apply optimization changes to current budget."""
+        """Apply optimization changes to a new budget; current_budget is left untouched."""
         try:
-            optimized = current_budget.copy()
-            
-            # Apply cost reductions
-            if "cost_reductions" in optimization:
-                for category, reduction in optimization["cost_reductions"].items():
-                    if category in optimized:
-                        for item, data in optimized[category].items():
-                            if isinstance(data, dict) and "total_cost" in data:
-                                ratio = reduction["proposed_cost"] / reduction["current_cost"]
-                                data["total_cost"] = data["total_cost"] * ratio
-            
-            # Apply reallocations
-            if "reallocations" in optimization:
-                for from_category, realloc in optimization["reallocations"].items():
-                    if from_category in optimized and realloc["to_category"] in optimized:
-                        amount = realloc["amount"]
-                        # Reduce from source
-                        if isinstance(optimized[from_category], dict):
-                            for item in optimized[from_category].values():
-                                if isinstance(item, dict) and "total_cost" in item:
-                                    item["total_cost"] -= amount
-                        # Add to destination
-                        if isinstance(optimized[realloc["to_category"]], dict):
-                            for item in optimized[realloc["to_category"]].values():
-                                if isinstance(item, dict) and "total_cost" in item:
-                                    item["total_cost"] += amount
-            
-            # Recalculate totals
-            self._recalculate_totals(optimized)
-            
-            return optimized
+            ledger = BudgetLedger.from_budget(current_budget)
+            ledger.apply_optimization(optimization)
+            return ledger.to_budget(current_budget)
             
         except Exception as e:
             logger.error(f"Failed to apply optimization: {str(e)}", exc_info=True)
-            raise RuntimeError(f"Failed to apply optimization: {str(e)}")
-    
-    def _recalculate_totals(self, budget: Dict[str, Any]) -> None:
-        """Recalculate all total costs in the budget."""
-        try:
-            if "total_estimates" in budget:
-                totals = budget["total_estimates"]
-                
-                # Recalculate category totals
-                for category in totals:
-                    if category != "grand_total":
-                        category_data = budget.get(category.replace("total_", ""), {})
-                        totals[category] = sum(
-                            item["total_cost"]
-                            for item in category_data.values()
-                            if isinstance(item, dict) and "total_cost" in item
-                        )
-                
-                # Recalculate grand total
-                totals["grand_total"] = sum(
-                    total for category, total in totals.items()
-                    if category != "grand_total"
-                )
-        except Exception as e:
-            logger.error(f"Failed to recalculate totals: {str(e)}", exc_info=True)
-            raise RuntimeError(f"Failed to recalculate totals: {str(e)}") 
\ No newline at end of file
+            raise RuntimeError(f"Failed to apply optimization: {str(e)}")
\ No newline at end of file
@@ -0,0 +1,158 @@
+"""
+Streaming ingestion of actual expenses.
+
+Cost reports arrive as CSV or JSONL batches. Rows are parsed one line at a
+time, normalized to a flat expense record and folded into RunningActuals,
+which keeps per-category, per-vendor and per-day totals. Adding an expense
+touches a constant number of counters, so tracking cost does not grow with
+the number of expenses already posted.
+"""
+
+from typing import Dict, Any, List, Optional, Iterable, Iterator
+from datetime import datetime
+import csv
+import hashlib
+import json
+import logging
+
+logger = logging.getLogger(__name__)
+
+EXPENSE_FORMATS = ["csv", "jsonl"]
+
+# Column names accepted for each expense field, in order of preference
+FIELD_ALIASES = {
+    "expense_id": ["expense_id", "id", "reference", "invoice"],
+    "category": ["category", "budget_category", "account"],
+    "item": ["item", "line_item", "line"],
+    "amount": ["amount", "total_cost", "cost", "total"],
+    "date": ["date", "expense_date", "posted"],
+    "vendor_id": ["vendor_id", "vendor"],
+    "description": ["description", "memo", "notes"],
+    "delay_days": ["delay_days", "delivery_delay"],
+    "rating": ["rating", "quality_rating"]
+}
+
+# Vendor feedback carried on an expense row when present
+OPTIONAL_FIELDS = ["delay_days", "rating"]
+
+# Short category names used in cost reports
+CATEGORY_ALIASES = {
+    "location": "location_costs",
+    "locations": "location_costs",
+    "equipment": "equipment_costs",
+    "personnel": "personnel_costs",
+    "crew": "personnel_costs",
+    "cast": "personnel_costs",
+    "logistics": "logistics_costs",
+    "catering": "logistics_costs",
+    "transport": "logistics_costs",
+    "insurance": "insurance_costs"
+}
+
+
+def _field(raw: Dict[str, Any], field: str) -> Any:
+    for key in FIELD_ALIASES[field]:
+        value = raw.get(key)
+        if value not in (None, ""):
+            return value
+    return None
+
+
+def normalize_expense(raw: Dict[str, Any]) -> Dict[str, Any]:
+    """Flat expense record from a CSV row or JSON object; raises ValueError on bad rows."""
+    amount = _field(raw, "amount")
+    if amount is None:
+        raise ValueError("Expense has no amount")
+    amount = float(str(amount).replace(",", "").replace("₹", "").replace("$", ""))
+
+    category = str(_field(raw, "category") or "other_costs").strip().lower().replace(" ", "_")
+    category = CATEGORY_ALIASES.get(category, category)
+
+    date = _field(raw, "date")
+    date = datetime.strptime(str(date)[:10], "%Y-%m-%d").strftime("%Y-%m-%d") if date else datetime.now().strftime("%Y-%m-%d")
+
+    expense = {
+        "category": category,
+        "item": str(_field(raw, "item") or ""),
+        "amount": round(amount, 2),
+        "date": date,
+        "vendor_id": str(_field(raw, "vendor_id") or ""),
+        "description": str(_field(raw, "description") or "")
+    }
+    for field in OPTIONAL_FIELDS:
+        value = _field(raw, field)
+        if value is not None:
+            expense[field] = float(value)
+    expense_id = _field(raw, "expense_id")
+    if expense_id is None:
+        # Without an id, re-posting an identical row is treated as a duplicate
+        expense_id = hashlib.sha1(json.dumps(expense, sort_keys=True).encode()).hexdigest()[:16]
+    expense["expense_id"] = str(expense_id)
+    return expense
+
+
+def parse_expense_lines(lines: Iterable[str], fmt: str = "csv") -> Iterator[Dict[str, Any]]:
+    """Normalized expenses from an iterable of CSV (with header) or JSONL lines."""
+    if fmt not in EXPENSE_FORMATS:
+        raise ValueError(f"Unsupported expense format: {fmt}")
+    if fmt == "csv":
+        rows = csv.DictReader(line for line in lines if line.strip())
+        for number, row in enumerate(rows, start=2):
+            try:
+                yield normalize_expense({key.strip().lower(): value for key, value in row.items() if key})
+            except ValueError as e:
+                raise ValueError(f"Invalid expense on line {number}: {e}")
+    else:
+        for number, line in enumerate(lines, start=1):
+            if not line.strip():
+                continue
+            try:
+                yield normalize_expense(json.loads(line))
+            except (ValueError, TypeError) as e:
+                raise ValueError(f"Invalid expense on line {number}: {e}")
+
+
+class RunningActuals:
+    """Running expense totals; serializes to a plain dict for the session store."""
+
+    def __init__(self, state: Optional[Dict[str, Any]] = None):
+        state = state or {}
+        self.total_spent = float(state.get("total_spent", 0.0))
+        self.count = int(state.get("count", 0))
+        self.categories: Dict[str, Dict[str, float]] = state.get("categories", {})
+        self.vendors: Dict[str, float] = state.get("vendors", {})
+        self.daily: Dict[str, float] = state.get("daily", {})
+        self.first_date: Optional[str] = state.get("first_date")
+        self.last_date: Optional[str] = state.get("last_date")
+
+    def add(self, expense: Dict[str, Any]) -> None:
+        amount = expense["amount"]
+        self.total_spent += amount
+        self.count += 1
+        category = self.categories.setdefault(expense["category"], {"actual": 0.0, "count": 0})
+        category["actual"] += amount
+        category["count"] += 1
+        if expense.get("vendor_id"):
+            self.vendors[expense["vendor_id"]] = self.vendors.get(expense["vendor_id"], 0.0) + amount
+        date = expense["date"]
+        self.daily[date] = self.daily.get(date, 0.0) + amount
+        if self.first_date is None or date < self.first_date:
+            self.first_date = date
+        if self.last_date is None or date > self.last_date:
+            self.last_date = date
+
+    def extend(self, expenses: List[Dict[str, Any]]) -> "RunningActuals":
+        for expense in expenses:
+            self.add(expense)
+        return self
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "total_spent": round(self.total_spent, 2),
+            "count": self.count,
+            "categories": self.categories,
+            "vendors": self.vendors,
+            "daily": self.daily,
+            "first_date": self.first_date,
+            "last_date": self.last_date
+        }
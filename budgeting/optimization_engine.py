@@ -0,0 +1,356 @@
+"""
+Target-budget optimization engine.
+
+Fits a priced budget to a target as a small linear program instead of asking
+the LLM for reductions. Levers are:
+
+- proportional cuts per category, bounded by a maximum cut share, the
+  category's min/max totals and locked line items;
+- equipment tier swaps (premium package to basic), from the rate card;
+- cutting shoot days, which saves each day-priced line's daily cost but
+  bills the lost day's hours to the crew as overtime.
+
+Each lever has an impact weight per unit of money saved. Tier swaps and day
+cuts are discrete, so every combination of them is enumerated; for each, the
+continuous cuts form a knapsack LP (one savings constraint, box bounds per
+category) whose optimum is the greedy fill by impact weight. The plan with
+the lowest total impact that meets the target is returned, which is the LP
+optimum over all lever combinations; a budget takes milliseconds.
+"""
+
+from typing import Dict, Any, List, Optional, Tuple
+from itertools import product
+import logging
+import time
+
+import numpy as np
+
+from .budget_engine import BUDGET_CATEGORIES
+from .budget_ledger import BudgetLedger
+from .rate_cards import COST_TEMPLATES, DEFAULT_DAY_HOURS
+
+logger = logging.getLogger(__name__)
+
+# Impact per unit of money saved by cutting a category proportionally
+CUT_IMPACT = {
+    "location_costs": 1.0,
+    "equipment_costs": 0.8,
+    "personnel_costs": 1.5,
+    "logistics_costs": 0.6
+}
+
+# Largest share of a category that proportional cuts may remove
+MAX_CUT = {
+    "location_costs": 0.3,
+    "equipment_costs": 0.3,
+    "personnel_costs": 0.15,
+    "logistics_costs": 0.4
+}
+
+# Impact per unit saved by swapping an equipment package to the basic tier or cutting a shoot day
+TIER_SWAP_IMPACT = 0.5
+SHOOT_DAY_IMPACT = 1.2
+MAX_SHOOT_DAY_CUT = 2
+
+# Without a target, aim to save this share of the grand total
+DEFAULT_SAVINGS_SHARE = 0.1
+
+# Scenarios scale how deep proportional cuts may go
+SCENARIO_CUT_FACTORS = {"base": 1.0, "optimistic": 1.25, "conservative": 0.6}
+
+
+def _money(amount: Any) -> float:
+    return round(float(amount), 2)
+
+
+def _locked(constraints: Dict[str, Any]) -> set:
+    """Locked lines as (category, item) pairs from "category/item" strings or dicts."""
+    locked = set()
+    for entry in constraints.get("locked_items") or []:
+        if isinstance(entry, dict):
+            locked.add((entry.get("category"), entry.get("item")))
+        else:
+            category, _, item = str(entry).partition("/")
+            locked.add((category, item))
+    return locked
+
+
+class OptimizationEngine:
+    """Lowest-impact plan that brings a budget to its target."""
+
+    def __init__(self, cost_templates: Optional[Dict[str, Any]] = None):
+        self.cost_templates = cost_templates or COST_TEMPLATES
+
+    def optimize(
+        self,
+        budget: Dict[str, Any],
+        target_budget: Optional[float] = None,
+        constraints: Optional[Dict[str, Any]] = None,
+        scenario: str = "base"
+    ) -> Dict[str, Any]:
+        """Plan of line changes bringing budget to target_budget (by default
+        10% under its total); constraints may set category_limits
+        ({category: {"min", "max"}}), locked_items, max_cut, impact_weights,
+        max_shoot_day_cut and allow_tier_swaps."""
+        started = time.perf_counter()
+        constraints = constraints or {}
+        ledger = BudgetLedger.from_budget(budget)
+        original_total = ledger.grand_total
+        # Contingency follows the subtotal, so a saving on lines saves (1 + contingency) on the total
+        markup = 1 + (ledger.contingency_percentage or 0.0) / 100
+        target = float(target_budget) if target_budget else original_total * (1 - DEFAULT_SAVINGS_SHARE)
+        required = max(original_total - target, 0.0) / markup
+
+        lines = self._lines(ledger, constraints)
+        lines["day_share"] = self._per_day_share(budget, lines)
+        lines["total_days"] = [
+            ((budget.get(category) or {}).get(item) or {}).get("total_days") if lines["day_share"][i] > 0 else None
+            for i, (category, item) in enumerate(zip(lines["category"], lines["item"]))
+        ]
+        shoot_days = int((budget.get("assumptions") or {}).get("shoot_days") or 0)
+        options = self._discrete_options(budget, lines, constraints)
+        limits = constraints.get("category_limits") or {}
+        weights = {**CUT_IMPACT, **(constraints.get("impact_weights") or {})}
+        factor = SCENARIO_CUT_FACTORS.get(scenario, 1.0)
+        max_cut = {category: min(share * factor, 1.0) for category, share in {**MAX_CUT, **(constraints.get("max_cut") or {})}.items()}
+
+        best, fallback, evaluated = None, None, 0
+        for choice in product(*[range(len(values)) for _, values in options]):
+            evaluated += 1
+            amounts = lines["amount"].copy()
+            discrete_impact = 0.0
+            picked = []
+            # Levers compose multiplicatively, so a day cut after a tier swap saves the cheaper day
+            for (lever, values), index in zip(options, choice):
+                if index:
+                    factor, weight, label = values[index]
+                    changed = amounts * factor
+                    discrete_impact += weight * float(amounts.sum() - changed.sum())
+                    amounts = changed
+                    picked.append(label)
+            plan = self._fill(lines, amounts, required, limits, max_cut, weights)
+            plan.update({"amounts": amounts, "impact": plan["impact"] + discrete_impact, "discrete": picked})
+            if plan["feasible"] and (best is None or plan["impact"] < best["impact"] - 1e-9):
+                best = plan
+            if fallback is None or plan["saving"] > fallback["saving"] + 1e-9:
+                fallback = plan
+
+        plan = best or fallback
+        result = self._report(lines, plan, original_total, target, markup, scenario, shoot_days)
+        result["plan"]["combinations_evaluated"] = evaluated
+        result["computation_ms"] = round((time.perf_counter() - started) * 1000, 3)
+        logger.info(
+            f"Optimized budget {original_total:,.2f} -> {result['savings_summary']['optimized_total']:,.2f} "
+            f"({evaluated} lever combinations) in {result['computation_ms']} ms"
+        )
+        return result
+
+    def _lines(self, ledger: BudgetLedger, constraints: Dict[str, Any]) -> Dict[str, Any]:
+        """Flat arrays of the optimizable lines: category, item, amount, locked."""
+        locked = _locked(constraints)
+        categories, items, amounts, is_locked = [], [], [], []
+        for category in BUDGET_CATEGORIES:
+            column = ledger.categories.get(category)
+            if column is None:
+                continue
+            for item, amount in zip(column.names, column.amounts.tolist()):
+                categories.append(category)
+                items.append(item)
+                amounts.append(amount)
+                is_locked.append((category, item) in locked)
+        return {
+            "category": np.array(categories, dtype=object),
+            "item": items,
+            "amount": np.array(amounts, dtype=float),
+            "locked": np.array(is_locked, dtype=bool)
+        }
+
+    def _discrete_options(self, budget: Dict[str, Any], lines: Dict[str, Any], constraints: Dict[str, Any]) -> List[Tuple[str, List[Tuple[np.ndarray, float, str]]]]:
+        """Per discrete lever, its choices as (per-line amount factor, impact weight, label); choice 0 is "no change"."""
+        unchanged = np.ones(len(lines["item"]))
+        options = []
+        index = {(category, item): i for i, (category, item) in enumerate(zip(lines["category"], lines["item"]))}
+
+        # Equipment tier swaps, for budgets priced at the premium tier
+        rate_card = budget.get("rate_card") or {}
+        if rate_card.get("tier") == "premium" and constraints.get("allow_tier_swaps", True):
+            templates = self.cost_templates.get(rate_card.get("region"), self.cost_templates["mumbai"])
+            for name, rates in templates["equipment_rates"].items():
+                i = index.get(("equipment_costs", name.title()))
+                if i is None or lines["locked"][i] or not rates.get("premium"):
+                    continue
+                factor = unchanged.copy()
+                factor[i] = rates["basic"] / rates["premium"]
+                options.append((f"tier:{name}", [(unchanged, 0.0, ""), (factor, TIER_SWAP_IMPACT, f"{name.title()} package to basic tier")]))
+
+        # Shoot-day cuts: day-priced lines lose a day; crew work the lost hours as overtime
+        max_days = int(constraints.get("max_shoot_day_cut", MAX_SHOOT_DAY_CUT))
+        per_day = lines["day_share"]
+        shoot_days = int((budget.get("assumptions") or {}).get("shoot_days") or 0)
+        if max_days > 0 and per_day.sum() > 0 and shoot_days > 1:
+            choices = [(unchanged, 0.0, "")]
+            for days in range(1, min(max_days, shoot_days - 1) + 1):
+                choices.append((np.maximum(1 - per_day * days, 0.0), SHOOT_DAY_IMPACT, f"Cut {days} shoot day{'s' if days > 1 else ''}"))
+            options.append(("shoot_days", choices))
+        return options
+
+    def _per_day_share(self, budget: Dict[str, Any], lines: Dict[str, Any]) -> np.ndarray:
+        """Share of each line saved by one shoot day fewer (day cost less the overtime it turns into)."""
+        day_hours = float((budget.get("assumptions") or {}).get("day_hours") or DEFAULT_DAY_HOURS)
+        saving = np.zeros(len(lines["item"]))
+        for i, (category, item) in enumerate(zip(lines["category"], lines["item"])):
+            line = (budget.get(category) or {}).get(item)
+            amount = lines["amount"][i]
+            if lines["locked"][i] or amount <= 0 or not isinstance(line, dict) or str(item).startswith("Cast - "):
+                continue
+            if category == "equipment_costs" and line.get("total_days"):
+                saving[i] = amount / line["total_days"]
+            elif category == "personnel_costs" and line.get("total_days") and line.get("overtime_rate"):
+                daily = amount / line["total_days"]
+                overtime = line["overtime_rate"] * line.get("headcount", 1) * day_hours
+                saving[i] = max(daily - overtime, 0.0)
+            elif category == "logistics_costs" and line.get("total_days") and line.get("daily_rate"):
+                saving[i] = min(line["daily_rate"], amount)
+        return saving / np.maximum(lines["amount"], 1e-9)
+
+    def _fill(
+        self,
+        lines: Dict[str, Any],
+        amounts: np.ndarray,
+        required: float,
+        limits: Dict[str, Any],
+        max_cut: Dict[str, float],
+        weights: Dict[str, float]
+    ) -> Dict[str, Any]:
+        """Greedy optimum of the continuous LP: category cuts between forced and capped amounts, cheapest impact first."""
+        discrete_saving = float(lines["amount"].sum() - amounts.sum())
+        cuts, forced, caps = {}, {}, {}
+        for category in BUDGET_CATEGORIES:
+            mask = lines["category"] == category
+            if not mask.any():
+                continue
+            total = float(amounts[mask].sum())
+            unlocked = float(amounts[mask & ~lines["locked"]].sum())
+            limit = limits.get(category) or {}
+            floor = float(limit.get("min", 0) or 0)
+            ceiling = limit.get("max")
+            caps[category] = max(min(unlocked * max_cut.get(category, 0.0), total - floor), 0.0)
+            forced[category] = max(total - float(ceiling), 0.0) if ceiling is not None else 0.0
+            cuts[category] = min(forced[category], caps[category])
+
+        feasible = all(forced[c] <= caps[c] + 1e-6 for c in forced)
+        remaining = required - discrete_saving - sum(cuts.values())
+        for category in sorted(caps, key=lambda c: weights.get(c, 1.0)):
+            if remaining <= 1e-9:
+                break
+            extra = min(caps[category] - cuts[category], remaining)
+            cuts[category] += extra
+            remaining -= extra
+        feasible = feasible and remaining <= 1e-6
+
+        impact = sum(weights.get(category, 1.0) * cut for category, cut in cuts.items())
+        return {
+            "cuts": cuts,
+            "impact": impact,
+            "saving": discrete_saving + sum(cuts.values()),
+            "feasible": feasible
+        }
+
+    def _report(
+        self,
+        lines: Dict[str, Any],
+        plan: Dict[str, Any],
+        original_total: float,
+        target: float,
+        markup: float,
+        scenario: str,
+        shoot_days: int = 0
+    ) -> Dict[str, Any]:
+        """Optimizer output in BudgetOptimizerAgent's shape, plus exact line changes.
+
+        A shoot-day cut also gives its day-priced line changes current_days and
+        proposed_days, and the plan the shoot_days it leaves.
+        """
+        days_cut = next((int(label.split()[1]) for label in plan["discrete"] if label.startswith("Cut ")), 0)
+        amounts = plan["amounts"].copy()
+        for category, cut in plan["cuts"].items():
+            mask = (lines["category"] == category) & ~lines["locked"]
+            unlocked = amounts[mask].sum()
+            if cut > 0 and unlocked > 0:
+                amounts[mask] *= 1 - cut / unlocked
+
+        line_changes = []
+        for i in np.flatnonzero(np.abs(amounts - lines["amount"]) >= 0.005):
+            change = {
+                "category": lines["category"][i],
+                "item": lines["item"][i],
+                "current_cost": _money(lines["amount"][i]),
+                "proposed_cost": _money(max(amounts[i], 0.0)),
+                "savings": _money(lines["amount"][i] - amounts[i])
+            }
+            if days_cut and lines["total_days"][i]:
+                change["current_days"] = lines["total_days"][i]
+                change["proposed_days"] = max(lines["total_days"][i] - days_cut, 1)
+            line_changes.append(change)
+
+        cost_reductions = {}
+        for category in BUDGET_CATEGORIES:
+            mask = lines["category"] == category
+            if not mask.any():
+                continue
+            current, proposed = float(lines["amount"][mask].sum()), float(amounts[mask].sum())
+            if current - proposed >= 0.005:
+                cost_reductions[category] = {
+                    "current_cost": _money(current),
+                    "proposed_cost": _money(proposed),
+                    "savings": _money(current - proposed),
+                    "impact_level": "high" if (current - proposed) / current > 0.2 else "medium" if (current - proposed) / current > 0.1 else "low"
+                }
+
+        total_savings = float(lines["amount"].sum() - amounts.sum()) * markup
+        optimized_total = original_total - total_savings
+        target_met = optimized_total <= target + 0.01
+        risks = []
+        if not target_met:
+            risks.append(f"Target {target:,.2f} is below what the allowed cuts can reach ({optimized_total:,.2f})")
+        if days_cut:
+            risks.append(f"{days_cut} fewer shoot day{'s' if days_cut > 1 else ''} lengthen the remaining days")
+        if cost_reductions.get("personnel_costs"):
+            risks.append("Personnel cuts reduce crew or cast time")
+
+        result = {
+            "cost_reductions": cost_reductions,
+            "line_changes": line_changes,
+            "reallocations": {},
+            "alternatives": {},
+            "plan": {
+                "levers": plan["discrete"],
+                "category_cuts": {category: _money(cut) for category, cut in plan["cuts"].items() if cut > 0},
+                "shoot_days_cut": days_cut,
+                "objective": round(plan["impact"], 2)
+            },
+            "impact_analysis": {
+                "quality_impact": {"level": "high" if plan["impact"] > total_savings else "low" if plan["impact"] < 0.75 * total_savings else "medium", "score": round(plan["impact"], 2)},
+                "timeline_impact": {"delay_days": 0, "shoot_days_cut": days_cut},
+                "resource_impact": {"lines_changed": len(line_changes)},
+                "risk_assessment": risks
+            },
+            "savings_summary": {
+                "original_total": _money(original_total),
+                "total_savings": _money(total_savings),
+                "total_reallocation": 0,
+                "optimized_total": _money(optimized_total),
+                "target_total": _money(target),
+                "percentage_saved": round(total_savings / original_total * 100, 2) if original_total > 0 else 0,
+                "target_met": target_met
+            },
+            "scenario_info": {
+                "name": scenario,
+                "description": f"Lowest-impact plan under {scenario} cut limits",
+                "risk_level": "high" if not target_met else "medium" if days_cut or cost_reductions.get("personnel_costs") else "low"
+            },
+            "engine": "optimizer"
+        }
+        if days_cut:
+            result["plan"]["shoot_days"] = {"current": shoot_days, "proposed": shoot_days - days_cut}
+        return result
@@ -0,0 +1,206 @@
+"""
+Rate cards used to price a production budget.
+
+Regional studio, location, equipment and crew rates (INR) and the 2024
+SAG-AFTRA / IATSE union tables (USD) that CostEstimatorAgent and
+UnionComplianceAgent carry, plus the logistics, insurance and exchange-rate
+figures the budget engine needs. Bump RATE_CARD_VERSION whenever a published
+rate changes; rate_card_version() also fingerprints the tables actually used,
+so an edited copy never shares a version with the published card.
+"""
+
+from typing import Dict, Any
+import hashlib
+import json
+
+RATE_CARD_VERSION = "2024.1"
+
+# Currency each table is quoted in
+TEMPLATE_CURRENCY = "INR"
+UNION_CURRENCY = "USD"
+
+# Regional rates in INR
+COST_TEMPLATES = {
+    "mumbai": {
+        "studio_rates": {"small": 25000, "medium": 50000, "large": 100000},
+        "location_rates": {"basic": 15000, "premium": 35000},
+        "equipment_rates": {
+            "camera": {"basic": 20000, "premium": 45000},
+            "lighting": {"basic": 15000, "premium": 35000},
+            "sound": {"basic": 10000, "premium": 25000}
+        },
+        "crew_rates": {
+            "director": {"daily": 15000, "weekly": 90000},
+            "dop": {"daily": 12000, "weekly": 70000},
+            "sound": {"daily": 8000, "weekly": 45000}
+        }
+    },
+    "delhi": {
+        "studio_rates": {"small": 20000, "medium": 40000, "large": 80000},
+        "location_rates": {"basic": 12000, "premium": 30000},
+        "equipment_rates": {
+            "camera": {"basic": 18000, "premium": 40000},
+            "lighting": {"basic": 12000, "premium": 30000},
+            "sound": {"basic": 8000, "premium": 20000}
+        },
+        "crew_rates": {
+            "director": {"daily": 12000, "weekly": 75000},
+            "dop": {"daily": 10000, "weekly": 60000},
+            "sound": {"daily": 7000, "weekly": 40000}
+        }
+    }
+}
+
+# Union rate templates (2024 rates, USD)
+UNION_RATES = {
+    "sag_aftra": {
+        "scale_rates": {
+            "lead_actor": {
+                "daily_rate": 1030,
+                "weekly_rate": 3575,
+                "overtime_rate": 1545  # 1.5x daily rate
+            },
+            "supporting_actor": {
+                "daily_rate": 630,
+                "weekly_rate": 2190,
+                "overtime_rate": 945
+            },
+            "background": {
+                "daily_rate": 150,
+                "weekly_rate": 525,
+                "overtime_rate": 225
+            },
+            "stunt_performer": {
+                "daily_rate": 1030,
+                "weekly_rate": 3575,
+                "hazard_pay": 500  # Additional per hazard
+            }
+        },
+        "benefits": {
+            "health_pension": {
+                "percentage": 18.5,
+                "minimum_contribution": 500
+            },
+            "vacation_holiday": {
+                "percentage": 8.0
+            }
+        },
+        "meal_penalties": {
+            "first_violation": 25,
+            "second_violation": 50,
+            "subsequent_violations": 100
+        },
+        "turnaround_violations": {
+            "less_than_12_hours": 100,
+            "less_than_10_hours": 200
+        },
+        "work_day_hours": 8  # Hours covered by the daily scale rate
+    },
+    "iatse": {
+        "department_minimums": {
+            "dp_rate": 550,  # per day
+            "gaffer_rate": 450,
+            "key_grip_rate": 400,
+            "sound_mixer_rate": 500,
+            "script_supervisor_rate": 450,
+            "first_ad_rate": 500,
+            "second_ad_rate": 350
+        },
+        "benefits": {
+            "health_welfare": {
+                "percentage": 25,
+                "minimum_hours": 300
+            },
+            "pension": {
+                "percentage": 15
+            },
+            "training": {
+                "percentage": 2
+            }
+        },
+        "overtime_rules": {
+            "daily_overtime": 12,  # hours before overtime
+            "weekly_overtime": 40,  # hours before weekly overtime
+            "overtime_multiplier": 1.5,
+            "double_time_hours": 16
+        },
+        "meal_requirements": {
+            "first_meal": 6,  # hours before first meal
+            "subsequent_meals": 6,  # hours between meals
+            "meal_penalty": 25
+        }
+    }
+}
+
+# Crew roles per department as (role, rate source, rate key); "template" rates come
+# from COST_TEMPLATES crew_rates for the region, "iatse" rates from department_minimums
+DEPARTMENT_ROLES = {
+    "direction": [("director", "template", "director"), ("first_ad", "iatse", "first_ad_rate"), ("second_ad", "iatse", "second_ad_rate")],
+    "cinematography": [("dop", "template", "dop")],
+    "sound": [("sound_mixer", "template", "sound")],
+    "lighting": [("gaffer", "iatse", "gaffer_rate"), ("key_grip", "iatse", "key_grip_rate")],
+    "production": [("script_supervisor", "iatse", "script_supervisor_rate")]
+}
+
+DEPARTMENT_ALIASES = {
+    "director": "direction",
+    "directing": "direction",
+    "camera": "cinematography",
+    "photography": "cinematography",
+    "audio": "sound",
+    "electric": "lighting",
+    "grip": "lighting",
+    "grip & electric": "lighting"
+}
+
+# Headcount for crew sizes given as labels
+CREW_SIZE_LABELS = {"Small": 8, "Medium": 15, "Large": 30}
+
+# Cast assumed when neither cast data nor a schedule names performers
+# (mirrors UnionComplianceAgent's fallback analysis)
+DEFAULT_CAST = [
+    {"name": "Lead", "category": "lead_actor", "count": 1, "day_share": 1.0},
+    {"name": "Supporting", "category": "supporting_actor", "count": 3, "day_share": 0.6},
+    {"name": "Background", "category": "background", "count": 8, "day_share": 1.0}
+]
+
+# Daily rental (INR) of special rigs a breakdown card can call for, keyed by
+# the scheduling engine's EQUIPMENT_KEYWORDS names
+SPECIAL_EQUIPMENT_RATES = {
+    "steadicam": 15000,
+    "camera_crane": 25000,
+    "dolly_track": 8000,
+    "drone": 20000,
+    "underwater_housing": 18000
+}
+
+# Per-day logistics in INR
+LOGISTICS_RATES = {
+    "currency": "INR",
+    "catering_per_head_day": 600,
+    "crew_transport_per_day": 12000,
+    "cast_transport_per_day": 6000
+}
+
+# Location and equipment surcharges as a share of the rental
+PERMIT_RATE = 0.2
+EQUIPMENT_INSURANCE_RATE = 0.1
+
+# Production insurance as a share of payroll (workers' compensation) and of
+# non-payroll spend (general liability)
+INSURANCE_RATES = {
+    "workers_compensation": 0.035,
+    "general_liability": 0.015
+}
+
+# USD value of one unit of each currency; callers override for the day's rates
+EXCHANGE_RATES = {"USD": 1.0, "INR": 0.012}
+
+# Shoot-day length assumed when there is no schedule to read hours from
+DEFAULT_DAY_HOURS = 10
+
+
+def rate_card_version(cost_templates: Dict[str, Any], union_rates: Dict[str, Any]) -> str:
+    """Published version plus a fingerprint of the tables in use."""
+    payload = json.dumps([cost_templates, union_rates], sort_keys=True, default=str)
+    return f"{RATE_CARD_VERSION}+{hashlib.sha1(payload.encode()).hexdigest()[:8]}"
@@ -0,0 +1,269 @@
+"""
+Scene-level cost attribution.
+
+Prices every scene from its breakdown card in one vectorized pass: page
+eighths give each scene's share of a shoot day, and that share is priced
+against the rate card for its location (studio, location tier, permits),
+the equipment package plus any special rigs the card calls for, its crew
+estimate and cast, and per-head logistics. When a priced budget is given,
+each category column is scaled to that budget's category total and
+insurance and contingency are spread by scene subtotal, so the scene table
+rolls up exactly to the category budget and the saving from cutting a scene
+is read straight off its row.
+"""
+
+from typing import Dict, Any, List, Optional, Iterable, Tuple
+import logging
+import time
+
+import numpy as np
+
+from scheduling.schedule_engine import SCHEDULE_RULES, EQUIPMENT_KEYWORDS, scene_eighths, scene_location
+from scheduling.unit_planner import merge_breakdown_cards, scene_crew_size
+from .budget_engine import BUDGET_CATEGORIES, STUDIO_SIZE_BY_QUALITY
+from .rate_cards import (
+    COST_TEMPLATES, UNION_RATES, TEMPLATE_CURRENCY, UNION_CURRENCY,
+    LOGISTICS_RATES, PERMIT_RATE, EXCHANGE_RATES, SPECIAL_EQUIPMENT_RATES
+)
+
+logger = logging.getLogger(__name__)
+
+# Cast scale category for characters the budget does not price by name
+DEFAULT_SCENE_CAST_CATEGORY = "supporting_actor"
+
+
+def _money(amount: Any) -> float:
+    return round(float(amount), 2)
+
+
+def _attribute(matrix: np.ndarray, totals: Dict[str, Any]) -> Tuple[np.ndarray, np.ndarray]:
+    """Scale each category column to the budget's total and spread insurance and contingency by subtotal."""
+    targets = np.array([float(totals.get(f"total_{category}", 0) or 0) for category in BUDGET_CATEGORIES])
+    sums = matrix.sum(axis=0)
+    # Categories no scene drives (zero column) are spread by scene subtotal instead
+    weights = matrix.sum(axis=1)
+    weights = weights / weights.sum() if weights.sum() > 0 else np.full(len(matrix), 1 / len(matrix))
+    scaled = np.where(sums > 0, matrix / np.where(sums > 0, sums, 1) * targets, weights[:, None] * targets)
+    overhead_total = float(totals.get("grand_total", 0) or 0) - float(targets.sum())
+    subtotal = scaled.sum(axis=1)
+    share = subtotal / subtotal.sum() if subtotal.sum() > 0 else weights
+    return scaled, share * max(overhead_total, 0.0)
+
+
+def scene_list(scene_data: Any) -> List[Dict[str, Any]]:
+    """Scenes with breakdown cards merged in, from script results, a list or a {scene_id: scene} dict."""
+    if isinstance(scene_data, dict) and isinstance(scene_data.get("scenes"), list):
+        cards = (scene_data.get("metadata") or {}).get("breakdown_cards") or scene_data.get("breakdown_cards")
+        return merge_breakdown_cards(scene_data["scenes"], cards)
+    if isinstance(scene_data, dict):
+        return [{"scene_number": scene_id, **scene} for scene_id, scene in scene_data.items() if isinstance(scene, dict)]
+    return list(scene_data or [])
+
+
+def scene_characters(scene: Dict[str, Any]) -> List[str]:
+    characters = scene.get("main_characters") or scene.get("characters") or scene.get("cast_requirements") or []
+    return [str(c.get("name", c)) if isinstance(c, dict) else str(c) for c in characters]
+
+
+def scene_rigs(scene: Dict[str, Any]) -> List[str]:
+    """Special equipment a scene calls for, from its card's equipment and special requirements."""
+    text = " ".join(
+        str(item) for key in ("equipment_needed", "special_requirements", "technical_cues")
+        for item in scene.get(key) or []
+    ).lower()
+    return sorted({rig for keyword, rig in EQUIPMENT_KEYWORDS.items() if keyword in text})
+
+
+class SceneCostModel:
+    """Vectorized per-scene pricing and attribution against a budget."""
+
+    def __init__(
+        self,
+        cost_templates: Optional[Dict[str, Any]] = None,
+        union_rates: Optional[Dict[str, Any]] = None,
+        rules: Optional[Dict[str, Any]] = None
+    ):
+        self.cost_templates = cost_templates or COST_TEMPLATES
+        self.union_rates = union_rates or UNION_RATES
+        self.rules = {**SCHEDULE_RULES, **(rules or {})}
+        hours_per_eighth = self.rules["hours_per_eighth"] * (1 + self.rules["setup_time_percentage"] + self.rules["wrap_time_percentage"])
+        self.eighths_per_day = min(self.rules["max_day_eighths"], self.rules["standard_day_hours"] / hours_per_eighth)
+
+    def price(
+        self,
+        scene_data: Any,
+        production_data: Optional[Dict[str, Any]] = None,
+        location_data: Optional[Dict[str, Any]] = None,
+        budget: Optional[Dict[str, Any]] = None
+    ) -> Dict[str, Any]:
+        """Per-scene cost table; attributed to budget's category totals when a budget is given."""
+        started = time.perf_counter()
+        production_data = production_data or {}
+        location_data = location_data or {}
+        scenes = scene_list(scene_data)
+        if not scenes:
+            raise ValueError("No scenes to price")
+
+        rate_card = (budget or {}).get("rate_card") or {}
+        region = str(rate_card.get("region") or location_data.get("region") or production_data.get("region") or "mumbai").lower()
+        templates = self.cost_templates.get(region, self.cost_templates["mumbai"])
+        quality = production_data.get("quality_level", "Medium")
+        tier = rate_card.get("tier") or ("premium" if quality == "High" else "basic")
+        currency = rate_card.get("currency", "USD")
+        exchange_rates = {**EXCHANGE_RATES, **(rate_card.get("exchange_rates") or {})}
+        inr = exchange_rates[TEMPLATE_CURRENCY] / exchange_rates[currency]
+        usd = exchange_rates[UNION_CURRENCY] / exchange_rates[currency]
+
+        ids = [str(scene.get("scene_number", i + 1)) for i, scene in enumerate(scenes)]
+        eighths = np.array([scene_eighths(scene, self.rules) for scene in scenes], dtype=float)
+        day_share = eighths / self.eighths_per_day
+        crew = np.array([scene_crew_size(scene) for scene in scenes], dtype=float)
+        characters = [scene_characters(scene) for scene in scenes]
+        cast = np.array([len(names) for names in characters], dtype=float)
+        places = [scene_location(scene) for scene in scenes]
+        rigs = [scene_rigs(scene) for scene in scenes]
+
+        # Location: studio rate for stages, tiered location rate plus permits elsewhere
+        premium_places = {
+            str(loc.get("name")) for loc in location_data.get("locations", [])
+            if isinstance(loc, dict) and str(loc.get("cost_category", "")).lower() == "premium"
+        }
+        studio = np.array([("studio" in place.lower() or "stage" in place.lower()) for place, _ in places])
+        premium = np.array([tier == "premium" or place in premium_places for place, _ in places])
+        location_rate = np.where(
+            studio,
+            templates["studio_rates"][STUDIO_SIZE_BY_QUALITY.get(quality, "medium")],
+            np.where(premium, templates["location_rates"]["premium"], templates["location_rates"]["basic"]) * (1 + PERMIT_RATE)
+        )
+        location_costs = location_rate * day_share * inr
+
+        # Equipment: the day's package plus any special rigs on the card
+        package = sum(rates.get(tier, rates["basic"]) for rates in templates["equipment_rates"].values())
+        rig_rate = np.array([sum(SPECIAL_EQUIPMENT_RATES.get(rig, 0) for rig in names) for names in rigs], dtype=float)
+        equipment_costs = (package + rig_rate) * day_share * inr
+
+        # Personnel: crew estimate at the blended crew day rate, cast at their budgeted or scale day rate
+        crew_rate = float(np.mean([rates["daily"] for rates in templates["crew_rates"].values()])) * inr
+        cast_rates = self._cast_day_rates(budget)
+        default_cast_rate = self.union_rates["sag_aftra"]["scale_rates"][DEFAULT_SCENE_CAST_CATEGORY]["daily_rate"] * usd
+        cast_rate = np.array([
+            sum(cast_rates.get(name, default_cast_rate) for name in names)
+            for names in characters
+        ], dtype=float)
+        personnel_costs = (crew * crew_rate + cast_rate) * day_share
+
+        # Logistics: catering per head and unit transport for the scene's share of the day
+        logistics_inr = exchange_rates[LOGISTICS_RATES["currency"]] / exchange_rates[currency]
+        logistics_costs = (
+            (crew + cast) * LOGISTICS_RATES["catering_per_head_day"]
+            + LOGISTICS_RATES["crew_transport_per_day"]
+            + np.where(cast > 0, LOGISTICS_RATES["cast_transport_per_day"], 0)
+        ) * day_share * logistics_inr
+
+        matrix = np.column_stack([location_costs, equipment_costs, personnel_costs, logistics_costs])
+        overhead = np.zeros(len(scenes))
+        attribution = "rate_card"
+        if budget and budget.get("total_estimates"):
+            matrix, overhead = _attribute(matrix, budget["total_estimates"])
+            attribution = "budget"
+        totals = matrix.sum(axis=1) + overhead
+
+        rows = {
+            scene_id: {
+                "location": places[i][0],
+                "location_type": places[i][1],
+                "eighths": _money(eighths[i]),
+                "shoot_days": round(float(day_share[i]), 3),
+                "crew": int(crew[i]),
+                "cast": characters[i],
+                "special_equipment": rigs[i],
+                **{category: _money(matrix[i, j]) for j, category in enumerate(BUDGET_CATEGORIES)},
+                "overhead": _money(overhead[i]),
+                "total_cost": _money(totals[i])
+            }
+            for i, scene_id in enumerate(ids)
+        }
+        result = {
+            "currency": currency,
+            "attribution": attribution,
+            "eighths_per_day": round(self.eighths_per_day, 2),
+            "scenes": rows,
+            "totals": {
+                **{f"total_{category}": _money(matrix[:, j].sum()) for j, category in enumerate(BUDGET_CATEGORIES)},
+                "overhead": _money(overhead.sum()),
+                "grand_total": _money(totals.sum())
+            },
+            "computation_ms": round((time.perf_counter() - started) * 1000, 3)
+        }
+        logger.info(f"Priced {len(ids)} scenes ({attribution}) in {result['computation_ms']} ms")
+        return result
+
+    def _cast_day_rates(self, budget: Optional[Dict[str, Any]]) -> Dict[str, float]:
+        """Day rate per performer name from a budget's cast lines, already in budget currency."""
+        lines = (budget or {}).get("personnel_costs") or {}
+        return {
+            name[len("Cast - "):]: float(line["daily_rate"])
+            for name, line in lines.items()
+            if name.startswith("Cast - ") and isinstance(line, dict) and line.get("daily_rate")
+        }
+
+
+def reattribute(scene_costs: Dict[str, Any], budget: Dict[str, Any]) -> Dict[str, Any]:
+    """Scene table rescaled to a budget's current totals, after edits or optimization changed them.
+
+    Each category column keeps its scene shares; overhead follows the
+    stored overhead shares, or scene subtotals if there were none.
+    """
+    totals = budget.get("total_estimates") or {}
+    ids = list(scene_costs["scenes"])
+    if not ids or not totals:
+        return scene_costs
+    rows = scene_costs["scenes"]
+    matrix = np.array([[rows[i][category] for category in BUDGET_CATEGORIES] for i in ids], dtype=float)
+    stored_overhead = np.array([rows[i]["overhead"] for i in ids], dtype=float)
+    matrix, overhead = _attribute(matrix, totals)
+    if stored_overhead.sum() > 0:
+        overhead = stored_overhead / stored_overhead.sum() * overhead.sum()
+    scenes = {
+        scene_id: {
+            **rows[scene_id],
+            **{category: _money(matrix[k, j]) for j, category in enumerate(BUDGET_CATEGORIES)},
+            "overhead": _money(overhead[k]),
+            "total_cost": _money(matrix[k].sum() + overhead[k])
+        }
+        for k, scene_id in enumerate(ids)
+    }
+    return {
+        **scene_costs,
+        "attribution": "budget",
+        "scenes": scenes,
+        "totals": {
+            **{f"total_{category}": _money(matrix[:, j].sum()) for j, category in enumerate(BUDGET_CATEGORIES)},
+            "overhead": _money(overhead.sum()),
+            "grand_total": _money(matrix.sum() + overhead.sum())
+        }
+    }
+
+
+def scene_cut_savings(scene_costs: Dict[str, Any], scene_ids: Iterable[Any], budget: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    """Category and total savings from dropping scenes, read off the scene cost table."""
+    scenes = scene_costs.get("scenes", {})
+    requested = [str(scene_id) for scene_id in scene_ids]
+    unknown = [scene_id for scene_id in requested if scene_id not in scenes]
+    if unknown:
+        raise ValueError(f"Unknown scenes: {', '.join(unknown)}")
+    removed = [scenes[scene_id] for scene_id in dict.fromkeys(requested)]
+    savings = {
+        category: _money(sum(row[category] for row in removed))
+        for category in BUDGET_CATEGORIES + ["overhead", "total_cost"]
+    }
+    grand_total = float(((budget or {}).get("total_estimates") or {}).get("grand_total", scene_costs["totals"]["grand_total"]))
+    return {
+        "scenes": list(dict.fromkeys(requested)),
+        "currency": scene_costs.get("currency"),
+        "eighths": _money(sum(row["eighths"] for row in removed)),
+        "shoot_days": round(sum(row["shoot_days"] for row in removed), 3),
+        "savings": savings,
+        "grand_total": _money(grand_total),
+        "grand_total_after_cuts": _money(grand_total - savings["total_cost"])
+    }
@@ -0,0 +1,409 @@
+"""
+Deterministic SAG-AFTRA / IATSE compliance engine.
+
+Evaluates a day-by-day shoot schedule and the cast's Day Out of Days against
+the union tables in rate_cards.py: scale wages with weekly caps, overtime,
+health/pension and vacation fringes (priced exactly as BudgetEngine prices
+them), tiered meal penalties for every started half hour a meal runs late,
+and turnaround penalties when a performer's rest between wrap and next call
+falls under 12 or 10 hours. Per-day rule terms are memoized by (rate card
+version, day hash) and whole results by (rate card version, schedule hash),
+so re-running an unchanged schedule is a cache hit and moving one shoot day
+re-evaluates only that day; penalties over all performers and days are then
+a few (cast x days) array operations.
+"""
+
+from typing import Dict, Any, List, Optional, Tuple
+from collections import OrderedDict
+import copy
+import hashlib
+import json
+import logging
+import time
+
+import numpy as np
+
+from .budget_engine import BudgetEngine, week_index
+from .rate_cards import COST_TEMPLATES, UNION_RATES, UNION_CURRENCY, DEFAULT_DAY_HOURS, rate_card_version
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CALL_TIME = "07:00"
+
+# Length of a meal break, and the late-meal increment that counts as one violation
+MEAL_BREAK_HOURS = 0.5
+MEAL_VIOLATION_HOURS = 0.5
+
+# Memo sizes: per-day rule terms and whole evaluations
+DAY_CACHE_SIZE = 4096
+RESULT_CACHE_SIZE = 64
+
+COMPLIANCE_REQUIREMENTS = {
+    "sag_aftra": [
+        "Maintain detailed timesheets for all performers",
+        "Ensure proper meal breaks (6 hours maximum)",
+        "Provide 12-hour turnaround between wrap and call",
+        "Submit weekly payroll reports to SAG-AFTRA",
+        "Maintain workers' compensation insurance"
+    ],
+    "iatse": [
+        "Pay prevailing wage rates for all crew positions",
+        "Provide overtime pay after 8 hours daily, 40 hours weekly",
+        "Contribute to health and pension funds",
+        "Maintain safe working conditions per OSHA standards",
+        "Provide proper meal breaks every 6 hours"
+    ]
+}
+
+
+def _clock_hours(value: Any) -> float:
+    """Hours after midnight for an "HH:MM" time (or a number of hours)."""
+    if isinstance(value, (int, float)):
+        return float(value)
+    hours, _, minutes = str(value).partition(":")
+    return int(hours) + int(minutes or 0) / 60
+
+
+def _hash(payload: Any) -> str:
+    return hashlib.sha1(json.dumps(payload, sort_keys=True, default=str).encode()).hexdigest()[:16]
+
+
+def normalize_days(schedule_data: Optional[Dict[str, Any]], production_data: Optional[Dict[str, Any]] = None) -> List[Dict[str, Any]]:
+    """Shoot days as {date, call, hours, meals, cast}; synthetic days when there is no day list."""
+    schedule_data = schedule_data or {}
+    day_list = schedule_data.get("days") or schedule_data.get("schedule") or []
+    if not day_list:
+        count = schedule_data.get("total_days") or (production_data or {}).get("schedule_days") or 1
+        day_list = [{} for _ in range(max(int(count), 1))]
+
+    days = []
+    for day in day_list:
+        meals = day.get("meal_breaks")
+        days.append({
+            "date": str(day["date"])[:10] if day.get("date") else None,
+            "call": _clock_hours(day.get("call_time") or day.get("start_time") or DEFAULT_CALL_TIME),
+            "hours": float(day.get("work_hours") or DEFAULT_DAY_HOURS),
+            "meals": sorted(float(meal) for meal in meals) if meals is not None else None,
+            "cast": sorted(str(name) for name in day["cast"]) if "cast" in day else None
+        })
+    return days
+
+
+class UnionComplianceEngine:
+    """Prices union wages, fringes and penalties for a schedule, memoizing per day and per schedule."""
+
+    def __init__(self, union_rates: Optional[Dict[str, Any]] = None, cost_templates: Optional[Dict[str, Any]] = None):
+        self.union_rates = union_rates or UNION_RATES
+        self.cost_templates = cost_templates or COST_TEMPLATES
+        self.budget_engine = BudgetEngine(self.cost_templates, self.union_rates)
+        self.version = rate_card_version(self.cost_templates, self.union_rates)
+        self._day_terms: "OrderedDict[Tuple[str, str], Dict[str, float]]" = OrderedDict()
+        self._results: "OrderedDict[Tuple[str, str], Dict[str, Any]]" = OrderedDict()
+
+    def evaluate(
+        self,
+        cast_data: Optional[Dict[str, Any]],
+        crew_data: Optional[Dict[str, Any]],
+        schedule_data: Optional[Dict[str, Any]],
+        production_type: str = "independent",
+        production_data: Optional[Dict[str, Any]] = None
+    ) -> Dict[str, Any]:
+        """Union costs, penalties and a per-day compliance table for a schedule.
+
+        schedule_data["days"] (or ["schedule"]) lists shoot days with date,
+        call_time ("HH:MM"), work_hours, meal_breaks (hours after call) and the
+        cast working; cast_data is the cast list or DOOP BudgetEngine accepts.
+        """
+        started = time.perf_counter()
+        production_data = production_data or {}
+        days = normalize_days(schedule_data, production_data)
+        region = str(production_data.get("region") or "mumbai").lower()
+        union = bool(production_data.get("union", True))
+        key = (self.version, _hash([days, cast_data, crew_data, production_type, region, union]))
+
+        if key in self._results:
+            self._results.move_to_end(key)
+            result = copy.deepcopy(self._results[key])
+            result["cache"] = {"result": "hit", "days": len(days), "days_repriced": 0}
+            result["computation_ms"] = round((time.perf_counter() - started) * 1000, 3)
+            return result
+
+        terms, repriced = self._terms(days)
+        result = self._evaluate(days, terms, cast_data or {}, crew_data or {}, production_type, region, union)
+        result["rate_card"] = self.version
+        result["schedule_hash"] = key[1]
+        self._results[key] = result
+        if len(self._results) > RESULT_CACHE_SIZE:
+            self._results.popitem(last=False)
+
+        result = copy.deepcopy(result)
+        result["cache"] = {"result": "miss", "days": len(days), "days_repriced": repriced}
+        result["computation_ms"] = round((time.perf_counter() - started) * 1000, 3)
+        logger.info(
+            f"Union compliance {result['total_union_costs']:,.2f} {UNION_CURRENCY}: "
+            f"{repriced} of {len(days)} days evaluated in {result['computation_ms']} ms"
+        )
+        return result
+
+    def _terms(self, days: List[Dict[str, Any]]) -> Tuple[Dict[str, np.ndarray], int]:
+        """Per-day rule terms as arrays, computing only days not already memoized."""
+        rows, repriced = [], 0
+        for day in days:
+            key = (self.version, _hash([day["hours"], day["meals"]]))
+            if key in self._day_terms:
+                self._day_terms.move_to_end(key)
+            else:
+                self._day_terms[key] = self._day_rules(day["hours"], day["meals"])
+                repriced += 1
+                if len(self._day_terms) > DAY_CACHE_SIZE:
+                    self._day_terms.popitem(last=False)
+            rows.append(self._day_terms[key])
+        terms = {name: np.array([row[name] for row in rows], dtype=float) for name in rows[0]} if rows else {}
+        return terms, repriced
+
+    def _day_rules(self, hours: float, meals: Optional[List[float]]) -> Dict[str, float]:
+        """Meal violations and penalties for one day's length and meal times.
+
+        Overtime is not counted here: the budget engine already prices it into
+        the cast and crew wage lines from the same day hours.
+        """
+        sag = self.union_rates["sag_aftra"]
+        iatse = self.union_rates["iatse"]
+        requirements = iatse["meal_requirements"]
+        if meals is None:
+            # No meal times given: one meal called at the first deadline
+            meals = [float(requirements["first_meal"])] if hours > requirements["first_meal"] else []
+        meals = [meal for meal in meals if 0 <= meal < hours]
+
+        # Work stretches between call, meals and wrap, each with its own meal deadline
+        starts = np.array([0.0] + [meal + MEAL_BREAK_HOURS for meal in meals])
+        ends = np.array(meals + [hours])
+        limits = np.array([requirements["first_meal"]] + [requirements["subsequent_meals"]] * len(meals), dtype=float)
+        late = np.maximum(ends - starts - limits, 0)
+        units = int(np.ceil(late / MEAL_VIOLATION_HOURS - 1e-9).sum())
+
+        # SAG-AFTRA meal penalties escalate with each violation in the day
+        tiers = sag["meal_penalties"]
+        sag_meal = sum(
+            tiers["first_violation"] if unit == 0 else tiers["second_violation"] if unit == 1 else tiers["subsequent_violations"]
+            for unit in range(units)
+        )
+        return {
+            "meal_violations": units,
+            "sag_meal_penalty": float(sag_meal),
+            "iatse_meal_penalty": float(units * requirements["meal_penalty"])
+        }
+
+    def _rest_hours(self, days: List[Dict[str, Any]]) -> np.ndarray:
+        """Hours between the previous day's wrap and each day's call (inf for the first day)."""
+        n_days = len(days)
+        if all(day["date"] for day in days):
+            day_number = np.asarray([day["date"] for day in days], dtype="datetime64[D]").astype(np.int64)
+        else:
+            # Undated schedules are taken as consecutive shoot days
+            day_number = np.arange(n_days)
+        calls = day_number * 24.0 + np.array([day["call"] for day in days])
+        wraps = calls + np.array([day["hours"] for day in days])
+        rest = np.full(n_days, np.inf)
+        rest[1:] = calls[1:] - wraps[:-1]
+        return rest
+
+    def _evaluate(
+        self,
+        days: List[Dict[str, Any]],
+        terms: Dict[str, np.ndarray],
+        cast_data: Dict[str, Any],
+        crew_data: Dict[str, Any],
+        production_type: str,
+        region: str,
+        union: bool
+    ) -> Dict[str, Any]:
+        sag = self.union_rates["sag_aftra"]
+        iatse = self.union_rates["iatse"]
+        n_days = len(days)
+        dates = [day["date"] for day in days]
+        day_info = {
+            "hours": np.array([day["hours"] for day in days]),
+            "week": week_index(dates) if all(dates) else np.arange(n_days) // 5,
+            "cast": [set(day["cast"] or []) for day in days] if any(day["cast"] is not None for day in days) else None
+        }
+        cast = self.budget_engine._cast_matrix(cast_data, day_info)
+        templates = self.cost_templates.get(region, self.cost_templates["mumbai"])
+        crew = self.budget_engine._crew_roster(crew_data, templates)
+
+        # Wages and fringes exactly as the rate-card budget prices them, in union currency
+        conversion = {code: 1.0 for code in set(crew["currency"]) | {UNION_CURRENCY}}
+        cast_lines = list(self.budget_engine._price_cast(cast, day_info, union, conversion).values())
+        crew_lines = list(self.budget_engine._price_crew(crew, day_info, union, conversion).values())
+
+        # Penalties over the (cast x days) work matrix
+        worked = cast["worked"].astype(float) * cast["count"][:, None]
+        rest = self._rest_hours(days)
+        turnaround = sag["turnaround_violations"]
+        rest_penalty = np.where(rest < 10, turnaround["less_than_10_hours"], np.where(rest < 12, turnaround["less_than_12_hours"], 0.0))
+        consecutive = np.zeros_like(worked)
+        consecutive[:, 1:] = worked[:, 1:] * cast["worked"][:, :-1]
+        meal_cost = worked * terms["sag_meal_penalty"]
+        turnaround_cost = consecutive * rest_penalty
+        meal_violations = worked * terms["meal_violations"]
+        turnaround_violations = consecutive * (rest_penalty > 0)
+
+        union_crew = crew["union_scale"] if union else np.zeros(len(crew["role"]), dtype=bool)
+        union_headcount = float(crew["count"][union_crew].sum())
+        crew_meal_cost = union_headcount * terms["iatse_meal_penalty"]
+
+        sag_aftra = self._sag_summary(cast, cast_lines, meal_cost, turnaround_cost, meal_violations, turnaround_violations, union)
+        iatse_summary = self._iatse_summary(crew, crew_lines, union_crew, crew_meal_cost, union_headcount * terms["meal_violations"])
+
+        daily = [
+            {
+                "day": d + 1,
+                "date": days[d]["date"],
+                "call_time": f"{int(days[d]['call']):02d}:{round(days[d]['call'] % 1 * 60):02d}",
+                "work_hours": days[d]["hours"],
+                "rest_hours": round(float(rest[d]), 2) if np.isfinite(rest[d]) else None,
+                "performers": int(round(worked[:, d].sum())),
+                "meal_violations": int(terms["meal_violations"][d]),
+                "turnaround_violations": int(round(turnaround_violations[:, d].sum())),
+                "penalties": round(float(meal_cost[:, d].sum() + turnaround_cost[:, d].sum() + crew_meal_cost[d]), 2)
+            }
+            for d in range(n_days)
+        ]
+
+        total = sag_aftra["estimated_total"] + iatse_summary["estimated_total"]
+        return {
+            "sag_aftra": sag_aftra,
+            "iatse": iatse_summary,
+            "daily": daily,
+            "compliance_requirements": copy.deepcopy(COMPLIANCE_REQUIREMENTS),
+            "total_union_costs": round(total, 2),
+            "currency": UNION_CURRENCY,
+            "production_type": production_type,
+            "recommendations": self._recommendations(daily),
+            "engine": "union_rules"
+        }
+
+    def _sag_summary(
+        self,
+        cast: Dict[str, Any],
+        lines: List[Dict[str, Any]],
+        meal_cost: np.ndarray,
+        turnaround_cost: np.ndarray,
+        meal_violations: np.ndarray,
+        turnaround_violations: np.ndarray,
+        union: bool
+    ) -> Dict[str, Any]:
+        sag = self.union_rates["sag_aftra"]
+        scale_rates = {}
+        performers = {}
+        for i, line in enumerate(lines):
+            category = cast["categories"][i]
+            entry = scale_rates.setdefault(category, {
+                "daily_rate": line["daily_rate"],
+                "weekly_rate": line["weekly_rate"],
+                "count": 0,
+                "person_days": 0,
+                "base_cost": 0.0,
+                "overtime_cost": 0.0,
+                "total_cost": 0.0
+            })
+            entry["count"] += line["headcount"]
+            entry["person_days"] += line["total_days"] * line["headcount"]
+            entry["base_cost"] = round(entry["base_cost"] + line["base_cost"], 2)
+            entry["overtime_cost"] = round(entry["overtime_cost"] + line["overtime_cost"], 2)
+            entry["total_cost"] = round(entry["total_cost"] + line["base_cost"] + line["overtime_cost"], 2)
+            performers[cast["names"][i]] = {
+                "category": category,
+                "work_days": line["total_days"],
+                "gross_wages": round(line["base_cost"] + line["overtime_cost"], 2),
+                "fringes": line["benefits"],
+                "meal_penalties": round(float(meal_cost[i].sum()), 2),
+                "turnaround_penalties": round(float(turnaround_cost[i].sum()), 2)
+            }
+        if "stunt_performer" in scale_rates:
+            scale_rates["stunt_performer"]["hazard_pay"] = sag["scale_rates"]["stunt_performer"].get("hazard_pay", 0)
+
+        gross = sum(entry["total_cost"] for entry in scale_rates.values())
+        fringes = sum(line["benefits"] for line in lines)
+        vacation = gross * sag["benefits"]["vacation_holiday"]["percentage"] / 100 if union else 0.0
+        meal_total = float(meal_cost.sum())
+        turnaround_total = float(turnaround_cost.sum())
+        return {
+            "scale_rates": scale_rates,
+            "performers": performers,
+            "benefits": {
+                "health_pension": {
+                    "percentage": sag["benefits"]["health_pension"]["percentage"],
+                    # Includes the minimum contribution for principal performers
+                    "calculated_amount": round(fringes - vacation, 2)
+                },
+                "vacation_holiday": {
+                    "percentage": sag["benefits"]["vacation_holiday"]["percentage"],
+                    "calculated_amount": round(vacation, 2)
+                }
+            },
+            "penalties": {
+                "meal_penalties": {
+                    "estimated_violations": int(round(meal_violations.sum())),
+                    "total_cost": round(meal_total, 2)
+                },
+                "turnaround_violations": {
+                    "estimated_violations": int(round(turnaround_violations.sum())),
+                    "total_cost": round(turnaround_total, 2)
+                }
+            },
+            "estimated_total": round(gross + fringes + meal_total + turnaround_total, 2)
+        }
+
+    def _iatse_summary(
+        self,
+        crew: Dict[str, Any],
+        lines: List[Dict[str, Any]],
+        union_crew: np.ndarray,
+        meal_cost: np.ndarray,
+        meal_violations: np.ndarray
+    ) -> Dict[str, Any]:
+        iatse = self.union_rates["iatse"]
+        crew_costs = {}
+        for i, line in enumerate(lines):
+            if not union_crew[i]:
+                continue
+            entry = crew_costs.setdefault(crew["department"][i], {"headcount": 0, "base_cost": 0.0, "overtime_cost": 0.0, "total_cost": 0.0})
+            entry["headcount"] += line["headcount"]
+            entry["base_cost"] = round(entry["base_cost"] + line["base_cost"], 2)
+            entry["overtime_cost"] = round(entry["overtime_cost"] + line["overtime_cost"], 2)
+            entry["total_cost"] = round(entry["total_cost"] + line["base_cost"] + line["overtime_cost"], 2)
+
+        gross = sum(entry["total_cost"] for entry in crew_costs.values())
+        benefits = {
+            name: {"percentage": benefit["percentage"], "calculated_amount": round(gross * benefit["percentage"] / 100, 2)}
+            for name, benefit in iatse["benefits"].items()
+        }
+        meal_total = float(meal_cost.sum())
+        return {
+            "department_minimums": dict(iatse["department_minimums"]),
+            "crew_costs": crew_costs,
+            "benefits": benefits,
+            "penalties": {
+                "meal_penalties": {
+                    "estimated_violations": int(round(meal_violations.sum())),
+                    "total_cost": round(meal_total, 2)
+                }
+            },
+            "estimated_total": round(gross + sum(b["calculated_amount"] for b in benefits.values()) + meal_total, 2)
+        }
+
+    def _recommendations(self, daily: List[Dict[str, Any]]) -> List[str]:
+        recommendations = []
+        late_meals = [row["day"] for row in daily if row["meal_violations"]]
+        short_rest = [row["day"] for row in daily if row["turnaround_violations"]]
+        if late_meals:
+            recommendations.append(f"Call meals earlier on shoot days {', '.join(map(str, late_meals[:10]))} to avoid meal penalties")
+        if short_rest:
+            recommendations.append(f"Push call times on shoot days {', '.join(map(str, short_rest[:10]))} to give a 12-hour turnaround")
+        long_days = [row["day"] for row in daily if row["work_hours"] > self.union_rates["iatse"]["overtime_rules"]["daily_overtime"]]
+        if long_days:
+            recommendations.append(f"{len(long_days)} shoot days run past {self.union_rates['iatse']['overtime_rules']['daily_overtime']} hours; split them to cut overtime")
+        if not recommendations:
+            recommendations.append("Schedule is clear of meal and turnaround penalties")
+        return recommendations
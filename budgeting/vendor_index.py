@@ -0,0 +1,172 @@
+"""
+Vendor analytics index.
+
+Keeps running aggregates per vendor: spend by category, payments, delivery
+count, on-time deliveries and delay total, rating count and total, and each
+quoted rate's variance against its market benchmark. Benchmarks come from the
+vendor's own market_rates or, failing that, from the regional cost_templates
+rate card. Posting an expense or a delivery updates one vendor's counters, and
+a vendor's metrics are read straight off them, so reports and rankings do not
+depend on how much expense history a project has.
+"""
+
+from typing import Dict, Any, List, Optional
+
+from .rate_cards import COST_TEMPLATES
+
+# Delay (days) up to which a delivery still counts as on time
+ON_TIME_TOLERANCE_DAYS = 0
+
+RANKING_METRICS = ["total_spend", "on_time_ratio", "mean_delay", "mean_rating", "rate_variance", "outstanding"]
+
+
+def template_benchmarks(templates: Dict[str, Any]) -> Dict[str, float]:
+    """Flatten one region's rate card into service -> benchmark rate.
+
+    Tiered rates are keyed "<service>_<tier>" with the basic tier also under
+    the bare service name; crew rates use the daily rate.
+    """
+    benchmarks = {}
+    for size, rate in templates.get("studio_rates", {}).items():
+        benchmarks[f"studio_{size}"] = rate
+    for tier, rate in templates.get("location_rates", {}).items():
+        benchmarks[f"location_{tier}"] = rate
+    benchmarks["location"] = templates.get("location_rates", {}).get("basic", 0)
+    for service, tiers in templates.get("equipment_rates", {}).items():
+        for tier, rate in tiers.items():
+            benchmarks[f"{service}_{tier}"] = rate
+        benchmarks[service] = tiers.get("basic", 0)
+    for role, rates in templates.get("crew_rates", {}).items():
+        benchmarks[role] = rates.get("daily", 0)
+    return {service: float(rate) for service, rate in benchmarks.items() if rate}
+
+
+def _empty_counters() -> Dict[str, float]:
+    return {"deliveries": 0, "on_time": 0, "delay_total": 0.0, "ratings": 0, "rating_total": 0.0}
+
+
+def _empty_vendor(name: str = "Unknown") -> Dict[str, Any]:
+    # Delivery and rating counters are kept apart for the vendor record, which
+    # is replaced on every registration, and for posted expenses, which accumulate
+    return {
+        "name": name,
+        "total_spend": 0.0,
+        "expense_count": 0,
+        "categories": {},
+        "total_paid": 0.0,
+        "payment_history": [],
+        "scheduled_payments": [],
+        "record": _empty_counters(),
+        "posted": _empty_counters(),
+        "rate_comparison": {},
+        "issues": []
+    }
+
+
+class VendorIndex:
+    """Per-vendor aggregates; serializes to a plain dict for the session store."""
+
+    def __init__(self, state: Optional[Dict[str, Any]] = None, region: str = "mumbai", cost_templates: Optional[Dict[str, Any]] = None):
+        state = state or {}
+        self.region = state.get("region", region)
+        templates = (cost_templates or COST_TEMPLATES).get(self.region, COST_TEMPLATES["mumbai"])
+        self.benchmarks = template_benchmarks(templates)
+        self.vendors: Dict[str, Dict[str, Any]] = state.get("vendors", {})
+
+    def _vendor(self, vendor_id: str) -> Dict[str, Any]:
+        return self.vendors.setdefault(vendor_id, _empty_vendor())
+
+    def register_vendor(self, vendor_id: str, vendor: Dict[str, Any]) -> None:
+        """Load a vendor record (payments, deliveries, ratings, rates); replaces what that record set before."""
+        entry = self._vendor(vendor_id)
+        entry["name"] = vendor.get("name", entry["name"])
+
+        payments = vendor.get("payments", [])
+        entry["payment_history"] = payments
+        entry["total_paid"] = float(sum(payment["amount"] for payment in payments))
+        entry["scheduled_payments"] = vendor.get("scheduled_payments", [])
+        entry["issues"] = vendor.get("issues", [])
+
+        delays = [float(delay["days"]) for delay in vendor.get("delivery_delays", [])]
+        scores = [float(rating["score"]) for rating in vendor.get("quality_ratings", [])]
+        entry["record"] = {
+            "deliveries": len(delays),
+            "on_time": sum(1 for days in delays if days <= ON_TIME_TOLERANCE_DAYS),
+            "delay_total": sum(delays),
+            "ratings": len(scores),
+            "rating_total": sum(scores)
+        }
+
+        market_rates = vendor.get("market_rates", {})
+        entry["rate_comparison"] = {}
+        for service, rate in vendor.get("rates", {}).items():
+            benchmark = market_rates.get(service, self.benchmarks.get(str(service).lower()))
+            if benchmark:
+                entry["rate_comparison"][service] = {
+                    "vendor_rate": rate,
+                    "market_rate": benchmark,
+                    "variance_percent": (rate - benchmark) / benchmark * 100
+                }
+
+    def register_vendors(self, vendor_data: Dict[str, Any]) -> "VendorIndex":
+        for vendor_id, vendor in (vendor_data or {}).items():
+            self.register_vendor(vendor_id, vendor)
+        return self
+
+    def post_expense(self, expense: Dict[str, Any]) -> None:
+        """Add one expense (and any delivery delay or rating it carries) to its vendor."""
+        vendor_id = expense.get("vendor_id")
+        if not vendor_id:
+            return
+        entry = self._vendor(vendor_id)
+        amount = float(expense.get("amount", expense.get("total_cost", 0)))
+        entry["total_spend"] += amount
+        entry["expense_count"] += 1
+        category = expense.get("category", "other_costs")
+        entry["categories"][category] = entry["categories"].get(category, 0.0) + amount
+        posted = entry["posted"]
+        if expense.get("delay_days") is not None:
+            posted["deliveries"] += 1
+            posted["on_time"] += int(float(expense["delay_days"]) <= ON_TIME_TOLERANCE_DAYS)
+            posted["delay_total"] += float(expense["delay_days"])
+        if expense.get("rating") is not None:
+            posted["ratings"] += 1
+            posted["rating_total"] += float(expense["rating"])
+
+    def post_actuals(self, actuals: Dict[str, Any]) -> "VendorIndex":
+        """Post an actual_expenses dict ({category: {expense_id: expense}}) in one pass."""
+        for category, expenses in (actuals or {}).items():
+            if isinstance(expenses, dict):
+                for expense in expenses.values():
+                    if isinstance(expense, dict):
+                        self.post_expense({**expense, "category": category})
+        return self
+
+    def metrics(self, vendor_id: str) -> Dict[str, Any]:
+        """Derived metrics for one vendor, read off its counters."""
+        entry = self.vendors[vendor_id]
+        counters = {key: entry["record"][key] + entry["posted"][key] for key in entry["record"]}
+        comparisons = entry["rate_comparison"].values()
+        return {
+            "vendor_id": vendor_id,
+            "name": entry["name"],
+            "total_spend": entry["total_spend"],
+            "total_paid": entry["total_paid"],
+            "outstanding": entry["total_spend"] - entry["total_paid"],
+            "on_time_ratio": counters["on_time"] / counters["deliveries"] if counters["deliveries"] else None,
+            "mean_delay": counters["delay_total"] / counters["deliveries"] if counters["deliveries"] else 0.0,
+            "mean_rating": counters["rating_total"] / counters["ratings"] if counters["ratings"] else 0.0,
+            "rate_variance": sum(c["variance_percent"] for c in comparisons) / len(comparisons) if comparisons else 0.0
+        }
+
+    def rank(self, metric: str = "total_spend", descending: bool = True, limit: Optional[int] = None) -> List[Dict[str, Any]]:
+        if metric not in RANKING_METRICS:
+            raise ValueError(f"Unknown vendor metric: {metric}")
+        rows = [self.metrics(vendor_id) for vendor_id in self.vendors]
+        # Vendors without data for the metric go last either way
+        ranked = sorted((row for row in rows if row[metric] is not None), key=lambda row: row[metric], reverse=descending)
+        ranked += [row for row in rows if row[metric] is None]
+        return ranked[:limit] if limit else ranked
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {"region": self.region, "vendors": self.vendors}
@@ -1,8 +1,10 @@
 from typing import Dict, Any, List
 import json
 import logging
-from datetime import datetime, timedelta
+from datetime import datetime
 from base_config import AGENT_INSTRUCTIONS, get_model_config
+from ..calendar_engine import ProductionCalendar, as_datetime
+from ..scene_features import compute_scene_features
 from google import genai
 from google.genai import types
 import os
@@ -38,7 +40,12 @@ class AssistantDirectorAgent:
         Focus on advanced scheduling optimization with StudioBinder-level precision."""
         logger.info("AssistantDirectorAgent initialized")
     
-    async def generate_stripboard_doop(self, scene_data: Dict[str, Any]) -> Dict[str, Any]:
+    async def generate_stripboard_doop(
+        self,
+        scene_data: Dict[str, Any],
+        project_parameters: Dict[str, Any] = None,
+        features: Dict[str, Any] = None
+    ) -> Dict[str, Any]:
         """Generate stripboard and DOOP reports for scheduling optimization."""
         logger.info("Starting stripboard and DOOP generation")
         
@@ -49,14 +56,17 @@ class AssistantDirectorAgent:
         scenes = scene_data.get('scenes', [])
         logger.info(f"Processing stripboard/DOOP for {len(scenes)} scenes")
         
+        # Reuse the coordinator's shared features when provided
+        features = features or compute_scene_features(scenes)
+        
         # Generate stripboard
         stripboard = self._generate_stripboard(scenes)
         
         # Generate DOOP reports
-        doop_reports = self._generate_doop_reports(scenes)
+        doop_reports = self._generate_doop_reports(scenes, features)
         
         # Generate call sheets
-        call_sheets = self._generate_call_sheets(scenes, doop_reports)
+        call_sheets = self._generate_call_sheets(scenes, doop_reports, project_parameters)
         
         # Schedule optimization
         optimized_schedule = self._optimize_schedule(scenes, stripboard)
@@ -67,12 +77,31 @@ class AssistantDirectorAgent:
             "doop_reports": doop_reports,
             "call_sheets": call_sheets,
             "optimized_schedule": optimized_schedule,
-            "scheduling_statistics": self._generate_scheduling_stats(scenes, doop_reports)
+            "scheduling_statistics": self._generate_scheduling_stats(scenes, doop_reports, features)
         }
         
         logger.info(f"Generated stripboard/DOOP for {len(scenes)} scenes")
         return result
     
+    def generate_unit_stripboards(self, scenes: List[Dict[str, Any]], unit_plan: Dict[str, Any]) -> Dict[str, Any]:
+        """Generate one stripboard per shooting unit, ordered by that unit's schedule."""
+        scenes_by_number = {str(scene.get('scene_number', '0')): scene for scene in scenes}
+        stripboards = {}
+
+        for unit_name, unit in unit_plan.get("units", {}).items():
+            stripboard = self._generate_stripboard([scenes_by_number[n] for n in unit["scene_numbers"]])
+            stripboard["unit"] = unit_name
+            stripboard["shooting_order"] = [
+                slot["scene_id"] for day in unit["schedule"] for slot in day["scenes"]
+            ]
+            stripboard["day_breaks"] = [
+                {"day": day["day"], "date": day["date"], "scenes": [slot["scene_id"] for slot in day["scenes"]]}
+                for day in unit["schedule"]
+            ]
+            stripboards[unit_name] = stripboard
+
+        return stripboards
+
     def _generate_stripboard(self, scenes: List[Dict[str, Any]]) -> Dict[str, Any]:
         """Generate color-coded stripboard for scene organization."""
         stripboard = {
@@ -217,24 +246,20 @@ class AssistantDirectorAgent:
         
         return shooting_order
     
-    def _generate_doop_reports(self, scenes: List[Dict[str, Any]]) -> Dict[str, Any]:
+    def _generate_doop_reports(self, scenes: List[Dict[str, Any]], features: Dict[str, Any]) -> Dict[str, Any]:
         """Generate Day Out of Days reports for cast scheduling."""
         doop_reports = {}
         
-        # Collect all characters
-        all_characters = set()
-        for scene in scenes:
-            all_characters.update(scene.get('main_characters', []))
+        # Collect every character's scenes in a single pass over the cast sets
+        character_days = {character: [] for character in features["all_cast"]}
+        for i, cast in enumerate(features["cast_sets"]):
+            for character in cast:
+                character_days[character].append(i)
         
         # Generate DOOP for each character
-        for character in all_characters:
-            character_scenes = []
-            work_days = []
-            
-            for i, scene in enumerate(scenes):
-                if character in scene.get('main_characters', []):
-                    character_scenes.append(scene.get('scene_number', '0'))
-                    work_days.append(i + 1)  # Day number
+        for character, scene_indexes in character_days.items():
+            character_scenes = [features["scene_numbers"][i] for i in scene_indexes]
+            work_days = [i + 1 for i in scene_indexes]  # Day number
             
             # Generate weekly layout
             weekly_layout = self._generate_weekly_layout(work_days)
@@ -338,9 +363,13 @@ class AssistantDirectorAgent:
         
         return False
     
-    def _generate_call_sheets(self, scenes: List[Dict[str, Any]], doop_reports: Dict[str, Any]) -> Dict[str, Any]:
+    def _generate_call_sheets(self, scenes: List[Dict[str, Any]], doop_reports: Dict[str, Any], project_parameters: Dict[str, Any] = None) -> Dict[str, Any]:
         """Generate call sheets for each shooting day."""
         call_sheets = {}
+        project_parameters = project_parameters or {}
+        start_date = project_parameters.get("start_date") or datetime.now().strftime('%Y-%m-%d')
+        calendar = ProductionCalendar.from_constraints(project_parameters.get("schedule_constraints"), start_date)
+        shoot_dates = calendar.shoot_dates(start_date, len(scenes))
         
         for day_index, scene in enumerate(scenes):
             day_number = day_index + 1
@@ -349,7 +378,7 @@ class AssistantDirectorAgent:
             # Base call sheet information
             call_sheet = {
                 "day": day_number,
-                "date": (datetime(2024, 3, 15) + timedelta(days=day_index)).strftime('%B %d, %Y'),
+                "date": as_datetime(shoot_dates[day_index]).strftime('%B %d, %Y'),
                 "scenes": [scene_number],
                 "location": scene.get('location', {}).get('place', 'Unknown'),
                 "cast_call_times": {},
@@ -454,7 +483,7 @@ class AssistantDirectorAgent:
         
         return conflicts
     
-    def _generate_scheduling_stats(self, scenes: List[Dict[str, Any]], doop_reports: Dict[str, Any]) -> Dict[str, Any]:
+    def _generate_scheduling_stats(self, scenes: List[Dict[str, Any]], doop_reports: Dict[str, Any], features: Dict[str, Any]) -> Dict[str, Any]:
         """Generate overall scheduling statistics."""
         stats = {
             "total_scenes": len(scenes),
@@ -475,20 +504,13 @@ class AssistantDirectorAgent:
             stats["average_work_days_per_actor"] = round(total_work_days / len(doop_reports), 1)
         
         # Location count
-        locations = set()
-        for scene in scenes:
-            locations.add(scene.get('location', {}).get('place', 'Unknown'))
-        stats["location_count"] = len(locations)
+        stats["location_count"] = len(features["location_groups"])
         
         # Complexity distribution
-        for scene in scenes:
-            complexity_score = len(scene.get('technical_cues', []))
-            if complexity_score >= 5:
-                stats["complexity_distribution"]["high"] += 1
-            elif complexity_score >= 2:
-                stats["complexity_distribution"]["medium"] += 1
-            else:
-                stats["complexity_distribution"]["standard"] += 1
+        cue_counts = features["technical_cue_counts"]
+        stats["complexity_distribution"]["high"] = int((cue_counts >= 5).sum())
+        stats["complexity_distribution"]["medium"] = int(((cue_counts >= 2) & (cue_counts < 5)).sum())
+        stats["complexity_distribution"]["standard"] = int((cue_counts < 2).sum())
         
         # Estimated total shoot days (scenes grouped by location)
         stats["estimated_total_shoot_days"] = (len(scenes) + 2) // 3  # Rough estimate
@@ -1,6 +1,7 @@
 from typing import Dict, Any, List
 import json
 import logging
+import re
 from datetime import datetime, timedelta
 from base_config import AGENT_INSTRUCTIONS, get_model_config
 from google import genai
@@ -53,7 +54,7 @@ class CrewAllocatorAgent:
         department_schedules = self._generate_department_schedules(scenes)
         
         # Create crew assignments
-        crew_assignments = self._create_crew_assignments(scenes, department_schedules)
+        crew_assignments = self._create_crew_assignments(scenes, department_schedules, crew_availability)
         
         # Generate work hour compliance
         work_hour_compliance = self._generate_work_hour_compliance(crew_assignments)
@@ -147,6 +148,175 @@ class CrewAllocatorAgent:
         
         return departments
     
+    def _assess_camera_complexity(self, scene: Dict[str, Any]) -> str:
+        """Assess camera complexity from technical cues."""
+        cues = " ".join(str(cue).lower() for cue in scene.get('technical_cues', []))
+        special_moves = sum(keyword in cues for keyword in ('steadicam', 'crane', 'drone', 'dolly', 'track', 'underwater'))
+        if special_moves >= 2 or len(scene.get('technical_cues', [])) > 5:
+            return "high"
+        if special_moves == 1 or len(scene.get('technical_cues', [])) > 2:
+            return "medium"
+        return "standard"
+    
+    def _assess_sound_complexity(self, scene: Dict[str, Any]) -> str:
+        """Assess sound complexity from dialogue load and location type."""
+        dialogue_count = len(scene.get('dialogues', []))
+        exterior = scene.get('location', {}).get('type') == 'EXT'
+        if dialogue_count > 10 or (exterior and dialogue_count > 5):
+            return "high"
+        if dialogue_count > 3 or exterior:
+            return "medium"
+        return "standard"
+    
+    def _assess_lighting_complexity(self, scene: Dict[str, Any]) -> str:
+        """Assess lighting complexity from time of day and location type."""
+        night = 'NIGHT' in str(scene.get('time', '')).upper()
+        exterior = scene.get('location', {}).get('type') == 'EXT'
+        if night and exterior:
+            return "high"
+        if night or exterior:
+            return "medium"
+        return "standard"
+    
+    def _assess_grip_complexity(self, scene: Dict[str, Any]) -> str:
+        """Assess grip complexity from rigging-heavy technical cues."""
+        cues = " ".join(str(cue).lower() for cue in scene.get('technical_cues', []))
+        rigging = sum(keyword in cues for keyword in ('crane', 'dolly', 'track', 'rig', 'jib'))
+        if rigging >= 2:
+            return "high"
+        if rigging == 1:
+            return "medium"
+        return "standard"
+    
+    def _calculate_camera_crew_needed(self, complexity: str) -> int:
+        return {"standard": 3, "medium": 4, "high": 6}.get(complexity, 3)
+    
+    def _calculate_sound_crew_needed(self, complexity: str) -> int:
+        return {"standard": 2, "medium": 2, "high": 3}.get(complexity, 2)
+    
+    def _calculate_lighting_crew_needed(self, complexity: str) -> int:
+        return {"standard": 3, "medium": 5, "high": 7}.get(complexity, 3)
+    
+    def _calculate_grip_crew_needed(self, complexity: str) -> int:
+        return {"standard": 3, "medium": 4, "high": 6}.get(complexity, 3)
+    
+    def _department_for_role(self, role: str) -> str:
+        """Map a crew role to one of the scheduled departments."""
+        role_lower = role.lower()
+        if any(keyword in role_lower for keyword in ('camera', 'photography', 'dp', 'focus', 'operator')):
+            return "camera"
+        if any(keyword in role_lower for keyword in ('sound', 'boom', 'audio')):
+            return "sound"
+        if any(keyword in role_lower for keyword in ('light', 'gaffer', 'electric')):
+            return "lighting"
+        if 'grip' in role_lower:
+            return "grip"
+        return "production"
+    
+    def _create_crew_assignments(
+        self,
+        scenes: List[Dict[str, Any]],
+        department_schedules: Dict[str, Any],
+        crew_availability: Dict[str, Any] = None
+    ) -> List[Dict[str, Any]]:
+        """Assign available crew members to the scenes their department covers."""
+        crew_members = (crew_availability or {}).get('crew', []) or [
+            {"name": "Director", "role": "Director"},
+            {"name": "DP", "role": "Director of Photography"},
+            {"name": "Sound Mixer", "role": "Sound"},
+            {"name": "Gaffer", "role": "Lighting"},
+            {"name": "Key Grip", "role": "Grip"}
+        ]
+        all_scenes = [scene.get('scene_number', '0') for scene in scenes]
+        
+        assignments = []
+        for crew in crew_members:
+            name = crew.get('name', 'Crew') if isinstance(crew, dict) else str(crew)
+            role = crew.get('role', 'Crew') if isinstance(crew, dict) else 'Crew'
+            department = self._department_for_role(role)
+            coverage = department_schedules.get(department, {}).get("scene_coverage", [])
+            
+            assignments.append({
+                "crew_member": name,
+                "role": role,
+                "department": department,
+                "assigned_scenes": [entry["scene"] for entry in coverage] or all_scenes,
+                "work_hours": 12,
+                "turnaround_hours": 10,
+                "meal_break_interval": 6,
+                "equipment_assigned": []
+            })
+        
+        return assignments
+    
+    def _generate_work_hour_compliance(self, crew_assignments: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """Check crew assignments against work hour, turnaround and meal rules."""
+        allocation = {"crew_assignments": crew_assignments}
+        self._validate_crew_assignments(allocation)
+        violations = allocation.get("union_rule_violations", [])
+        
+        return {
+            "compliance_status": {
+                "compliant": not violations,
+                "checked_assignments": len(crew_assignments),
+                "violation_count": len(violations)
+            },
+            "violations": violations,
+            "rules_applied": {
+                "max_work_hours": 12,
+                "min_turnaround_hours": 10,
+                "meal_break_interval_hours": 6
+            }
+        }
+    
+    def _create_call_sheet_details(self, scenes: List[Dict[str, Any]], crew_assignments: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """Create per-day crew call details."""
+        department_calls = {"camera": "06:30", "lighting": "06:00", "grip": "06:00", "sound": "07:00", "production": "06:00"}
+        details = {}
+        
+        for day_index, scene in enumerate(scenes):
+            scene_number = scene.get('scene_number', '0')
+            details[f"day_{day_index + 1}"] = {
+                "scene": scene_number,
+                "crew_calls": {
+                    assignment["crew_member"]: department_calls.get(assignment["department"], "07:00")
+                    for assignment in crew_assignments
+                    if scene_number in assignment["assigned_scenes"]
+                },
+                "notes": ["Night shoot - adjusted turnaround"] if 'NIGHT' in str(scene.get('time', '')).upper() else []
+            }
+        
+        return details
+    
+    def _calculate_department_efficiency(self, department_schedules: Dict[str, Any], crew_assignments: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """Compare each department's peak and average crew needs with its assigned crew."""
+        efficiency = {}
+        
+        for department, schedule in department_schedules.items():
+            needed = [entry["crew_needed"] for entry in schedule.get("scene_coverage", [])]
+            assigned = sum(1 for assignment in crew_assignments if assignment["department"] == department)
+            peak = max(needed) if needed else 0
+            
+            efficiency[department] = {
+                "peak_crew_needed": peak,
+                "average_crew_needed": round(sum(needed) / len(needed), 1) if needed else 0,
+                "assigned_crew": assigned,
+                "additional_day_players_needed": max(0, peak - assigned)
+            }
+        
+        return efficiency
+    
+    def _generate_union_compliance_notes(self, crew_assignments: List[Dict[str, Any]]) -> List[str]:
+        """Generate union compliance notes for the crew allocation."""
+        notes = [
+            "IATSE: 10-hour minimum turnaround between wrap and next call",
+            "Meal break required within 6 hours of crew call",
+            "Work beyond 12 hours triggers overtime penalties"
+        ]
+        if any(assignment.get("work_hours", 0) > 12 for assignment in crew_assignments):
+            notes.append("Some assignments exceed 12 hours - budget for overtime")
+        return notes
+    
     def _clean_and_extract_json(self, text: str) -> str:
         """Clean and extract JSON from text response."""
         # First, try to find JSON between triple backticks
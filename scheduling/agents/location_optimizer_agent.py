@@ -3,6 +3,7 @@ import json
 import logging
 from datetime import datetime, timedelta
 from base_config import AGENT_INSTRUCTIONS, get_model_config
+from ..scene_features import compute_scene_features
 from google import genai
 from google.genai import types
 import os
@@ -38,7 +39,12 @@ class LocationOptimizerAgent:
         Focus on superior geographic optimization with PEFT-enhanced location logistics."""
         logger.info("LocationOptimizerAgent initialized")
     
-    async def optimize_locations(self, scene_data: Dict[str, Any], location_constraints: Dict[str, Any] = None) -> Dict[str, Any]:
+    async def optimize_locations(
+        self,
+        scene_data: Dict[str, Any],
+        location_constraints: Dict[str, Any] = None,
+        features: Dict[str, Any] = None
+    ) -> Dict[str, Any]:
         """Optimize location logistics for maximum efficiency."""
         logger.info("Starting location logistics optimization")
         
@@ -49,8 +55,11 @@ class LocationOptimizerAgent:
         scenes = scene_data.get('scenes', [])
         logger.info(f"Processing location optimization for {len(scenes)} scenes")
         
+        # Reuse the coordinator's shared features when provided
+        features = features or compute_scene_features(scenes)
+        
         # Analyze location grouping
-        location_grouping = self._analyze_location_grouping(scenes)
+        location_grouping = self._analyze_location_grouping(scenes, features)
         
         # Plan logistics
         logistics_planning = self._plan_logistics(scenes, location_grouping)
@@ -77,7 +86,7 @@ class LocationOptimizerAgent:
         logger.info(f"Generated location optimization for {len(scenes)} scenes")
         return result
     
-    def _analyze_location_grouping(self, scenes: List[Dict[str, Any]]) -> Dict[str, Any]:
+    def _analyze_location_grouping(self, scenes: List[Dict[str, Any]], features: Dict[str, Any]) -> Dict[str, Any]:
         """Analyze and optimize location grouping for efficient shooting."""
         grouping = {
             "location_clusters": {},
@@ -86,24 +95,17 @@ class LocationOptimizerAgent:
             "recommended_order": []
         }
         
-        # Group scenes by location
+        # Group scenes by location using the shared per-scene pages and cue counts
         location_scenes = {}
-        for scene in scenes:
-            location = scene.get('location', {})
-            location_key = f"{location.get('place', 'Unknown')}_{location.get('type', 'INT')}"
-            
-            if location_key not in location_scenes:
-                location_scenes[location_key] = {
-                    "scenes": [],
-                    "total_pages": 0,
-                    "complexity_score": 0,
-                    "location_type": location.get('type', 'INT'),
-                    "location_name": location.get('place', 'Unknown')
-                }
-            
-            location_scenes[location_key]["scenes"].append(scene.get('scene_number', '0'))
-            location_scenes[location_key]["total_pages"] += self._estimate_scene_pages_numeric(scene)
-            location_scenes[location_key]["complexity_score"] += len(scene.get('technical_cues', []))
+        for location_key, indexes in features["location_key_groups"].items():
+            location = scenes[indexes[0]].get('location', {})
+            location_scenes[location_key] = {
+                "scenes": [features["scene_numbers"][i] for i in indexes],
+                "total_pages": float(features["pages"][indexes].sum()),
+                "complexity_score": int(features["technical_cue_counts"][indexes].sum()),
+                "location_type": location.get('type', 'INT'),
+                "location_name": location.get('place', 'Unknown')
+            }
         
         # Calculate estimated days for each location
         for location_key, location_data in location_scenes.items():
@@ -146,15 +148,6 @@ class LocationOptimizerAgent:
         
         return grouping
     
-    def _estimate_scene_pages_numeric(self, scene: Dict[str, Any]) -> float:
-        """Estimate scene pages as a numeric value."""
-        description_length = len(scene.get('description', ''))
-        dialogue_count = len(scene.get('dialogues', []))
-        
-        # Rough estimation: 250 words per page
-        estimated_pages = (description_length + dialogue_count * 50) / 250
-        return max(0.125, estimated_pages)  # Minimum 1/8 page
-    
     def _optimize_travel_between_locations(self, location_scenes: Dict[str, Any]) -> Dict[str, Any]:
         """Optimize travel between locations to minimize time and cost."""
         travel_optimization = {
@@ -269,9 +262,9 @@ class LocationOptimizerAgent:
         location_clusters = location_grouping.get("location_clusters", {})
         
         # Plan equipment moves
-        for i, (location_key, location_data) in enumerate(location_clusters.items()):
-            if i > 0:  # Skip first location (no move needed)
-                prev_location = list(location_clusters.keys())[i-1]
+        prev_location = None
+        for location_key, location_data in location_clusters.items():
+            if prev_location is not None:  # Skip first location (no move needed)
                 
                 # Estimate equipment needed
                 equipment_needed = self._estimate_equipment_for_location(location_data)
@@ -291,6 +284,7 @@ class LocationOptimizerAgent:
                     move_plan["special_requirements"].append("Weather protection equipment")
                 
                 logistics["equipment_moves"].append(move_plan)
+            prev_location = location_key
         
         # Plan crew transportation
         for location_key, location_data in location_clusters.items():
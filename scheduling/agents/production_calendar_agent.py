@@ -1,8 +1,13 @@
 from typing import Dict, Any, List
 import json
 import logging
-from datetime import datetime, timedelta
+import numpy as np
+from datetime import datetime
 from base_config import AGENT_INSTRUCTIONS, get_model_config
+from ..calendar_engine import ProductionCalendar, as_iso, week_offsets
+from ..scene_features import compute_scene_features
+from ..schedule_engine import format_clock
+from ..solar import DEFAULT_COORDINATES, SUN_WINDOWS, daylight_table, resolve_coordinates
 from google import genai
 from google.genai import types
 import os
@@ -38,7 +43,12 @@ class ProductionCalendarAgent:
         Focus on advanced timeline management with comprehensive milestone tracking."""
         logger.info("ProductionCalendarAgent initialized")
     
-    async def generate_production_calendar(self, scene_data: Dict[str, Any], project_parameters: Dict[str, Any] = None) -> Dict[str, Any]:
+    async def generate_production_calendar(
+        self,
+        scene_data: Dict[str, Any],
+        project_parameters: Dict[str, Any] = None,
+        features: Dict[str, Any] = None
+    ) -> Dict[str, Any]:
         """Generate comprehensive production calendar with timeline management."""
         logger.info("Starting production calendar generation")
         
@@ -49,14 +59,22 @@ class ProductionCalendarAgent:
         scenes = scene_data.get('scenes', [])
         logger.info(f"Processing production calendar for {len(scenes)} scenes")
         
+        # Reuse the coordinator's shared features when provided
+        features = features or compute_scene_features(scenes)
+        
+        project_parameters = project_parameters or {}
+        start_date = project_parameters.get("start_date") or datetime.now().strftime('%Y-%m-%d')
+        calendar = ProductionCalendar.from_constraints(project_parameters.get("schedule_constraints"), start_date)
+        production_start = calendar.roll_forward(start_date)
+        
         # Generate pre-production timeline
-        pre_production = self._generate_pre_production_timeline(scenes, project_parameters)
+        pre_production = self._generate_pre_production_timeline(scenes, calendar, production_start)
         
         # Generate production timeline
-        production_timeline = self._generate_production_timeline(scenes)
+        production_timeline = self._generate_production_timeline(scenes, features, calendar, production_start, project_parameters)
         
         # Generate post-production timeline
-        post_production = self._generate_post_production_timeline(scenes, project_parameters)
+        post_production = self._generate_post_production_timeline(scenes, calendar, production_timeline)
         
         # Create deliverable schedule
         deliverable_schedule = self._create_deliverable_schedule(project_parameters)
@@ -65,10 +83,11 @@ class ProductionCalendarAgent:
         milestone_tracking = self._generate_milestone_tracking(pre_production, production_timeline, post_production)
         
         # Weather and seasonal considerations
-        seasonal_planning = self._generate_seasonal_planning(scenes, production_timeline)
+        seasonal_planning = self._generate_seasonal_planning(scenes, features, production_timeline, project_parameters.get("schedule_constraints"))
         
         result = {
             "timestamp": datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+            "working_calendar": calendar.describe(),
             "pre_production": pre_production,
             "production_timeline": production_timeline,
             "post_production": post_production,
@@ -81,7 +100,7 @@ class ProductionCalendarAgent:
         logger.info(f"Generated production calendar for {len(scenes)} scenes")
         return result
     
-    def _generate_pre_production_timeline(self, scenes: List[Dict[str, Any]], project_parameters: Dict[str, Any] = None) -> Dict[str, Any]:
+    def _generate_pre_production_timeline(self, scenes: List[Dict[str, Any]], calendar: ProductionCalendar, production_start: np.datetime64) -> Dict[str, Any]:
         """Generate pre-production timeline with all necessary phases."""
         pre_production = {
             "phase_duration": "12 weeks",
@@ -92,44 +111,46 @@ class ProductionCalendarAgent:
         }
         
         # Base start date (12 weeks before production)
-        production_start = datetime(2024, 3, 15)
-        prep_start = production_start - timedelta(weeks=12)
+        prep_start = production_start - np.timedelta64(12 * 7, 'D')
+        # Working date at the start of each prep week, resolved in one vectorized step
+        week = as_iso(calendar.roll_forward(week_offsets(prep_start, np.arange(12))))
+        production_start_iso = str(production_start)
         
         # Key phases
         pre_production["key_phases"] = {
             "script_development": {
-                "start_date": (prep_start).strftime('%Y-%m-%d'),
-                "end_date": (prep_start + timedelta(weeks=2)).strftime('%Y-%m-%d'),
+                "start_date": week[0],
+                "end_date": week[2],
                 "duration": "2 weeks",
                 "deliverables": ["Final script", "Script breakdown", "Scene analysis"]
             },
             "pre_visualization": {
-                "start_date": (prep_start + timedelta(weeks=2)).strftime('%Y-%m-%d'),
-                "end_date": (prep_start + timedelta(weeks=4)).strftime('%Y-%m-%d'),
+                "start_date": week[2],
+                "end_date": week[4],
                 "duration": "2 weeks",
                 "deliverables": ["Storyboards", "Shot lists", "Technical previsualization"]
             },
             "casting": {
-                "start_date": (prep_start + timedelta(weeks=1)).strftime('%Y-%m-%d'),
-                "end_date": (prep_start + timedelta(weeks=6)).strftime('%Y-%m-%d'),
+                "start_date": week[1],
+                "end_date": week[6],
                 "duration": "5 weeks",
                 "deliverables": ["Cast finalization", "Wardrobe fittings", "Rehearsals"]
             },
             "location_scouting": {
-                "start_date": (prep_start + timedelta(weeks=3)).strftime('%Y-%m-%d'),
-                "end_date": (prep_start + timedelta(weeks=8)).strftime('%Y-%m-%d'),
+                "start_date": week[3],
+                "end_date": week[8],
                 "duration": "5 weeks",
                 "deliverables": ["Location agreements", "Permits", "Tech scouts"]
             },
             "technical_preparation": {
-                "start_date": (prep_start + timedelta(weeks=6)).strftime('%Y-%m-%d'),
-                "end_date": (prep_start + timedelta(weeks=11)).strftime('%Y-%m-%d'),
+                "start_date": week[6],
+                "end_date": week[11],
                 "duration": "5 weeks",
                 "deliverables": ["Equipment booking", "Crew contracts", "Call sheets"]
             },
             "final_preparation": {
-                "start_date": (prep_start + timedelta(weeks=11)).strftime('%Y-%m-%d'),
-                "end_date": production_start.strftime('%Y-%m-%d'),
+                "start_date": week[11],
+                "end_date": production_start_iso,
                 "duration": "1 week",
                 "deliverables": ["Final rehearsals", "Equipment check", "Production meeting"]
             }
@@ -138,19 +159,19 @@ class ProductionCalendarAgent:
         # Departmental preparation
         pre_production["departmental_prep"] = {
             "camera_department": {
-                "equipment_tests": (prep_start + timedelta(weeks=8)).strftime('%Y-%m-%d'),
-                "lens_tests": (prep_start + timedelta(weeks=9)).strftime('%Y-%m-%d'),
-                "camera_prep": (prep_start + timedelta(weeks=11)).strftime('%Y-%m-%d')
+                "equipment_tests": week[8],
+                "lens_tests": week[9],
+                "camera_prep": week[11]
             },
             "sound_department": {
-                "location_acoustics": (prep_start + timedelta(weeks=7)).strftime('%Y-%m-%d'),
-                "equipment_prep": (prep_start + timedelta(weeks=10)).strftime('%Y-%m-%d'),
-                "sound_design_prep": (prep_start + timedelta(weeks=6)).strftime('%Y-%m-%d')
+                "location_acoustics": week[7],
+                "equipment_prep": week[10],
+                "sound_design_prep": week[6]
             },
             "production_design": {
-                "concept_development": (prep_start + timedelta(weeks=2)).strftime('%Y-%m-%d'),
-                "set_construction": (prep_start + timedelta(weeks=5)).strftime('%Y-%m-%d'),
-                "prop_acquisition": (prep_start + timedelta(weeks=8)).strftime('%Y-%m-%d')
+                "concept_development": week[2],
+                "set_construction": week[5],
+                "prop_acquisition": week[8]
             }
         }
         
@@ -161,18 +182,18 @@ class ProductionCalendarAgent:
         
         pre_production["casting_schedule"] = {
             "principal_casting": {
-                "auditions": (prep_start + timedelta(weeks=1)).strftime('%Y-%m-%d'),
-                "callbacks": (prep_start + timedelta(weeks=3)).strftime('%Y-%m-%d'),
-                "final_selections": (prep_start + timedelta(weeks=4)).strftime('%Y-%m-%d'),
+                "auditions": week[1],
+                "callbacks": week[3],
+                "final_selections": week[4],
                 "characters_count": len(unique_characters)
             },
             "supporting_casting": {
-                "auditions": (prep_start + timedelta(weeks=4)).strftime('%Y-%m-%d'),
-                "selections": (prep_start + timedelta(weeks=5)).strftime('%Y-%m-%d')
+                "auditions": week[4],
+                "selections": week[5]
             },
             "wardrobe_fittings": {
-                "principals": (prep_start + timedelta(weeks=6)).strftime('%Y-%m-%d'),
-                "supporting": (prep_start + timedelta(weeks=7)).strftime('%Y-%m-%d')
+                "principals": week[6],
+                "supporting": week[7]
             }
         }
         
@@ -186,136 +207,138 @@ class ProductionCalendarAgent:
         pre_production["location_preparation"] = {
             "location_count": len(unique_locations),
             "scouting_phase": {
-                "initial_scout": (prep_start + timedelta(weeks=3)).strftime('%Y-%m-%d'),
-                "technical_scout": (prep_start + timedelta(weeks=7)).strftime('%Y-%m-%d'),
-                "final_scout": (prep_start + timedelta(weeks=10)).strftime('%Y-%m-%d')
+                "initial_scout": week[3],
+                "technical_scout": week[7],
+                "final_scout": week[10]
             },
             "permits_and_agreements": {
-                "permit_applications": (prep_start + timedelta(weeks=6)).strftime('%Y-%m-%d'),
-                "location_agreements": (prep_start + timedelta(weeks=8)).strftime('%Y-%m-%d'),
-                "insurance_finalization": (prep_start + timedelta(weeks=9)).strftime('%Y-%m-%d')
+                "permit_applications": week[6],
+                "location_agreements": week[8],
+                "insurance_finalization": week[9]
             }
         }
         
         return pre_production
     
-    def _generate_production_timeline(self, scenes: List[Dict[str, Any]]) -> Dict[str, Any]:
-        """Generate detailed production phase timeline."""
-        production_start = datetime(2024, 3, 15)
-        
-        # Group scenes by location for scheduling efficiency
-        location_groups = {}
-        for scene in scenes:
-            location = scene.get('location', {}).get('place', 'Unknown')
-            if location not in location_groups:
-                location_groups[location] = []
-            location_groups[location].append(scene)
+    def _generate_production_timeline(
+        self,
+        scenes: List[Dict[str, Any]],
+        features: Dict[str, Any],
+        calendar: ProductionCalendar,
+        production_start: np.datetime64,
+        project_parameters: Dict[str, Any] = None
+    ) -> Dict[str, Any]:
+        """Generate detailed production phase timeline on working days."""
+        constraints = (project_parameters or {}).get("schedule_constraints") or {}
+        
+        # Scenes grouped by location for scheduling efficiency
+        location_groups = features["location_groups"]
+        
+        # Shooting days per location block, and turnaround days off after night blocks
+        locations = list(location_groups.keys())
+        days_needed = np.array([max(1, -(-len(location_groups[loc]) // 3)) for loc in locations], dtype=int)
+        block_ends = np.cumsum(days_needed)
+        total_shooting_days = int(block_ends[-1]) if len(block_ends) else 0
+        
+        night_blocks = np.array([features["night"][location_groups[loc]].mean() > 0.5 for loc in locations], dtype=bool)
+        switches_to_day = night_blocks[:-1] & ~night_blocks[1:]
+        turnaround_after = set(block_ends[:-1][switches_to_day].tolist())
+        turnaround_after.update(int(day) for day in constraints.get("turnaround_after_days", []))
+        turnaround_after = sorted(day for day in turnaround_after if 0 < day < total_shooting_days)
+        
+        # Map every shoot day to a date in one step
+        shoot_dates = calendar.shoot_dates(production_start, total_shooting_days, turnaround_after)
         
-        # Calculate estimated shooting days
-        total_shooting_days = 0
         location_schedule = {}
-        
-        current_date = production_start
-        for location, location_scenes in location_groups.items():
-            days_needed = max(1, len(location_scenes) // 3 + (1 if len(location_scenes) % 3 else 0))
-            total_shooting_days += days_needed
-            
+        block_starts = block_ends - days_needed
+        for location, start_index, end_index, days in zip(locations, block_starts, block_ends, days_needed):
+            location_scenes = [scenes[i] for i in location_groups[location]]
             location_schedule[location] = {
-                "start_date": current_date.strftime('%Y-%m-%d'),
-                "end_date": (current_date + timedelta(days=days_needed - 1)).strftime('%Y-%m-%d'),
-                "shooting_days": days_needed,
+                "start_date": str(shoot_dates[start_index]),
+                "end_date": str(shoot_dates[end_index - 1]),
+                "shooting_days": int(days),
                 "scene_count": len(location_scenes),
                 "scenes": [s.get('scene_number', '0') for s in location_scenes]
             }
-            
-            current_date += timedelta(days=days_needed)
         
-        production_end = production_start + timedelta(days=total_shooting_days - 1)
+        production_end = shoot_dates[-1] if total_shooting_days else production_start
         
         timeline = {
-            "start_date": production_start.strftime('%Y-%m-%d'),
-            "end_date": production_end.strftime('%Y-%m-%d'),
+            "start_date": str(production_start),
+            "end_date": str(production_end),
             "total_shooting_days": total_shooting_days,
+            "calendar_days": int((production_end - production_start).astype(int)) + 1,
+            "shoot_dates": as_iso(shoot_dates),
+            "turnaround_days_after": turnaround_after,
             "location_schedule": location_schedule,
-            "weekly_breakdown": self._generate_weekly_breakdown(production_start, total_shooting_days),
+            "weekly_breakdown": calendar.weekly_breakdown(shoot_dates),
             "contingency_days": max(2, total_shooting_days // 10),  # 10% contingency
             "weather_days": self._calculate_weather_days(scenes)
         }
         
         return timeline
     
-    def _generate_weekly_breakdown(self, start_date: datetime, total_days: int) -> Dict[str, Any]:
-        """Generate weekly breakdown of production schedule."""
-        weeks = {}
-        current_date = start_date
-        week_number = 1
-        
-        while (current_date - start_date).days < total_days:
-            week_start = current_date
-            week_end = min(current_date + timedelta(days=4), start_date + timedelta(days=total_days - 1))
-            
-            weeks[f"week_{week_number}"] = {
-                "start_date": week_start.strftime('%Y-%m-%d'),
-                "end_date": week_end.strftime('%Y-%m-%d'),
-                "shooting_days": min(5, (week_end - week_start).days + 1),
-                "weekend_break": week_end < start_date + timedelta(days=total_days - 1)
-            }
-            
-            current_date += timedelta(days=7)  # Move to next week
-            week_number += 1
-        
-        return weeks
-    
-    def _calculate_weather_days(self, scenes: List[Dict[str, Any]]) -> int:
+    @staticmethod
+    def _calculate_weather_days(scenes: List[Dict[str, Any]]) -> int:
         """Calculate weather contingency days for exterior scenes."""
         exterior_scenes = sum(1 for scene in scenes if scene.get('location', {}).get('type') == 'EXT')
         return max(1, exterior_scenes // 5)  # 1 weather day per 5 exterior scenes
     
-    def _generate_post_production_timeline(self, scenes: List[Dict[str, Any]], project_parameters: Dict[str, Any] = None) -> Dict[str, Any]:
+    def _generate_post_production_timeline(self, scenes: List[Dict[str, Any]], calendar: ProductionCalendar, production_timeline: Dict[str, Any]) -> Dict[str, Any]:
         """Generate post-production timeline."""
         # Estimate post-production duration based on project scope
         scene_count = len(scenes)
         estimated_duration_weeks = max(8, scene_count // 10)  # Minimum 8 weeks, scale with complexity
         
-        production_end = datetime(2024, 3, 15) + timedelta(days=len(scenes) // 3)
-        post_start = production_end + timedelta(days=1)
+        # Post starts on the first working day after wrap
+        post_start = calendar.offset(production_timeline["end_date"], 1)
+        phase_weeks = {
+            "assembly_edit": 0,
+            "rough_cut": 2,
+            "fine_cut": 5,
+            "sound_design": 4,
+            "color_correction": 6,
+            "final_mix": 7,
+            "final_delivery": estimated_duration_weeks
+        }
+        d = dict(zip(phase_weeks.keys(), as_iso(calendar.roll_forward(week_offsets(post_start, list(phase_weeks.values()))))))
         
         post_production = {
-            "start_date": post_start.strftime('%Y-%m-%d'),
+            "start_date": str(post_start),
             "estimated_duration": f"{estimated_duration_weeks} weeks",
             "phases": {
                 "assembly_edit": {
-                    "start_date": post_start.strftime('%Y-%m-%d'),
+                    "start_date": d["assembly_edit"],
                     "duration": "2 weeks",
                     "deliverable": "Rough cut"
                 },
                 "rough_cut": {
-                    "start_date": (post_start + timedelta(weeks=2)).strftime('%Y-%m-%d'),
+                    "start_date": d["rough_cut"],
                     "duration": "3 weeks",
                     "deliverable": "Director's cut"
                 },
                 "fine_cut": {
-                    "start_date": (post_start + timedelta(weeks=5)).strftime('%Y-%m-%d'),
+                    "start_date": d["fine_cut"],
                     "duration": "2 weeks",
                     "deliverable": "Picture lock"
                 },
                 "sound_design": {
-                    "start_date": (post_start + timedelta(weeks=4)).strftime('%Y-%m-%d'),
+                    "start_date": d["sound_design"],
                     "duration": "4 weeks",
                     "deliverable": "Sound mix"
                 },
                 "color_correction": {
-                    "start_date": (post_start + timedelta(weeks=6)).strftime('%Y-%m-%d'),
+                    "start_date": d["color_correction"],
                     "duration": "2 weeks",
                     "deliverable": "Color graded master"
                 },
                 "final_mix": {
-                    "start_date": (post_start + timedelta(weeks=7)).strftime('%Y-%m-%d'),
+                    "start_date": d["final_mix"],
                     "duration": "1 week",
                     "deliverable": "Final mix"
                 }
             },
-            "final_delivery": (post_start + timedelta(weeks=estimated_duration_weeks)).strftime('%Y-%m-%d')
+            "final_delivery": d["final_delivery"]
         }
         
         return post_production
@@ -405,8 +428,14 @@ class ProductionCalendarAgent:
         
         return milestones
     
-    def _generate_seasonal_planning(self, scenes: List[Dict[str, Any]], production_timeline: Dict[str, Any]) -> Dict[str, Any]:
-        """Generate seasonal and weather-dependent planning."""
+    def _generate_seasonal_planning(
+        self,
+        scenes: List[Dict[str, Any]],
+        features: Dict[str, Any],
+        production_timeline: Dict[str, Any],
+        constraints: Dict[str, Any] = None
+    ) -> Dict[str, Any]:
+        """Generate seasonal and weather-dependent planning from computed daylight."""
         seasonal_planning = {
             "weather_considerations": {},
             "seasonal_factors": {},
@@ -424,22 +453,32 @@ class ProductionCalendarAgent:
             "backup_locations": "Indoor alternatives identified"
         }
         
-        # Production timing analysis
+        # Sun times for every shoot date and location, computed locally
+        daylight = self._estimate_daylight_hours(features, production_timeline, constraints)
+        
+        # Production timing analysis; seasons flip south of the equator
         start_date = datetime.strptime(production_timeline["start_date"], '%Y-%m-%d')
         month = start_date.month
+        season_index = (month % 12) // 3
+        if daylight["reference_location"]["latitude"] < 0:
+            season_index = (season_index + 2) % 4
         
-        if month in [12, 1, 2]:  # Winter
+        hours = daylight["daylight_hours"]
+        if season_index == 0:  # Winter
             season_notes = ["Short daylight hours", "Weather delays likely", "Heating costs"]
-        elif month in [3, 4, 5]:  # Spring
+        elif season_index == 1:  # Spring
             season_notes = ["Moderate weather", "Good daylight", "Occasional rain"]
-        elif month in [6, 7, 8]:  # Summer
+        elif season_index == 2:  # Summer
             season_notes = ["Long daylight hours", "Heat considerations", "Vacation schedules"]
         else:  # Fall
             season_notes = ["Moderate weather", "Shorter days", "Good conditions"]
+        if hours["min"] < 10:
+            season_notes.append(f"Exterior day work limited to {hours['min']} hours of sun on the shortest shoot day")
         
         seasonal_planning["seasonal_factors"] = {
-            "production_season": ["Winter", "Spring", "Summer", "Fall"][month // 3],
-            "daylight_hours": self._estimate_daylight_hours(month),
+            "production_season": ["Winter", "Spring", "Summer", "Fall"][season_index],
+            "daylight_hours": f"{hours['min']}-{hours['max']} hours",
+            "daylight": daylight,
             "weather_risks": season_notes,
             "crew_availability": "Standard" if month not in [7, 12] else "Holiday considerations"
         }
@@ -460,24 +499,76 @@ class ProductionCalendarAgent:
         
         return seasonal_planning
     
-    def _estimate_daylight_hours(self, month: int) -> str:
-        """Estimate daylight hours based on month."""
-        daylight_hours = {
-            1: "9-10 hours", 2: "10-11 hours", 3: "11-12 hours",
-            4: "12-13 hours", 5: "13-14 hours", 6: "14-15 hours",
-            7: "14-15 hours", 8: "13-14 hours", 9: "12-13 hours",
-            10: "11-12 hours", 11: "10-11 hours", 12: "9-10 hours"
+    def _estimate_daylight_hours(
+        self,
+        features: Dict[str, Any],
+        production_timeline: Dict[str, Any],
+        constraints: Dict[str, Any] = None
+    ) -> Dict[str, Any]:
+        """Compute sunrise, sunset and golden-hour windows for every shoot date and location."""
+        shoot_dates = production_timeline.get("shoot_dates") or [production_timeline["start_date"]]
+        places = list(features["location_groups"].keys()) or ["Unknown"]
+        coordinates = resolve_coordinates(places, constraints)
+        coordinates_source = "project"
+        if coordinates is None:
+            coordinates = resolve_coordinates(places, DEFAULT_COORDINATES)
+            coordinates_source = "default reference"
+        table = daylight_table(shoot_dates, coordinates)
+        daylight_hours = table["daylight_minutes"] / 60
+        
+        # Windows per exterior location over the dates that location is scheduled
+        location_schedule = production_timeline.get("location_schedule", {})
+        dates = np.array(shoot_dates, dtype='datetime64[D]')
+        exterior_windows = {}
+        for column, place in enumerate(places):
+            indexes = features["location_groups"].get(place, [])
+            if not indexes or not features["exterior"][indexes].any():
+                continue
+            block = location_schedule.get(place, {})
+            in_block = (dates >= np.datetime64(block.get("start_date", shoot_dates[0]))) & (dates <= np.datetime64(block.get("end_date", shoot_dates[-1])))
+            rows = np.flatnonzero(in_block) if in_block.any() else np.arange(len(dates))
+            exterior_windows[place] = {
+                "dates": [shoot_dates[row] for row in rows],
+                "sunrise": [format_clock(table["sunrise"][row, column]) for row in rows],
+                "sunset": [format_clock(table["sunset"][row, column]) for row in rows],
+                "windows": {
+                    period: [
+                        f"{format_clock(table[start_event][row, column])}-{format_clock(table[end_event][row, column])}"
+                        for row in rows
+                    ]
+                    for period, (start_event, end_event) in SUN_WINDOWS.items()
+                    if period in ("DAWN", "DAY", "DUSK")
+                },
+                "min_daylight_hours": round(float(daylight_hours[rows, column].min()), 2)
+            }
+        
+        return {
+            "coordinates_source": coordinates_source,
+            "reference_location": {
+                "latitude": coordinates["latitude"][0],
+                "longitude": coordinates["longitude"][0],
+                "timezone": coordinates["timezone"][0]
+            },
+            "daylight_hours": {
+                "min": round(float(daylight_hours.min()), 1),
+                "max": round(float(daylight_hours.max()), 1),
+                "mean": round(float(daylight_hours.mean()), 1)
+            },
+            "earliest_sunrise": format_clock(float(table["sunrise"].min())),
+            "latest_sunset": format_clock(float(table["sunset"].max())),
+            "exterior_locations": exterior_windows
         }
-        return daylight_hours.get(month, "11-12 hours")
     
     def _generate_calendar_summary(self, pre_production: Dict[str, Any], production: Dict[str, Any], post_production: Dict[str, Any]) -> Dict[str, Any]:
         """Generate overall calendar summary."""
-        # Calculate total project duration
+        # Calculate total project duration from the resolved dates
         pre_prod_weeks = 12
         production_days = production["total_shooting_days"]
         post_prod_weeks = int(post_production["estimated_duration"].split()[0])
         
-        total_weeks = pre_prod_weeks + (production_days // 7) + 1 + post_prod_weeks
+        project_start = datetime.strptime(pre_production["key_phases"]["script_development"]["start_date"], '%Y-%m-%d')
+        final_delivery = datetime.strptime(post_production["final_delivery"], '%Y-%m-%d')
+        total_weeks = -(-((final_delivery - project_start).days + 1) // 7)
         
         summary = {
             "total_project_duration": f"{total_weeks} weeks",
@@ -1,12 +1,12 @@
 import logging
 from typing import Dict, Any, List
 import json
-import re
-from datetime import datetime, timedelta
+import asyncio
 import os
 from google import genai
 from google.genai import types
 from base_config import AGENT_INSTRUCTIONS, get_model_config
+from ..schedule_engine import ScheduleEngine
 
 logger = logging.getLogger(__name__)
 
@@ -15,6 +15,7 @@ class ScheduleGeneratorAgent:
         self.client = genai.Client(api_key=os.environ.get("GOOGLE_API_KEY"))
         self.model_config = get_model_config()
         self.instructions = AGENT_INSTRUCTIONS["schedule_generator"]
+        self.engine = ScheduleEngine()
         logger.info("ScheduleGeneratorAgent initialized")
     
     async def generate_schedule(
@@ -23,9 +24,10 @@ class ScheduleGeneratorAgent:
         crew_allocation: Dict[str, Any],
         location_optimization: Dict[str, Any],
         start_date: str,
-        constraints: Dict[str, Any] = None
+        constraints: Dict[str, Any] = None,
+        include_llm_notes: bool = False
     ) -> Dict[str, Any]:
-        """Generate a detailed shooting schedule."""
+        """Generate a detailed shooting schedule with the local schedule engine."""
         try:
             logger.info(f"Starting schedule generation from {start_date}")
             
@@ -42,135 +44,56 @@ class ScheduleGeneratorAgent:
             
             logger.debug(f"Processing {len(scenes)} scenes")
             
-            prompt = f"""You are a film production schedule generator. Your task is to create a detailed shooting schedule based on scene data, crew allocation, and location optimization.
-
-IMPORTANT: You must respond with ONLY valid JSON data in the exact format specified below. Do not include any other text or explanations.
-
-Required JSON format:
-{{
-    "schedule": [
-        {{
-            "day": number,
-            "date": "YYYY-MM-DD",
-            "scenes": [
-                {{
-                    "scene_id": "string",
-                    "start_time": "HH:MM",
-                    "end_time": "HH:MM",
-                    "location_id": "string",
-                    "crew_ids": ["crew1", "crew2"],
-                    "equipment_ids": ["equip1", "equip2"],
-                    "setup_time": "HH:MM",
-                    "wrap_time": "HH:MM",
-                    "breaks": [
-                        {{
-                            "type": "string",
-                            "start_time": "HH:MM",
-                            "end_time": "HH:MM"
-                        }}
-                    ]
-                }}
-            ]
-        }}
-    ],
-    "calendar_data": {{
-        "events": [
-            {{
-                "id": "string",
-                "title": "string",
-                "start": "YYYY-MM-DDTHH:MM:SS",
-                "end": "YYYY-MM-DDTHH:MM:SS",
-                "resourceId": "string",
-                "color": "string",
-                "textColor": "string",
-                "description": "string",
-                "location": "string",
-                "crew": ["crew1", "crew2"],
-                "equipment": ["equip1", "equip2"]
-            }}
-        ],
-        "resources": [
-            {{
-                "id": "string",
-                "title": "string",
-                "type": "string"
-            }}
-        ]
-    }},
-    "gantt_data": {{
-        "tasks": [
-            {{
-                "id": "string",
-                "text": "string",
-                "start_date": "YYYY-MM-DD HH:MM",
-                "end_date": "YYYY-MM-DD HH:MM",
-                "progress": number,
-                "parent": "string",
-                "dependencies": ["task1", "task2"],
-                "resource_ids": ["resource1", "resource2"],
-                "type": "string",
-                "color": "string"
-            }}
-        ],
-        "links": [
-            {{
-                "id": "string",
-                "source": "string",
-                "target": "string",
-                "type": "string"
-            }}
-        ],
-        "resources": [
-            {{
-                "id": "string",
-                "name": "string",
-                "type": "string",
-                "calendar_id": "string"
-            }}
+            schedule_result = self.engine.build_schedule(
+                scenes,
+                start_date,
+                crew_allocation=crew_allocation,
+                location_optimization=location_optimization,
+                constraints=constraints
+            )
+            logger.info(f"Built {schedule_result['summary']['total_days']}-day schedule locally")
+            
+            # Prose notes are the only optional LLM step
+            if include_llm_notes:
+                schedule_result["optimization_notes"].extend(
+                    await self._generate_llm_notes(schedule_result, constraints)
+                )
+            
+            return schedule_result
+            
+        except Exception as e:
+            logger.error(f"Error in generate_schedule: {str(e)}")
+            raise
+    
+    async def _generate_llm_notes(self, schedule_result: Dict[str, Any], constraints: Dict[str, Any] = None) -> List[str]:
+        """Ask Gemini for short prose notes on an already-built schedule."""
+        day_overview = [
+            {
+                "day": day["day"],
+                "date": day["date"],
+                "locations": day["locations"],
+                "scenes": [scene["scene_id"] for scene in day["scenes"]],
+                "work_hours": day["work_hours"],
+                "overtime_hours": day["overtime_hours"]
+            }
+            for day in schedule_result["schedule"]
         ]
-    }},
-    "summary": {{
-        "total_days": number,
-        "start_date": "YYYY-MM-DD",
-        "end_date": "YYYY-MM-DD",
-        "total_scenes": number,
-        "total_pages": number,
-        "total_runtime_minutes": number
-    }},
-    "optimization_notes": ["note1", "note2"]
-}}
-
-Consider these scheduling factors:
-        - Scene complexity and estimated duration
-        - Location availability and optimization
-        - Crew availability and conflicts
-        - Equipment availability
-        - Weather dependencies
-        - Daylight requirements
-        - Meal breaks and union regulations
-        
-        Scene Data:
-{json.dumps(scenes, indent=2)}
-
-Crew Allocation:
-{json.dumps(crew_allocation, indent=2)}
-
-Location Optimization:
-{json.dumps(location_optimization, indent=2)}
-
-Start Date: {start_date}
+        prompt = f"""Review this film shooting schedule and return ONLY a JSON object of the form
+{{"notes": ["note1", "note2"]}} with at most 5 short, practical notes for the assistant director.
 
-Additional Constraints:
-{json.dumps(constraints, indent=2) if constraints else "No specific constraints provided"}
+Summary:
+{json.dumps(schedule_result["summary"], indent=2)}
 
-Remember: Return ONLY the JSON data structure. No other text."""
+Days:
+{json.dumps(day_overview)}
 
-            # Combine instructions with prompt
-            full_prompt = f"{self.instructions}\n\n{prompt}"
-
-            response = self.client.models.generate_content(
+Constraints:
+{json.dumps(constraints, indent=2) if constraints else "None"}"""
+        try:
+            response = await asyncio.to_thread(
+                self.client.models.generate_content,
                 model=self.model_config["model"],
-                contents=full_prompt,
+                contents=f"{self.instructions}\n\n{prompt}",
                 config=types.GenerateContentConfig(
                     temperature=self.model_config["temperature"],
                     max_output_tokens=self.model_config["max_output_tokens"],
@@ -179,163 +102,13 @@ Remember: Return ONLY the JSON data structure. No other text."""
                     response_mime_type="application/json"
                 )
             )
-
-            # Safe content extraction
-            def extract_content_safely(response):
-                if not hasattr(response, 'candidates') or not response.candidates:
-                    raise ValueError("No candidates in Gemini response")
-                
-                candidate = response.candidates[0]
-                if not hasattr(candidate, 'content') or not candidate.content:
-                    raise ValueError("Empty content in Gemini response")
-                
-                if not hasattr(candidate.content, 'parts') or not candidate.content.parts:
-                    raise ValueError("No content parts in Gemini response")
-                
-                text_content = candidate.content.parts[0].text
-                if not text_content:
-                    raise ValueError("Empty text content in Gemini response")
-                
-                return text_content
-
-            try:
-                result_final_output = extract_content_safely(response)
-            except ValueError as e:
-                logger.error(f"Validation error: {e}")
-                # Try to create a basic valid response
-                logger.info("Attempting to create fallback response")
-                start_date = datetime.now()
-                fallback_response = {
-                    "schedule": [
-                        {
-                            "day": 1,
-                            "date": start_date.strftime("%Y-%m-%d"),
-                            "scenes": []
-                        }
-                    ],
-                    "calendar_data": {
-                        "events": [],
-                        "resources": []
-                    },
-                    "gantt_data": {
-                        "tasks": [],
-                        "links": [],
-                        "resources": []
-                    },
-                    "summary": {
-                        "total_days": 1,
-                        "start_date": start_date.strftime("%Y-%m-%d"),
-                        "end_date": start_date.strftime("%Y-%m-%d"),
-                        "total_scenes": len(scenes),
-                        "total_pages": 0,
-                        "total_runtime_minutes": 0
-                    },
-                    "optimization_notes": ["Generated fallback response due to API parsing error"]
-                }
-                return fallback_response
-            
-            # Log the raw response for debugging
-            logger.debug(f"Raw API response: {result_final_output}")
-            
-            # First, validate that we have a response
-            if not result_final_output or not result_final_output.strip():
-                raise ValueError("Empty response from API")
-            
-            # Clean the response - try to extract JSON
-            cleaned_response = self._clean_and_extract_json(result_final_output)
+            cleaned_response = self._clean_and_extract_json(response.text or "")
             if not cleaned_response:
-                raise ValueError("Could not find valid JSON in response")
-            
-            # Try to parse the JSON
-            schedule_result = json.loads(cleaned_response)
-            
-            # Validate the required fields
-            required_fields = ['schedule', 'calendar_data', 'gantt_data', 'summary']
-            for field in required_fields:
-                if field not in schedule_result:
-                    raise ValueError(f"Missing required field: {field}")
-            
-            # Validate schedule data
-            for day in schedule_result.get('schedule', []):
-                required_day_fields = ['day', 'date', 'scenes']
-                for field in required_day_fields:
-                    if field not in day:
-                        raise ValueError(f"Missing required day field: {field}")
-                
-                for scene in day.get('scenes', []):
-                    required_scene_fields = ['scene_id', 'start_time', 'end_time', 'location_id']
-                    for field in required_scene_fields:
-                        if field not in scene:
-                            raise ValueError(f"Missing required scene field: {field}")
-            
-            # Validate calendar data
-            calendar_data = schedule_result.get('calendar_data', {})
-            if not isinstance(calendar_data.get('events'), list):
-                raise ValueError("Calendar data must contain events array")
-            if not isinstance(calendar_data.get('resources'), list):
-                raise ValueError("Calendar data must contain resources array")
-            
-            # Validate Gantt data
-            gantt_data = schedule_result.get('gantt_data', {})
-            if not isinstance(gantt_data.get('tasks'), list):
-                raise ValueError("Gantt data must contain tasks array")
-            if not isinstance(gantt_data.get('links'), list):
-                raise ValueError("Gantt data must contain links array")
-            if not isinstance(gantt_data.get('resources'), list):
-                raise ValueError("Gantt data must contain resources array")
-            
-            # Validate summary data
-            summary = schedule_result.get('summary', {})
-            required_summary_fields = ['total_days', 'start_date', 'end_date', 'total_scenes']
-            for field in required_summary_fields:
-                if field not in summary:
-                    raise ValueError(f"Missing required summary field: {field}")
-            
-            # Validate and adjust dates
-            schedule_result = self._validate_and_adjust_dates(schedule_result, start_date)
-            logger.info("Schedule dates validated and adjusted")
-            
-            return schedule_result
-            
-        except json.JSONDecodeError as e:
-            logger.error(f"Failed to parse schedule result: {str(e)}")
-            logger.debug(f"Raw response: {result_final_output}")
-            
-            # Try to create a basic valid response
-            logger.info("Attempting to create fallback response")
-            start_date = datetime.now()
-            fallback_response = {
-                "schedule": [
-                    {
-                        "day": 1,
-                        "date": start_date.strftime("%Y-%m-%d"),
-                        "scenes": []
-                    }
-                ],
-                "calendar_data": {
-                    "events": [],
-                    "resources": []
-                },
-                "gantt_data": {
-                    "tasks": [],
-                    "links": [],
-                    "resources": []
-                },
-                "summary": {
-                    "total_days": 1,
-                    "start_date": start_date.strftime("%Y-%m-%d"),
-                    "end_date": start_date.strftime("%Y-%m-%d"),
-                    "total_scenes": len(scenes),
-                    "total_pages": 0,
-                    "total_runtime_minutes": 0
-                },
-                "optimization_notes": ["Generated fallback response due to API parsing error"]
-            }
-            return fallback_response
-            
+                return []
+            return [str(note) for note in json.loads(cleaned_response).get("notes", [])]
         except Exception as e:
-            logger.error(f"Error in generate_schedule: {str(e)}")
-            raise
+            logger.warning(f"Skipping LLM schedule notes: {str(e)}")
+            return []
     
     def _clean_and_extract_json(self, text: str) -> str:
         """Extract JSON from text response."""
@@ -358,42 +131,3 @@ Remember: Return ONLY the JSON data structure. No other text."""
         except Exception as e:
             logger.error(f"Error cleaning JSON: {str(e)}")
             return ""
-    
-    def _validate_and_adjust_dates(self, schedule_result: Dict[str, Any], start_date: str) -> Dict[str, Any]:
-        """Validate and adjust dates in the schedule to ensure they are sequential and start from the given date."""
-        try:
-            start = datetime.strptime(start_date, "%Y-%m-%d")
-            
-            if "schedule" not in schedule_result:
-                return schedule_result
-            
-            for i, day in enumerate(schedule_result["schedule"]):
-                # Set the correct date
-                current_date = start + timedelta(days=i)
-                day["date"] = current_date.strftime("%Y-%m-%d")
-                day["day"] = i + 1
-                
-                # Validate time formats
-                for scene in day.get("scenes", []):
-                    for time_field in ["start_time", "end_time", "setup_time", "wrap_time"]:
-                        if time_field in scene:
-                            try:
-                                datetime.strptime(scene[time_field], "%H:%M")
-                            except ValueError:
-                                scene[time_field] = "00:00"  # Set default if invalid
-                    
-                    # Validate crew call times
-                    for call in scene.get("breaks", []):
-                        if "start_time" in call and "end_time" in call:
-                            try:
-                                datetime.strptime(call["start_time"], "%H:%M")
-                                datetime.strptime(call["end_time"], "%H:%M")
-                            except ValueError:
-                                call["start_time"] = "07:00"  # Set default if invalid
-                                call["end_time"] = "12:00"  # Set default if invalid
-            
-            return schedule_result
-            
-        except Exception as e:
-            logger.error(f"Error validating schedule dates: {str(e)}", exc_info=True)
-            return schedule_result  # Return original if validation fails
\ No newline at end of file
@@ -1,8 +1,11 @@
 from typing import Dict, Any, List
 import json
 import logging
+import numpy as np
 from datetime import datetime
 from base_config import AGENT_INSTRUCTIONS, get_model_config
+from ..calendar_engine import ProductionCalendar, as_iso
+from ..scene_features import compute_scene_features
 from google import genai
 from google.genai import types
 import os
@@ -38,7 +41,12 @@ class ScheduleParserAgent:
         Focus on excellent structured data extraction with precision."""
         logger.info("ScheduleParserAgent initialized")
     
-    async def parse_schedule_elements(self, scene_data: Dict[str, Any]) -> Dict[str, Any]:
+    async def parse_schedule_elements(
+        self,
+        scene_data: Dict[str, Any],
+        project_parameters: Dict[str, Any] = None,
+        features: Dict[str, Any] = None
+    ) -> Dict[str, Any]:
         """Parse fundamental scheduling elements from scene data."""
         logger.info("Starting schedule parsing analysis")
         
@@ -49,10 +57,13 @@ class ScheduleParserAgent:
         scenes = scene_data.get('scenes', [])
         logger.info(f"Processing schedule parsing for {len(scenes)} scenes")
         
+        # Reuse the coordinator's shared features when provided
+        features = features or compute_scene_features(scenes)
+        
         # Extract scheduling elements
-        scheduling_elements = self._extract_scheduling_elements(scenes)
-        basic_schedule = self._generate_basic_schedule(scenes)
-        crew_allocation = self._generate_basic_crew_allocation(scenes)
+        scheduling_elements = self._extract_scheduling_elements(scenes, features)
+        basic_schedule = self._generate_basic_schedule(scenes, project_parameters, features)
+        crew_allocation = self._generate_basic_crew_allocation(scenes, features)
         
         result = {
             "timestamp": datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
@@ -66,7 +77,7 @@ class ScheduleParserAgent:
         logger.info(f"Generated schedule parsing for {len(scenes)} scenes")
         return result
     
-    def _extract_scheduling_elements(self, scenes: List[Dict[str, Any]]) -> Dict[str, Any]:
+    def _extract_scheduling_elements(self, scenes: List[Dict[str, Any]], features: Dict[str, Any]) -> Dict[str, Any]:
         """Extract core scheduling elements from scenes."""
         elements = {
             "total_scenes": len(scenes),
@@ -112,7 +123,7 @@ class ScheduleParserAgent:
             elements["location_breakdown"][location_name]["estimated_shoot_days"] = max(1, round(scene_count / 3.5))
         
         # Cast requirements extraction
-        for scene in scenes:
+        for scene, complexity_score in zip(scenes, features["complexity"]):
             characters = scene.get('main_characters', [])
             
             for character in characters:
@@ -131,7 +142,6 @@ class ScheduleParserAgent:
             elements["time_periods"].add(time_period)
             
             # Scene complexity assessment
-            complexity_score = self._calculate_scene_complexity(scene)
             elements["scene_complexity"][scene.get('scene_number', '0')] = complexity_score
         
         # Convert sets to lists and counts for JSON serialization
@@ -145,96 +155,41 @@ class ScheduleParserAgent:
         
         return elements
     
-    def _calculate_scene_complexity(self, scene: Dict[str, Any]) -> Dict[str, Any]:
-        """Calculate scene complexity for scheduling purposes."""
-        complexity = {
-            "score": 0,
-            "factors": [],
-            "category": "Standard"
-        }
-        
-        # Dialogue complexity
-        dialogue_count = len(scene.get('dialogues', []))
-        if dialogue_count > 10:
-            complexity["score"] += 3
-            complexity["factors"].append("Heavy dialogue")
-        elif dialogue_count > 5:
-            complexity["score"] += 2
-            complexity["factors"].append("Moderate dialogue")
-        
-        # Character count
-        character_count = len(scene.get('main_characters', []))
-        if character_count > 4:
-            complexity["score"] += 3
-            complexity["factors"].append("Multiple characters")
-        elif character_count > 2:
-            complexity["score"] += 1
-            complexity["factors"].append("Several characters")
-        
-        # Technical requirements
-        technical_cues = scene.get('technical_cues', [])
-        if len(technical_cues) > 5:
-            complexity["score"] += 3
-            complexity["factors"].append("Complex technical requirements")
-        elif len(technical_cues) > 2:
-            complexity["score"] += 2
-            complexity["factors"].append("Technical requirements")
-        
-        # Location type
-        location_type = scene.get('location', {}).get('type', 'INT')
-        if location_type == 'EXT':
-            complexity["score"] += 1
-            complexity["factors"].append("Exterior location")
-        
-        # Categorize complexity
-        if complexity["score"] >= 7:
-            complexity["category"] = "High"
-        elif complexity["score"] >= 4:
-            complexity["category"] = "Medium"
-        else:
-            complexity["category"] = "Standard"
-        
-        return complexity
-    
-    def _generate_basic_schedule(self, scenes: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    def _generate_basic_schedule(self, scenes: List[Dict[str, Any]], project_parameters: Dict[str, Any], features: Dict[str, Any]) -> List[Dict[str, Any]]:
         """Generate basic schedule structure."""
         schedule = []
-        current_date = datetime(2024, 3, 15)  # Base date
-        
-        # Group scenes by location for efficient scheduling
-        location_groups = {}
-        for scene in scenes:
-            location = scene.get('location', {}).get('place', 'Unknown')
-            if location not in location_groups:
-                location_groups[location] = []
-            location_groups[location].append(scene)
+        project_parameters = project_parameters or {}
+        start_date = project_parameters.get("start_date") or datetime.now().strftime('%Y-%m-%d')
+        calendar = ProductionCalendar.from_constraints(project_parameters.get("schedule_constraints"), start_date)
         
+        # Scenes are already grouped by location in the shared features
+        scores = features["complexity_scores"]
         day_counter = 1
-        for location, location_scenes in location_groups.items():
+        for location, location_indexes in features["location_groups"].items():
             # Sort scenes by complexity (simpler first)
-            sorted_scenes = sorted(location_scenes, 
-                                 key=lambda s: self._calculate_scene_complexity(s)["score"])
+            sorted_indexes = sorted(location_indexes, key=lambda i: scores[i])
             
             # Group scenes into shooting days (max 4 scenes per day)
             scenes_per_day = 4
-            for i in range(0, len(sorted_scenes), scenes_per_day):
-                day_scenes = sorted_scenes[i:i+scenes_per_day]
+            for i in range(0, len(sorted_indexes), scenes_per_day):
+                day_indexes = sorted_indexes[i:i+scenes_per_day]
+                day_scenes = [scenes[j] for j in day_indexes]
                 
                 schedule_day = {
                     "day": day_counter,
-                    "date": current_date.strftime('%Y-%m-%d'),
                     "location": location,
                     "scenes": [s.get('scene_number', '0') for s in day_scenes],
                     "estimated_hours": self._estimate_shooting_hours(day_scenes),
-                    "complexity_level": self._calculate_day_complexity(day_scenes)
+                    "complexity_level": self._calculate_day_complexity(scores[day_indexes])
                 }
                 
                 schedule.append(schedule_day)
-                
-                # Advance date and day counter
-                current_date = current_date.replace(day=current_date.day + 1)
                 day_counter += 1
         
+        # Assign working dates to all shoot days at once
+        for schedule_day, shoot_date in zip(schedule, as_iso(calendar.shoot_dates(start_date, len(schedule)))):
+            schedule_day["date"] = shoot_date
+        
         return schedule
     
     def _estimate_shooting_hours(self, scenes: List[Dict[str, Any]]) -> float:
@@ -266,10 +221,9 @@ class ScheduleParserAgent:
         
         return round(total_hours + setup_time + breakdown_time, 1)
     
-    def _calculate_day_complexity(self, scenes: List[Dict[str, Any]]) -> str:
-        """Calculate overall complexity for a shooting day."""
-        total_complexity = sum(self._calculate_scene_complexity(scene)["score"] for scene in scenes)
-        avg_complexity = total_complexity / len(scenes) if scenes else 0
+    def _calculate_day_complexity(self, complexity_scores: np.ndarray) -> str:
+        """Calculate overall complexity for a shooting day from its scene scores."""
+        avg_complexity = float(complexity_scores.mean()) if len(complexity_scores) else 0
         
         if avg_complexity >= 5:
             return "High"
@@ -278,7 +232,7 @@ class ScheduleParserAgent:
         else:
             return "Standard"
     
-    def _generate_basic_crew_allocation(self, scenes: List[Dict[str, Any]]) -> Dict[str, Any]:
+    def _generate_basic_crew_allocation(self, scenes: List[Dict[str, Any]], features: Dict[str, Any]) -> Dict[str, Any]:
         """Generate basic crew allocation requirements."""
         crew_allocation = {
             "core_crew": {
@@ -339,7 +293,7 @@ class ScheduleParserAgent:
         
         # Estimate crew size per day based on scene complexity
         for i, scene in enumerate(scenes):
-            complexity = self._calculate_scene_complexity(scene)["score"]
+            complexity = int(features["complexity_scores"][i])
             
             base_crew_size = 15  # Core crew
             additional_crew = min(complexity, 5)  # Add crew based on complexity
@@ -0,0 +1,315 @@
+"""
+Scheduling benchmark suite.
+
+Generates synthetic projects from 50 to 1000 scenes (10-200 locations,
+5-150 cast), times every scheduling agent, the local engines and the full
+coordinator pipeline, and writes a pytest-benchmark style JSON report. With a
+stored baseline it prints a comparison table and can fail on regressions.
+
+    python -m scheduling.benchmark --sizes small,medium --rounds 5
+    python -m scheduling.benchmark --save-baseline
+    python -m scheduling.benchmark --compare --fail-on-regression
+
+The agents construct Gemini clients, so GOOGLE_API_KEY must be set, but no
+LLM calls are made.
+"""
+
+from typing import Dict, Any, List, Callable, Optional
+import argparse
+import asyncio
+import json
+import logging
+import os
+import platform
+import random
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+import numpy as np
+
+from .agents.schedule_parser_agent import ScheduleParserAgent
+from .agents.assistant_director_agent import AssistantDirectorAgent
+from .agents.location_optimizer_agent import LocationOptimizerAgent
+from .agents.crew_allocator_agent import CrewAllocatorAgent
+from .agents.production_calendar_agent import ProductionCalendarAgent
+from .coordinator import SchedulingCoordinator
+from .order_evaluator import ShootingOrderEvaluator
+from .scene_features import compute_scene_features
+from .schedule_engine import ScheduleEngine
+from .unit_planner import UnitPlanner, merge_breakdown_cards
+
+logger = logging.getLogger(__name__)
+
+# (scenes, locations, cast) per project size
+PROJECT_SIZES = {
+    "small": (50, 10, 5),
+    "medium": (200, 40, 30),
+    "large": (500, 100, 80),
+    "xlarge": (1000, 200, 150)
+}
+
+DEFAULT_BASELINE_PATH = os.path.join("data", "benchmarks", "scheduling_baseline.json")
+DEFAULT_REPORT_DIR = os.path.join("data", "benchmarks")
+DEFAULT_START_DATE = "2026-03-02"
+
+TIMES_OF_DAY = ["DAY", "DAY", "DAY", "NIGHT", "DAWN", "DUSK", "MORNING", "EVENING"]
+TECHNICAL_CUES = ["CLOSE-UP on hands", "Steadicam follows", "Crane up to reveal", "Dolly track left", "Drone aerial", "Handheld"]
+SPECIAL_REQUIREMENTS = ["Stunt coordinator", "Safety coordinator", "VFX coordinator", "Drone operator/crane operator", "Steadicam operator"]
+
+
+def synthetic_project(scene_count: int, location_count: int, cast_count: int, seed: int = 0) -> Dict[str, Any]:
+    """Build a reproducible scene_data dict with parsed scenes and breakdown cards."""
+    rng = random.Random(seed)
+    cast = [f"CHARACTER_{k + 1}" for k in range(cast_count)]
+    # A few leads appear far more often than the supporting cast
+    weights = [1.0 / (k + 1) for k in range(cast_count)]
+    locations = [(f"LOCATION {k + 1}", "EXT" if rng.random() < 0.4 else "INT") for k in range(location_count)]
+
+    scenes = []
+    cards = []
+    for i in range(scene_count):
+        place, location_type = locations[rng.randrange(location_count)]
+        characters = sorted(set(rng.choices(cast, weights=weights, k=rng.randint(0, min(5, cast_count)))))
+        dialogues = [
+            {"character": rng.choice(characters), "line": " ".join(["word"] * rng.randint(4, 30))}
+            for _ in range(rng.randint(0, 14) if characters else 0)
+        ]
+        scene_number = str(i + 1)
+        scenes.append({
+            "scene_number": scene_number,
+            "location": {"place": place, "type": location_type},
+            "time": rng.choice(TIMES_OF_DAY),
+            "description": " ".join(["action"] * rng.randint(20, 200)),
+            "dialogues": dialogues,
+            "main_characters": characters,
+            "technical_cues": rng.sample(TECHNICAL_CUES, rng.randint(0, 3))
+        })
+        cards.append({
+            "scene_number": scene_number,
+            "crew_estimate": {"total_crew": rng.choice([12, 18, 25, 35, 50])},
+            "special_requirements": rng.sample(SPECIAL_REQUIREMENTS, rng.randint(0, 2))
+        })
+
+    return {"scenes": scenes, "metadata": {"breakdown_cards": cards}}
+
+
+def _stats(samples: List[float]) -> Dict[str, float]:
+    """pytest-benchmark style statistics for a list of round timings in seconds."""
+    ordered = sorted(samples)
+    quartiles = np.percentile(ordered, [25, 75])
+    mean = statistics.fmean(ordered)
+    return {
+        "min": ordered[0],
+        "max": ordered[-1],
+        "mean": mean,
+        "stddev": statistics.stdev(ordered) if len(ordered) > 1 else 0.0,
+        "median": statistics.median(ordered),
+        "iqr": float(quartiles[1] - quartiles[0]),
+        "rounds": len(ordered),
+        "ops": 1.0 / mean if mean else 0.0,
+        "total": sum(ordered),
+        "data": ordered
+    }
+
+
+class SchedulingBenchmark:
+    """Times scheduling agents, engines and the coordinator on synthetic projects."""
+
+    def __init__(self, rounds: int = 5, warmup: int = 1, seed: int = 0):
+        self.rounds = rounds
+        self.warmup = warmup
+        self.seed = seed
+        self.parser = ScheduleParserAgent()
+        self.assistant_director = AssistantDirectorAgent()
+        self.location_optimizer = LocationOptimizerAgent()
+        self.crew_allocator = CrewAllocatorAgent()
+        self.production_calendar = ProductionCalendarAgent()
+        self.engine = ScheduleEngine()
+        self.unit_planner = UnitPlanner(self.engine)
+
+    def _time(self, function: Callable[[], Any]) -> List[float]:
+        for _ in range(self.warmup):
+            function()
+        samples = []
+        for _ in range(self.rounds):
+            start = time.perf_counter()
+            function()
+            samples.append(time.perf_counter() - start)
+        return samples
+
+    def cases(self, scene_data: Dict[str, Any], coordinator: SchedulingCoordinator) -> Dict[str, Callable[[], Any]]:
+        """Named zero-argument callables for one project."""
+        scenes = scene_data["scenes"]
+        parameters = {"start_date": DEFAULT_START_DATE, "schedule_constraints": {}}
+        crew_data = {"crew": []}
+        features = compute_scene_features(scenes)
+        evaluator = ShootingOrderEvaluator(scenes)
+        unit_scenes = merge_breakdown_cards(scenes, scene_data["metadata"]["breakdown_cards"])
+
+        return {
+            "scene_features": lambda: compute_scene_features(scenes),
+            "schedule_parser.parse_schedule_elements": lambda: asyncio.run(
+                self.parser.parse_schedule_elements(scene_data, parameters, features)),
+            "assistant_director.generate_stripboard_doop": lambda: asyncio.run(
+                self.assistant_director.generate_stripboard_doop(scene_data, parameters, features)),
+            "location_optimizer.optimize_locations": lambda: asyncio.run(
+                self.location_optimizer.optimize_locations(scene_data, None, features)),
+            "crew_allocator.allocate_departments": lambda: asyncio.run(
+                self.crew_allocator.allocate_departments(scene_data, crew_data)),
+            "production_calendar.generate_production_calendar": lambda: asyncio.run(
+                self.production_calendar.generate_production_calendar(scene_data, parameters, features)),
+            "schedule_engine.build_schedule": lambda: self.engine.build_schedule(scenes, DEFAULT_START_DATE),
+            "order_evaluator.rank_200": lambda: evaluator.rank(evaluator.generate_candidates(200, self.seed)),
+            "unit_planner.plan": lambda: self.unit_planner.plan(unit_scenes, DEFAULT_START_DATE, True),
+            "coordinator.generate_schedule": lambda: asyncio.run(
+                coordinator.generate_schedule(scene_data, crew_data, DEFAULT_START_DATE))
+        }
+
+    def run(self, sizes: List[str], only: Optional[List[str]] = None) -> Dict[str, Any]:
+        """Run every case for each project size and return the JSON report."""
+        benchmarks = []
+        cwd = os.getcwd()
+        with tempfile.TemporaryDirectory() as workdir:
+            # The coordinator writes schedule files relative to the working directory
+            os.chdir(workdir)
+            try:
+                coordinator = SchedulingCoordinator()
+                for size in sizes:
+                    scene_count, location_count, cast_count = PROJECT_SIZES[size]
+                    scene_data = synthetic_project(scene_count, location_count, cast_count, self.seed)
+                    for name, function in self.cases(scene_data, coordinator).items():
+                        if only and not any(pattern in name for pattern in only):
+                            continue
+                        samples = self._time(function)
+                        stats = _stats(samples)
+                        benchmarks.append({
+                            "group": size,
+                            "name": f"{name}[{size}]",
+                            "fullname": f"scheduling/benchmark.py::{name}[{size}]",
+                            "params": {"scenes": scene_count, "locations": location_count, "cast": cast_count},
+                            "stats": stats
+                        })
+                        logger.info(f"{name}[{size}]: median {stats['median'] * 1000:.2f} ms over {stats['rounds']} rounds")
+                if coordinator._process_pool is not None:
+                    coordinator._process_pool.shutdown()
+            finally:
+                os.chdir(cwd)
+
+        return {
+            "machine_info": {
+                "node": platform.node(),
+                "processor": platform.processor(),
+                "machine": platform.machine(),
+                "python_implementation": platform.python_implementation(),
+                "python_version": platform.python_version(),
+                "system": platform.system(),
+                "release": platform.release(),
+                "cpu_count": os.cpu_count(),
+                "numpy_version": np.__version__
+            },
+            "datetime": datetime.now().isoformat(),
+            "version": 1,
+            "benchmarks": benchmarks
+        }
+
+
+def compare_reports(current: Dict[str, Any], baseline: Dict[str, Any], threshold: float = 0.2) -> Dict[str, Any]:
+    """Compare medians against a baseline; a slowdown beyond threshold is a regression."""
+    baseline_by_name = {bench["name"]: bench for bench in baseline.get("benchmarks", [])}
+    rows = []
+    for bench in current["benchmarks"]:
+        previous = baseline_by_name.get(bench["name"])
+        row = {"name": bench["name"], "median": bench["stats"]["median"]}
+        if previous:
+            base_median = previous["stats"]["median"]
+            change = (bench["stats"]["median"] - base_median) / base_median if base_median else 0.0
+            row.update({
+                "baseline_median": base_median,
+                "change": change,
+                "status": "regression" if change > threshold else "improved" if change < -threshold else "ok"
+            })
+        else:
+            row["status"] = "new"
+        rows.append(row)
+    return {
+        "threshold": threshold,
+        "rows": rows,
+        "regressions": [row["name"] for row in rows if row["status"] == "regression"]
+    }
+
+
+def format_comparison(comparison: Dict[str, Any]) -> str:
+    """Render a comparison as a fixed-width table in the style of pytest-benchmark compare."""
+    width = max([len(row["name"]) for row in comparison["rows"]] + [4])
+    lines = [
+        f"{'Name':<{width}}  {'Median (ms)':>12}  {'Baseline (ms)':>13}  {'Change':>8}  Status",
+        "-" * (width + 50)
+    ]
+    for row in comparison["rows"]:
+        baseline = f"{row['baseline_median'] * 1000:13.2f}" if "baseline_median" in row else f"{'-':>13}"
+        change = f"{row['change'] * 100:+7.1f}%" if "change" in row else f"{'-':>8}"
+        lines.append(f"{row['name']:<{width}}  {row['median'] * 1000:12.2f}  {baseline}  {change}  {row['status']}")
+    if comparison["regressions"]:
+        lines.append(f"{len(comparison['regressions'])} regression(s) over {comparison['threshold'] * 100:.0f}%")
+    return "\n".join(lines)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark the scheduling agents and coordinator")
+    parser.add_argument("--sizes", default=",".join(PROJECT_SIZES), help="Comma-separated project sizes")
+    parser.add_argument("--only", default="", help="Comma-separated substrings of case names to run")
+    parser.add_argument("--rounds", type=int, default=5)
+    parser.add_argument("--warmup", type=int, default=1)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", default="", help="Report path (default data/benchmarks/scheduling_<timestamp>.json)")
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE_PATH)
+    parser.add_argument("--save-baseline", action="store_true", help="Store this run as the baseline")
+    parser.add_argument("--compare", action="store_true", help="Compare against the baseline")
+    parser.add_argument("--threshold", type=float, default=0.2, help="Relative median slowdown counted as a regression")
+    parser.add_argument("--fail-on-regression", action="store_true")
+    parser.add_argument("--verbose", action="store_true", help="Keep the agents' INFO logging")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    if not args.verbose:
+        for name in ("scheduling.agents", "scheduling.coordinator", "scheduling.unit_planner"):
+            logging.getLogger(name).setLevel(logging.WARNING)
+    sizes = [size.strip() for size in args.sizes.split(",") if size.strip()]
+    unknown = [size for size in sizes if size not in PROJECT_SIZES]
+    if unknown:
+        parser.error(f"Unknown sizes {unknown}; choose from {list(PROJECT_SIZES)}")
+
+    benchmark = SchedulingBenchmark(rounds=args.rounds, warmup=args.warmup, seed=args.seed)
+    report = benchmark.run(sizes, [name for name in args.only.split(",") if name])
+
+    output = args.output or os.path.join(DEFAULT_REPORT_DIR, f"scheduling_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json")
+    os.makedirs(os.path.dirname(output) or ".", exist_ok=True)
+    with open(output, "w") as f:
+        json.dump(report, f, indent=2)
+    logger.info(f"Benchmark report written to {output}")
+
+    exit_code = 0
+    if args.compare:
+        if not os.path.exists(args.baseline):
+            logger.warning(f"No baseline at {args.baseline}; run with --save-baseline first")
+        else:
+            with open(args.baseline) as f:
+                comparison = compare_reports(report, json.load(f), args.threshold)
+            print(format_comparison(comparison))
+            if comparison["regressions"] and args.fail_on_regression:
+                exit_code = 1
+
+    if args.save_baseline:
+        os.makedirs(os.path.dirname(args.baseline) or ".", exist_ok=True)
+        with open(args.baseline, "w") as f:
+            json.dump(report, f, indent=2)
+        logger.info(f"Baseline saved to {args.baseline}")
+
+    return exit_code
+
+
+if __name__ == "__main__":
+    sys.exit(main())
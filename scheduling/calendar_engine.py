@@ -0,0 +1,154 @@
+"""
+Business-day production calendar.
+
+Maps shoot-day indexes to calendar dates with NumPy business-day arithmetic,
+honouring 5- or 6-day weeks, holiday calendars, blackout dates and
+turnaround days off.
+"""
+
+from typing import Dict, Any, List, Optional, Iterable, Union
+import logging
+from datetime import date, datetime
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+WEEKMASKS = {
+    5: "Mon Tue Wed Thu Fri",
+    6: "Mon Tue Wed Thu Fri Sat",
+    7: "Mon Tue Wed Thu Fri Sat Sun"
+}
+
+# Fixed-date public holidays as (month, day)
+HOLIDAY_CALENDARS = {
+    "us": [(1, 1), (6, 19), (7, 4), (11, 11), (12, 25)],
+    "india": [(1, 26), (8, 15), (10, 2), (12, 25)],
+    "uk": [(1, 1), (12, 25), (12, 26)],
+    "none": []
+}
+
+DateLike = Union[str, date, datetime, np.datetime64]
+
+
+def to_day(value: DateLike) -> np.datetime64:
+    """Convert a date-like value to a datetime64[D]."""
+    if isinstance(value, datetime):
+        value = value.date()
+    return np.datetime64(value, 'D')
+
+
+class ProductionCalendar:
+    """Shooting calendar built on numpy.busday_offset / busday_count."""
+
+    def __init__(
+        self,
+        weekmask: str = WEEKMASKS[5],
+        holidays: Optional[Iterable[DateLike]] = None,
+        blackout_dates: Optional[Iterable[DateLike]] = None,
+        holiday_calendar: Optional[str] = None,
+        years: Optional[Iterable[int]] = None
+    ):
+        self.weekmask = weekmask
+        closed = [to_day(d) for d in (holidays or [])]
+        closed += [to_day(d) for d in (blackout_dates or [])]
+        if holiday_calendar:
+            if holiday_calendar.lower() not in HOLIDAY_CALENDARS:
+                raise ValueError(f"Unknown holiday calendar: {holiday_calendar}")
+            for year in (years or range(datetime.now().year - 1, datetime.now().year + 4)):
+                closed += [np.datetime64(date(year, month, day), 'D') for month, day in HOLIDAY_CALENDARS[holiday_calendar.lower()]]
+        self.holidays = np.unique(np.array(closed, dtype='datetime64[D]'))
+        self._busdaycal = np.busdaycalendar(weekmask=self.weekmask, holidays=self.holidays)
+
+    @classmethod
+    def from_constraints(cls, constraints: Optional[Dict[str, Any]] = None, start_date: Optional[DateLike] = None) -> "ProductionCalendar":
+        """Build a calendar from schedule constraints.
+
+        Recognised keys: weekmask, shoot_days_per_week (5/6/7), holidays,
+        holiday_calendar, blackout_dates.
+        """
+        constraints = constraints or {}
+        weekmask = constraints.get("weekmask") or WEEKMASKS.get(int(constraints.get("shoot_days_per_week", 5)), WEEKMASKS[5])
+        years = None
+        if start_date:
+            year = int(str(to_day(start_date))[:4])
+            years = range(year - 1, year + 4)
+        return cls(
+            weekmask=weekmask,
+            holidays=constraints.get("holidays"),
+            blackout_dates=constraints.get("blackout_dates"),
+            holiday_calendar=constraints.get("holiday_calendar"),
+            years=years
+        )
+
+    def is_shoot_day(self, value: DateLike) -> bool:
+        return bool(np.is_busday(to_day(value), busdaycal=self._busdaycal))
+
+    def roll_forward(self, dates: Union[DateLike, np.ndarray]) -> np.ndarray:
+        """Move each date forward to the next working day (vectorized)."""
+        return np.busday_offset(np.asarray(dates, dtype='datetime64[D]'), 0, roll='forward', busdaycal=self._busdaycal)
+
+    def offset(self, start: DateLike, days: Union[int, np.ndarray]) -> np.ndarray:
+        """Date(s) that are `days` working days after start (start rolled forward first)."""
+        return np.busday_offset(to_day(start), days, roll='forward', busdaycal=self._busdaycal)
+
+    def shoot_dates(
+        self,
+        start: DateLike,
+        total_days: int,
+        turnaround_after: Optional[Iterable[int]] = None
+    ) -> np.ndarray:
+        """Dates for shoot days 1..total_days in one vectorized step.
+
+        turnaround_after lists 1-based shoot days that are followed by a
+        working day off (e.g. the switch from nights back to days).
+        """
+        indexes = np.arange(total_days)
+        if turnaround_after:
+            breaks = np.sort(np.asarray(list(turnaround_after), dtype=int))
+            indexes = indexes + np.searchsorted(breaks, indexes, side='right')
+        return self.offset(start, indexes)
+
+    def working_days_between(self, start: DateLike, end: DateLike) -> int:
+        """Working days in [start, end)."""
+        return int(np.busday_count(to_day(start), to_day(end), busdaycal=self._busdaycal))
+
+    def weekly_breakdown(self, dates: np.ndarray) -> Dict[str, Any]:
+        """Group shoot dates into Monday-based weeks."""
+        if len(dates) == 0:
+            return {}
+        day_numbers = dates.astype('datetime64[D]').astype(np.int64)
+        # 1970-01-01 was a Thursday, so Monday-based week numbers shift by 3 days
+        week_ids = (day_numbers + 3) // 7
+        unique_weeks, starts, counts = np.unique(week_ids, return_index=True, return_counts=True)
+        weeks = {}
+        for number, (start_index, count) in enumerate(zip(starts, counts), start=1):
+            week_dates = dates[start_index:start_index + count]
+            weeks[f"week_{number}"] = {
+                "start_date": str(week_dates[0]),
+                "end_date": str(week_dates[-1]),
+                "shooting_days": int(count),
+                "weekend_break": number < len(unique_weeks)
+            }
+        return weeks
+
+    def describe(self) -> Dict[str, Any]:
+        return {
+            "weekmask": self.weekmask,
+            "shoot_days_per_week": len(self.weekmask.split()),
+            "closed_dates": [str(d) for d in self.holidays]
+        }
+
+
+def as_iso(dates: np.ndarray) -> List[str]:
+    """datetime64[D] array to ISO strings."""
+    return np.datetime_as_string(np.asarray(dates, dtype='datetime64[D]'), unit='D').tolist()
+
+
+def as_datetime(value: np.datetime64) -> datetime:
+    return datetime.combine(value.astype('datetime64[D]').astype(date), datetime.min.time())
+
+
+def week_offsets(start: DateLike, weeks: Union[List[float], np.ndarray]) -> np.ndarray:
+    """start + N weeks for every N, as datetime64[D]."""
+    return to_day(start) + np.round(np.asarray(weeks, dtype=float) * 7).astype('timedelta64[D]')
@@ -1,16 +1,43 @@
 import logging
-from typing import Dict, Any, Optional
+from typing import Dict, Any, List, Optional
+import asyncio
 import json
 import os
+import time
+from concurrent.futures import ProcessPoolExecutor
 from datetime import datetime
 from .agents.schedule_parser_agent import ScheduleParserAgent
 from .agents.assistant_director_agent import AssistantDirectorAgent
 from .agents.location_optimizer_agent import LocationOptimizerAgent
 from .agents.crew_allocator_agent import CrewAllocatorAgent
 from .agents.production_calendar_agent import ProductionCalendarAgent
+from .order_evaluator import ShootingOrderEvaluator
+from .scene_features import compute_scene_features
+from .unit_planner import UnitPlanner, merge_breakdown_cards
 
 logger = logging.getLogger(__name__)
 
+# Projects at or above this size run the agents' CPU-bound work in worker processes
+PROCESS_POOL_MIN_SCENES = 200
+
+AGENT_CLASSES = {
+    "schedule_parser": ScheduleParserAgent,
+    "assistant_director": AssistantDirectorAgent,
+    "location_optimizer": LocationOptimizerAgent,
+    "crew_allocator": CrewAllocatorAgent,
+    "production_calendar": ProductionCalendarAgent
+}
+
+# One agent instance per worker process, created on first use
+_worker_agents: Dict[str, Any] = {}
+
+def _run_agent_in_worker(agent_name: str, method_name: str, args: tuple) -> Dict[str, Any]:
+    """Run one agent method to completion inside a worker process."""
+    agent = _worker_agents.get(agent_name)
+    if agent is None:
+        agent = _worker_agents[agent_name] = AGENT_CLASSES[agent_name]()
+    return asyncio.run(getattr(agent, method_name)(*args))
+
 class SchedulingCoordinator:
     def __init__(self):
         logger.info("Initializing SchedulingCoordinator with 5 specialized agents")
@@ -22,6 +49,12 @@ class SchedulingCoordinator:
         self.crew_allocator = CrewAllocatorAgent()             # DEPT SCHEDULING - GPT-4.1 mini
         self.production_calendar = ProductionCalendarAgent()   # TIMELINE MGMT - Gemini 2.5 Flash
         
+        # Splits scenes across main, second and splinter units when requested
+        self.unit_planner = UnitPlanner()
+        
+        # Worker processes for large projects, started on first use
+        self._process_pool: Optional[ProcessPoolExecutor] = None
+        
         # Create necessary data directories
         os.makedirs("data/schedules", exist_ok=True)
         os.makedirs("data/schedules/calendar", exist_ok=True)
@@ -146,7 +179,7 @@ class SchedulingCoordinator:
                 },
                 "coordination_metrics": {
                     "agent_integration": "Fully coordinated",
-                    "data_flow": "Sequential pipeline",
+                    "data_flow": "Parallel agents over shared scene features",
                     "optimization_level": "Advanced multi-agent",
                     "scheduling_approach": "Industry-standard practices"
                 }
@@ -183,43 +216,40 @@ class SchedulingCoordinator:
                 logger.error(f"Input validation failed: {str(e)}")
                 raise
             
-            # Step 1: Parse scheduling elements (FOUNDATIONAL)
-            logger.info("Step 1: Parsing scheduling elements with ScheduleParserAgent")
-            schedule_elements = await self.schedule_parser.parse_schedule_elements(processed_scene_data)
-            logger.info("Schedule parsing completed")
-            
-            # Step 2: Generate stripboard and DOOP reports (DOOP/STRIPBOARD)
-            logger.info("Step 2: Generating stripboard and DOOP reports with AssistantDirectorAgent")
-            stripboard_doop = await self.assistant_director.generate_stripboard_doop(processed_scene_data)
-            logger.info("Stripboard and DOOP generation completed")
-            
-            # Step 3: Optimize locations and logistics (LOGISTICS)
-            logger.info("Step 3: Optimizing locations and logistics with LocationOptimizerAgent")
-            location_plan = await self.location_optimizer.optimize_locations(
-                processed_scene_data,
-                location_constraints
-            )
-            logger.info("Location optimization completed")
+            calendar_parameters = {
+                "start_date": validated_start_date,
+                "schedule_constraints": schedule_constraints or {}
+            }
             
-            # Step 4: Allocate crew across departments (DEPT SCHEDULING)
-            logger.info("Step 4: Allocating crew across departments with CrewAllocatorAgent")
-            crew_allocation = await self.crew_allocator.allocate_departments(
-                processed_scene_data,
-                processed_crew_data
-            )
-            logger.info("Department crew allocation completed")
+            # Compute location groups, page counts, complexity and cast sets once for all agents
+            features = compute_scene_features(processed_scene_data["scenes"])
+            use_processes = features["scene_count"] >= PROCESS_POOL_MIN_SCENES
             
-            # Step 5: Generate production calendar and timeline (TIMELINE MGMT)
-            logger.info("Step 5: Generating production calendar with ProductionCalendarAgent")
-            production_calendar = await self.production_calendar.generate_production_calendar(
-                processed_scene_data,
-                {
-                    "start_date": validated_start_date,
-                    "location_plan": location_plan,
-                    "crew_allocation": crew_allocation
-                }
+            # The five agents are independent, so run them concurrently
+            logger.info(f"Running 5 scheduling agents concurrently ({'process pool' if use_processes else 'threads'})")
+            pipeline_start = time.perf_counter()
+            (
+                (schedule_elements, parser_seconds),
+                (stripboard_doop, director_seconds),
+                (location_plan, location_seconds),
+                (crew_allocation, crew_seconds),
+                (production_calendar, calendar_seconds)
+            ) = await asyncio.gather(
+                self._run_agent("schedule_parser", "parse_schedule_elements", (processed_scene_data, calendar_parameters, features), use_processes),
+                self._run_agent("assistant_director", "generate_stripboard_doop", (processed_scene_data, calendar_parameters, features), use_processes),
+                self._run_agent("location_optimizer", "optimize_locations", (processed_scene_data, location_constraints, features), use_processes),
+                self._run_agent("crew_allocator", "allocate_departments", (processed_scene_data, processed_crew_data), use_processes),
+                self._run_agent("production_calendar", "generate_production_calendar", (processed_scene_data, calendar_parameters, features), use_processes)
             )
-            logger.info("Production calendar generation completed")
+            agent_timings = {
+                "schedule_parser": parser_seconds,
+                "assistant_director": director_seconds,
+                "location_optimizer": location_seconds,
+                "crew_allocator": crew_seconds,
+                "production_calendar": calendar_seconds,
+                "total_wall_clock": round(time.perf_counter() - pipeline_start, 4)
+            }
+            logger.info(f"Scheduling agents completed: {agent_timings}")
             
             # Compile comprehensive scheduling results
             result = {
@@ -238,9 +268,25 @@ class SchedulingCoordinator:
                 "scheduling_summary": self._generate_scheduling_summary(
                     schedule_elements, stripboard_doop, location_plan, crew_allocation, production_calendar
                 ),
+                "agent_timings": agent_timings,
                 "timestamp": datetime.now().isoformat()
             }
             
+            # Multi-unit split when the caller configures units
+            unit_constraints = (schedule_constraints or {}).get("units")
+            if unit_constraints:
+                unit_scenes = merge_breakdown_cards(
+                    processed_scene_data["scenes"],
+                    processed_scene_data["metadata"].get("breakdown_cards")
+                )
+                unit_plan = await asyncio.to_thread(
+                    self.unit_planner.plan,
+                    unit_scenes, validated_start_date, unit_constraints, schedule_constraints, location_plan
+                )
+                unit_plan["stripboards"] = self.assistant_director.generate_unit_stripboards(unit_scenes, unit_plan)
+                result["unit_plan"] = unit_plan
+                logger.info(f"Unit plan saves {unit_plan['day_savings']['days_saved']} shoot days")
+            
             # Save to disk
             logger.info("Saving comprehensive scheduling data to disk")
             saved_files = self._save_to_disk(result)
@@ -253,6 +299,26 @@ class SchedulingCoordinator:
             logger.error(f"Error in 5-agent scheduling pipeline: {str(e)}", exc_info=True)
             raise
     
+    async def _run_agent(self, agent_name: str, method_name: str, args: tuple, use_processes: bool):
+        """Run one agent off the event loop and return (result, elapsed seconds)."""
+        start = time.perf_counter()
+        if use_processes:
+            if self._process_pool is None:
+                self._process_pool = ProcessPoolExecutor(max_workers=min(len(AGENT_CLASSES), os.cpu_count() or 1))
+            loop = asyncio.get_running_loop()
+            result = await loop.run_in_executor(self._process_pool, _run_agent_in_worker, agent_name, method_name, args)
+        else:
+            agent = getattr(self, agent_name)
+            result = await asyncio.to_thread(asyncio.run, getattr(agent, method_name)(*args))
+        return result, round(time.perf_counter() - start, 4)
+    
+    def close(self) -> None:
+        """Shut down the worker processes, if any were started; safe to call more than once."""
+        if self._process_pool is not None:
+            self._process_pool.shutdown(wait=False, cancel_futures=True)
+            self._process_pool = None
+            logger.info("Scheduling worker processes shut down")
+    
     async def generate_schedule_frontend(
         self,
         script_data: Dict[str, Any],
@@ -286,6 +352,77 @@ class SchedulingCoordinator:
             logger.error(f"Error in frontend schedule generation: {str(e)}")
             raise
 
+    async def evaluate_shooting_orders(
+        self,
+        scene_data: Dict[str, Any],
+        candidates: Optional[List[Dict[str, Any]]] = None,
+        generate: int = 0,
+        start_date: str = "",
+        location_constraints: Optional[Dict[str, Any]] = None,
+        schedule_constraints: Optional[Dict[str, Any]] = None,
+        weights: Optional[Dict[str, float]] = None,
+        seed: Optional[int] = None
+    ) -> Dict[str, Any]:
+        """Score candidate shooting orders in one vectorized batch and return a ranked table.
+
+        Each candidate may carry a name, a shooting_order (scene numbers), a start_date and
+        its own schedule_constraints (cast_availability windows, eighths_per_day). Candidates
+        sharing constraints are scored together; `generate` adds random location-block orders.
+        """
+        processed_scene_data = self._validate_scene_data(scene_data)
+        scenes = processed_scene_data["scenes"]
+        validated_start_date = self._validate_start_date(start_date)
+        base_constraints = schedule_constraints or {}
+        candidates = list(candidates or [])
+
+        # Group candidates by their effective constraints so each group is one matrix pass
+        groups: Dict[str, List[int]] = {}
+        for i, candidate in enumerate(candidates):
+            key = json.dumps(candidate.get("schedule_constraints", {}), sort_keys=True, default=str)
+            groups.setdefault(key, []).append(i)
+
+        def evaluate() -> Dict[str, Any]:
+            tables = []
+            for key, members in groups.items():
+                constraints = {**base_constraints, **json.loads(key)}
+                evaluator = ShootingOrderEvaluator(scenes, location_constraints, constraints)
+                orders = evaluator.orders_from_scene_numbers([
+                    candidates[i].get("shooting_order") or [] for i in members
+                ])
+                tables.append(evaluator.rank(
+                    orders,
+                    names=[candidates[i].get("name", f"candidate_{i + 1}") for i in members],
+                    start_dates=[candidates[i].get("start_date") or validated_start_date for i in members],
+                    weights=weights,
+                    include_orders=len(members)
+                ))
+            if generate > 0:
+                evaluator = ShootingOrderEvaluator(scenes, location_constraints, base_constraints)
+                tables.append(evaluator.rank(
+                    evaluator.generate_candidates(generate, seed),
+                    names=["location_grouped"] + [f"generated_{n}" for n in range(1, generate)],
+                    start_dates=[validated_start_date] * generate,
+                    weights=weights
+                ))
+            return tables
+
+        start = time.perf_counter()
+        tables = await asyncio.to_thread(evaluate)
+
+        ranking = sorted((row for table in tables for row in table["ranking"]), key=lambda row: row["score"])
+        for position, row in enumerate(ranking, start=1):
+            row["rank"] = position
+
+        logger.info(f"Evaluated {len(ranking)} shooting order candidates for {len(scenes)} scenes")
+        return {
+            "scene_count": len(scenes),
+            "candidates_evaluated": len(ranking),
+            "score_weights": tables[0]["score_weights"] if tables else {},
+            "ranking": ranking,
+            "evaluation_seconds": round(time.perf_counter() - start, 4),
+            "timestamp": datetime.now().isoformat()
+        }
+
     def _save_to_disk(self, data: Dict[str, Any]) -> Dict[str, str]:
         """Save schedule data to disk in multiple formats."""
         try:
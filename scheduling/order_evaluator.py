@@ -0,0 +1,263 @@
+"""
+Batch what-if evaluation of candidate shooting orders.
+
+Scores N candidate orders in one vectorized pass over a scene x cast matrix,
+a location distance matrix and an eighths-per-day packing rule. Each order is
+scored on total days, cast hold days, company moves, travel, overtime and
+actor availability conflicts. No LLM calls are involved.
+"""
+
+from typing import Dict, Any, List, Optional
+import logging
+
+import numpy as np
+
+from .calendar_engine import ProductionCalendar, as_iso
+from .schedule_engine import SCHEDULE_RULES, scene_eighths, scene_location
+
+logger = logging.getLogger(__name__)
+
+# Score weights in shoot-day equivalents
+DEFAULT_SCORE_WEIGHTS = {
+    "total_days": 1.0,
+    "hold_days": 0.25,
+    "company_moves": 0.5,
+    "travel_hours": 0.05,
+    "overtime_hours": 1.0 / 12,
+    "availability_conflicts": 2.0
+}
+
+# Upper bound on one-hot day tensor elements built per chunk
+MAX_CHUNK_ELEMENTS = 20_000_000
+
+
+def haversine_km(latitudes: np.ndarray, longitudes: np.ndarray) -> np.ndarray:
+    """Pairwise great-circle distances in km."""
+    lat = np.radians(latitudes)[:, None]
+    lon = np.radians(longitudes)[:, None]
+    dlat = lat - lat.T
+    dlon = lon - lon.T
+    a = np.sin(dlat / 2) ** 2 + np.cos(lat) * np.cos(lat.T) * np.sin(dlon / 2) ** 2
+    return 6371.0 * 2 * np.arcsin(np.sqrt(np.clip(a, 0.0, 1.0)))
+
+
+class ShootingOrderEvaluator:
+    """Vectorized scorer for candidate shooting orders of one project."""
+
+    def __init__(
+        self,
+        scenes: List[Dict[str, Any]],
+        location_constraints: Optional[Dict[str, Any]] = None,
+        schedule_constraints: Optional[Dict[str, Any]] = None,
+        rules: Optional[Dict[str, Any]] = None
+    ):
+        self.rules = {**SCHEDULE_RULES, **(rules or {})}
+        self.scenes = scenes
+        self.schedule_constraints = schedule_constraints or {}
+        location_constraints = location_constraints or {}
+
+        self.scene_numbers = [str(scene.get('scene_number', i + 1)) for i, scene in enumerate(scenes)]
+        self.scene_index = {number: i for i, number in enumerate(self.scene_numbers)}
+        self.eighths = np.array([scene_eighths(scene, self.rules) for scene in scenes], dtype=float)
+
+        # Location index per scene and location distance matrix (hours)
+        places = [scene_location(scene) for scene in scenes]
+        self.locations = list(dict.fromkeys(place for place, _ in places))
+        location_lookup = {place: i for i, place in enumerate(self.locations)}
+        self.scene_locations = np.array([location_lookup[place] for place, _ in places], dtype=int)
+        location_types = {place: location_type for place, location_type in places}
+        self.travel_hours = self._build_travel_matrix(location_types, location_constraints)
+
+        # Scene x cast incidence matrix
+        self.cast = sorted({c for scene in scenes for c in scene.get('main_characters', []) or []})
+        cast_lookup = {name: k for k, name in enumerate(self.cast)}
+        self.cast_matrix = np.zeros((len(scenes), len(self.cast)), dtype=np.float32)
+        for i, scene in enumerate(scenes):
+            for name in scene.get('main_characters', []) or []:
+                self.cast_matrix[i, cast_lookup[name]] = 1.0
+
+        day_hours_per_eighth = self.rules["hours_per_eighth"] * (1 + self.rules["setup_time_percentage"] + self.rules["wrap_time_percentage"])
+        self.eighths_per_day = float(self.schedule_constraints.get(
+            "eighths_per_day",
+            min(self.rules["max_day_eighths"], self.rules["standard_day_hours"] / day_hours_per_eighth)
+        ))
+        self.hours_per_eighth_on_set = day_hours_per_eighth
+        self.availability = self._build_availability(self.schedule_constraints.get("cast_availability", {}))
+
+    def _build_travel_matrix(self, location_types: Dict[str, str], location_constraints: Dict[str, Any]) -> np.ndarray:
+        """Travel hours between locations from coordinates, an explicit matrix, or INT/EXT defaults."""
+        coordinates = location_constraints.get("coordinates", {})
+        explicit = location_constraints.get("travel_hours", {})
+
+        # Defaults match LocationOptimizerAgent._estimate_travel_time
+        exterior = np.array([location_types[place] == 'EXT' for place in self.locations], dtype=bool)
+        matrix = np.where(exterior[:, None] & exterior[None, :], 2.0, np.where(~exterior[:, None] & ~exterior[None, :], 1.0, 1.5))
+
+        if coordinates and all(place in coordinates for place in self.locations):
+            lat = np.array([coordinates[place][0] for place in self.locations], dtype=float)
+            lon = np.array([coordinates[place][1] for place in self.locations], dtype=float)
+            speed = float(location_constraints.get("travel_speed_kmh", 40.0))
+            matrix = haversine_km(lat, lon) / speed
+
+        for origin, targets in explicit.items():
+            for target, hours in targets.items():
+                if origin in self.locations and target in self.locations:
+                    matrix[self.locations.index(origin), self.locations.index(target)] = float(hours)
+
+        np.fill_diagonal(matrix, 0.0)
+        return matrix
+
+    def _build_availability(self, cast_availability: Dict[str, Any]) -> Optional[np.ndarray]:
+        """Zero-based (first_day, last_day) availability window per cast member, or None."""
+        if not cast_availability:
+            return None
+        windows = np.zeros((len(self.cast), 2), dtype=int)
+        windows[:, 1] = np.iinfo(np.int32).max
+        for name, window in cast_availability.items():
+            if name in self.cast:
+                k = self.cast.index(name)
+                windows[k, 0] = int(window.get("available_from_day", 1)) - 1
+                windows[k, 1] = int(window.get("available_to_day", np.iinfo(np.int32).max)) - 1
+        return windows
+
+    def baseline_order(self) -> np.ndarray:
+        """Scenes grouped by location in order of first appearance."""
+        return np.lexsort((np.arange(len(self.scenes)), self._first_appearance_rank()))
+
+    def _first_appearance_rank(self) -> np.ndarray:
+        first_seen = {}
+        for location in self.scene_locations:
+            first_seen.setdefault(int(location), len(first_seen))
+        return np.array([first_seen[int(location)] for location in self.scene_locations])
+
+    def generate_candidates(self, count: int, seed: Optional[int] = None) -> np.ndarray:
+        """Generate candidate orders that keep location blocks together in random block order."""
+        rng = np.random.default_rng(seed)
+        scene_count = len(self.scenes)
+        # Integer block ranks plus a [0, 1) shuffle inside each block keep blocks contiguous
+        block_rank = np.argsort(rng.random((count, len(self.locations))), axis=1)
+        within_rank = rng.random((count, scene_count))
+        keys = block_rank[:, self.scene_locations] + within_rank
+        orders = np.argsort(keys, axis=1)
+        orders[0] = self.baseline_order()
+        return orders
+
+    def orders_from_scene_numbers(self, candidate_orders: List[List[Any]]) -> np.ndarray:
+        """Convert lists of scene numbers into index orders, appending unlisted scenes.
+
+        Unknown scene numbers are ignored and repeats keep their first position.
+        """
+        orders = np.empty((len(candidate_orders), len(self.scenes)), dtype=int)
+        for n, candidate in enumerate(candidate_orders):
+            listed = list(dict.fromkeys(
+                self.scene_index[str(number)] for number in candidate if str(number) in self.scene_index
+            ))
+            seen = set(listed)
+            orders[n] = listed + [i for i in range(len(self.scenes)) if i not in seen]
+        return orders
+
+    def evaluate(self, orders: np.ndarray) -> Dict[str, np.ndarray]:
+        """Score every order (N x S array of scene indexes) in a vectorized pass."""
+        orders = np.atleast_2d(np.asarray(orders, dtype=int))
+        count, scene_count = orders.shape
+
+        # Pack by cumulative eighths: a scene lands on the day its start falls in
+        ordered_eighths = self.eighths[orders]
+        start_eighths = np.cumsum(ordered_eighths, axis=1) - ordered_eighths
+        ordered_days = np.floor(start_eighths / self.eighths_per_day + 1e-9).astype(int)
+        total_days = ordered_days[:, -1] + 1 if scene_count else np.zeros(count, dtype=int)
+
+        # Company moves and travel between consecutive scenes
+        ordered_locations = self.scene_locations[orders]
+        moves = ordered_locations[:, 1:] != ordered_locations[:, :-1]
+        company_moves = moves.sum(axis=1)
+        travel_hours = self.travel_hours[ordered_locations[:, :-1], ordered_locations[:, 1:]].sum(axis=1)
+
+        # Day of each scene in scene order, then per-day eighths and cast occupancy
+        scene_days = np.empty_like(ordered_days)
+        np.put_along_axis(scene_days, orders, ordered_days, axis=1)
+        max_days = int(total_days.max()) if count else 0
+
+        hold_days = np.zeros(count)
+        overtime_eighths = np.zeros(count)
+        conflicts = np.zeros(count)
+        day_range = np.arange(max_days)
+        chunk = max(1, MAX_CHUNK_ELEMENTS // max(1, max_days * scene_count))
+        for begin in range(0, count, chunk):
+            days_chunk = scene_days[begin:begin + chunk]
+            onehot = (days_chunk[:, None, :] == day_range[None, :, None]).astype(np.float32)
+            day_eighths = onehot @ self.eighths.astype(np.float32)
+            overtime_eighths[begin:begin + chunk] = np.maximum(0.0, day_eighths - self.eighths_per_day).sum(axis=1)
+
+            if self.cast:
+                working = (onehot @ self.cast_matrix) > 0
+                work_days = working.sum(axis=1)
+                first = working.argmax(axis=1)
+                last = max_days - 1 - working[:, ::-1, :].argmax(axis=1)
+                span = np.where(work_days > 0, last - first + 1, 0)
+                hold_days[begin:begin + chunk] = (span - work_days).sum(axis=1)
+
+                if self.availability is not None:
+                    outside = (day_range[:, None] < self.availability[None, :, 0]) | (day_range[:, None] > self.availability[None, :, 1])
+                    conflicts[begin:begin + chunk] = (working & outside[None, :, :]).sum(axis=(1, 2))
+
+        overtime_hours = overtime_eighths * self.hours_per_eighth_on_set
+        return {
+            "total_days": total_days,
+            "hold_days": hold_days,
+            "company_moves": company_moves,
+            "travel_hours": travel_hours,
+            "overtime_hours": overtime_hours,
+            "availability_conflicts": conflicts
+        }
+
+    def rank(
+        self,
+        orders: np.ndarray,
+        names: Optional[List[str]] = None,
+        start_dates: Optional[List[str]] = None,
+        weights: Optional[Dict[str, float]] = None,
+        include_orders: int = 10
+    ) -> Dict[str, Any]:
+        """Evaluate orders and return them as a ranked table."""
+        weights = {**DEFAULT_SCORE_WEIGHTS, **(weights or {})}
+        metrics = self.evaluate(orders)
+        score = sum(weights[key] * metrics[key] for key in weights)
+        ranking = np.argsort(score, kind='stable')
+
+        # End dates per candidate, grouped by start date so each group is one vectorized call
+        end_dates = [None] * len(orders)
+        if start_dates:
+            calendar = ProductionCalendar.from_constraints(self.schedule_constraints, start_dates[0])
+            starts = np.array(start_dates)
+            for start in np.unique(starts):
+                members = np.flatnonzero(starts == start)
+                for member, end in zip(members, as_iso(calendar.offset(start, metrics["total_days"][members] - 1))):
+                    end_dates[member] = end
+
+        table = []
+        for position, n in enumerate(ranking, start=1):
+            row = {
+                "rank": position,
+                "candidate": names[n] if names else f"candidate_{n}",
+                "score": round(float(score[n]), 3),
+                "total_days": int(metrics["total_days"][n]),
+                "hold_days": int(metrics["hold_days"][n]),
+                "company_moves": int(metrics["company_moves"][n]),
+                "travel_hours": round(float(metrics["travel_hours"][n]), 2),
+                "overtime_hours": round(float(metrics["overtime_hours"][n]), 2),
+                "availability_conflicts": int(metrics["availability_conflicts"][n])
+            }
+            if start_dates:
+                row["start_date"] = start_dates[n]
+                row["end_date"] = end_dates[n]
+            if position <= include_orders:
+                row["shooting_order"] = [self.scene_numbers[i] for i in orders[n]]
+            table.append(row)
+
+        return {
+            "candidates_evaluated": len(orders),
+            "eighths_per_day": round(self.eighths_per_day, 2),
+            "score_weights": weights,
+            "ranking": table
+        }
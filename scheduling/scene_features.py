@@ -0,0 +1,101 @@
+"""
+Shared per-run scene features for the scheduling agents.
+
+SchedulingCoordinator computes these once per run and hands the same dict to
+every agent, so location grouping, page estimates, complexity scores and cast
+sets are not recomputed by each agent.
+"""
+
+from typing import Dict, Any, List
+
+import numpy as np
+
+
+def scene_complexity(scene: Dict[str, Any]) -> Dict[str, Any]:
+    """Calculate scene complexity for scheduling purposes."""
+    complexity = {
+        "score": 0,
+        "factors": [],
+        "category": "Standard"
+    }
+
+    # Dialogue complexity
+    dialogue_count = len(scene.get('dialogues', []))
+    if dialogue_count > 10:
+        complexity["score"] += 3
+        complexity["factors"].append("Heavy dialogue")
+    elif dialogue_count > 5:
+        complexity["score"] += 2
+        complexity["factors"].append("Moderate dialogue")
+
+    # Character count
+    character_count = len(scene.get('main_characters', []))
+    if character_count > 4:
+        complexity["score"] += 3
+        complexity["factors"].append("Multiple characters")
+    elif character_count > 2:
+        complexity["score"] += 1
+        complexity["factors"].append("Several characters")
+
+    # Technical requirements
+    technical_cues = scene.get('technical_cues', [])
+    if len(technical_cues) > 5:
+        complexity["score"] += 3
+        complexity["factors"].append("Complex technical requirements")
+    elif len(technical_cues) > 2:
+        complexity["score"] += 2
+        complexity["factors"].append("Technical requirements")
+
+    # Location type
+    location_type = scene.get('location', {}).get('type', 'INT')
+    if location_type == 'EXT':
+        complexity["score"] += 1
+        complexity["factors"].append("Exterior location")
+
+    # Categorize complexity
+    if complexity["score"] >= 7:
+        complexity["category"] = "High"
+    elif complexity["score"] >= 4:
+        complexity["category"] = "Medium"
+    else:
+        complexity["category"] = "Standard"
+
+    return complexity
+
+
+def compute_scene_features(scenes: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """Compute the feature set shared by all scheduling agents for one run."""
+    location_groups: Dict[str, List[int]] = {}
+    location_key_groups: Dict[str, List[int]] = {}
+    cast_sets = []
+
+    for i, scene in enumerate(scenes):
+        location = scene.get('location', {})
+        place = location.get('place', 'Unknown')
+        location_groups.setdefault(place, []).append(i)
+        location_key_groups.setdefault(f"{place}_{location.get('type', 'INT')}", []).append(i)
+        cast_sets.append(frozenset(scene.get('main_characters', [])))
+
+    description_lengths = np.array([len(scene.get('description', '')) for scene in scenes], dtype=float)
+    dialogue_counts = np.array([len(scene.get('dialogues', [])) for scene in scenes], dtype=float)
+    technical_cue_counts = np.array([len(scene.get('technical_cues', [])) for scene in scenes], dtype=int)
+
+    # Rough estimation: 250 words per page, minimum 1/8 page
+    pages = np.maximum(0.125, (description_lengths + dialogue_counts * 50) / 250)
+    complexity = [scene_complexity(scene) for scene in scenes]
+
+    return {
+        "scene_count": len(scenes),
+        "scene_numbers": [scene.get('scene_number', '0') for scene in scenes],
+        "location_groups": location_groups,
+        "location_key_groups": location_key_groups,
+        "pages": pages,
+        "dialogue_counts": dialogue_counts.astype(int),
+        "technical_cue_counts": technical_cue_counts,
+        "complexity": complexity,
+        "complexity_scores": np.array([c["score"] for c in complexity], dtype=int),
+        "cast_sets": cast_sets,
+        "all_cast": sorted(set().union(*cast_sets)) if cast_sets else [],
+        "exterior": np.array([scene.get('location', {}).get('type') == 'EXT' for scene in scenes], dtype=bool),
+        "night": np.array(['NIGHT' in str(scene.get('time', '')).upper() for scene in scenes], dtype=bool)
+    }
@@ -0,0 +1,565 @@
+"""
+Deterministic shooting-schedule engine.
+
+Builds the day-by-day shooting schedule locally from scene eighths, setup/wrap
+percentages and union work rules. The output has the same shape the
+ScheduleGeneratorAgent used to request from the LLM (schedule, calendar_data,
+gantt_data, summary, optimization_notes), so callers do not change.
+"""
+
+from typing import Dict, Any, List, Optional, Tuple
+import logging
+from datetime import datetime, timedelta
+
+import numpy as np
+
+from .calendar_engine import ProductionCalendar, as_datetime
+from .solar import SUN_WINDOWS, daylight_table, resolve_coordinates
+
+logger = logging.getLogger(__name__)
+
+# Industry standards shared with the ADK eighths calculator
+SCHEDULE_RULES = {
+    "words_per_page": 250,
+    "eighths_per_page": 8,
+    "hours_per_eighth": 0.15,
+    "setup_time_percentage": 0.3,
+    "wrap_time_percentage": 0.2,
+    "minimum_scene_eighths": 1,
+    "max_day_eighths": 60,
+    "standard_day_hours": 12,
+    "crew_call": "07:00",
+    "meal_interval_hours": 6,
+    "meal_duration_minutes": 30,
+    "turnaround_hours": 10,
+    "company_move_minutes": 60,
+    "max_company_moves_per_day": 1
+}
+
+# Stripboard ordering: day work first, night work last in each location block
+TIME_OF_DAY_RANK = {"DAWN": 0, "MORNING": 1, "DAY": 2, "AFTERNOON": 3, "DUSK": 4, "EVENING": 5, "NIGHT": 6}
+
+EQUIPMENT_KEYWORDS = {
+    "steadicam": "steadicam",
+    "crane": "camera_crane",
+    "dolly": "dolly_track",
+    "track": "dolly_track",
+    "drone": "drone",
+    "underwater": "underwater_housing"
+}
+
+
+def scene_location(scene: Dict[str, Any]) -> Tuple[str, str]:
+    """Return (place, INT/EXT) for both parsed scenes and breakdown cards."""
+    location = scene.get('location', {})
+    if isinstance(location, dict):
+        return location.get('place', 'Unknown') or 'Unknown', (location.get('type') or 'INT').upper()
+    return str(location or 'Unknown'), (scene.get('location_type') or 'INT').upper()
+
+
+def scene_time_of_day(scene: Dict[str, Any]) -> str:
+    """Return the scene's time of day for both parsed scenes and breakdown cards."""
+    return str(scene.get('time') or scene.get('time_of_day') or 'DAY').upper()
+
+
+def scene_eighths(scene: Dict[str, Any], rules: Dict[str, Any] = SCHEDULE_RULES) -> float:
+    """Page length of a scene in eighths, estimated from text when not provided."""
+    for key in ("adjusted_eighths", "eighths", "eighths_on_page"):
+        value = scene.get(key)
+        if isinstance(value, (int, float)) and value > 0:
+            return float(value)
+
+    words = len(str(scene.get('description', '')).split())
+    for dialogue in scene.get('dialogues', []) or []:
+        line = dialogue.get('line', '') if isinstance(dialogue, dict) else str(dialogue)
+        words += len(str(line).split()) + 1
+    pages = words / rules["words_per_page"]
+    return max(float(rules["minimum_scene_eighths"]), round(pages * rules["eighths_per_page"]))
+
+
+def format_clock(minutes: float) -> str:
+    """Format minutes after midnight as HH:MM (hours may exceed 24 past midnight)."""
+    minutes = int(round(minutes))
+    return f"{minutes // 60:02d}:{minutes % 60:02d}"
+
+
+def parse_clock(value: str) -> int:
+    """Parse HH:MM into minutes after midnight."""
+    hours, minutes = value.split(":")
+    return int(hours) * 60 + int(minutes)
+
+
+class ScheduleEngine:
+    """Greedy day packer and time-slot assigner for shooting schedules."""
+
+    def __init__(self, rules: Optional[Dict[str, Any]] = None):
+        self.rules = {**SCHEDULE_RULES, **(rules or {})}
+
+    def compute_scene_timings(self, scenes: List[Dict[str, Any]]) -> Dict[str, np.ndarray]:
+        """Vectorized per-scene eighths, shoot, setup and wrap minutes."""
+        eighths = np.array([scene_eighths(scene, self.rules) for scene in scenes], dtype=float)
+        shoot = eighths * self.rules["hours_per_eighth"] * 60.0
+        setup = shoot * self.rules["setup_time_percentage"]
+        wrap = shoot * self.rules["wrap_time_percentage"]
+        return {
+            "eighths": eighths,
+            "shoot_minutes": np.round(shoot),
+            "setup_minutes": np.round(setup),
+            "wrap_minutes": np.round(wrap),
+            "total_minutes": np.round(shoot) + np.round(setup) + np.round(wrap)
+        }
+
+    def shooting_order(
+        self,
+        scenes: List[Dict[str, Any]],
+        location_optimization: Optional[Dict[str, Any]] = None,
+        constraints: Optional[Dict[str, Any]] = None
+    ) -> List[int]:
+        """Return scene indexes in shooting order, grouped by location."""
+        constraints = constraints or {}
+        numbers = [str(scene.get('scene_number', i + 1)) for i, scene in enumerate(scenes)]
+        index_by_number = {number: i for i, number in enumerate(numbers)}
+
+        # An explicit order from the caller wins
+        explicit = constraints.get("shooting_order")
+        if explicit:
+            order = [index_by_number[str(n)] for n in explicit if str(n) in index_by_number]
+            seen = set(order)
+            return order + [i for i in range(len(scenes)) if i not in seen]
+
+        # Group by location, keeping the location optimizer's recommended order when present
+        groups: Dict[str, List[int]] = {}
+        for i, scene in enumerate(scenes):
+            place, location_type = scene_location(scene)
+            groups.setdefault(f"{place}_{location_type}", []).append(i)
+
+        grouping = (location_optimization or {}).get("location_grouping", {})
+        recommended = [key for key in grouping.get("recommended_order", []) if key in groups]
+        remaining = sorted(
+            (key for key in groups if key not in recommended),
+            key=lambda key: len(groups[key]),
+            reverse=True
+        )
+
+        order = []
+        for key in recommended + remaining:
+            order.extend(sorted(groups[key], key=lambda i: TIME_OF_DAY_RANK.get(scene_time_of_day(scenes[i]), 2)))
+        return order
+
+    def scene_time_windows(
+        self,
+        scenes: List[Dict[str, Any]],
+        dates: np.ndarray,
+        constraints: Optional[Dict[str, Any]] = None
+    ) -> Optional[Dict[str, np.ndarray]]:
+        """Hard daylight windows (minutes after midnight) per shoot day for exterior scenes.
+
+        Returns None when the constraints give no coordinates. Windows are stored
+        per distinct (place, time of day) column; "column" maps each scene to its
+        column, or -1 when the scene has no window.
+        """
+        places = [scene_location(scene) for scene in scenes]
+        unique_places = list(dict.fromkeys(place for place, _ in places))
+        coordinates = resolve_coordinates(unique_places, constraints)
+        if coordinates is None or not len(dates):
+            return None
+
+        place_column = {place: k for k, place in enumerate(unique_places)}
+        known = coordinates["known"]
+        keys: Dict[Tuple[int, str], int] = {}
+        column = np.full(len(scenes), -1, dtype=int)
+        for i, (scene, (place, location_type)) in enumerate(zip(scenes, places)):
+            period = scene_time_of_day(scene)
+            if location_type == 'EXT' and period in SUN_WINDOWS and known[place_column[place]]:
+                column[i] = keys.setdefault((place_column[place], period), len(keys))
+        if not keys:
+            return None
+
+        table = daylight_table(dates, coordinates)
+        key_places = np.array([place for place, _ in keys], dtype=int)
+        start = np.empty((len(dates), len(keys)))
+        end = np.empty((len(dates), len(keys)))
+        for period, (start_event, end_event) in SUN_WINDOWS.items():
+            members = np.array([k for (_, key_period), k in keys.items() if key_period == period], dtype=int)
+            if len(members):
+                start[:, members] = table[start_event][:, key_places[members]]
+                end[:, members] = table[end_event][:, key_places[members]]
+        return {"start": start, "end": end, "column": column}
+
+    def scene_window(self, windows: Optional[Dict[str, np.ndarray]], day: int, i: int) -> Tuple[float, float]:
+        """(start, end) daylight window of scene i on a shoot day; open when it has none."""
+        if windows is None or windows["column"][i] < 0:
+            return -np.inf, np.inf
+        column = windows["column"][i]
+        return windows["start"][day, column], windows["end"][day, column]
+
+    def day_call(self, windows: Optional[Dict[str, np.ndarray]], day: int, first_scene: int, call_minutes: int, timings: Dict[str, np.ndarray]) -> int:
+        """Crew call for a day, moved so its first scene starts setup as its light window needs.
+
+        Dusk work pushes the call later instead of idling the crew, and dawn work
+        brings it forward when the standard call would miss the window.
+        """
+        start, end = self.scene_window(windows, day, first_scene)
+        if not np.isfinite(start):
+            return call_minutes
+        setup = timings["setup_minutes"][first_scene]
+        aligned = int(start - setup)
+        if aligned > call_minutes or call_minutes + setup + timings["shoot_minutes"][first_scene] > end:
+            return aligned
+        return call_minutes
+
+    def _window_wait(self, windows: Optional[Dict[str, np.ndarray]], day: int, i: int, clock: float, timings: Dict[str, np.ndarray]) -> Tuple[float, bool]:
+        """Minutes to wait for a scene's light and whether it then finishes inside its window."""
+        start, end = self.scene_window(windows, day, i)
+        ready = clock + timings["setup_minutes"][i]
+        shoot_start = max(ready, start)
+        return shoot_start - ready, shoot_start + timings["shoot_minutes"][i] <= end
+
+    def turnaround_call(
+        self,
+        windows: Optional[Dict[str, np.ndarray]],
+        day: int,
+        first_scene: int,
+        call_minutes: int,
+        timings: Dict[str, np.ndarray],
+        dates: Optional[np.ndarray] = None,
+        previous_wrap: Optional[float] = None
+    ) -> Tuple[float, float]:
+        """(planned, actual) crew call of a shoot day.
+
+        The planned call follows the first scene's light; the actual call is
+        pushed back until the crew has had its turnaround since the previous
+        day's wrap (minutes after that day's midnight) on dates[day - 1].
+        """
+        planned = self.day_call(windows, day, first_scene, call_minutes, timings)
+        if previous_wrap is None or dates is None or day == 0:
+            return planned, planned
+        gap_days = int((dates[day] - dates[day - 1]).astype(int))
+        rest = gap_days * 24 * 60 - previous_wrap + planned
+        return planned, planned + max(self.rules["turnaround_hours"] * 60 - rest, 0)
+
+    def pack_days(
+        self,
+        scenes: List[Dict[str, Any]],
+        order: List[int],
+        timings: Dict[str, np.ndarray],
+        windows: Optional[Dict[str, np.ndarray]] = None,
+        call_minutes: Optional[int] = None,
+        dates: Optional[np.ndarray] = None
+    ) -> List[List[int]]:
+        """Greedily pack ordered scenes into shoot days by eighths, working minutes and daylight windows.
+
+        Each day is laid out as assign_time_slots will lay it out (company
+        moves, the meal breaks it takes, light waits) from the call
+        build_schedule will give it, including turnaround pushes when dates
+        are given.
+        """
+        day_minutes = self.rules["standard_day_hours"] * 60
+        max_eighths = self.rules["max_day_eighths"]
+        move_minutes = self.rules["company_move_minutes"]
+        max_moves = self.rules["max_company_moves_per_day"]
+        meal_interval = self.rules["meal_interval_hours"] * 60
+        meal_minutes = self.rules["meal_duration_minutes"]
+        call_minutes = parse_clock(self.rules["crew_call"]) if call_minutes is None else call_minutes
+
+        def place(i: int, is_move: bool, clock: float, last_reset: float, meals: int) -> Tuple[float, float, int, bool]:
+            """Wrap of scene i placed at clock, the last meal reset and meal count after it, and whether it is in its window."""
+            clock += move_minutes if is_move else 0
+            if clock > last_reset and clock + timings["total_minutes"][i] - last_reset > meal_interval:
+                clock += meal_minutes
+                last_reset = clock
+                meals += 1
+            wait, in_window = self._window_wait(windows, len(days), i, clock, timings)
+            return clock + wait + timings["total_minutes"][i], last_reset, meals, in_window
+
+        days: List[List[int]] = []
+        current: List[int] = []
+        used_eighths = 0.0
+        moves = meals = 0
+        current_location = None
+        call = clock = last_reset = 0.0
+        previous_wrap = None
+
+        for i in order:
+            location = scene_location(scenes[i])[0]
+            if not current:
+                _, call = self.turnaround_call(windows, len(days), i, call_minutes, timings, dates, previous_wrap)
+                clock = last_reset = call
+                meals = 0
+            is_move = current_location is not None and location != current_location
+            wrap, reset, meal_count, in_window = place(i, is_move, clock, last_reset, meals)
+
+            fits = (
+                wrap - call - meal_minutes * meal_count <= day_minutes
+                and used_eighths + timings["eighths"][i] <= max_eighths
+                and (not is_move or moves < max_moves)
+                and in_window
+            )
+            if current and not fits:
+                days.append(current)
+                previous_wrap = clock
+                current, used_eighths, moves = [], 0.0, 0
+                is_move = False
+                _, call = self.turnaround_call(windows, len(days), i, call_minutes, timings, dates, previous_wrap)
+                clock = last_reset = call
+                wrap, reset, meal_count, _ = place(i, False, clock, last_reset, 0)
+
+            # A scene whose window cannot hold it even on a fresh day is placed anyway and flagged later
+            current.append(i)
+            clock, last_reset, meals = wrap, reset, meal_count
+            used_eighths += timings["eighths"][i]
+            moves += 1 if is_move else 0
+            current_location = location
+
+        if current:
+            days.append(current)
+        return days
+
+    def _equipment_ids(self, scene: Dict[str, Any]) -> List[str]:
+        equipment = []
+        for cue in scene.get('technical_cues', []) or []:
+            cue_lower = str(cue).lower()
+            for keyword, equipment_id in EQUIPMENT_KEYWORDS.items():
+                if keyword in cue_lower and equipment_id not in equipment:
+                    equipment.append(equipment_id)
+        return equipment
+
+    def assign_time_slots(
+        self,
+        scenes: List[Dict[str, Any]],
+        day_indexes: List[int],
+        timings: Dict[str, np.ndarray],
+        call_minutes: int,
+        crew_ids: List[str],
+        windows: Optional[Dict[str, np.ndarray]] = None,
+        day: int = 0
+    ) -> Dict[str, Any]:
+        """Lay out one day's scenes from crew call with meal breaks, company moves and daylight waits."""
+        meal_interval = self.rules["meal_interval_hours"] * 60
+        meal_duration = self.rules["meal_duration_minutes"]
+        move_minutes = self.rules["company_move_minutes"]
+
+        clock = call_minutes
+        last_reset = call_minutes
+        previous_location = None
+        day_scenes = []
+        meals = []
+        company_moves = 0
+
+        for i in day_indexes:
+            scene = scenes[i]
+            place, location_type = scene_location(scene)
+            breaks = []
+
+            if previous_location is not None and place != previous_location:
+                breaks.append({"type": "company_move", "start_time": format_clock(clock), "end_time": format_clock(clock + move_minutes)})
+                clock += move_minutes
+                company_moves += 1
+
+            # The meal must start before the crew has worked meal_interval hours
+            if clock > last_reset and clock + timings["total_minutes"][i] - last_reset > meal_interval:
+                meal = {"type": "meal", "start_time": format_clock(clock), "end_time": format_clock(clock + meal_duration)}
+                breaks.append(meal)
+                meals.append(meal)
+                clock += meal_duration
+                last_reset = clock
+
+            # Hold the setup until the scene's light window opens
+            wait, in_window = self._window_wait(windows, day, i, clock, timings)
+            if wait >= 1:
+                breaks.append({"type": "daylight_wait", "start_time": format_clock(clock), "end_time": format_clock(clock + wait)})
+                clock += wait
+
+            setup, shoot, wrap = (timings[key][i] for key in ("setup_minutes", "shoot_minutes", "wrap_minutes"))
+            slot = {
+                "scene_id": str(scene.get('scene_number', i + 1)),
+                "start_time": format_clock(clock),
+                "end_time": format_clock(clock + setup + shoot + wrap),
+                "location_id": f"{place}_{location_type}",
+                "crew_ids": list(crew_ids),
+                "equipment_ids": self._equipment_ids(scene),
+                "setup_time": format_clock(setup),
+                "wrap_time": format_clock(wrap),
+                "eighths": float(timings["eighths"][i]),
+                "time_of_day": scene_time_of_day(scene),
+                "breaks": breaks
+            }
+            window_start, window_end = self.scene_window(windows, day, i)
+            if np.isfinite(window_start):
+                slot["daylight_window"] = {
+                    "start_time": format_clock(window_start),
+                    "end_time": format_clock(window_end),
+                    "within_window": bool(in_window)
+                }
+            day_scenes.append(slot)
+            clock += setup + shoot + wrap
+            previous_location = place
+
+        work_minutes = clock - call_minutes - meal_duration * len(meals)
+        return {
+            "scenes": day_scenes,
+            "wrap_minutes": clock,
+            "work_minutes": work_minutes,
+            "meal_breaks": meals,
+            "company_moves": company_moves
+        }
+
+    def build_schedule(
+        self,
+        scenes: List[Dict[str, Any]],
+        start_date: str,
+        crew_allocation: Optional[Dict[str, Any]] = None,
+        location_optimization: Optional[Dict[str, Any]] = None,
+        constraints: Optional[Dict[str, Any]] = None
+    ) -> Dict[str, Any]:
+        """Build the complete schedule, calendar and Gantt data for the given scenes."""
+        constraints = constraints or {}
+        calendar = ProductionCalendar.from_constraints(constraints, start_date)
+        crew_ids = [
+            str(assignment.get('crew_member'))
+            for assignment in (crew_allocation or {}).get("crew_assignments", [])
+            if isinstance(assignment, dict) and assignment.get('crew_member')
+        ]
+
+        timings = self.compute_scene_timings(scenes)
+        order = self.shooting_order(scenes, location_optimization, constraints)
+
+        standard_call = parse_clock(constraints.get("crew_call", self.rules["crew_call"]))
+        standard_minutes = self.rules["standard_day_hours"] * 60
+
+        # Every scene could take its own day, so dates for len(scenes) days bound the packer's lookups
+        candidate_dates = calendar.shoot_dates(start_date, len(scenes), constraints.get("turnaround_after_days"))
+        windows = self.scene_time_windows(scenes, candidate_dates, constraints)
+        days = self.pack_days(scenes, order, timings, windows, standard_call, candidate_dates)
+        shoot_dates = candidate_dates[:len(days)]
+
+        schedule = []
+        previous_wrap = None
+        for day_number, day_indexes in enumerate(days, start=1):
+            date = as_datetime(shoot_dates[day_number - 1])
+
+            # Dawn and dusk work move the call; the previous wrap's turnaround can push it back
+            planned_call, call = self.turnaround_call(
+                windows, day_number - 1, day_indexes[0], standard_call, timings, candidate_dates, previous_wrap
+            )
+
+            slots = self.assign_time_slots(scenes, day_indexes, timings, call, crew_ids, windows, day_number - 1)
+            overtime = max(0.0, slots["work_minutes"] - standard_minutes)
+            schedule.append({
+                "day": day_number,
+                "date": date.strftime("%Y-%m-%d"),
+                "crew_call": format_clock(call),
+                "estimated_wrap": format_clock(slots["wrap_minutes"]),
+                "turnaround_adjusted": call != planned_call,
+                "call_moved_for_daylight": planned_call != standard_call,
+                "locations": list(dict.fromkeys(scene["location_id"] for scene in slots["scenes"])),
+                "total_eighths": float(timings["eighths"][day_indexes].sum()),
+                "work_hours": round(slots["work_minutes"] / 60, 2),
+                "overtime_hours": round(overtime / 60, 2),
+                "company_moves": slots["company_moves"],
+                "scenes": slots["scenes"]
+            })
+            previous_wrap = slots["wrap_minutes"]
+
+        total_eighths = float(timings["eighths"].sum())
+        total_pages = round(total_eighths / self.rules["eighths_per_page"], 2)
+        end_date = schedule[-1]["date"] if schedule else start_date
+
+        return {
+            "schedule": schedule,
+            "calendar_data": self._build_calendar_data(schedule),
+            "gantt_data": self._build_gantt_data(schedule),
+            "summary": {
+                "total_days": len(schedule),
+                "start_date": schedule[0]["date"] if schedule else start_date,
+                "end_date": end_date,
+                "total_scenes": len(scenes),
+                "total_pages": total_pages,
+                "total_runtime_minutes": round(total_pages)
+            },
+            "optimization_notes": self._build_notes(schedule)
+        }
+
+    def _build_calendar_data(self, schedule: List[Dict[str, Any]]) -> Dict[str, Any]:
+        events = []
+        resources = {}
+        for day in schedule:
+            base = datetime.strptime(day["date"], "%Y-%m-%d")
+            for scene in day["scenes"]:
+                resources.setdefault(scene["location_id"], {"id": scene["location_id"], "title": scene["location_id"].rsplit("_", 1)[0], "type": "location"})
+                events.append({
+                    "id": f"day{day['day']}_scene{scene['scene_id']}",
+                    "title": f"Scene {scene['scene_id']}",
+                    "start": (base + timedelta(minutes=parse_clock(scene["start_time"]))).strftime("%Y-%m-%dT%H:%M:%S"),
+                    "end": (base + timedelta(minutes=parse_clock(scene["end_time"]))).strftime("%Y-%m-%dT%H:%M:%S"),
+                    "resourceId": scene["location_id"],
+                    "color": "#1f77b4" if "NIGHT" not in scene["time_of_day"] else "#2c3e50",
+                    "textColor": "#ffffff",
+                    "description": f"{scene['eighths']:g}/8 pages",
+                    "location": scene["location_id"],
+                    "crew": scene["crew_ids"],
+                    "equipment": scene["equipment_ids"]
+                })
+        return {"events": events, "resources": list(resources.values())}
+
+    def _build_gantt_data(self, schedule: List[Dict[str, Any]]) -> Dict[str, Any]:
+        tasks = []
+        links = []
+        resources = {}
+        previous_day_task = None
+        for day in schedule:
+            day_task = f"day_{day['day']}"
+            tasks.append({
+                "id": day_task,
+                "text": f"Shoot Day {day['day']}",
+                "start_date": f"{day['date']} {day['crew_call']}",
+                "end_date": f"{day['date']} {day['estimated_wrap']}",
+                "progress": 0,
+                "parent": "",
+                "dependencies": [previous_day_task] if previous_day_task else [],
+                "resource_ids": day["locations"],
+                "type": "project",
+                "color": "#ff7f0e" if day["overtime_hours"] else "#2ca02c"
+            })
+            if previous_day_task:
+                links.append({"id": f"link_{previous_day_task}_{day_task}", "source": previous_day_task, "target": day_task, "type": "finish_to_start"})
+            for scene in day["scenes"]:
+                resources.setdefault(scene["location_id"], {"id": scene["location_id"], "name": scene["location_id"], "type": "location", "calendar_id": "production"})
+                tasks.append({
+                    "id": f"{day_task}_scene_{scene['scene_id']}",
+                    "text": f"Scene {scene['scene_id']}",
+                    "start_date": f"{day['date']} {scene['start_time']}",
+                    "end_date": f"{day['date']} {scene['end_time']}",
+                    "progress": 0,
+                    "parent": day_task,
+                    "dependencies": [],
+                    "resource_ids": [scene["location_id"]],
+                    "type": "task",
+                    "color": "#1f77b4"
+                })
+            previous_day_task = day_task
+        return {"tasks": tasks, "links": links, "resources": list(resources.values())}
+
+    def _build_notes(self, schedule: List[Dict[str, Any]]) -> List[str]:
+        notes = []
+        overtime_days = [day["day"] for day in schedule if day["overtime_hours"] > 0]
+        if overtime_days:
+            notes.append(f"{len(overtime_days)} day(s) exceed the {self.rules['standard_day_hours']}-hour standard day: {overtime_days}")
+        pushed = [day["day"] for day in schedule if day["turnaround_adjusted"]]
+        if pushed:
+            notes.append(f"Crew call pushed for turnaround on day(s) {pushed}")
+        moved = [day["day"] for day in schedule if day.get("call_moved_for_daylight")]
+        if moved:
+            notes.append(f"Crew call moved for dawn or dusk light on day(s) {moved}")
+        outside = [
+            scene["scene_id"] for day in schedule for scene in day["scenes"]
+            if not scene.get("daylight_window", {}).get("within_window", True)
+        ]
+        if outside:
+            notes.append(f"Scene(s) {outside} cannot finish inside their daylight window")
+        moves = sum(day["company_moves"] for day in schedule)
+        if moves:
+            notes.append(f"{moves} company move(s) scheduled within shoot days")
+        if not notes:
+            notes.append("All shoot days fit within standard hours with no company moves")
+        return notes
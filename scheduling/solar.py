@@ -0,0 +1,169 @@
+"""
+Offline sun position and daylight windows.
+
+Uses the NOAA general solar position equations, vectorized over shoot dates
+and locations, to give civil dawn, sunrise, golden hours, solar noon, sunset
+and civil dusk in local clock minutes; the next civil dawn runs past 24:00 so
+night windows stay on the shoot day's clock. No external service is needed; a
+full season for every location computes in a few milliseconds.
+"""
+
+from datetime import datetime, timezone
+from typing import Dict, Any, List, Optional, Sequence, Tuple
+from zoneinfo import ZoneInfo
+import logging
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# Zenith angles (degrees) for the events we report
+ZENITH_SUNRISE = 90.833   # Upper limb on the horizon with refraction
+ZENITH_CIVIL = 96.0       # Civil twilight
+ZENITH_GOLDEN = 84.0      # Sun 6 degrees above the horizon
+
+# Usable light window per scene time of day, as (start event, end event)
+SUN_WINDOWS = {
+    "DAY": ("sunrise", "sunset"),
+    "MORNING": ("sunrise", "solar_noon"),
+    "AFTERNOON": ("solar_noon", "sunset"),
+    "DAWN": ("civil_dawn", "golden_morning_end"),
+    "DUSK": ("golden_evening_start", "civil_dusk"),
+    "EVENING": ("golden_evening_start", "civil_dusk"),
+    "NIGHT": ("civil_dusk", "next_civil_dawn")
+}
+
+# Reference location used for reporting when a project gives no coordinates
+DEFAULT_COORDINATES = {"latitude": 34.05, "longitude": -118.24, "timezone": "America/Los_Angeles"}
+
+
+def _solar_terms(day_of_year: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Equation of time (minutes) and declination (radians) at local noon."""
+    gamma = 2 * np.pi / 365 * (day_of_year - 1)
+    eqtime = 229.18 * (
+        0.000075 + 0.001868 * np.cos(gamma) - 0.032077 * np.sin(gamma)
+        - 0.014615 * np.cos(2 * gamma) - 0.040849 * np.sin(2 * gamma)
+    )
+    declination = (
+        0.006918 - 0.399912 * np.cos(gamma) + 0.070257 * np.sin(gamma)
+        - 0.006758 * np.cos(2 * gamma) + 0.000907 * np.sin(2 * gamma)
+        - 0.002697 * np.cos(3 * gamma) + 0.00148 * np.sin(3 * gamma)
+    )
+    return eqtime, declination
+
+
+def _hour_angle(latitude: np.ndarray, declination: np.ndarray, zenith: float) -> np.ndarray:
+    """Hour angle in degrees at which the sun crosses the given zenith.
+
+    Clipping gives 0 when the sun never gets that high (no window) and 180
+    when it never drops that low (window spans the whole day).
+    """
+    cos_ha = (
+        np.cos(np.radians(zenith)) / (np.cos(latitude) * np.cos(declination))
+        - np.tan(latitude) * np.tan(declination)
+    )
+    return np.degrees(np.arccos(np.clip(cos_ha, -1.0, 1.0)))
+
+
+def solar_times(
+    dates: Sequence[Any],
+    latitudes: Sequence[float],
+    longitudes: Sequence[float],
+    utc_offsets: Optional[np.ndarray] = None
+) -> Dict[str, np.ndarray]:
+    """Sun event times for every (date, location) pair as (dates x locations) arrays.
+
+    Times are minutes after local midnight; utc_offsets is a (dates x locations)
+    array of minutes east of UTC and defaults to solar time zones (longitude / 15).
+    """
+    days = np.asarray(dates, dtype='datetime64[D]')
+    years = days.astype('datetime64[Y]')
+    day_of_year = (days - years).astype(int) + 1
+
+    latitude = np.radians(np.asarray(latitudes, dtype=float))[None, :]
+    longitude = np.asarray(longitudes, dtype=float)[None, :]
+    eqtime, declination = _solar_terms(day_of_year.astype(float))
+    eqtime = eqtime[:, None]
+    declination = declination[:, None]
+
+    if utc_offsets is None:
+        utc_offsets = np.broadcast_to(np.round(longitude / 15.0) * 60, (len(days), longitude.shape[1]))
+
+    solar_noon = 720 - 4 * longitude - eqtime + utc_offsets
+    times = {"solar_noon": solar_noon}
+    for name, zenith in (("sun", ZENITH_SUNRISE), ("civil", ZENITH_CIVIL), ("golden", ZENITH_GOLDEN)):
+        hour_angle = _hour_angle(latitude, declination, zenith)
+        times[f"{name}_rise"] = solar_noon - 4 * hour_angle
+        times[f"{name}_set"] = solar_noon + 4 * hour_angle
+
+    return {
+        "civil_dawn": times["civil_rise"],
+        "sunrise": times["sun_rise"],
+        "golden_morning_end": times["golden_rise"],
+        "solar_noon": solar_noon,
+        "golden_evening_start": times["golden_set"],
+        "sunset": times["sun_set"],
+        "civil_dusk": times["civil_set"],
+        # Tomorrow's dawn, taken from today's: it moves by at most a couple of minutes a day
+        "next_civil_dawn": times["civil_rise"] + 1440,
+        "daylight_minutes": times["sun_set"] - times["sun_rise"]
+    }
+
+
+def utc_offsets(dates: Sequence[Any], timezones: Sequence[Optional[str]], longitudes: Sequence[float]) -> np.ndarray:
+    """UTC offsets in minutes per (date, location), honouring daylight saving where a timezone is given."""
+    days = np.asarray(dates, dtype='datetime64[D]').astype(object)
+    offsets = np.empty((len(days), len(timezones)), dtype=float)
+    by_zone: Dict[str, np.ndarray] = {}
+    for column, (zone_name, longitude) in enumerate(zip(timezones, longitudes)):
+        if zone_name and zone_name not in by_zone:
+            try:
+                zone = ZoneInfo(zone_name)
+                by_zone[zone_name] = np.array([
+                    datetime(day.year, day.month, day.day, 12, tzinfo=timezone.utc).astimezone(zone).utcoffset().total_seconds() / 60
+                    for day in days
+                ])
+            except Exception:
+                logger.warning(f"Unknown timezone {zone_name}; using solar time zone")
+                by_zone[zone_name] = None
+        zone_offsets = by_zone.get(zone_name) if zone_name else None
+        offsets[:, column] = zone_offsets if zone_offsets is not None else round(longitude / 15.0) * 60
+    return offsets
+
+
+def resolve_coordinates(places: List[str], constraints: Optional[Dict[str, Any]]) -> Optional[Dict[str, list]]:
+    """Latitude, longitude and timezone per place from schedule constraints, or None when none are given.
+
+    constraints["location_coordinates"] maps place -> [lat, lon] or {"latitude", "longitude", "timezone"};
+    constraints["latitude"], ["longitude"] and ["timezone"] cover places without their own entry.
+    """
+    constraints = constraints or {}
+    per_place = constraints.get("location_coordinates") or {}
+    default = None
+    if constraints.get("latitude") is not None and constraints.get("longitude") is not None:
+        default = {
+            "latitude": float(constraints["latitude"]),
+            "longitude": float(constraints["longitude"]),
+            "timezone": constraints.get("timezone")
+        }
+    if not per_place and default is None:
+        return None
+
+    resolved = {"latitude": [], "longitude": [], "timezone": [], "known": []}
+    for place in places:
+        entry = per_place.get(place)
+        if isinstance(entry, (list, tuple)) and len(entry) >= 2:
+            entry = {"latitude": entry[0], "longitude": entry[1], "timezone": constraints.get("timezone")}
+        entry = entry or default
+        resolved["known"].append(entry is not None)
+        entry = entry or DEFAULT_COORDINATES
+        resolved["latitude"].append(float(entry["latitude"]))
+        resolved["longitude"].append(float(entry["longitude"]))
+        resolved["timezone"].append(entry.get("timezone"))
+    return resolved
+
+
+def daylight_table(dates: Sequence[Any], coordinates: Dict[str, list]) -> Dict[str, np.ndarray]:
+    """Solar event times for dates x resolved coordinates, using local clock time."""
+    offsets = utc_offsets(dates, coordinates["timezone"], coordinates["longitude"])
+    return solar_times(dates, coordinates["latitude"], coordinates["longitude"], offsets)
@@ -0,0 +1,274 @@
+"""
+Multi-unit shooting plans (main unit, second unit, splinter unit).
+
+Scenes that need no principal cast or that are covered by doubles (inserts,
+establishing shots, stunts, aerials) are moved to a second unit; short scenes
+with small crews can go to a splinter unit that shares cast with the main unit
+as long as no actor is needed by two units on the same date. Each unit is
+scheduled by ScheduleEngine and the units are merged into one calendar.
+"""
+
+from typing import Dict, Any, List, Optional, Set
+import logging
+
+from .schedule_engine import ScheduleEngine, scene_eighths
+
+logger = logging.getLogger(__name__)
+
+# Default unit profiles; schedule_constraints["units"] overrides any field
+UNIT_PROFILES = {
+    "main": {
+        "enabled": True,
+        "max_crew": None,
+        "allows_cast": True
+    },
+    "second": {
+        "enabled": True,
+        "max_crew": 25,
+        "allows_cast": False
+    },
+    "splinter": {
+        "enabled": True,
+        "max_crew": 15,
+        "allows_cast": True,
+        "max_scene_eighths": 2
+    }
+}
+
+# Keywords in special requirements, technical cues or descriptions that mark second-unit work
+SECOND_UNIT_KEYWORDS = [
+    "establishing", "insert", "stunt", "drone", "aerial", "crane operator",
+    "car-mounted", "vehicle", "driving", "underwater", "b-roll", "plate"
+]
+
+# Special requirements that mean cast are replaced by doubles on the second unit
+DOUBLE_KEYWORDS = ["stunt", "driver", "underwater"]
+
+# Maximum passes spent moving second or splinter scenes with cast conflicts back to the main unit
+MAX_CONFLICT_PASSES = 5
+
+
+def merge_breakdown_cards(scenes: List[Dict[str, Any]], cards: Optional[List[Dict[str, Any]]]) -> List[Dict[str, Any]]:
+    """Return copies of scenes with crew_estimate, special_requirements and eighths from their breakdown card."""
+    cards_by_scene = {str(card.get("scene_number")): card for card in cards or []}
+    merged = []
+    for scene in scenes:
+        card = cards_by_scene.get(str(scene.get("scene_number")))
+        if not card:
+            merged.append(scene)
+            continue
+        enriched = dict(scene)
+        for key in ("crew_estimate", "special_requirements", "equipment_needed", "adjusted_eighths"):
+            if key in card and key not in enriched:
+                enriched[key] = card[key]
+        merged.append(enriched)
+    return merged
+
+
+def scene_crew_size(scene: Dict[str, Any]) -> int:
+    """Total crew for a scene from its breakdown card estimate, defaulting to a standard crew."""
+    estimate = scene.get("crew_estimate") or {}
+    return int(estimate.get("total_crew", 20)) if isinstance(estimate, dict) else int(estimate)
+
+
+class UnitPlanner:
+    """Assigns scenes to shooting units and schedules each unit."""
+
+    def __init__(self, engine: Optional[ScheduleEngine] = None):
+        self.engine = engine or ScheduleEngine()
+
+    def unit_profiles(self, unit_constraints: Any, main_crew: int = 0) -> Dict[str, Dict[str, Any]]:
+        """Merge the caller's unit overrides into the default profiles.
+
+        main_crew is the main unit's peak crew, used when the main profile has no cap.
+        """
+        overrides = unit_constraints if isinstance(unit_constraints, dict) else {}
+        profiles = {
+            name: {**profile, **(overrides.get(name) or {})}
+            for name, profile in UNIT_PROFILES.items()
+        }
+
+        # Drop the smallest units first when the crews cannot all work the same day
+        max_total_crew = overrides.get("max_total_crew")
+        if max_total_crew:
+            for name in ("splinter", "second"):
+                active = [p for p in profiles.values() if p["enabled"] and p["max_crew"]]
+                if sum(p["max_crew"] for p in active) + (profiles["main"]["max_crew"] or main_crew) <= max_total_crew:
+                    break
+                profiles[name]["enabled"] = False
+        return profiles
+
+    def classify_scene(self, scene: Dict[str, Any], profiles: Dict[str, Dict[str, Any]]) -> str:
+        """Pick the smallest unit that can shoot a scene on its own."""
+        crew = scene_crew_size(scene)
+        cast = scene.get("main_characters", []) or []
+        requirements = " ".join(str(r) for r in scene.get("special_requirements", []) or []).lower()
+        text = " ".join([
+            requirements,
+            " ".join(str(c) for c in scene.get("technical_cues", []) or []).lower(),
+            str(scene.get("description", "")).lower()
+        ])
+
+        second = profiles["second"]
+        if second["enabled"] and (second["max_crew"] is None or crew <= second["max_crew"]):
+            doubled = any(keyword in requirements for keyword in DOUBLE_KEYWORDS)
+            if any(keyword in text for keyword in SECOND_UNIT_KEYWORDS) and (not cast or doubled or second["allows_cast"]):
+                return "second"
+            if not cast and not scene.get("dialogues"):
+                return "second"
+
+        splinter = profiles["splinter"]
+        if splinter["enabled"] and (splinter["allows_cast"] or not cast) and (splinter["max_crew"] is None or crew <= splinter["max_crew"]):
+            if scene_eighths(scene, self.engine.rules) <= splinter.get("max_scene_eighths", 2):
+                return "splinter"
+
+        return "main"
+
+    def plan(
+        self,
+        scenes: List[Dict[str, Any]],
+        start_date: str,
+        unit_constraints: Any = None,
+        schedule_constraints: Optional[Dict[str, Any]] = None,
+        location_optimization: Optional[Dict[str, Any]] = None
+    ) -> Dict[str, Any]:
+        """Split scenes across units, schedule each unit and merge them into one calendar."""
+        constraints = {k: v for k, v in (schedule_constraints or {}).items() if k != "units"}
+        profiles = self.unit_profiles(unit_constraints, max((scene_crew_size(s) for s in scenes), default=0))
+        assignment = {i: self.classify_scene(scene, profiles) for i, scene in enumerate(scenes)}
+
+        # Second or splinter scenes that need an actor another unit has on the same date go back
+        # to main; every reschedule is checked again, and what the last pass leaves is reported
+        moved_to_main: List[str] = []
+        schedules = self._schedule_units(scenes, assignment, start_date, constraints, location_optimization)
+        conflicts = self._cast_conflicts(scenes, schedules)
+        for _ in range(MAX_CONFLICT_PASSES):
+            if not conflicts:
+                break
+            for conflict in conflicts:
+                assignment[conflict.pop("index")] = "main"
+                moved_to_main.append(conflict["scene_number"])
+            schedules = self._schedule_units(scenes, assignment, start_date, constraints, location_optimization)
+            conflicts = self._cast_conflicts(scenes, schedules)
+        for conflict in conflicts:
+            del conflict["index"]
+        if conflicts:
+            logger.warning(f"{len(conflicts)} cast conflicts left after {MAX_CONFLICT_PASSES} passes")
+
+        single_unit = self.engine.build_schedule(scenes, start_date, None, location_optimization, constraints)
+        single_days = len(single_unit["schedule"])
+        multi_days = len(self._merged_dates(schedules))
+
+        units = {}
+        for name, schedule in schedules.items():
+            unit_scenes = [scenes[i] for i, unit in assignment.items() if unit == name]
+            units[name] = {
+                "scene_numbers": [str(s.get("scene_number")) for s in unit_scenes],
+                "shoot_days": len(schedule["schedule"]),
+                "total_eighths": sum(day["total_eighths"] for day in schedule["schedule"]),
+                "peak_crew": max((scene_crew_size(s) for s in unit_scenes), default=0),
+                "crew_cap": profiles[name]["max_crew"],
+                "schedule": schedule["schedule"]
+            }
+
+        logger.info(f"Unit plan: {single_days} single-unit days -> {multi_days} with {len(units)} units")
+        return {
+            "units": units,
+            "merged_calendar": self._merge_calendar(scenes, assignment, schedules),
+            "day_savings": {
+                "single_unit_days": single_days,
+                "multi_unit_days": multi_days,
+                "days_saved": single_days - multi_days
+            },
+            "cast_conflicts_resolved": moved_to_main,
+            "cast_conflicts_unresolved": conflicts,
+            "unit_profiles": profiles
+        }
+
+    def _schedule_units(
+        self,
+        scenes: List[Dict[str, Any]],
+        assignment: Dict[int, str],
+        start_date: str,
+        constraints: Dict[str, Any],
+        location_optimization: Optional[Dict[str, Any]]
+    ) -> Dict[str, Dict[str, Any]]:
+        schedules = {}
+        for name in UNIT_PROFILES:
+            unit_scenes = [scenes[i] for i, unit in assignment.items() if unit == name]
+            if unit_scenes:
+                schedules[name] = self.engine.build_schedule(unit_scenes, start_date, None, location_optimization, constraints)
+        return schedules
+
+    def _working_cast(self, scene: Dict[str, Any], unit: str) -> Set[str]:
+        """Actors a scene needs on set; second-unit doubles stand in for cast."""
+        if unit == "second":
+            requirements = " ".join(str(r) for r in scene.get("special_requirements", []) or []).lower()
+            if any(keyword in requirements for keyword in DOUBLE_KEYWORDS):
+                return set()
+        return set(scene.get("main_characters", []) or [])
+
+    def _cast_conflicts(self, scenes: List[Dict[str, Any]], schedules: Dict[str, Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Second and splinter scenes whose cast works for another unit on the same date.
+
+        Units are checked in profile order against the cast of every unit
+        before them (main first), so each pair of units is compared once and
+        the scene on the later unit is the one reported.
+        """
+        index_by_number = {str(s.get("scene_number", i + 1)): i for i, s in enumerate(scenes)}
+        booked: Dict[str, Set[str]] = {}
+        conflicts = []
+        for name in UNIT_PROFILES:
+            if name not in schedules:
+                continue
+            unit_cast: Dict[str, Set[str]] = {}
+            for day in schedules[name]["schedule"]:
+                busy = booked.get(day["date"], set())
+                for slot in day["scenes"]:
+                    number = str(slot["scene_id"])
+                    cast = self._working_cast(scenes[index_by_number[number]], name)
+                    clash = busy & cast
+                    if name != "main" and clash:
+                        conflicts.append({
+                            "index": index_by_number[number],
+                            "scene_number": number,
+                            "unit": name,
+                            "date": day["date"],
+                            "cast": sorted(clash)
+                        })
+                    unit_cast.setdefault(day["date"], set()).update(cast)
+            for date, cast in unit_cast.items():
+                booked.setdefault(date, set()).update(cast)
+        return conflicts
+
+    def _merged_dates(self, schedules: Dict[str, Dict[str, Any]]) -> List[str]:
+        return sorted({day["date"] for schedule in schedules.values() for day in schedule["schedule"]})
+
+    def _merge_calendar(
+        self,
+        scenes: List[Dict[str, Any]],
+        assignment: Dict[int, str],
+        schedules: Dict[str, Dict[str, Any]]
+    ) -> List[Dict[str, Any]]:
+        """One row per shoot date listing what every unit shoots and the combined crew."""
+        crew_by_number = {str(s.get("scene_number", i + 1)): scene_crew_size(s) for i, s in enumerate(scenes)}
+        merged: Dict[str, Dict[str, Any]] = {}
+        for name, schedule in schedules.items():
+            for day in schedule["schedule"]:
+                row = merged.setdefault(day["date"], {"date": day["date"], "units": {}, "total_crew": 0})
+                numbers = [str(slot["scene_id"]) for slot in day["scenes"]]
+                unit_crew = max((crew_by_number[n] for n in numbers), default=0)
+                row["units"][name] = {
+                    "unit_day": day["day"],
+                    "crew_call": day["crew_call"],
+                    "locations": day["locations"],
+                    "scenes": numbers,
+                    "crew": unit_crew
+                }
+                row["total_crew"] += unit_crew
+
+        calendar = [merged[date] for date in sorted(merged)]
+        for day_number, row in enumerate(calendar, start=1):
+            row["day"] = day_number
+            row["units_shooting"] = len(row["units"])
+        return calendar
@@ -0,0 +1,108 @@
+"""
+Adaptive concurrency for image generation requests.
+
+AdaptiveLimiter keeps a sliding window of requests in flight and sizes it
+with AIMD, as TCP does: every successful request grows the limit by
+1/limit (about one slot per window), while a throttled or failed request
+(429, 5xx, transport error) halves it and a request whose latency rises
+well above the best seen trims it by a tenth. Decreases apply at most once
+per window, so a burst of 429s from requests that were already in flight
+counts as a single congestion event. Retries back off exponentially with
+full jitter.
+"""
+
+from typing import Dict, Any, Optional
+import asyncio
+import logging
+import random
+
+logger = logging.getLogger(__name__)
+
+INITIAL_LIMIT = 4
+MIN_LIMIT = 1
+MAX_LIMIT = 16
+
+# Multiplicative decreases on throttling and on latency growth
+THROTTLE_DECREASE = 0.5
+LATENCY_DECREASE = 0.9
+# Latency above this multiple of the fastest request seen counts as congestion
+LATENCY_BACKOFF_RATIO = 2.5
+
+RETRYABLE_STATUS_CODES = {429, 500, 502, 503, 504}
+BACKOFF_BASE_SECONDS = 1.0
+BACKOFF_MAX_SECONDS = 30.0
+
+
+def backoff_delay(attempt: int, base: float = BACKOFF_BASE_SECONDS, cap: float = BACKOFF_MAX_SECONDS) -> float:
+    """Full-jitter exponential backoff for a 0-based retry attempt."""
+    return random.uniform(0, min(cap, base * 2 ** attempt))
+
+
+class AdaptiveLimiter:
+    """AIMD-sized window of concurrent requests."""
+
+    def __init__(self, initial: int = INITIAL_LIMIT, minimum: int = MIN_LIMIT, maximum: int = MAX_LIMIT):
+        self.min_limit = minimum
+        self.max_limit = maximum
+        self.limit = float(min(max(initial, minimum), maximum))
+        self.in_flight = 0
+        self._window = 0
+        self._condition: Optional[asyncio.Condition] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._best_latency: Optional[float] = None
+        self.stats = {"completed": 0, "throttled": 0, "failed": 0, "slow": 0}
+
+    def _ready(self) -> asyncio.Condition:
+        # Created per event loop, so the limiter can be built outside one and reused across asyncio.run calls
+        loop = asyncio.get_running_loop()
+        if self._condition is None or self._loop is not loop:
+            self._condition = asyncio.Condition()
+            self._loop = loop
+            self.in_flight = 0
+        return self._condition
+
+    async def acquire(self) -> int:
+        """Wait for a free slot; returns the window the request started in, for release()."""
+        condition = self._ready()
+        async with condition:
+            await condition.wait_for(lambda: self.in_flight < int(self.limit))
+            self.in_flight += 1
+            return self._window
+
+    async def release(self, window: int, latency: Optional[float] = None, throttled: bool = False, failed: bool = False) -> None:
+        """Return a slot and adapt the limit to how the request went."""
+        condition = self._ready()
+        async with condition:
+            self.in_flight -= 1
+            if throttled:
+                self.stats["throttled"] += 1
+                self._decrease(window, THROTTLE_DECREASE)
+            elif failed:
+                # Errors that say nothing about load (bad input, missing output) leave the limit alone
+                self.stats["failed"] += 1
+            elif latency is not None:
+                self.stats["completed"] += 1
+                if self._best_latency is None or latency < self._best_latency:
+                    self._best_latency = latency
+                if latency > self._best_latency * LATENCY_BACKOFF_RATIO:
+                    self.stats["slow"] += 1
+                    self._decrease(window, LATENCY_DECREASE)
+                else:
+                    self.limit = min(self.max_limit, self.limit + 1 / self.limit)
+            condition.notify_all()
+
+    def _decrease(self, window: int, factor: float) -> None:
+        # Requests started before the last decrease report congestion it already answered
+        if window != self._window:
+            return
+        self.limit = max(self.min_limit, self.limit * factor)
+        self._window += 1
+        logger.info(f"Image concurrency reduced to {int(self.limit)}")
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "limit": int(self.limit),
+            "in_flight": self.in_flight,
+            "best_latency_s": round(self._best_latency, 3) if self._best_latency is not None else None,
+            **self.stats
+        }
@@ -7,10 +7,21 @@ import time
 from urllib.parse import urljoin
 from datetime import datetime
 import replicate
+from replicate.exceptions import ReplicateError
 import httpx
 
+from ..adaptive_limiter import AdaptiveLimiter, RETRYABLE_STATUS_CODES, backoff_delay
+from ..image_store import ImageStore, request_key
+from ..image_derivatives import derivative_path, generate_derivatives
+
 logger = logging.getLogger(__name__)
 
+IMAGE_MODEL = "black-forest-labs/flux-schnell"
+DEFAULT_ASPECT_RATIO = "1:1"
+
+# Tries per image (prediction and download each) before giving up
+MAX_IMAGE_ATTEMPTS = 4
+
 class ImageGeneratorAgent:
     """Agent responsible for generating storyboard images from text prompts.
     
@@ -32,6 +43,17 @@ class ImageGeneratorAgent:
             os.environ["REPLICATE_API_TOKEN"] = self.replicate_api_token
             self.replicate_enabled = True
         
+        # Predictions go through one client (REPLICATE_BASE_URL points it at another server)
+        # and an AIMD-sized window of concurrent requests shared by all callers
+        self.replicate_client = replicate.Client(api_token=self.replicate_api_token) if self.replicate_enabled else None
+        self.limiter = AdaptiveLimiter()
+        
+        # Images already generated are served from the content-addressed store; identical
+        # requests made while one is still generating wait for it instead of running again
+        self.image_store = ImageStore()
+        self._stores = {self.image_store.root: self.image_store}
+        self._in_flight: Dict[str, asyncio.Task] = {}
+        
         # Shot type presets
         self.shot_presets = {
             "WS": "wide shot showing the full scene and environment",
@@ -110,59 +132,113 @@ class ImageGeneratorAgent:
             return [{"scene_id": item.get("scene_id", "unknown"), "error": "Replicate API not configured"} for item in prompt_data]
         
         logger.info(f"Generating images for {len(prompt_data)} prompts")
+        started = time.monotonic()
         results = []
         
-        # Create a single HTTP client for all requests
+        # Create a single HTTP client for all requests; the limiter keeps a sliding window in flight
         async with httpx.AsyncClient() as client:
-            batch_size = 5
-            for i in range(0, len(prompt_data), batch_size):
-                batch = prompt_data[i:i + batch_size]
-                
-                tasks = []
-                for item in batch:
-                    scene_id = item.get("scene_id")
-                    base_prompt = item.get("prompt")
-                    
-                    if not scene_id or not base_prompt:
-                        logger.warning(f"Missing scene_id or prompt in item: {item}")
-                        results.append({
-                            "scene_id": scene_id or "unknown",
-                            "error": "Missing scene_id or prompt"
-                        })
-                        continue
-
-                    # Enhanced prompt building with technical parameters
-                    enhanced_prompt = self._build_enhanced_prompt(
-                        base_prompt=base_prompt,
-                        shot_type=item.get("shot_type"),
-                        style_type=item.get("style_type"),
-                        camera_angle=item.get("camera_angle"),
-                        lighting=item.get("lighting"),
-                        mood=item.get("mood")
-                    )
-                    
-                    item["enhanced_prompt"] = enhanced_prompt
-                    tasks.append(self._generate_single_image(scene_id, enhanced_prompt, client))
-                
-                batch_results = await asyncio.gather(*tasks, return_exceptions=True)
-                
-                for result in batch_results:
-                    if isinstance(result, Exception):
-                        logger.error(f"Error in batch processing: {str(result)}")
-                        results.append({
-                            "scene_id": "unknown",
-                            "error": f"Batch processing error: {str(result)}"
-                        })
-                    else:
-                        results.append(result)
-                
-                if i + batch_size < len(prompt_data):
-                    await asyncio.sleep(2)
+            outcomes = await asyncio.gather(
+                *(self.generate_for_prompt(item, client) for item in prompt_data),
+                return_exceptions=True
+            )
         
-        logger.info(f"Completed image generation for {len(results)} prompts")
+        for result in outcomes:
+            if isinstance(result, Exception):
+                logger.error(f"Error in batch processing: {str(result)}")
+                results.append({
+                    "scene_id": "unknown",
+                    "error": f"Batch processing error: {str(result)}"
+                })
+            else:
+                results.append(result)
+        
+        generated = sum(1 for result in results if result.get("image_data"))
+        cached = sum(1 for result in results if result.get("cached"))
+        elapsed = max(time.monotonic() - started, 1e-9)
+        logger.info(
+            f"Completed image generation for {len(results)} prompts, {cached} from the image store "
+            f"({generated / elapsed * 60:.1f} images/minute, limiter {self.limiter.snapshot()})"
+        )
         return results
     
-    async def _generate_single_image(self, scene_id: str, prompt: str, client: httpx.AsyncClient) -> Dict[str, Any]:
+    async def generate_for_prompt(self, item: Dict[str, Any], client: httpx.AsyncClient) -> Dict[str, Any]:
+        """Image for one prompt result from PromptGeneratorAgent.
+        
+        New images carry their bytes in image_data; images found in the image store
+        come back already saved, with cached set and image_path pointing at the file.
+        """
+        scene_id = item.get("scene_id")
+        base_prompt = item.get("prompt")
+        
+        if not scene_id or not base_prompt:
+            logger.warning(f"Missing scene_id or prompt in item: {item}")
+            return {
+                "scene_id": scene_id or "unknown",
+                "error": "Missing scene_id or prompt"
+            }
+        
+        if not self.replicate_enabled:
+            return {"scene_id": scene_id, "error": "Replicate API not configured"}
+        
+        # Enhanced prompt building with technical parameters
+        enhanced_prompt = self._build_enhanced_prompt(
+            base_prompt=base_prompt,
+            shot_type=item.get("shot_type"),
+            style_type=item.get("style_type"),
+            camera_angle=item.get("camera_angle"),
+            lighting=item.get("lighting"),
+            mood=item.get("mood")
+        )
+        
+        item["enhanced_prompt"] = enhanced_prompt
+        seed = item.get("seed")
+        aspect_ratio = item.get("aspect_ratio", DEFAULT_ASPECT_RATIO)
+        key = request_key(IMAGE_MODEL, enhanced_prompt, seed, aspect_ratio)
+        
+        stored = await asyncio.to_thread(self.image_store.get, key)
+        if stored:
+            logger.info(f"Serving image for scene {scene_id} from the image store")
+            return self._stored_result(scene_id, enhanced_prompt, stored, seed, aspect_ratio)
+        
+        # The generation runs as its own task and every caller, the first included, waits on it
+        # through its own shield: a cancelled caller stops waiting without cancelling the others
+        generation = self._in_flight.get(key)
+        if generation is not None and not generation.done() and generation.get_loop() is asyncio.get_running_loop():
+            logger.info(f"Scene {scene_id} shares an image already being generated")
+        else:
+            generation = asyncio.ensure_future(
+                self._generate_single_image(scene_id, enhanced_prompt, client, seed, aspect_ratio)
+            )
+            self._in_flight[key] = generation
+            generation.add_done_callback(
+                lambda done, key=key: self._in_flight.pop(key) if self._in_flight.get(key) is done else None
+            )
+        shared = await asyncio.shield(generation)
+        return {**shared, "scene_id": scene_id, "metadata": dict(shared.get("metadata", {}))}
+    
+    def _stored_result(self, scene_id: str, prompt: str, stored: Dict[str, Any],
+                       seed: Optional[int], aspect_ratio: str) -> Dict[str, Any]:
+        """Result for an image served from the store, shaped like one returned by save_image."""
+        return {
+            "scene_id": scene_id,
+            "prompt": prompt,
+            "image_path": stored["path"],
+            "local_file_path": stored["path"],
+            "web_path": self._web_path(stored),
+            "status": "success",
+            "cached": True,
+            "metadata": {
+                "model": "flux-schnell",
+                "timestamp": datetime.now().isoformat(),
+                "seed": seed,
+                "aspect_ratio": aspect_ratio,
+                "content_hash": stored["content_hash"]
+            }
+        }
+    
+    async def _generate_single_image(self, scene_id: str, prompt: str, client: httpx.AsyncClient,
+                                     seed: Optional[int] = None,
+                                     aspect_ratio: str = DEFAULT_ASPECT_RATIO) -> Dict[str, Any]:
         """Generate a single image from a prompt using Replicate's Flux Schnell model."""
         logger.info(f"Generating image for scene {scene_id}")
         
@@ -183,11 +259,7 @@ class ImageGeneratorAgent:
         
         try:
             # Run the Flux Schnell model
-            prediction = await asyncio.to_thread(
-                replicate.run,
-                "black-forest-labs/flux-schnell",
-                input={"prompt": prompt}
-            )
+            prediction = await self._run_prediction(scene_id, prompt, seed, aspect_ratio)
             
             # Get the first image from the output
             if prediction and len(prediction) > 0:
@@ -198,14 +270,14 @@ class ImageGeneratorAgent:
                 image_url = image_output.url if hasattr(image_output, 'url') else str(image_output)
                 
                 # Download the image data
-                response = await client.get(image_url)
-                response.raise_for_status()
-                image_data = response.content
+                image_data = await self._download(image_url, client)
                 
                 result["image_data"] = image_data
                 result["metadata"]["model"] = "flux-schnell"
                 result["metadata"]["timestamp"] = datetime.now().isoformat()
                 result["metadata"]["image_url"] = image_url
+                result["metadata"]["seed"] = seed
+                result["metadata"]["aspect_ratio"] = aspect_ratio
             else:
                 raise ValueError("No image generated")
             
@@ -217,6 +289,54 @@ class ImageGeneratorAgent:
                 "scene_id": scene_id,
                 "error": str(e)
             }
+    
+    def _is_retryable(self, error: Exception) -> bool:
+        """Throttling, server errors and dropped connections are worth retrying; anything else is not."""
+        if isinstance(error, ReplicateError):
+            return error.status in RETRYABLE_STATUS_CODES
+        if isinstance(error, httpx.HTTPStatusError):
+            return error.response.status_code in RETRYABLE_STATUS_CODES
+        return isinstance(error, httpx.TransportError)
+    
+    async def _run_prediction(self, scene_id: str, prompt: str, seed: Optional[int] = None,
+                              aspect_ratio: str = DEFAULT_ASPECT_RATIO) -> Any:
+        """One Flux Schnell prediction inside a limiter slot, retried with jittered backoff."""
+        model_input = {"prompt": prompt, "aspect_ratio": aspect_ratio}
+        if seed is not None:
+            model_input["seed"] = seed
+        for attempt in range(MAX_IMAGE_ATTEMPTS):
+            window = await self.limiter.acquire()
+            started = time.monotonic()
+            # A cancelled request gives its slot back without a verdict on the load
+            outcome: Dict[str, Any] = {}
+            try:
+                prediction = await self.replicate_client.async_run(IMAGE_MODEL, input=model_input)
+                outcome = {"latency": time.monotonic() - started}
+                return prediction
+            except Exception as e:
+                retryable = self._is_retryable(e)
+                outcome = {"throttled": retryable, "failed": not retryable}
+                if not retryable or attempt == MAX_IMAGE_ATTEMPTS - 1:
+                    raise
+                error = str(e)
+            finally:
+                # Shielded, so a second cancellation cannot interrupt the release and leak the slot
+                await asyncio.shield(self.limiter.release(window, **outcome))
+            delay = backoff_delay(attempt)
+            logger.warning(f"Prediction for scene {scene_id} failed ({error}), retry {attempt + 1} in {delay:.1f}s")
+            await asyncio.sleep(delay)
+    
+    async def _download(self, image_url: str, client: httpx.AsyncClient) -> bytes:
+        """Image bytes from the prediction's output URL, retried with jittered backoff."""
+        for attempt in range(MAX_IMAGE_ATTEMPTS):
+            try:
+                response = await client.get(image_url)
+                response.raise_for_status()
+                return response.content
+            except Exception as e:
+                if not self._is_retryable(e) or attempt == MAX_IMAGE_ATTEMPTS - 1:
+                    raise
+                await asyncio.sleep(backoff_delay(attempt))
 
     async def save_images_to_disk(self, results: List[Dict[str, Any]], output_dir: str) -> List[Dict[str, Any]]:
         """Save generated images to disk."""
@@ -225,49 +345,102 @@ class ImageGeneratorAgent:
         
         saved_results = []
         for result in results:
-            scene_id = result.get("scene_id", "unknown")
-            
-            try:
-                if "error" in result:
-                    logger.warning(f"Skipping scene {scene_id} due to error: {result['error']}")
-                    saved_results.append(result)
-                    continue
-                
-                if not result.get("image_data"):
-                    logger.warning(f"No image data for scene {scene_id}")
-                    result["error"] = "No image data"
-                    saved_results.append(result)
-                    continue
-                
-                # Save image to disk
-                filename = f"scene_{scene_id}.webp"
-                filepath = os.path.join(output_dir, filename)
-                
-                with open(filepath, "wb") as f:
-                    f.write(result["image_data"])
-                
-                # Update result with file path
-                saved_result = result.copy()
-                saved_result["image_path"] = filepath
-                saved_result.pop("image_data", None)  # Remove binary data
-                
-                # Add web-accessible path
-                try:
-                    web_path = os.path.join("storage", "storyboards", filename)
-                    saved_result["web_path"] = web_path.replace(os.sep, "/")  # Ensure forward slashes for web paths
-                except Exception as e:
-                    logger.warning(f"Error creating web path for scene {scene_id}: {str(e)}")
-                
-                saved_results.append(saved_result)
-                
-                logger.info(f"Saved image for scene {scene_id} to {filepath}")
-                
-            except Exception as e:
-                logger.error(f"Error saving image for scene {scene_id}: {str(e)}")
-                result["error"] = f"Error saving image: {str(e)}"
-                saved_results.append(result)
+            saved_results.append(self.save_image(result, output_dir))
+        
+        return list(await asyncio.gather(*(self.add_derivatives(result) for result in saved_results)))
+    
+    async def add_derivatives(self, saved_result: Dict[str, Any]) -> Dict[str, Any]:
+        """Create the thumbnail, preview and print sizes of a saved image and list them under derivatives."""
+        if saved_result.get("status") != "success" or not saved_result.get("image_path"):
+            return saved_result
+        
+        try:
+            paths = await generate_derivatives(saved_result["image_path"])
+            store = self._store_containing(saved_result["image_path"])
+            if store:
+                # Derivatives count toward the store's byte cap and are evicted with their original
+                await asyncio.to_thread(store.record_derivatives, saved_result["image_path"])
+        except Exception as e:
+            # Views fall back to the original when a derivative is missing
+            logger.warning(f"Error creating derivatives for scene {saved_result.get('scene_id')}: {str(e)}")
+            return saved_result
+        
+        web_path = saved_result.get("web_path")
+        saved_result["derivatives"] = {
+            size: {
+                "image_path": path,
+                "web_path": derivative_path(web_path, size) if web_path else None
+            }
+            for size, path in paths.items()
+        }
+        return saved_result
+    
+    def _store_for(self, output_dir: Optional[str]) -> ImageStore:
+        if not output_dir:
+            return self.image_store
+        root = os.path.normpath(output_dir)
+        if root not in self._stores:
+            self._stores[root] = ImageStore(root)
+        return self._stores[root]
+    
+    def _store_containing(self, path: str) -> Optional[ImageStore]:
+        path = os.path.abspath(path)
+        for store in self._stores.values():
+            if path.startswith(os.path.abspath(store.root) + os.sep):
+                return store
+        return None
+    
+    def _web_path(self, stored: Dict[str, Any]) -> str:
+        # Forward slashes for web paths; the hash in the name lets browsers cache the URL indefinitely
+        return "/".join(["storage", "storyboards", stored["relative_path"]])
+    
+    def save_image(self, result: Dict[str, Any], output_dir: Optional[str] = None) -> Dict[str, Any]:
+        """Add one generated image to the image store under output_dir; the returned result has its path instead of its bytes.
+        
+        Files are named after the SHA-256 of their bytes, so an image generated twice is written once.
+        """
+        scene_id = result.get("scene_id", "unknown")
         
-        return saved_results
+        try:
+            if "error" in result:
+                logger.warning(f"Skipping scene {scene_id} due to error: {result['error']}")
+                return result
+            
+            if result.get("cached"):
+                return result
+            
+            if not result.get("image_data"):
+                logger.warning(f"No image data for scene {scene_id}")
+                result["error"] = "No image data"
+                return result
+            
+            # Save image to the store, keyed by the request that produced it
+            metadata = result.get("metadata", {})
+            stored = self._store_for(output_dir).put(
+                result["image_data"],
+                IMAGE_MODEL,
+                result.get("prompt", ""),
+                metadata.get("seed"),
+                metadata.get("aspect_ratio", DEFAULT_ASPECT_RATIO)
+            )
+            filepath = stored["path"]
+            
+            # Update result with file path
+            saved_result = result.copy()
+            saved_result["image_path"] = filepath
+            saved_result["local_file_path"] = filepath
+            saved_result["status"] = "success"
+            saved_result["web_path"] = self._web_path(stored)
+            saved_result["metadata"] = {**metadata, "content_hash": stored["content_hash"]}
+            saved_result.pop("image_data", None)  # Remove binary data
+            
+            logger.info(f"Saved image for scene {scene_id} to {filepath}")
+            return saved_result
+            
+        except Exception as e:
+            logger.error(f"Error saving image for scene {scene_id}: {str(e)}")
+            result["error"] = f"Error saving image: {str(e)}"
+            return result
 
     async def generate_image(
         self,
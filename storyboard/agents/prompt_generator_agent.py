@@ -1,7 +1,10 @@
 import logging
 import os
 import re
-from typing import Dict, Any, List, Optional, Union
+import json
+import hashlib
+from collections import OrderedDict
+from typing import Dict, Any, List, Optional, Union, Tuple, AsyncIterator
 import asyncio
 
 from google import genai
@@ -9,6 +12,11 @@ from google.genai import types
 
 logger = logging.getLogger(__name__)
 
+# Gemini calls in flight at once, scenes described per call, and prompts kept in memory
+MAX_CONCURRENT_PROMPTS = 8
+PROMPT_BATCH_SIZE = 4
+PROMPT_CACHE_SIZE = 2048
+
 class PromptGeneratorAgent:
     """Agent responsible for generating detailed image prompts from scene descriptions.
     
@@ -72,13 +80,57 @@ class PromptGeneratorAgent:
 
         OUTPUT ONLY THE PROMPT, nothing else.
         """
+
+        self.batch_prompt_template = """
+        Create a detailed visual prompt for an AI image generator for each of these scenes.
+        
+        {scenes}
+        
+        Each prompt should:
+        1. Include the key visual elements (setting, characters, actions)
+        2. Specify camera angle, framing, and perspective
+        3. Describe lighting, mood, and atmosphere
+        4. Use specific, evocative, and concrete language
+        5. Avoid dialogue or non-visual elements
+        6. Keep the prompt under 200 words
+        7. Format as a single paragraph without bullet points
+
+        Respond ONLY with JSON: {{"prompts": [{{"id": string, "prompt": string}}]}}, one entry per scene id.
+        """
+
+        # Generated prompts keyed by (scene description hash, shot type, mood), least recently used first
+        self._prompt_cache: "OrderedDict[Tuple[str, str, str], str]" = OrderedDict()
+    
+    async def generate_prompts(
+        self,
+        scene_data: Dict[str, Any],
+        max_concurrency: int = MAX_CONCURRENT_PROMPTS,
+        batch_size: int = PROMPT_BATCH_SIZE
+    ) -> List[Dict[str, Any]]:
+        """Generate image prompts for a list of scenes with enhanced technical parameters.
+        
+        Prompts are cached per (scene description, shot type, mood), so a re-run
+        only asks Gemini about changed scenes. The rest are described batch_size
+        scenes per call, with at most max_concurrency calls in flight; results
+        keep the scene order.
+        """
+        results = [result async for result in self.iter_prompts(scene_data, max_concurrency, batch_size)]
+        return sorted(results, key=lambda result: result["sequence_number"])
     
-    async def generate_prompts(self, scene_data: Dict[str, Any]) -> List[Dict[str, Any]]:
-        """Generate image prompts for a list of scenes with enhanced technical parameters."""
+    async def iter_prompts(
+        self,
+        scene_data: Dict[str, Any],
+        max_concurrency: int = MAX_CONCURRENT_PROMPTS,
+        batch_size: int = PROMPT_BATCH_SIZE
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """Yield prompts as they become ready: cached ones first, then each batch as it completes.
+        
+        Every result carries the scene's 1-based sequence_number in scene_data.
+        """
         scenes = scene_data.get('scenes', [])
         logger.info(f"Generating prompts for {len(scenes)} scenes")
         
-        results = []
+        entries = []
         for i, scene in enumerate(scenes):
             if isinstance(scene, str):
                 scene_id = str(i + 1)
@@ -94,35 +146,156 @@ class PromptGeneratorAgent:
             if not scene_description:
                 logger.warning(f"Scene {scene_id} has no description, skipping")
                 continue
-            
+            entries.append({
+                "scene_id": scene_id,
+                "scene_heading": scene_heading,
+                "scene_description": scene_description,
+                "technical_params": technical_params,
+                "sequence_number": i + 1,
+                "key": self._cache_key(scene_description, technical_params)
+            })
+        
+        # Scenes sharing a key (repeated descriptions) are generated once
+        pending = {}
+        for entry in entries:
+            # Refresh and read a hit together; later misses may evict it from the LRU
+            prompt = self._prompt_cache.get(entry["key"])
+            if prompt is not None:
+                self._prompt_cache.move_to_end(entry["key"])
+                yield self._prompt_result(entry, prompt, cached=True)
+            else:
+                pending.setdefault(entry["key"], []).append(entry)
+        logger.info(f"Generating {len(pending)} new prompts; {len(entries) - len(pending)} scenes reuse cached or repeated prompts")
+        
+        semaphore = asyncio.Semaphore(max(1, max_concurrency))
+        misses = [waiting[0] for waiting in pending.values()]
+        size = max(1, batch_size)
+        tasks = [
+            asyncio.ensure_future(self._generate_batch(misses[i:i + size], semaphore))
+            for i in range(0, len(misses), size)
+        ]
+        try:
+            for completed in asyncio.as_completed(tasks):
+                for key, prompt in (await completed).items():
+                    if not isinstance(prompt, Exception):
+                        self._remember(key, prompt)
+                    for entry in pending.pop(key, []):
+                        yield self._prompt_result(entry, prompt, cached=False)
+        finally:
+            for task in tasks:
+                task.cancel()
+    
+    def _prompt_result(self, entry: Dict[str, Any], prompt: Union[str, Exception], cached: bool) -> Dict[str, Any]:
+        if isinstance(prompt, Exception):
+            logger.error(f"Error generating prompt for scene {entry['scene_id']}: {str(prompt)}")
+            return {
+                "scene_id": entry["scene_id"],
+                "scene_heading": entry["scene_heading"],
+                "sequence_number": entry["sequence_number"],
+                "error": str(prompt)
+            }
+        return {
+            "scene_id": entry["scene_id"],
+            "scene_heading": entry["scene_heading"],
+            "scene_description": entry["scene_description"],
+            "prompt": prompt,
+            "technical_params": entry["technical_params"],
+            "sequence_number": entry["sequence_number"],
+            "cached": cached
+        }
+    
+    def _cache_key(self, scene_description: str, technical_params: Dict[str, Any]) -> Tuple[str, str, str]:
+        # Technical notes also shape the prompt, so they are hashed with the description
+        text = f"{scene_description}\n{technical_params.get('technical_notes', '')}"
+        return (
+            hashlib.sha256(text.encode()).hexdigest(),
+            technical_params.get("shot_type", "MS"),
+            technical_params.get("mood", "neutral")
+        )
+    
+    def _remember(self, key: Tuple[str, str, str], prompt: str) -> None:
+        self._prompt_cache[key] = prompt
+        self._prompt_cache.move_to_end(key)
+        if len(self._prompt_cache) > PROMPT_CACHE_SIZE:
+            self._prompt_cache.popitem(last=False)
+    
+    async def _generate_batch(
+        self,
+        batch: List[Dict[str, Any]],
+        semaphore: asyncio.Semaphore
+    ) -> Dict[Tuple[str, str, str], Union[str, Exception]]:
+        """Prompts for a batch of scenes from one Gemini call; scenes it misses are retried one by one."""
+        prompts = {}
+        if len(batch) > 1:
             try:
-                # Generate the prompt with technical parameters
-                prompt = await self._generate_single_prompt(
-                    scene_description,
-                    shot_type=technical_params.get("shot_type", "MS"),
-                    technical_notes=technical_params.get("technical_notes", ""),
-                    mood=technical_params.get("mood", "neutral")
-                )
-                
-                result = {
-                    "scene_id": scene_id,
-                    "scene_heading": scene_heading,
-                    "scene_description": scene_description,
-                    "prompt": prompt,
-                    "technical_params": technical_params
-                }
-                results.append(result)
-                logger.info(f"Generated prompt for scene {scene_id}")
-                
+                async with semaphore:
+                    prompts = await self._generate_batch_prompts(batch)
+            except Exception as e:
+                logger.warning(f"Batched prompt generation failed for {len(batch)} scenes, retrying singly: {str(e)}")
+        
+        async def single(entry: Dict[str, Any]) -> Union[str, Exception]:
+            params = entry["technical_params"]
+            try:
+                async with semaphore:
+                    return await self._generate_single_prompt(
+                        entry["scene_description"],
+                        shot_type=params.get("shot_type", "MS"),
+                        technical_notes=params.get("technical_notes", ""),
+                        mood=params.get("mood", "neutral")
+                    )
             except Exception as e:
-                logger.error(f"Error generating prompt for scene {scene_id}: {str(e)}")
-                results.append({
-                    "scene_id": scene_id,
-                    "scene_heading": scene_heading,
-                    "error": str(e)
-                })
-        
-        return results
+                return e
+        
+        missing = [entry for entry in batch if entry["key"] not in prompts]
+        for entry, prompt in zip(missing, await asyncio.gather(*(single(entry) for entry in missing))):
+            prompts[entry["key"]] = prompt
+        return prompts
+    
+    async def _generate_batch_prompts(self, batch: List[Dict[str, Any]]) -> Dict[Tuple[str, str, str], str]:
+        """One Gemini call describing several scenes; returns the prompts it produced, by cache key."""
+        sections = []
+        for number, entry in enumerate(batch, start=1):
+            params = entry["technical_params"]
+            shot_type = params.get("shot_type", "MS")
+            sections.append(
+                f"SCENE ID: {number}\n"
+                f"SCENE: {entry['scene_description']}\n"
+                f"SHOT TYPE: {self.shot_templates.get(shot_type, '').format(scene=entry['scene_description'], subject='the subject')}\n"
+                f"TECHNICAL NOTES: {params.get('technical_notes', '')}\n"
+                f"MOOD: {self.mood_templates.get(params.get('mood', 'neutral'), '')}"
+            )
+        system_message = "You are a master cinematic storyboard artist."
+        full_prompt = f"{system_message}\n\n{self.batch_prompt_template.format(scenes=chr(10).join(sections))}"
+        
+        response = await asyncio.to_thread(
+            self.client.models.generate_content,
+            model="gemini-2.5-flash",
+            contents=full_prompt,
+            config=types.GenerateContentConfig(
+                temperature=0.7,
+                max_output_tokens=8000,
+                top_p=0.95,
+                top_k=20,
+                response_mime_type="application/json"
+            )
+        )
+        text = response.candidates[0].content.parts[0].text
+        match = re.search(r'\{.*\}', text, re.DOTALL)
+        parsed = json.loads(match.group(0) if match else text)
+        
+        prompts = {}
+        for item in parsed.get("prompts", []):
+            try:
+                number = int(item["id"])
+            except (KeyError, ValueError, TypeError):
+                continue
+            if not 1 <= number <= len(batch):
+                continue
+            entry = batch[number - 1]
+            prompt = str(item.get("prompt") or "").strip()
+            if prompt:
+                prompts[entry["key"]] = prompt
+        return prompts
     
     async def _generate_single_prompt(
         self, 
@@ -1,13 +1,17 @@
 import logging
 import os
+import asyncio
+import shutil
 from typing import Dict, Any, List
 from datetime import datetime
 import json
-from fpdf import FPDF
 import base64
 from PIL import Image
 import io
 
+from ..storyboard_document import StoryboardDocument
+from ..storyboard_export import StoryboardExporter, DEFAULT_PANELS_PER_PAGE, ProgressCallback
+
 logger = logging.getLogger(__name__)
 
 class StoryboardFormatterAgent:
@@ -17,56 +21,35 @@ class StoryboardFormatterAgent:
         """Initialize the StoryboardFormatterAgent."""
         logger.info("Initializing StoryboardFormatterAgent")
         self.annotations = {}  # Store annotations by panel_id
+        self.exporter = StoryboardExporter(os.path.join("data", "storyboards", "exports"))
     
     async def format_storyboard(
         self,
         scene_data: Dict[str, Any],
         prompts: List[Dict[str, Any]],
         image_results: List[Dict[str, Any]]
-    ) -> Dict[str, Any]:
+    ) -> StoryboardDocument:
         """Format storyboard data for display and export."""
         logger.info("Formatting storyboard data")
         
-        formatted = {
+        formatted = StoryboardDocument({
             "title": scene_data.get("metadata", {}).get("title", "Untitled Script"),
             "timestamp": datetime.now().isoformat(),
             "scenes": [],
             "status": "success",
             "sequence_order": [],  # Track panel sequence
             "annotations": {}  # Store panel annotations
-        }
+        })
+        
+        prompts_by_scene = {}
+        for prompt in prompts:
+            prompts_by_scene.setdefault(prompt.get("scene_id"), prompt)
         
         for image_result in image_results:
-            scene_id = image_result.get("scene_id")
-            prompt_data = next((p for p in prompts if p.get("scene_id") == scene_id), {})
-            
-            scene_entry = {
-                "scene_id": scene_id,
-                "scene_heading": prompt_data.get("scene_heading", ""),
-                "description": prompt_data.get("scene_description", ""),
-                "prompt": prompt_data.get("prompt", ""),
-                "revised_prompt": image_result.get("revised_prompt"),
-                "status": image_result.get("status", "error"),
-                "image_path": None,
-                "web_path": None,
-                "image_url": None,
-                "technical_params": prompt_data.get("technical_params", {}),
-                "annotations": [],
-                "sequence_number": len(formatted["scenes"]) + 1
-            }
-            
-            if image_result.get("status") == "success":
-                scene_entry.update({
-                    "image_path": image_result.get("local_file_path"),
-                    "web_path": image_result.get("web_path"),
-                    "image_url": image_result.get("image_url"),
-                    "image_data": image_result.get("image_data")
-                })
-            else:
-                scene_entry["error"] = image_result.get("error", "Unknown error")
-            
-            formatted["scenes"].append(scene_entry)
-            formatted["sequence_order"].append(scene_id)
+            prompt_data = prompts_by_scene.get(image_result.get("scene_id"), {})
+            scene_entry = self.format_panel(prompt_data, image_result, len(formatted["scenes"]) + 1)
+            # Unsaved image bytes stay with the document, out of its JSON
+            formatted.add_panel(scene_entry, image_result.get("image_data"))
         
         formatted["metadata"] = {
             "scene_count": len(formatted["scenes"]),
@@ -86,50 +69,59 @@ class StoryboardFormatterAgent:
         logger.info(f"Formatted storyboard with {len(formatted['scenes'])} scenes")
         return formatted
 
-    async def export_pdf(self, storyboard_data: Dict[str, Any], output_path: str) -> str:
-        """Export storyboard as PDF document."""
+    def format_panel(
+        self,
+        prompt_data: Dict[str, Any],
+        image_result: Dict[str, Any],
+        sequence_number: int
+    ) -> Dict[str, Any]:
+        """One storyboard panel from a scene's prompt and its saved image result; image bytes are left out."""
+        scene_entry = {
+            "scene_id": image_result.get("scene_id"),
+            "scene_heading": prompt_data.get("scene_heading", ""),
+            "description": prompt_data.get("scene_description", ""),
+            "prompt": prompt_data.get("prompt", ""),
+            "revised_prompt": image_result.get("revised_prompt"),
+            "status": image_result.get("status", "error"),
+            "image_path": None,
+            "web_path": None,
+            "image_url": None,
+            "technical_params": prompt_data.get("technical_params", {}),
+            "annotations": [],
+            "sequence_number": sequence_number
+        }
+        
+        if image_result.get("status") == "success":
+            scene_entry.update({
+                "image_path": image_result.get("local_file_path"),
+                "web_path": image_result.get("web_path"),
+                "image_url": image_result.get("image_url"),
+                "derivatives": image_result.get("derivatives", {})
+            })
+        else:
+            scene_entry["error"] = image_result.get("error", "Unknown error")
+        return scene_entry
+
+    def _web_image(self, scene: Dict[str, Any], size: str) -> str:
+        return scene.get("derivatives", {}).get(size, {}).get("web_path") or scene["web_path"]
+
+    async def export_pdf(
+        self,
+        storyboard_data: Dict[str, Any],
+        output_path: str = None,
+        panels_per_page: int = DEFAULT_PANELS_PER_PAGE,
+        progress: ProgressCallback = None
+    ) -> str:
+        """Export storyboard as a grid-layout PDF document, written off the event loop.
+        
+        The file is cached per storyboard version and copied to output_path when one is given.
+        """
         try:
-            pdf = FPDF()
-            pdf.set_auto_page_break(auto=True, margin=15)
-            
-            # Add title page
-            pdf.add_page()
-            pdf.set_font("Arial", "B", 24)
-            pdf.cell(0, 20, storyboard_data["title"], ln=True, align="C")
-            pdf.set_font("Arial", "", 12)
-            pdf.cell(0, 10, f"Generated on: {storyboard_data['timestamp']}", ln=True, align="C")
-            
-            # Add scenes
-            for scene in storyboard_data["scenes"]:
-                pdf.add_page()
-                
-                # Scene header
-                pdf.set_font("Arial", "B", 16)
-                pdf.cell(0, 10, f"Scene {scene['scene_id']}: {scene['scene_heading']}", ln=True)
-                
-                # Image
-                if scene.get("image_path"):
-                    try:
-                        pdf.image(scene["image_path"], x=10, y=pdf.get_y()+5, w=190)
-                    except Exception as e:
-                        logger.error(f"Error adding image to PDF: {str(e)}")
-                
-                # Scene details
-                pdf.set_y(pdf.get_y() + 140)  # Move below image
-                pdf.set_font("Arial", "", 10)
-                pdf.multi_cell(0, 5, f"Description: {scene['description']}")
-                pdf.multi_cell(0, 5, f"Technical Notes: {scene.get('technical_params', {})}")
-                
-                # Annotations
-                if scene.get("annotations"):
-                    pdf.set_font("Arial", "B", 12)
-                    pdf.cell(0, 10, "Annotations:", ln=True)
-                    pdf.set_font("Arial", "", 10)
-                    for annotation in scene["annotations"]:
-                        pdf.multi_cell(0, 5, f"- {annotation['text']}")
-            
-            # Save PDF
-            pdf.output(output_path)
+            result = await asyncio.to_thread(self.exporter.export, storyboard_data, panels_per_page, progress)
+            if not output_path or os.path.abspath(output_path) == os.path.abspath(result["path"]):
+                return result["path"]
+            os.makedirs(os.path.dirname(output_path) or ".", exist_ok=True)
+            await asyncio.to_thread(shutil.copyfile, result["path"], output_path)
             logger.info(f"Exported storyboard PDF to {output_path}")
             return output_path
             
@@ -177,7 +169,7 @@ class StoryboardFormatterAgent:
                 html_content.append(f"""
                 <div class="slide">
                     <h2>Scene {scene['scene_id']}: {scene['scene_heading']}</h2>
-                    <img src="{scene['web_path']}" class="scene-image" alt="Scene {scene['scene_id']}">
+                    <img src="{self._web_image(scene, 'preview')}" class="scene-image" alt="Scene {scene['scene_id']}">
                     <div class="scene-details">
                         <p><strong>Description:</strong> {scene['description']}</p>
                         <p><strong>Technical Notes:</strong> {scene.get('technical_params', {})}</p>
@@ -219,52 +211,47 @@ class StoryboardFormatterAgent:
             logger.error(f"Error exporting slideshow: {str(e)}")
             raise
 
-    async def add_annotation(self, storyboard_data: Dict[str, Any], scene_id: str, annotation: str) -> Dict[str, Any]:
+    async def add_annotation(self, storyboard_data: Dict[str, Any], scene_id: str, annotation: str) -> StoryboardDocument:
         """Add an annotation to a specific scene."""
         try:
-            for scene in storyboard_data["scenes"]:
-                if scene["scene_id"] == scene_id:
-                    if "annotations" not in scene:
-                        scene["annotations"] = []
-                    
-                    annotation_entry = {
-                        "id": len(scene["annotations"]) + 1,
-                        "text": annotation,
-                        "timestamp": datetime.now().isoformat()
-                    }
-                    
-                    scene["annotations"].append(annotation_entry)
-                    logger.info(f"Added annotation to scene {scene_id}")
-                    return storyboard_data
+            document = StoryboardDocument.from_dict(storyboard_data)
+            scene = document.panel(scene_id)
+            if scene is None:
+                logger.warning(f"Scene {scene_id} not found")
+                return document
+            
+            if "annotations" not in scene:
+                scene["annotations"] = []
+            
+            annotation_entry = {
+                "id": len(scene["annotations"]) + 1,
+                "text": annotation,
+                "timestamp": datetime.now().isoformat()
+            }
             
-            logger.warning(f"Scene {scene_id} not found")
-            return storyboard_data
+            scene["annotations"].append(annotation_entry)
+            logger.info(f"Added annotation to scene {scene_id}")
+            return document
             
         except Exception as e:
             logger.error(f"Error adding annotation: {str(e)}")
             raise
 
-    async def reorder_sequence(self, storyboard_data: Dict[str, Any], new_order: List[str]) -> Dict[str, Any]:
+    async def reorder_sequence(self, storyboard_data: Dict[str, Any], new_order: List[str]) -> StoryboardDocument:
         """Reorder the sequence of scenes in the storyboard."""
         try:
+            document = StoryboardDocument.from_dict(storyboard_data)
+            
             # Validate all scene IDs exist
-            current_scenes = {scene["scene_id"] for scene in storyboard_data["scenes"]}
-            if not all(scene_id in current_scenes for scene_id in new_order):
+            panels = document.panels
+            if not all(scene_id in panels for scene_id in new_order):
                 raise ValueError("Invalid scene IDs in new order")
             
-            # Create new scene list in specified order
-            new_scenes = []
-            for scene_id in new_order:
-                scene = next(s for s in storyboard_data["scenes"] if s["scene_id"] == scene_id)
-                scene["sequence_number"] = len(new_scenes) + 1
-                new_scenes.append(scene)
-            
-            storyboard_data["scenes"] = new_scenes
-            storyboard_data["sequence_order"] = new_order
+            document.reorder(new_order)
             
             logger.info("Updated storyboard sequence order")
-            return storyboard_data
+            return document
             
         except Exception as e:
             logger.error(f"Error reordering sequence: {str(e)}")
-            raise 
\ No newline at end of file
+            raise
@@ -160,9 +160,9 @@ class StoryboardManager:
             
             logger.info(f"Saving storyboard data to {filename}")
             
-            # Ensure data is JSON serializable
+            # Serialize once; this also ensures data is JSON serializable
             try:
-                json.dumps(data)
+                payload = json.dumps(data, indent=2)
             except TypeError as e:
                 logger.error(f"Data is not JSON serializable: {str(e)}")
                 raise TypeError(f"Data is not JSON serializable: {str(e)}")
@@ -170,7 +170,7 @@ class StoryboardManager:
             os.makedirs(os.path.dirname(filename), exist_ok=True)
             
             with open(filename, "w") as f:
-                json.dump(data, f, indent=2)
+                f.write(payload)
             
             logger.info(f"Successfully saved {os.path.getsize(filename)} bytes to {filename}")
             return filename
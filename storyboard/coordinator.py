@@ -1,7 +1,9 @@
-from typing import Dict, Any, List
+from typing import Dict, Any, List, AsyncIterator
+import asyncio
 import json
 import os
 import logging
+import httpx
 from datetime import datetime
 from base_config import AGENT_INSTRUCTIONS, get_model_config
 from google import genai
@@ -18,11 +20,15 @@ from .agents.production_designer_agent import ProductionDesignerAgent
 from .agents.prompt_generator_agent import PromptGeneratorAgent
 from .agents.image_generator_agent import ImageGeneratorAgent
 from .agents.storyboard_formatter_agent import StoryboardFormatterAgent
+from .storyboard_export import DEFAULT_PANELS_PER_PAGE, ProgressCallback
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Items buffered between pipeline stages
+PIPELINE_QUEUE_DEPTH = 4
+
 class StoryboardCoordinator:
     """
     🎨 Agent 6: Storyboard Coordinator
@@ -70,62 +76,11 @@ class StoryboardCoordinator:
     ) -> Dict[str, Any]:
         """Generate storyboard images for scenes through the enhanced pipeline."""
         try:
-            logger.info("Starting storyboard generation pipeline")
-            
-            # Process scene data with shot type analysis
-            processed_scene_data = self._analyze_and_process_scenes(scene_data)
-            if not processed_scene_data["scenes"]:
-                raise ValueError("No valid scenes found in scene data")
-            
-            logger.info(f"Found {len(processed_scene_data['scenes'])} scenes for storyboard generation")
-            
-            # Apply shot settings if provided, otherwise use analyzed settings
-            if shot_settings:
-                processed_scene_data = self._apply_shot_settings(processed_scene_data, shot_settings)
-            
-            # Generate prompts with technical parameters
-            logger.info("Step 1: Generating image prompts for scenes")
-            prompts = await self.prompt_generator.generate_prompts(processed_scene_data)
-            if not prompts:
-                raise ValueError("Failed to generate scene prompts")
-            logger.info(f"Generated {len(prompts)} scene prompts")
-            
-            # Generate images with style parameters
-            logger.info("Step 2: Generating storyboard images")
-            image_results = await self.image_generator.generate_images(prompts)
-            if not image_results:
-                raise ValueError("Failed to generate storyboard images")
-            
-            # Save images to disk in static directory for web access
-            output_dir = os.path.join("static", "storage", "storyboards")
-            image_results = await self.image_generator.save_images_to_disk(image_results, output_dir)
-            logger.info(f"Generated and saved {len(image_results)} storyboard images")
-            
-            # Format storyboard for display
-            logger.info("Step 3: Formatting storyboard for display")
-            formatted_storyboard = await self.storyboard_formatter.format_storyboard(
-                processed_scene_data, 
-                prompts, 
-                image_results
-            )
-            
-            # Convert absolute paths to web-accessible paths
-            for scene in formatted_storyboard["scenes"]:
-                if "image_path" in scene and scene["image_path"]:
-                    # Get the relative path from the static directory
-                    try:
-                        relative_path = os.path.relpath(scene["image_path"], start="static")
-                        scene["image_path"] = relative_path
-                    except ValueError:
-                        # If paths are on different drives, keep the original path
-                        pass
-            
-            # Save storyboard data
-            saved_path = self._save_to_disk(formatted_storyboard)
-            formatted_storyboard["saved_path"] = saved_path
-            
-            logger.info("Storyboard generation pipeline completed successfully")
-            return formatted_storyboard
+            storyboard = None
+            async for event in self.stream_storyboard(scene_data, shot_settings):
+                if event["type"] == "complete":
+                    storyboard = event["storyboard"]
+            return storyboard
             
         except Exception as e:
             logger.error(f"Failed to generate storyboard: {str(e)}", exc_info=True)
@@ -134,6 +89,132 @@ class StoryboardCoordinator:
                 "status": "failed"
             }
     
+    async def stream_storyboard(
+        self,
+        scene_data: Dict[str, Any],
+        shot_settings: Dict[str, Any] = None,
+        queue_depth: int = PIPELINE_QUEUE_DEPTH
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """Generate a storyboard as a pipeline, yielding {"type": "panel"} events as panels finish.
+        
+        Prompts, image generation and saving run as concurrent stages joined by
+        queues of queue_depth items: each prompt goes to image generation as soon
+        as it is ready and each image is written to disk as soon as it downloads,
+        so at most queue_depth images (plus those in flight) are held in memory.
+        The last event is {"type": "complete", "storyboard": ...} with the panels
+        in scene order.
+        """
+        logger.info("Starting storyboard generation pipeline")
+        
+        # Process scene data with shot type analysis
+        processed_scene_data = self._analyze_and_process_scenes(scene_data)
+        if not processed_scene_data["scenes"]:
+            raise ValueError("No valid scenes found in scene data")
+        
+        logger.info(f"Found {len(processed_scene_data['scenes'])} scenes for storyboard generation")
+        
+        # Apply shot settings if provided, otherwise use analyzed settings
+        if shot_settings:
+            processed_scene_data = self._apply_shot_settings(processed_scene_data, shot_settings)
+        
+        # Save images to disk in static directory for web access
+        output_dir = os.path.join("static", "storage", "storyboards")
+        os.makedirs(output_dir, exist_ok=True)
+        
+        # One worker per slot the image limiter may open; the limiter decides how many run at once
+        image_workers = self.image_generator.limiter.max_limit
+        prompt_queue: asyncio.Queue = asyncio.Queue(maxsize=queue_depth)
+        image_queue: asyncio.Queue = asyncio.Queue(maxsize=queue_depth)
+        # Panels carry paths, not image bytes, so this queue needs no bound
+        panel_queue: asyncio.Queue = asyncio.Queue()
+        
+        async def produce_prompts():
+            async for prompt in self.prompt_generator.iter_prompts(processed_scene_data):
+                await prompt_queue.put(prompt)
+            for _ in range(image_workers):
+                await prompt_queue.put(None)
+        
+        async def generate_images(client: httpx.AsyncClient):
+            while (prompt := await prompt_queue.get()) is not None:
+                if "error" in prompt:
+                    result = {"scene_id": prompt["scene_id"], "error": prompt["error"]}
+                else:
+                    result = await self.image_generator.generate_for_prompt(prompt, client)
+                await image_queue.put((prompt, result))
+            await image_queue.put(None)
+        
+        async def save_images():
+            finished = 0
+            while finished < image_workers:
+                item = await image_queue.get()
+                if item is None:
+                    finished += 1
+                    continue
+                prompt, result = item
+                saved = await asyncio.to_thread(self.image_generator.save_image, result, output_dir)
+                saved = await self.image_generator.add_derivatives(saved)
+                await panel_queue.put((prompt, saved))
+        
+        prompts, image_results = [], []
+        async with httpx.AsyncClient() as client:
+            stages = [
+                asyncio.ensure_future(produce_prompts()),
+                *(asyncio.ensure_future(generate_images(client)) for _ in range(image_workers)),
+                asyncio.ensure_future(save_images())
+            ]
+            pipeline = asyncio.gather(*stages)
+            # Wake the consumer when the pipeline finishes or any stage fails
+            pipeline.add_done_callback(lambda _: panel_queue.put_nowait(None))
+            try:
+                while (item := await panel_queue.get()) is not None:
+                    prompt, saved = item
+                    prompts.append(prompt)
+                    image_results.append(saved)
+                    panel = self.storyboard_formatter.format_panel(prompt, saved, prompt["sequence_number"])
+                    yield {"type": "panel", "panel": self._web_panel(panel)}
+                await pipeline
+            finally:
+                for stage in stages:
+                    stage.cancel()
+        logger.info(f"Generated and saved {len(image_results)} storyboard images")
+        
+        # Format storyboard for display, in scene order
+        order = sorted(range(len(prompts)), key=lambda i: prompts[i]["sequence_number"])
+        formatted_storyboard = await self.storyboard_formatter.format_storyboard(
+            processed_scene_data,
+            [prompts[i] for i in order],
+            [image_results[i] for i in order]
+        )
+        formatted_storyboard["scenes"] = [self._web_panel(scene) for scene in formatted_storyboard["scenes"]]
+        
+        # Save storyboard data
+        saved_path = self._save_to_disk(formatted_storyboard)
+        formatted_storyboard["saved_path"] = saved_path
+        
+        logger.info("Storyboard generation pipeline completed successfully")
+        yield {"type": "complete", "storyboard": formatted_storyboard}
+    
+    def _web_panel(self, scene: Dict[str, Any]) -> Dict[str, Any]:
+        """Convert a panel's absolute image paths to ones relative to the static directory."""
+        scene["image_path"] = self._static_path(scene.get("image_path"))
+        if scene.get("derivatives"):
+            # A new dict: the derivatives dict is shared with the image result, which is formatted more than once
+            scene["derivatives"] = {
+                size: {**entry, "image_path": self._static_path(entry.get("image_path"))}
+                for size, entry in scene["derivatives"].items()
+            }
+        return scene
+    
+    def _static_path(self, path: str) -> str:
+        if not path:
+            return path
+        # Get the relative path from the static directory
+        try:
+            return os.path.relpath(path, start="static")
+        except ValueError:
+            # If paths are on different drives, keep the original path
+            return path
+    
     def _analyze_and_process_scenes(self, scene_data: Dict[str, Any]) -> Dict[str, Any]:
         """Analyze scenes and determine appropriate shot types."""
         if not isinstance(scene_data, dict):
@@ -236,9 +317,9 @@ class StoryboardCoordinator:
             
             logger.info(f"Saving storyboard data to {filename}")
             
-            # Validate data is JSON serializable
+            # Serialize once; this also validates the data is JSON serializable
             try:
-                json.dumps(data)
+                payload = json.dumps(data, indent=2)
             except TypeError as e:
                 logger.error(f"Data is not JSON serializable: {str(e)}")
                 raise TypeError(f"Data is not JSON serializable: {str(e)}")
@@ -246,7 +327,7 @@ class StoryboardCoordinator:
             os.makedirs(os.path.dirname(filename), exist_ok=True)
             
             with open(filename, "w") as f:
-                json.dump(data, f, indent=2)
+                f.write(payload)
             
             logger.info(f"Successfully saved {os.path.getsize(filename)} bytes to {filename}")
             return filename
@@ -259,10 +340,29 @@ class StoryboardCoordinator:
         self,
         storyboard_data: Dict[str, Any],
         export_format: str = "pdf",
-        output_path: str = None
+        output_path: str = None,
+        panels_per_page: int = DEFAULT_PANELS_PER_PAGE,
+        progress: ProgressCallback = None
     ) -> str:
         """Export storyboard in specified format."""
-        return await self.storyboard_formatter.export_pdf(storyboard_data, output_path)
+        if export_format == "slideshow":
+            return await self.storyboard_formatter.export_slideshow(storyboard_data, output_path)
+        return await self.storyboard_formatter.export_pdf(storyboard_data, output_path, panels_per_page, progress)
+    
+    async def export_pdf(
+        self,
+        storyboard_data: Dict[str, Any],
+        panels_per_page: int = DEFAULT_PANELS_PER_PAGE,
+        progress: ProgressCallback = None
+    ) -> Dict[str, Any]:
+        """Grid-layout PDF of a storyboard, cached per version; returns its path, filename and page counts."""
+        try:
+            return await asyncio.to_thread(
+                self.storyboard_formatter.exporter.export, storyboard_data, panels_per_page, progress
+            )
+        except Exception as e:
+            logger.error(f"Error exporting storyboard PDF: {str(e)}", exc_info=True)
+            raise RuntimeError(f"Failed to export storyboard PDF: {str(e)}")
     
     async def add_annotation(
         self,
@@ -0,0 +1,92 @@
+"""
+Scaled derivatives of stored storyboard images.
+
+Each original gets a thumbnail (grids and galleries), a preview (slideshow
+and single-panel views), a sheet size (panels in multi-panel PDF pages) and
+a print size (full-page PDF panels), written next to it as
+<content hash>.<size>.<ext>. Since originals are content-addressed, a
+derivative that exists is always current and is never generated twice.
+Web sizes are WebP; PDF sizes are JPEG, which PDFs embed as-is.
+Resizing runs in a shared thread pool (Pillow releases the GIL while
+decoding and resampling), so it stays off the event loop.
+"""
+
+from typing import Dict, Any, List, Optional
+from concurrent.futures import ThreadPoolExecutor
+import asyncio
+import logging
+import os
+import uuid
+
+from PIL import Image
+
+logger = logging.getLogger(__name__)
+
+# Longest edge in pixels, file format and quality per derivative; originals are never upscaled
+DERIVATIVE_SIZES: Dict[str, Dict[str, Any]] = {
+    "thumbnail": {"max_edge": 384, "format": "WEBP", "extension": "webp", "quality": 75},
+    "preview": {"max_edge": 768, "format": "WEBP", "extension": "webp", "quality": 82},
+    "sheet": {"max_edge": 800, "format": "JPEG", "extension": "jpg", "quality": 80},
+    "print": {"max_edge": 1600, "format": "JPEG", "extension": "jpg", "quality": 85},
+}
+
+DERIVATIVE_WORKERS = int(os.environ.get("STORYBOARD_DERIVATIVE_WORKERS", min(8, os.cpu_count() or 1)))
+
+_executor: Optional[ThreadPoolExecutor] = None
+
+
+def _pool() -> ThreadPoolExecutor:
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(max_workers=DERIVATIVE_WORKERS, thread_name_prefix="storyboard-derivatives")
+    return _executor
+
+
+def derivative_path(original: str, size: str) -> str:
+    """Where the given size of an original image is cached."""
+    spec = DERIVATIVE_SIZES[size]
+    stem, _ = os.path.splitext(original)
+    return f"{stem}.{size}.{spec['extension']}"
+
+
+def create_derivatives(original: str, sizes: Optional[List[str]] = None) -> Dict[str, str]:
+    """Write any missing derivatives of an original; returns their paths by size."""
+    sizes = sizes or list(DERIVATIVE_SIZES)
+    paths = {size: derivative_path(original, size) for size in sizes}
+    missing = [size for size in sizes if not os.path.exists(paths[size])]
+    if not missing:
+        return paths
+
+    with Image.open(original) as source:
+        source.load()
+        # Largest first, so each smaller size is resampled from the previous one rather than the original
+        image = source.convert("RGB")
+        for size in sorted(missing, key=lambda s: -DERIVATIVE_SIZES[s]["max_edge"]):
+            spec = DERIVATIVE_SIZES[size]
+            image.thumbnail((spec["max_edge"], spec["max_edge"]), Image.LANCZOS)
+            # Write beside the target and rename, so concurrent readers never see a partial file
+            partial = f"{paths[size]}.{uuid.uuid4().hex}.partial"
+            image.save(partial, format=spec["format"], quality=spec["quality"])
+            os.replace(partial, paths[size])
+    logger.info(f"Created {len(missing)} derivatives of {original}")
+    return paths
+
+
+def derivative_for(original: str, size: str) -> str:
+    """Path of one size of an original, created on first use; falls back to the original."""
+    path = derivative_path(original, size)
+    if os.path.exists(path):
+        return path
+    if not os.path.isfile(original):
+        return original
+    try:
+        return create_derivatives(original, [size])[size]
+    except Exception as e:
+        logger.warning(f"Could not create {size} derivative of {original}: {str(e)}")
+        return original
+
+
+async def generate_derivatives(original: str) -> Dict[str, str]:
+    """create_derivatives in the shared worker pool."""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_pool(), create_derivatives, original)
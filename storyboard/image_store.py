@@ -0,0 +1,213 @@
+"""
+Content-addressed storage for generated storyboard images.
+
+A generation request is identified by (model, enhanced prompt, seed, size);
+its image bytes are stored once under their SHA-256, in a file named after
+that hash, so identical outputs share a file and browsers can cache image
+URLs forever. A SQLite index next to the images maps request keys to
+content hashes and tracks size and last use; scaled derivatives written
+next to an image (<hash>.<size>.<ext>) count toward its size once recorded.
+When the store grows past its byte cap, the least recently used images are
+evicted with their derivatives and entries.
+"""
+
+from typing import Dict, Any, Optional
+from contextlib import contextmanager
+from datetime import datetime
+import glob
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import uuid
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_IMAGE_DIR = os.environ.get("STORYBOARD_IMAGE_DIR", os.path.join("static", "storage", "storyboards"))
+DEFAULT_MAX_BYTES = int(os.environ.get("STORYBOARD_IMAGE_CACHE_BYTES", 2 * 1024 ** 3))
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS blobs (
+    content_hash TEXT PRIMARY KEY,
+    path TEXT NOT NULL,
+    bytes INTEGER NOT NULL,
+    derivative_bytes INTEGER NOT NULL DEFAULT 0,
+    last_used TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS entries (
+    key TEXT PRIMARY KEY,
+    content_hash TEXT NOT NULL,
+    model TEXT NOT NULL,
+    prompt TEXT NOT NULL,
+    seed INTEGER,
+    size TEXT,
+    created_at TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS entries_by_content ON entries (content_hash);
+CREATE INDEX IF NOT EXISTS blobs_by_use ON blobs (last_used);
+"""
+
+
+def request_key(model: str, prompt: str, seed: Optional[int] = None, size: Optional[str] = None) -> str:
+    """Hash identifying one image generation request."""
+    payload = json.dumps({"model": model, "prompt": prompt, "seed": seed, "size": size}, sort_keys=True)
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+class ImageStore:
+    """Images on disk by content hash, indexed by generation request, with LRU eviction."""
+
+    def __init__(self, root: str = DEFAULT_IMAGE_DIR, max_bytes: int = DEFAULT_MAX_BYTES, extension: str = "webp"):
+        self.root = root
+        self.max_bytes = max_bytes
+        self.extension = extension
+        os.makedirs(root, exist_ok=True)
+        self.index_path = os.path.join(root, "image_index.db")
+        with self._connect() as connection:
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.executescript(SCHEMA)
+            columns = {row[1] for row in connection.execute("PRAGMA table_info(blobs)")}
+            if "derivative_bytes" not in columns:
+                # Indexes created before derivatives were counted
+                connection.execute("ALTER TABLE blobs ADD COLUMN derivative_bytes INTEGER NOT NULL DEFAULT 0")
+
+    @contextmanager
+    def _connect(self):
+        # A connection per call keeps the index safe across threads and processes
+        connection = sqlite3.connect(self.index_path, timeout=30, isolation_level=None)
+        try:
+            connection.execute("PRAGMA busy_timeout=30000")
+            yield connection
+        finally:
+            connection.close()
+
+    def _record(self, path: str, content_hash: str, key: Optional[str] = None) -> Dict[str, Any]:
+        relative = os.path.relpath(path, self.root).replace(os.sep, "/")
+        return {"key": key, "content_hash": content_hash, "path": path, "relative_path": relative}
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """Stored image for a request key, or None; a hit counts as a use for eviction."""
+        with self._connect() as connection:
+            row = connection.execute(
+                "SELECT blobs.content_hash, blobs.path FROM entries JOIN blobs USING (content_hash) WHERE entries.key = ?",
+                (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            content_hash, path = row
+            if not os.path.exists(path):
+                # The file was removed behind the index's back; forget it and its derivatives
+                connection.execute("DELETE FROM entries WHERE content_hash = ?", (content_hash,))
+                connection.execute("DELETE FROM blobs WHERE content_hash = ?", (content_hash,))
+                for derivative in self._derivatives(path):
+                    os.remove(derivative)
+                return None
+            connection.execute(
+                "UPDATE blobs SET last_used = ? WHERE content_hash = ?",
+                (datetime.now().isoformat(), content_hash)
+            )
+        return self._record(path, content_hash, key)
+
+    def put(
+        self,
+        data: bytes,
+        model: str,
+        prompt: str,
+        seed: Optional[int] = None,
+        size: Optional[str] = None
+    ) -> Dict[str, Any]:
+        """Store image bytes for a request; bytes already stored (under any request) are not written again."""
+        key = request_key(model, prompt, seed, size)
+        content_hash = hashlib.sha256(data).hexdigest()
+        path = os.path.join(self.root, "images", content_hash[:2], f"{content_hash}.{self.extension}")
+        if not os.path.exists(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            # Write beside the target and rename, so readers never see a partial image
+            partial = f"{path}.{uuid.uuid4().hex}.partial"
+            with open(partial, "wb") as f:
+                f.write(data)
+            os.replace(partial, path)
+
+        now = datetime.now().isoformat()
+        with self._connect() as connection:
+            connection.execute("BEGIN IMMEDIATE")
+            try:
+                connection.execute(
+                    "INSERT INTO blobs (content_hash, path, bytes, last_used) VALUES (?, ?, ?, ?) "
+                    "ON CONFLICT (content_hash) DO UPDATE SET last_used = excluded.last_used",
+                    (content_hash, path, len(data), now)
+                )
+                connection.execute(
+                    "INSERT OR REPLACE INTO entries (key, content_hash, model, prompt, seed, size, created_at) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    (key, content_hash, model, prompt, seed, size, now)
+                )
+                evicted = self._evict(connection, keep=content_hash)
+                connection.execute("COMMIT")
+            except Exception:
+                connection.execute("ROLLBACK")
+                raise
+        self._remove(evicted)
+        return self._record(path, content_hash, key)
+
+    def record_derivatives(self, path: str) -> int:
+        """Count the derivatives written next to a stored image toward its size; returns their bytes."""
+        size = sum(os.path.getsize(derivative) for derivative in self._derivatives(path))
+        with self._connect() as connection:
+            connection.execute("BEGIN IMMEDIATE")
+            try:
+                row = connection.execute("SELECT content_hash FROM blobs WHERE path = ?", (path,)).fetchone()
+                evicted = []
+                if row is not None:
+                    connection.execute("UPDATE blobs SET derivative_bytes = ? WHERE path = ?", (size, path))
+                    evicted = self._evict(connection, keep=row[0])
+                connection.execute("COMMIT")
+            except Exception:
+                connection.execute("ROLLBACK")
+                raise
+        self._remove(evicted)
+        return size
+
+    def _derivatives(self, path: str) -> list:
+        stem, _ = os.path.splitext(path)
+        return [
+            candidate for candidate in glob.glob(f"{glob.escape(stem)}.*")
+            if candidate != path and not candidate.endswith(".partial") and os.path.isfile(candidate)
+        ]
+
+    def _remove(self, evicted: list) -> None:
+        """Delete evicted images and every derivative of them."""
+        for stale in evicted:
+            for file in [stale, *self._derivatives(stale)]:
+                if os.path.exists(file):
+                    os.remove(file)
+        if evicted:
+            logger.info(f"Evicted {len(evicted)} storyboard images to stay under {self.max_bytes} bytes")
+
+    def _evict(self, connection: sqlite3.Connection, keep: str) -> list:
+        """Drop least recently used images until the store fits max_bytes; returns their paths."""
+        total = connection.execute("SELECT COALESCE(SUM(bytes + derivative_bytes), 0) FROM blobs").fetchone()[0]
+        evicted = []
+        if total <= self.max_bytes:
+            return evicted
+        rows = connection.execute(
+            "SELECT content_hash, path, bytes + derivative_bytes FROM blobs WHERE content_hash != ? ORDER BY last_used",
+            (keep,)
+        )
+        for content_hash, path, size in rows.fetchall():
+            if total <= self.max_bytes:
+                break
+            connection.execute("DELETE FROM entries WHERE content_hash = ?", (content_hash,))
+            connection.execute("DELETE FROM blobs WHERE content_hash = ?", (content_hash,))
+            evicted.append(path)
+            total -= size
+        return evicted
+
+    def stats(self) -> Dict[str, Any]:
+        with self._connect() as connection:
+            images, total = connection.execute(
+                "SELECT COUNT(*), COALESCE(SUM(bytes + derivative_bytes), 0) FROM blobs"
+            ).fetchone()
+            entries = connection.execute("SELECT COUNT(*) FROM entries").fetchone()[0]
+        return {"images": images, "entries": entries, "bytes": total, "max_bytes": self.max_bytes}
@@ -0,0 +1,68 @@
+"""
+Storyboard document model.
+
+A formatted storyboard is a plain dict (title, scenes in display order,
+sequence_order, metadata) so it serializes as-is, but StoryboardDocument
+also keeps a map from scene id to the same panel dicts, so finding,
+annotating or reordering panels never scans the board. The map lives in an
+attribute, outside the dict's items, and so do any image bytes that came
+with the panels: neither is ever written to JSON. Storyboards loaded back
+from JSON are wrapped with from_dict, which indexes them once.
+"""
+
+from typing import Dict, Any, List, Optional
+
+
+class StoryboardDocument(dict):
+    """Storyboard dict with an id-indexed panel map and out-of-band image payloads."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.setdefault("scenes", [])
+        self.setdefault("sequence_order", [])
+        # Image bytes by scene id, for panels whose image has not been saved to disk
+        self.payloads: Dict[str, bytes] = {}
+        self._panels: Dict[str, Dict[str, Any]] = {}
+        self._indexed: Optional[List[Dict[str, Any]]] = None
+        self._indexed_count = 0
+
+    @classmethod
+    def from_dict(cls, storyboard: Dict[str, Any]) -> "StoryboardDocument":
+        """The document itself when already one, else a document over the same scene dicts."""
+        if isinstance(storyboard, cls):
+            return storyboard
+        document = cls(storyboard)
+        document.payloads.update(getattr(storyboard, "payloads", {}))
+        return document
+
+    @property
+    def panels(self) -> Dict[str, Dict[str, Any]]:
+        """Panels by scene id; rebuilt only if the scenes list was replaced or resized behind the map."""
+        scenes = self["scenes"]
+        if scenes is not self._indexed or len(scenes) != self._indexed_count:
+            self._panels = {scene["scene_id"]: scene for scene in scenes}
+            self._indexed = scenes
+            self._indexed_count = len(scenes)
+        return self._panels
+
+    def add_panel(self, panel: Dict[str, Any], image_data: Optional[bytes] = None) -> None:
+        panels = self.panels
+        self["scenes"].append(panel)
+        self["sequence_order"].append(panel["scene_id"])
+        panels[panel["scene_id"]] = panel
+        self._indexed_count += 1
+        if image_data:
+            self.payloads[panel["scene_id"]] = image_data
+
+    def panel(self, scene_id: str) -> Optional[Dict[str, Any]]:
+        return self.panels.get(scene_id)
+
+    def reorder(self, new_order: List[str]) -> None:
+        """Put the panels in the given order of scene ids and renumber them."""
+        panels = self.panels
+        scenes = [panels[scene_id] for scene_id in new_order]
+        for number, scene in enumerate(scenes, 1):
+            scene["sequence_number"] = number
+        self["scenes"] = scenes
+        self["sequence_order"] = list(new_order)
+        self._indexed = scenes
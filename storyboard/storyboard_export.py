@@ -0,0 +1,346 @@
+"""
+Storyboard PDF export: panels laid out in a grid, several to a landscape page.
+
+Pages are written to the file as soon as they are laid out. Each panel's
+image is a pre-scaled JPEG derivative that is copied into the PDF
+unchanged (DCTDecode) and released, and only object offsets are kept
+until the cross-reference table is written, so memory stays flat however
+long the board is. A progress callback hears about every finished page.
+Exports are cached on disk by a hash of the storyboard's contents and the
+layout, and served from there until the storyboard changes.
+"""
+
+from typing import Dict, Any, List, Optional, Callable, Tuple, BinaryIO
+from datetime import datetime
+import hashlib
+import io
+import json
+import logging
+import math
+import os
+import time
+import uuid
+
+from fpdf.fonts import fpdf_charwidths
+from PIL import Image
+
+from .image_derivatives import derivative_for
+
+logger = logging.getLogger(__name__)
+
+# Bumped when the layout of an export changes, so cached files are rebuilt
+EXPORT_VERSION = "1"
+
+# Panels per page -> (columns, rows)
+GRID_LAYOUTS = {1: (1, 1), 2: (2, 1), 4: (2, 2), 6: (3, 2), 9: (3, 3), 12: (4, 3)}
+DEFAULT_PANELS_PER_PAGE = 6
+
+# Landscape A4, in millimetres
+PAGE_WIDTH = 297.0
+PAGE_HEIGHT = 210.0
+MARGIN = 10.0
+HEADER_HEIGHT = 12.0
+GUTTER = 5.0
+CAPTION_LINES = 5
+LINE_HEIGHT = 3.4
+
+PT_PER_MM = 72 / 25.4
+
+ProgressCallback = Callable[[int, int], None]
+
+
+def storyboard_version(storyboard: Dict[str, Any], panels_per_page: int = DEFAULT_PANELS_PER_PAGE) -> str:
+    """Hash of everything an export shows, so any edit to the board produces a new cached file."""
+    content = {
+        "export": EXPORT_VERSION,
+        "layout": panels_per_page,
+        "title": storyboard.get("title"),
+        "timestamp": storyboard.get("timestamp"),
+        "panels": [
+            [
+                scene.get("scene_id"),
+                scene.get("scene_heading"),
+                scene.get("description"),
+                scene.get("technical_params"),
+                scene.get("image_path"),
+                [annotation.get("text") for annotation in scene.get("annotations", [])]
+            ]
+            for scene in storyboard.get("scenes", [])
+        ]
+    }
+    return hashlib.sha256(json.dumps(content, sort_keys=True, default=str).encode()).hexdigest()[:16]
+
+
+class StreamingPDF:
+    """Minimal PDF writer that emits each page (and its images) to the file as it is added."""
+
+    def __init__(self, stream: BinaryIO, width: float = PAGE_WIDTH, height: float = PAGE_HEIGHT):
+        self.stream = stream
+        self.width = width
+        self.height = height
+        self.offsets: Dict[int, int] = {}
+        self.page_ids: List[int] = []
+        self._next_id = 1
+        self.stream.write(b"%PDF-1.4\n%\xe2\xe3\xcf\xd3\n")
+        # The page tree is written last, once every page is known
+        self.pages_id = self._reserve()
+        self.fonts = {
+            "F1": self._object(b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica /Encoding /WinAnsiEncoding >>"),
+            "F2": self._object(b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica-Bold /Encoding /WinAnsiEncoding >>")
+        }
+
+    def _reserve(self) -> int:
+        object_id = self._next_id
+        self._next_id += 1
+        return object_id
+
+    def _object(self, body: bytes, object_id: Optional[int] = None) -> int:
+        object_id = object_id or self._reserve()
+        self.offsets[object_id] = self.stream.tell()
+        self.stream.write(f"{object_id} 0 obj\n".encode() + body + b"\nendobj\n")
+        return object_id
+
+    def _stream_object(self, dictionary: str, data: bytes) -> int:
+        return self._object(f"<< {dictionary} /Length {len(data)} >>\nstream\n".encode() + data + b"\nendstream")
+
+    def image(self, path: str) -> Tuple[int, int, int]:
+        """Embed an image file; returns its object id and pixel size."""
+        with Image.open(path) as image:
+            width, height = image.size
+            if image.format == "JPEG" and image.mode in ("RGB", "L"):
+                with open(path, "rb") as f:
+                    data = f.read()
+                colorspace = "/DeviceRGB" if image.mode == "RGB" else "/DeviceGray"
+            else:
+                # Originals that have no JPEG derivative are re-encoded once here
+                buffer = io.BytesIO()
+                image.convert("RGB").save(buffer, format="JPEG", quality=85)
+                data = buffer.getvalue()
+                colorspace = "/DeviceRGB"
+        object_id = self._stream_object(
+            f"/Type /XObject /Subtype /Image /Width {width} /Height {height} "
+            f"/ColorSpace {colorspace} /BitsPerComponent 8 /Filter /DCTDecode",
+            data
+        )
+        return object_id, width, height
+
+    def page(self, content: str, images: Dict[str, int]) -> None:
+        contents_id = self._stream_object("", content.encode("latin-1"))
+        xobjects = " ".join(f"/{name} {object_id} 0 R" for name, object_id in images.items())
+        fonts = " ".join(f"/{name} {object_id} 0 R" for name, object_id in self.fonts.items())
+        resources = f"/Font << {fonts} >>" + (f" /XObject << {xobjects} >>" if images else "")
+        self.page_ids.append(self._object(
+            f"<< /Type /Page /Parent {self.pages_id} 0 R "
+            f"/MediaBox [0 0 {self.width * PT_PER_MM:.2f} {self.height * PT_PER_MM:.2f}] "
+            f"/Resources << {resources} >> /Contents {contents_id} 0 R >>".encode()
+        ))
+
+    def close(self, title: str = "") -> None:
+        kids = " ".join(f"{page_id} 0 R" for page_id in self.page_ids)
+        self._object(f"<< /Type /Pages /Kids [{kids}] /Count {len(self.page_ids)} >>".encode(), self.pages_id)
+        catalog_id = self._object(f"<< /Type /Catalog /Pages {self.pages_id} 0 R >>".encode())
+        info_id = self._object(f"<< /Title ({_escape(title)}) /Producer (Storyboard export) >>".encode("latin-1"))
+        xref = self.stream.tell()
+        size = self._next_id
+        lines = [f"xref\n0 {size}\n", "0000000000 65535 f \n"]
+        lines += [f"{self.offsets[object_id]:010d} 00000 n \n" for object_id in range(1, size)]
+        lines.append(f"trailer\n<< /Size {size} /Root {catalog_id} 0 R /Info {info_id} 0 R >>\nstartxref\n{xref}\n%%EOF\n")
+        self.stream.write("".join(lines).encode())
+
+
+class StoryboardExporter:
+    """Writes and caches grid-layout storyboard PDFs."""
+
+    def __init__(self, export_dir: str):
+        self.export_dir = export_dir
+
+    def path(self, version: str) -> str:
+        return os.path.join(self.export_dir, f"storyboard-{version}.pdf")
+
+    def export(
+        self,
+        storyboard: Dict[str, Any],
+        panels_per_page: int = DEFAULT_PANELS_PER_PAGE,
+        progress: Optional[ProgressCallback] = None
+    ) -> Dict[str, Any]:
+        """Export a storyboard to PDF, or return the cached file for this version of it. Blocking."""
+        started = time.perf_counter()
+        if panels_per_page not in GRID_LAYOUTS:
+            raise ValueError(f"Unsupported panels per page: {panels_per_page} (choose from {sorted(GRID_LAYOUTS)})")
+        scenes = storyboard.get("scenes", [])
+        if not scenes:
+            raise ValueError("Storyboard has no scenes to export")
+
+        version = storyboard_version(storyboard, panels_per_page)
+        path = self.path(version)
+        pages = math.ceil(len(scenes) / panels_per_page)
+        cached = os.path.exists(path)
+        if cached:
+            if progress:
+                progress(len(scenes), len(scenes))
+        else:
+            os.makedirs(self.export_dir, exist_ok=True)
+            # Write beside the target and rename, so concurrent requests never serve a partial file
+            partial = f"{path}.{uuid.uuid4().hex}.partial"
+            try:
+                with open(partial, "wb") as f:
+                    self._write(f, storyboard, panels_per_page, progress)
+                os.replace(partial, path)
+            finally:
+                if os.path.exists(partial):
+                    os.remove(partial)
+
+        result = {
+            "path": path,
+            "filename": f"{_slug(storyboard.get('title', 'storyboard'))}-storyboard.pdf",
+            "media_type": "application/pdf",
+            "version": version,
+            "panels": len(scenes),
+            "pages": pages,
+            "panels_per_page": panels_per_page,
+            "cached": cached,
+            "elapsed_seconds": round(time.perf_counter() - started, 3)
+        }
+        logger.info(f"Storyboard PDF {'served from cache' if cached else 'written'}: {len(scenes)} panels on {pages} pages")
+        return result
+
+    def _write(
+        self,
+        stream: BinaryIO,
+        storyboard: Dict[str, Any],
+        panels_per_page: int,
+        progress: Optional[ProgressCallback]
+    ) -> None:
+        scenes = storyboard["scenes"]
+        columns, rows = GRID_LAYOUTS[panels_per_page]
+        # Single-panel pages get the print size; grids get the smaller sheet size
+        size = "print" if panels_per_page == 1 else "sheet"
+        cell_width = (PAGE_WIDTH - 2 * MARGIN - (columns - 1) * GUTTER) / columns
+        cell_height = (PAGE_HEIGHT - 2 * MARGIN - HEADER_HEIGHT - (rows - 1) * GUTTER) / rows
+        image_height = cell_height - CAPTION_LINES * LINE_HEIGHT - 2
+        pages = math.ceil(len(scenes) / panels_per_page)
+        title = str(storyboard.get("title", "Storyboard"))
+        generated = storyboard.get("timestamp") or datetime.now().isoformat()
+
+        pdf = StreamingPDF(stream)
+        for page in range(pages):
+            ops = [
+                _text(MARGIN, MARGIN + 6, title, "F2", 14),
+                _text(PAGE_WIDTH - MARGIN - 60, MARGIN + 6, f"Page {page + 1} of {pages}", "F1", 9),
+                _text(MARGIN, MARGIN + 10, f"Generated on: {generated}", "F1", 7)
+            ]
+            images = {}
+            for slot, scene in enumerate(scenes[page * panels_per_page:(page + 1) * panels_per_page]):
+                x = MARGIN + (slot % columns) * (cell_width + GUTTER)
+                y = MARGIN + HEADER_HEIGHT + (slot // columns) * (cell_height + GUTTER)
+                image_id = self._embed(pdf, scene, size)
+                if image_id:
+                    object_id, pixel_width, pixel_height = image_id
+                    name = f"I{slot}"
+                    images[name] = object_id
+                    # Fit the image to its box, keeping its aspect ratio
+                    scale = min(cell_width / pixel_width, image_height / pixel_height)
+                    width, height = pixel_width * scale, pixel_height * scale
+                    ops.append(_image(name, x + (cell_width - width) / 2, y, width, height))
+                else:
+                    ops.append(_box(x, y, cell_width, image_height))
+                    ops.append(_text(x + 2, y + image_height / 2, "No image", "F1", 8))
+                ops.extend(self._caption(scene, x, y + image_height + 2, cell_width))
+            pdf.page("\n".join(ops), images)
+            if progress:
+                progress(min((page + 1) * panels_per_page, len(scenes)), len(scenes))
+        pdf.close(title)
+
+    def _embed(self, pdf: StreamingPDF, scene: Dict[str, Any], size: str) -> Optional[Tuple[int, int, int]]:
+        original = scene.get("image_path")
+        if not original:
+            return None
+        # Panel paths are relative to the static directory once formatted for the web
+        if not os.path.exists(original) and os.path.exists(os.path.join("static", original)):
+            original = os.path.join("static", original)
+        path = derivative_for(original, size)
+        if not os.path.isfile(path):
+            return None
+        try:
+            return pdf.image(path)
+        except Exception as e:
+            logger.error(f"Error adding image to PDF: {str(e)}")
+            return None
+
+    def _caption(self, scene: Dict[str, Any], x: float, y: float, width: float) -> List[str]:
+        heading = f"Scene {scene.get('scene_id', '?')}: {scene.get('scene_heading', '')}"
+        params = scene.get("technical_params") or {}
+        details = ", ".join(f"{key}: {value}" for key, value in params.items() if value)
+        lines = _wrap(heading, width, 8, bold=True)[:1]
+        lines = [(line, "F2") for line in lines]
+        body = _wrap(scene.get("description", ""), width, 7)
+        if details:
+            body += _wrap(details, width, 7)
+        for annotation in scene.get("annotations", []):
+            body += _wrap(f"- {annotation.get('text', '')}", width, 7)
+        remaining = CAPTION_LINES - len(lines)
+        if len(body) > remaining:
+            body = body[:remaining]
+            body[-1] = _truncate(body[-1], width, 7, force=True)
+        lines += [(line, "F1") for line in body]
+        return [
+            _text(x, y + (index + 1) * LINE_HEIGHT - 0.8, line, font, 8 if font == "F2" else 7)
+            for index, (line, font) in enumerate(lines)
+        ]
+
+
+def _escape(text: Any) -> str:
+    latin = str(text).encode("latin-1", "replace").decode("latin-1")
+    return latin.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)").replace("\r", " ").replace("\n", " ")
+
+
+def _width(text: str, size: float, bold: bool = False) -> float:
+    """Width of a string in millimetres, from FPDF's Helvetica metrics."""
+    widths = fpdf_charwidths["helveticaB" if bold else "helvetica"]
+    return sum(widths.get(char, 556) for char in text) * size / 1000 / PT_PER_MM
+
+
+def _wrap(text: Any, width: float, size: float, bold: bool = False) -> List[str]:
+    lines, line = [], ""
+    for word in str(text or "").split():
+        candidate = f"{line} {word}" if line else word
+        if _width(candidate, size, bold) <= width or not line:
+            line = candidate
+        else:
+            lines.append(line)
+            line = word
+    if line:
+        lines.append(line)
+    return [_truncate(line, width, size, bold) for line in lines]
+
+
+def _truncate(line: str, width: float, size: float, bold: bool = False, force: bool = False) -> str:
+    """Shorten a line to fit width, ending it with an ellipsis; force adds one to mark omitted lines."""
+    if not force and _width(line, size, bold) <= width:
+        return line
+    while line and _width(line + "...", size, bold) > width:
+        line = line[:-1]
+    return line.rstrip() + "..."
+
+
+def _text(x: float, y: float, text: str, font: str, size: float) -> str:
+    return f"BT /{font} {size} Tf {x * PT_PER_MM:.2f} {(PAGE_HEIGHT - y) * PT_PER_MM:.2f} Td ({_escape(text)}) Tj ET"
+
+
+def _image(name: str, x: float, y: float, width: float, height: float) -> str:
+    return (
+        f"q {width * PT_PER_MM:.2f} 0 0 {height * PT_PER_MM:.2f} "
+        f"{x * PT_PER_MM:.2f} {(PAGE_HEIGHT - y - height) * PT_PER_MM:.2f} cm /{name} Do Q"
+    )
+
+
+def _box(x: float, y: float, width: float, height: float) -> str:
+    return (
+        f"q 0.9 g {x * PT_PER_MM:.2f} {(PAGE_HEIGHT - y - height) * PT_PER_MM:.2f} "
+        f"{width * PT_PER_MM:.2f} {height * PT_PER_MM:.2f} re f Q"
+    )
+
+
+def _slug(text: str) -> str:
+    slug = "".join(char if char.isalnum() else "-" for char in str(text).lower()).strip("-")
+    return "-".join(part for part in slug.split("-") if part) or "storyboard"